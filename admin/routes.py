@@ -8,6 +8,12 @@ import os
 from flask_login import current_user
 from . import admin_bp
 
+# Fonogramas listados na prévia do envio delta (o envio inclui todos)
+LIMITE_PREVIA_DELTA = 1000
+
+# Linhas por página nas listas de retornos e de fonogramas do detalhe do envio
+POR_PAGINA_DETALHES_ENVIO = 50
+
 # ==================== DASHBOARD ====================
 
 @admin_bp.route('/')
@@ -59,21 +65,46 @@ def novo_envio():
     fonogramas = envio_service.obter_fonogramas_para_envio()
     return render_template('admin/envios/novo.html', fonogramas=fonogramas)
 
+@admin_bp.route('/envios/delta', methods=['GET', 'POST'])
+@admin_required
+def envio_delta():
+    """Envio delta: só fonogramas novos, alterados ou recusados desde o último envio (com prévia)"""
+    if request.method == 'POST':
+        formato = request.form.get('formato', 'EXCEL')
+        resultado = envio_service.criar_envio_delta(formato=formato, usuario=current_user)
+        
+        if resultado['sucesso']:
+            flash(f'Envio delta criado com sucesso! Protocolo: {resultado["protocolo"]} ({resultado["total"]} fonogramas)', 'success')
+            return redirect(url_for('admin.detalhes_envio', envio_id=resultado['envio_id']))
+        else:
+            flash(f'Erro ao criar envio delta: {resultado["erro"]}', 'danger')
+    
+    # GET: prévia do que entra no envio e por quê
+    delta = envio_service.obter_delta_envio(limite_previa=LIMITE_PREVIA_DELTA)
+    return render_template('admin/envios/delta.html', delta=delta)
+
 @admin_bp.route('/envios/<int:envio_id>')
 @admin_required
 def detalhes_envio(envio_id):
     """Detalhes de um envio específico"""
     envio = EnvioECAD.query.get_or_404(envio_id)
-    retornos = RetornoECAD.query.filter_by(envio_id=envio_id).all()
-    return render_template('admin/envios/detalhes.html', envio=envio, retornos=retornos)
+    detalhes = envio_service.obter_detalhes_envio(
+        envio_id,
+        pagina_retornos=request.args.get('page', 1, type=int),
+        pagina_fonogramas=request.args.get('page_fonogramas', 1, type=int),
+        por_pagina=POR_PAGINA_DETALHES_ENVIO
+    )
+    return render_template('admin/envios/detalhes.html', envio=envio, **detalhes)
 
 @admin_bp.route('/envios/<int:envio_id>/download')
 @admin_required
 def download_arquivo_envio(envio_id):
-    """Download do arquivo gerado para envio"""
+    """Download do arquivo gerado para envio (compactado ou não, ver shared/artefatos_envio.py)"""
+    from shared.artefatos_envio import enviar_artefato
+    
     envio = EnvioECAD.query.get_or_404(envio_id)
     if envio.arquivo_gerado and os.path.exists(envio.arquivo_gerado):
-        return send_file(envio.arquivo_gerado, as_attachment=True)
+        return enviar_artefato(envio.arquivo_gerado, descompactar=request.args.get('descompactar') == '1')
     flash('Arquivo não encontrado.', 'danger')
     return redirect(url_for('admin.detalhes_envio', envio_id=envio_id))
 
@@ -119,16 +150,27 @@ def upload_retorno():
         
         arquivo = request.files['arquivo']
         envio_id = request.form.get('envio_id', type=int)
+        confirmar_posicional = request.form.get('confirmar_posicional') == '1'
         
         if not envio_id:
             flash('Selecione o envio relacionado.', 'danger')
             return redirect(request.url)
         
-        resultado = retorno_service.processar_upload_retorno(arquivo, envio_id)
+        resultado = retorno_service.processar_upload_retorno(arquivo, envio_id, confirmar_posicional)
         
-        if resultado['sucesso']:
-            flash(f'Retorno processado! Aceitos: {resultado["aceitos"]}, Recusados: {resultado["recusados"]}', 'success')
+        if resultado['sucesso'] and resultado.get('ja_processado'):
+            processado_em = resultado['processado_em'].strftime('%d/%m/%Y %H:%M') if resultado['processado_em'] else ''
+            flash(f'Este arquivo já foi processado para o envio em {processado_em} '
+                  f'(Aceitos: {resultado["aceitos"]}, Recusados: {resultado["recusados"]}). Nada foi alterado.', 'info')
+            return redirect(url_for('admin.detalhes_envio', envio_id=envio_id))
+        elif resultado['sucesso']:
+            mensagem = f'Retorno processado! Aceitos: {resultado["aceitos"]}, Recusados: {resultado["recusados"]}'
+            if resultado.get('ja_aplicadas'):
+                mensagem += f' ({resultado["ja_aplicadas"]} linha(s) já aplicada(s) antes foram puladas)'
+            flash(mensagem, 'success')
             return redirect(url_for('admin.detalhes_envio', envio_id=envio_id))
+        elif resultado.get('requer_confirmacao'):
+            flash(f'{resultado["erro"]}.', 'warning')
         else:
             flash(f'Erro: {resultado["erro"]}', 'danger')
     
@@ -241,6 +283,16 @@ def importar_lote():
 
             return render_template('admin/lote/resultado_validacao.html', resultado=resultado_final)
             
+        elif request.form.get('assincrono') == '1':
+            # Importação em segundo plano (scripts/worker_importacao.py)
+            from shared import jobs
+            ids = [
+                jobs.enfileirar('importar_lote', user_id=current_user.id, arquivo=arquivo).id
+                for arquivo in arquivos if arquivo.filename
+            ]
+            flash(f'Importação enviada para processamento em segundo plano (jobs: {", ".join(f"#{i}" for i in ids)}).', 'info')
+            return redirect(url_for('admin.importar_lote'))
+            
         else:
             total_salvos = 0
             total_atualizados = 0
@@ -1,11 +1,16 @@
 # admin/services/envio_service.py
 from models import db, Fonograma, EnvioECAD, HistoricoFonograma
-from shared.gerador_ecad import gerar_excel_ecad, gerar_exp_ecad, gerar_txt_ecad, validar_antes_envio
+from shared.gerador_ecad import (
+    gerar_excel_ecad, gerar_exp_ecad, gerar_txt_ecad, gerar_txt_ecad_paralelo, iterar_fonogramas_ecad, validar_envio_em_lote
+)
+from shared.artefatos_envio import caminho_artefato
 from datetime import datetime
 import uuid
 import os
 
 UPLOAD_FOLDER = 'uploads/envios'
+# Fonogramas por comando ao associar e atualizar os fonogramas de um envio
+TAMANHO_LOTE_ENVIO = 5000
 
 def obter_fonogramas_para_envio():
     """Retorna fonogramas que podem ser enviados ao ECAD"""
@@ -14,20 +19,26 @@ def obter_fonogramas_para_envio():
     ).order_by(Fonograma.created_at.desc()).all()
 
 def validar_fonogramas_para_envio(fonograma_ids):
-    """Valida fonogramas antes de criar envio"""
-    fonogramas = Fonograma.query.filter(Fonograma.id.in_(fonograma_ids)).all()
-    return validar_antes_envio(fonogramas)
+    """Valida fonogramas antes de criar envio (em SQL, sem carregar os fonogramas)"""
+    return validar_envio_em_lote(fonograma_ids)
 
-def criar_envio(fonograma_ids, formato, usuario):
-    """Cria um novo envio ao ECAD"""
+def criar_envio(fonograma_ids, formato, usuario, tipo_envio=None, observacoes=None):
+    """
+    Cria um novo envio ao ECAD. A seleção é validada no banco a partir dos ids;
+    só depois os fonogramas são associados e atualizados, em lotes de
+    TAMANHO_LOTE_ENVIO (sem carregar os objetos)
+    """
+    from sqlalchemy import func, insert, select, update
+    from models import fonograma_envio
+    from shared.envio_delta import registrar_envio
+    
     try:
-        fonogramas = Fonograma.query.filter(Fonograma.id.in_(fonograma_ids)).all()
+        # Validar antes (campos e percentuais conferidos no banco)
+        validacao = validar_envio_em_lote(fonograma_ids)
         
-        if not fonogramas:
+        if not validacao['total']:
             return {'sucesso': False, 'erro': 'Nenhum fonograma selecionado'}
         
-        # Validar antes
-        validacao = validar_antes_envio(fonogramas)
         if validacao['com_erro'] > 0:
             return {
                 'sucesso': False, 
@@ -35,63 +46,72 @@ def criar_envio(fonograma_ids, formato, usuario):
                 'detalhes': validacao['erros']
             }
         
+        # Só os ids que existem no banco (em ordem de id)
+        ids = validacao['ids_validos']
+        
         # Gerar protocolo único
         protocolo = f"ECAD-{datetime.now().strftime('%Y%m%d')}-{uuid.uuid4().hex[:8].upper()}"
         
         # Criar pasta se não existir
         os.makedirs(UPLOAD_FOLDER, exist_ok=True)
         
-        # Gerar arquivo
+        # Gerar arquivo (titulares carregados em lote; TXT de envios grandes em vários processos)
         if formato == 'EXCEL':
             arquivo_path = os.path.join(UPLOAD_FOLDER, f"{protocolo}.xlsx")
-            resultado_arquivo = gerar_excel_ecad(fonogramas, arquivo_path)
-        elif formato == 'TXT_ECAD':
-            arquivo_path = os.path.join(UPLOAD_FOLDER, f"{protocolo}.txt")
-            resultado_arquivo = gerar_txt_ecad(fonogramas, arquivo_path)
+            resultado_arquivo = gerar_excel_ecad(iterar_fonogramas_ecad(ids), arquivo_path)
         else:
-            arquivo_path = os.path.join(UPLOAD_FOLDER, f"{protocolo}.txt")
-            resultado_arquivo = gerar_txt_ecad(fonogramas, arquivo_path)
+            # TXT compactado durante a geração conforme ENVIO_COMPRESSAO
+            arquivo_path = caminho_artefato(os.path.join(UPLOAD_FOLDER, f"{protocolo}.txt"))
+            resultado_arquivo = gerar_txt_ecad_paralelo(ids, arquivo_path)
         
         # Criar registro de envio
         envio = EnvioECAD(
             protocolo=protocolo,
             data_envio=datetime.utcnow(),
-            tipo_envio='PARCIAL' if len(fonogramas) < 100 else 'TOTAL',
+            tipo_envio=tipo_envio or ('PARCIAL' if len(ids) < 100 else 'TOTAL'),
             metodo='MANUAL',
             formato_arquivo=formato,
             arquivo_gerado=arquivo_path,
-            total_fonogramas=len(fonogramas),
+            total_fonogramas=len(ids),
             status='AGUARDANDO_RETORNO',
+            observacoes=observacoes,
             created_by=usuario.email if usuario else None
         )
+        db.session.add(envio)
+        db.session.flush()
         
-        # Associar fonogramas
-        for fono in fonogramas:
-            envio.fonogramas.append(fono)
-            
+        # Associar fonogramas, registrar no histórico e atualizar o status, lote a lote
+        agora = datetime.utcnow()
+        for inicio in range(0, len(ids), TAMANHO_LOTE_ENVIO):
+            lote = ids[inicio:inicio + TAMANHO_LOTE_ENVIO]
             # Guardar status ANTES de alterar
-            status_anterior = fono.status_ecad
-            
-            # Atualizar status do fonograma
-            fono.status_ecad = 'ENVIADO'
-            fono.data_ultimo_envio = datetime.utcnow()
-            fono.tentativas_envio = (fono.tentativas_envio or 0) + 1
-            fono.ultimo_protocolo_ecad = protocolo
-            
-            # Registrar no histórico
-            historico = HistoricoFonograma(
-                fonograma_id=fono.id,
-                data_alteracao=datetime.utcnow(),
-                tipo_alteracao='ENVIO',
-                campo_alterado='status_ecad',
-                valor_anterior=status_anterior,
-                valor_novo='ENVIADO',
-                usuario=usuario.email if usuario else None,
-                motivo=f'Envio ao ECAD - Protocolo: {protocolo}'
+            status_anterior = db.session.execute(
+                select(Fonograma.id, Fonograma.status_ecad).where(Fonograma.id.in_(lote))
+            ).all()
+            db.session.execute(insert(fonograma_envio), [
+                {'fonograma_id': fonograma_id, 'envio_id': envio.id} for fonograma_id in lote
+            ])
+            db.session.execute(insert(HistoricoFonograma.__table__), [{
+                'fonograma_id': fonograma_id,
+                'data_alteracao': agora,
+                'tipo_alteracao': 'ENVIO',
+                'campo_alterado': 'status_ecad',
+                'valor_anterior': status,
+                'valor_novo': 'ENVIADO',
+                'usuario': envio.created_by,
+                'motivo': f'Envio ao ECAD - Protocolo: {protocolo}',
+            } for fonograma_id, status in status_anterior])
+            db.session.execute(
+                update(Fonograma).where(Fonograma.id.in_(lote))
+                .values(status_ecad='ENVIADO', data_ultimo_envio=agora,
+                        tentativas_envio=func.coalesce(Fonograma.tentativas_envio, 0) + 1,
+                        ultimo_protocolo_ecad=protocolo, updated_at=agora)
+                .execution_options(synchronize_session=False)
             )
-            db.session.add(historico)
         
-        db.session.add(envio)
+        # Fingerprint dos dados enviados (base do próximo envio delta), com o
+        # mesmo updated_at gravado acima, na mesma transação
+        registrar_envio(envio.id, ids, atualizado_em=agora)
         db.session.commit()
         
         return {
@@ -99,13 +119,38 @@ def criar_envio(fonograma_ids, formato, usuario):
             'envio_id': envio.id,
             'protocolo': protocolo,
             'arquivo': arquivo_path,
-            'total': len(fonogramas)
+            'total': len(ids)
         }
         
     except Exception as e:
         db.session.rollback()
         return {'sucesso': False, 'erro': str(e)}
 
+def obter_detalhes_envio(envio_id, pagina_retornos=1, pagina_fonogramas=1, por_pagina=50):
+    """
+    Resumo dos retornos (último retorno de cada fonograma) e páginas das listas
+    de retornos e de fonogramas do envio
+    """
+    from models import fonograma_envio
+    from shared.processador_retorno_ecad import consulta_ultimos_retornos, resumo_retornos_envio
+    
+    resumo = resumo_retornos_envio(envio_id)
+    # Uma linha por fonograma com retorno: o total da paginação é o do resumo
+    retornos = db.paginate(consulta_ultimos_retornos(envio_id), page=pagina_retornos,
+                           per_page=por_pagina, error_out=False, count=False)
+    retornos.total = resumo['total']
+    fonogramas = (
+        Fonograma.query.join(fonograma_envio, fonograma_envio.c.fonograma_id == Fonograma.id)
+        .filter(fonograma_envio.c.envio_id == envio_id)
+        .order_by(Fonograma.id)
+        .paginate(page=pagina_fonogramas, per_page=por_pagina, error_out=False)
+    )
+    return {
+        'resumo': resumo,
+        'retornos': retornos,
+        'fonogramas': fonogramas,
+    }
+
 def reenviar_recusados(envio_id, usuario):
     """Cria novo envio com fonogramas recusados"""
     from shared.processador_retorno_ecad import obter_fonogramas_para_reenvio
@@ -116,3 +161,19 @@ def reenviar_recusados(envio_id, usuario):
         return {'sucesso': False, 'erro': 'Nenhum fonograma recusado para reenvio'}
     
     return criar_envio(fonograma_ids, 'EXCEL', usuario)
+
+def obter_delta_envio(limite_previa=None):
+    """Prévia do envio delta: fonogramas novos, alterados ou recusados desde o último envio, com o motivo"""
+    from shared.envio_delta import selecionar_delta
+    return selecionar_delta(limite_previa)
+
+def criar_envio_delta(formato, usuario):
+    """Cria envio só com os fonogramas novos, alterados ou recusados desde o último envio"""
+    from shared.envio_delta import selecionar_delta
+    
+    delta = selecionar_delta(limite_previa=0)
+    if not delta['ids']:
+        return {'sucesso': False, 'erro': 'Nenhum fonograma novo ou alterado desde o último envio'}
+    
+    resumo = ', '.join(f'{motivo}: {total}' for motivo, total in delta['por_motivo'].items() if total)
+    return criar_envio(delta['ids'], formato, usuario, tipo_envio='DELTA', observacoes=f'Envio delta ({resumo})')
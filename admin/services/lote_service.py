@@ -30,7 +30,7 @@ def validar_importacao(arquivo):
     for idx, item in enumerate(resultado['dados'], start=2):  # Linha 2 em diante (1 é header)
         erros = []
         avisos = []
-        isrc = str(item.get('isrc', '')).strip()
+        isrc = safe_str(item.get('isrc'))
         titulo = str(item.get('titulo', '')).strip()[:30]  # Primeiros 30 chars
         
         # === VALIDAÇÕES OBRIGATÓRIAS (bloqueiam importação) ===
@@ -120,72 +120,220 @@ def validar_importacao(arquivo):
         'avisos_agrupados': avisos_agrupados
     }
 
-def executar_importacao(arquivo, usuario):
-    """Executa importação em lote"""
-    try:
-        from shared.fonograma_service import criar_fonograma_do_dataframe
-        import pandas as pd
-        
-        # Ler arquivo
-        if arquivo.filename.lower().endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(arquivo)
-        else:
-            df = pd.read_csv(arquivo, encoding='utf-8', on_bad_lines='skip')
-        
-        # Converter para lista de dicts
-        dados = df.to_dict(orient='records')
-        
-        salvos = 0
-        atualizados = 0
-        erros = 0
-        
-        for item in dados:
-            try:
-                isrc = str(item.get('isrc', '')).strip()
-                if not isrc:
-                    erros += 1
-                    continue
-                
-                # Verificar se já existe
-                fono = Fonograma.query.filter_by(isrc=isrc).first()
-                
-                if fono:
-                    # Atualizar campos existentes
-                    fono.titulo = str(item.get('titulo', fono.titulo)).strip() if item.get('titulo') else fono.titulo
-                    fono.versao = str(item.get('versao', '')).strip() or fono.versao
-                    fono.duracao = str(item.get('duracao', fono.duracao)).strip() if item.get('duracao') else fono.duracao
-                    fono.ano_grav = int(item.get('ano_grav')) if item.get('ano_grav') else fono.ano_grav
-                    fono.ano_lanc = int(item.get('ano_lanc')) if item.get('ano_lanc') else fono.ano_lanc
-                    fono.idioma = str(item.get('idioma', '')).strip() or fono.idioma
-                    fono.genero = str(item.get('genero', fono.genero)).strip() if item.get('genero') else fono.genero
-                    fono.titulo_obra = str(item.get('titulo_obra', '')).strip() or fono.titulo_obra
-                    fono.prod_nome = str(item.get('prod_nome', '')).strip() or fono.prod_nome
-                    fono.prod_doc = str(item.get('prod_doc', '')).strip() or fono.prod_doc
-                    fono.updated_at = datetime.utcnow()
-                    atualizados += 1
-                else:
-                    # Criar novo fonograma
-                    novo = criar_fonograma_do_dataframe(item)
-                    
-                    # Atribuir ao usuário que está importando
-                    if usuario:
-                        novo.user_id = usuario.id
-                        if hasattr(usuario, 'associacao') and usuario.associacao:
-                            novo.assoc_gestao = usuario.associacao
-                    
-                    db.session.add(novo)
-                    salvos += 1
-                    
-            except Exception as item_error:
+# Linhas por transação na importação em lote
+TAMANHO_BLOCO_IMPORTACAO = 1000
+
+# Colunas que a importação em lote atualiza num ISRC existente (só se vierem preenchidas)
+CAMPOS_TEXTO_ATUALIZADOS = ('titulo', 'versao', 'duracao', 'idioma', 'genero', 'titulo_obra', 'prod_nome', 'prod_doc')
+CAMPOS_INTEIROS_ATUALIZADOS = ('ano_grav', 'ano_lanc')
+# Ano de lançamento de um fonograma novo sem ano de lançamento nem de gravação
+ANO_LANC_PADRAO = 2024
+
+
+def _campos_atualizacao(item):
+    """Colunas preenchidas na linha; ano inválido levanta ValueError (linha com erro)"""
+    from shared.fonograma_service import safe_str
+    from shared.validador import limpar_documento
+    
+    campos = {}
+    for campo in CAMPOS_TEXTO_ATUALIZADOS:
+        valor = safe_str(item.get(campo))
+        if valor:
+            campos[campo] = valor
+    for campo in CAMPOS_INTEIROS_ATUALIZADOS:
+        valor = safe_str(item.get(campo))
+        if valor:
+            campos[campo] = int(float(valor))
+    if 'prod_doc' in campos:
+        # Mesmo documento limpo que um fonograma novo recebe
+        campos['prod_doc'] = limpar_documento(campos['prod_doc'])
+    return campos
+
+
+def _dono_importacao(usuario):
+    """
+    user_id e associação do usuário que está importando, lidos uma vez antes dos
+    blocos: o commit de cada bloco expira o objeto do usuário
+    """
+    if not usuario:
+        return {}
+    dono = {'user_id': usuario.id}
+    if getattr(usuario, 'associacao', None):
+        dono['assoc_gestao'] = usuario.associacao
+    return dono
+
+
+def _liberar_fonogramas_gravados():
+    """Tira da sessão os fonogramas do bloco (o identity map não cresce com o arquivo), sem soltar o usuário"""
+    for objeto in list(db.session.identity_map.values()):
+        if isinstance(objeto, Fonograma):
+            db.session.expunge(objeto)
+
+
+def _ler_blocos_importacao(arquivo):
+    """
+    DataFrames do arquivo em blocos (XLSX grande e CSV sem carregar o arquivo
+    inteiro). XLSX pequeno é lido com pd.read_excel; no grande os valores vêm
+    como texto e são convertidos pelos safe_* na gravação
+    """
+    import pandas as pd
+    from shared.processador import ler_excel_em_blocos, xlsx_pequeno
+    
+    nome = arquivo.filename.lower()
+    if nome.endswith('.xlsx'):
+        if xlsx_pequeno(arquivo.stream):
+            return [pd.read_excel(arquivo)]
+        return ler_excel_em_blocos(arquivo.stream, TAMANHO_BLOCO_IMPORTACAO, limpar=False)
+    if nome.endswith('.xls'):
+        return [pd.read_excel(arquivo)]
+    return pd.read_csv(arquivo, encoding='utf-8', on_bad_lines='skip', chunksize=TAMANHO_BLOCO_IMPORTACAO)
+
+
+def _gravar_linhas(itens, dono):
+    """
+    Grava as linhas com upsert_fonogramas (INSERT ... ON CONFLICT (isrc), sem
+    consulta prévia): ISRC novo entra com todas as colunas da linha e os
+    filhos; ISRC já cadastrado recebe só as colunas de atualização preenchidas
+    (preservar_existentes). ISRC repetido nas linhas junta as colunas
+    preenchidas, a última vence. Não faz commit.
+    Retorna (salvos, atualizados, erros).
+    """
+    from sqlalchemy import func, update
+    from shared.fonograma_service import _valores_criacao, _valores_filhos, safe_str
+    from shared.upsert_service import substituir_filhos, upsert_fonogramas
+    
+    valores = {}  # isrc -> colunas do upsert
+    filhos = {}   # isrc -> filhos da primeira linha, gravados só se o fonograma for criado
+    linhas = erros = 0
+    
+    for item in itens:
+        try:
+            isrc = safe_str(item.get('isrc'))
+            if not isrc:
                 erros += 1
                 continue
+            
+            campos = _campos_atualizacao(item)
+            if isrc in valores:
+                valores[isrc].update(campos)
+            else:
+                linha = {**_valores_criacao(item), **dono, **campos}
+                if 'ano_lanc' not in campos:
+                    # Vazio não sobrescreve o existente; num fonograma novo o padrão entra depois do upsert
+                    linha['ano_lanc'] = None
+                filhos[isrc] = _valores_filhos(item)
+                valores[isrc] = linha
+            linhas += 1
+        except Exception:
+            erros += 1
+    
+    gravados = upsert_fonogramas(
+        list(valores.values()),
+        colunas_atualizadas=CAMPOS_TEXTO_ATUALIZADOS + CAMPOS_INTEIROS_ATUALIZADOS,
+        preservar_existentes=True,
+    )
+    criados = {isrc: gravados[isrc] for isrc in gravados if gravados[isrc][1]}
+    if criados:
+        db.session.execute(
+            update(Fonograma)
+            .where(Fonograma.id.in_([id_ for id_, _ in criados.values()]), Fonograma.ano_lanc.is_(None))
+            .values(ano_lanc=func.coalesce(Fonograma.ano_grav, ANO_LANC_PADRAO)),
+            execution_options={'synchronize_session': False}
+        )
+        substituir_filhos(criados, {isrc: filhos[isrc] for isrc in criados})
+    
+    salvos = len(criados)
+    return salvos, linhas - salvos, erros
+
+
+def _importar_bloco(itens, dono):
+    """Grava um bloco numa transação (_gravar_linhas). Retorna (salvos, atualizados, erros)"""
+    contagens = _gravar_linhas(itens, dono)
+    db.session.commit()
+    return contagens
+
+
+def _importar_bloco_linha_a_linha(itens, dono):
+    """Depois de falha no bloco: cada linha no seu savepoint, só as que falham contam como erro"""
+    salvos = atualizados = erros = 0
+    
+    for item in itens:
+        try:
+            with db.session.begin_nested():
+                contagens = _gravar_linhas([item], dono)
+            salvos += contagens[0]
+            atualizados += contagens[1]
+            erros += contagens[2]
+        except Exception:
+            erros += 1
+    
+    db.session.commit()
+    return salvos, atualizados, erros
+
+
+def executar_importacao(arquivo, usuario, callback_progresso=None):
+    """
+    Executa importação em lote, em blocos de TAMANHO_BLOCO_IMPORTACAO linhas
+    (um commit por bloco; uma falha só afeta as linhas do bloco).
+    
+    callback_progresso(progresso: Dict) é chamado ao fim de cada bloco.
+    O resultado traz o tempo e as contagens de cada bloco em 'blocos'.
+    """
+    import time
+    
+    salvos = 0
+    atualizados = 0
+    erros = 0
+    linhas = 0
+    blocos = []
+    inicio = time.perf_counter()
+    dono = _dono_importacao(usuario)
+    
+    try:
+        for df in _ler_blocos_importacao(arquivo):
+            # XLSX/XLS podem vir num bloco só; a transação continua limitada ao tamanho do bloco
+            todos = df.to_dict(orient='records')
+            for pos in range(0, len(todos), TAMANHO_BLOCO_IMPORTACAO):
+                itens = todos[pos:pos + TAMANHO_BLOCO_IMPORTACAO]
+                inicio_bloco = time.perf_counter()
+                try:
+                    contagens = _importar_bloco(itens, dono)
+                except Exception:
+                    db.session.rollback()
+                    contagens = _importar_bloco_linha_a_linha(itens, dono)
+                _liberar_fonogramas_gravados()
+                
+                salvos += contagens[0]
+                atualizados += contagens[1]
+                erros += contagens[2]
+                linhas += len(itens)
+                blocos.append({
+                    'bloco': len(blocos) + 1,
+                    'linhas': len(itens),
+                    'salvos': contagens[0],
+                    'atualizados': contagens[1],
+                    'erros': contagens[2],
+                    'segundos': round(time.perf_counter() - inicio_bloco, 3)
+                })
+                if callback_progresso:
+                    callback_progresso({
+                        'bloco': len(blocos),
+                        'linhas_processadas': linhas,
+                        'salvos': salvos,
+                        'atualizados': atualizados,
+                        'erros': erros
+                    })
         
-        db.session.commit()
-        return {'sucesso': True, 'salvos': salvos, 'atualizados': atualizados, 'erros': erros}
+        return {
+            'sucesso': True, 'salvos': salvos, 'atualizados': atualizados, 'erros': erros,
+            'linhas': linhas, 'blocos': blocos, 'tempo_total': round(time.perf_counter() - inicio, 3)
+        }
         
     except Exception as e:
         db.session.rollback()
-        return {'sucesso': False, 'erro': str(e)}
+        # Blocos anteriores já foram gravados
+        return {'sucesso': False, 'erro': str(e), 'salvos': salvos, 'atualizados': atualizados,
+                'erros': erros, 'linhas': linhas, 'blocos': blocos}
 
 def atualizar_status_em_lote(fonograma_ids, novo_status, motivo, usuario):
     """Atualiza status de múltiplos fonogramas"""
@@ -1,9 +1,18 @@
 # admin/services/retorno_service.py
 from shared.processador_retorno_ecad import processar_retorno, importar_retorno_ecad
+from shared.retorno_incremental import registrar_arquivo_retorno
 from models import db, EnvioECAD
 
-def processar_upload_retorno(arquivo, envio_id):
-    """Processa arquivo de retorno do ECAD"""
+def processar_upload_retorno(arquivo, envio_id, confirmar_posicional=False):
+    """
+    Processa arquivo de retorno do ECAD
+    
+    confirmar_posicional: quem enviou confirma que todos os fonogramas de um TXT
+    posicional (layout 0660) foram aceitos (ver importar_retorno_ecad).
+
+    O mesmo arquivo (pelo hash do conteúdo) já processado para o envio não é
+    lido de novo; um arquivo cujo processamento parou no meio é retomado.
+    """
     try:
         envio = EnvioECAD.query.get(envio_id)
         if not envio:
@@ -18,11 +27,32 @@ def processar_upload_retorno(arquivo, envio_id):
         os.makedirs('uploads/retornos', exist_ok=True)
         arquivo.save(path)
         
+        # Arquivo já recebido para este envio: fica a cópia anterior
+        registro, ja_processado = registrar_arquivo_retorno(envio_id, path, arquivo.filename)
+        if registro.caminho != path and registro.caminho and os.path.exists(registro.caminho):
+            os.remove(path)
+            path = registro.caminho
+        elif registro.caminho != path:
+            registro.caminho = path
+            db.session.commit()
+        
+        if ja_processado:
+            return {
+                'sucesso': True,
+                'ja_processado': True,
+                'processado_em': registro.processado_em,
+                'aceitos': registro.aceitos,
+                'recusados': registro.recusados,
+                'total': registro.total_linhas
+            }
+        
         # Importar
-        dados_retorno = importar_retorno_ecad(path, envio_id)
+        dados_retorno = importar_retorno_ecad(path, envio_id, confirmar_posicional)
         
         # Processar
-        resultado = processar_retorno(dados_retorno, envio_id)
+        resultado = processar_retorno(dados_retorno, envio_id, registro)
+        if not resultado.get('sucesso'):
+            return resultado
         
         # Atualizar status do envio se todos processados
         envio.status = 'PROCESSADO'
@@ -32,6 +62,7 @@ def processar_upload_retorno(arquivo, envio_id):
             'sucesso': True,
             'aceitos': resultado.get('aceitos', 0),
             'recusados': resultado.get('recusados', 0),
+            'ja_aplicadas': resultado.get('ja_aplicadas', 0),
             'total': resultado.get('total_processados', 0)
         }
         
@@ -9,6 +9,7 @@ Estrutura:
 - /api/validar/*       - Validação de dados
 - /api/ecad/*          - Envios e retornos ECAD
 - /api/relatorios/*    - Estatísticas e relatórios
+- /api/jobs/*          - Importações em segundo plano
 """
 from flask import Blueprint
 
@@ -64,6 +65,7 @@ from . import fonogramas_api
 from . import validacao_api
 from . import ecad_api
 from . import relatorios_api
+from . import jobs_api
 
 
 
@@ -0,0 +1,201 @@
+"""
+API de Jobs - SBACEM
+Importações e validações em segundo plano (fila em shared/jobs.py)
+"""
+from flask import request
+from flask_login import current_user
+from . import api_bp
+from .helpers import api_response, api_error, api_paginate, require_api_auth
+
+# Tipos que qualquer usuário pode enfileirar pela API (importar_lote é do admin)
+TIPOS_USUARIO = ('importar_catalogo', 'validar_arquivo')
+EXTENSOES_PERMITIDAS = ('.csv', '.xls', '.xlsx')
+
+
+def _job_do_usuario(job_id):
+    """Retorna (job, erro): o job se existir e o usuário puder vê-lo"""
+    from shared.jobs import obter_job
+
+    job = obter_job(job_id)
+    if not job:
+        return None, api_error("Job não encontrado", "NOT_FOUND", status=404)
+    if not current_user.is_admin and job.user_id != current_user.id:
+        return None, api_error("Acesso negado", "FORBIDDEN", status=403)
+    return job, None
+
+
+@api_bp.route('/jobs', methods=['POST'])
+@require_api_auth
+def criar_job():
+    """
+    Enfileirar importação/validação de arquivo
+    ---
+    tags:
+      - Jobs
+    consumes:
+      - multipart/form-data
+    parameters:
+      - name: file
+        in: formData
+        type: file
+        required: true
+      - name: tipo
+        in: formData
+        type: string
+        enum: [importar_catalogo, validar_arquivo, importar_lote]
+        default: importar_catalogo
+      - name: incluir_invalidos
+        in: formData
+        type: boolean
+        default: false
+    responses:
+      202:
+        description: Job criado (acompanhe em /api/jobs/{id})
+      400:
+        description: Arquivo ou tipo inválido
+    """
+    from shared import jobs
+
+    arquivo = request.files.get('file') or request.files.get('arquivo')
+    if not arquivo or not arquivo.filename:
+        return api_error("Nenhum arquivo enviado", "VALIDATION_ERROR")
+    if not arquivo.filename.lower().endswith(EXTENSOES_PERMITIDAS):
+        return api_error("Apenas arquivos CSV ou Excel (.xls, .xlsx) são aceitos", "VALIDATION_ERROR")
+
+    tipo = request.form.get('tipo', 'importar_catalogo')
+    if tipo not in TIPOS_USUARIO and not (tipo == 'importar_lote' and current_user.is_admin):
+        return api_error(f"Tipo de job inválido: {tipo}", "VALIDATION_ERROR")
+
+    parametros = {}
+    if tipo == 'importar_catalogo':
+        parametros['salvar_apenas_validos'] = request.form.get('incluir_invalidos', '').lower() not in ('1', 'true', 'on')
+
+    job = jobs.enfileirar(tipo, user_id=current_user.id, arquivo=arquivo, parametros=parametros)
+    return api_response(data=job.to_dict(), message="Job enfileirado", status=202)
+
+
+@api_bp.route('/jobs', methods=['GET'])
+@require_api_auth
+def listar_jobs():
+    """
+    Listar jobs (admin vê todos)
+    ---
+    tags:
+      - Jobs
+    parameters:
+      - name: page
+        in: query
+        type: integer
+        default: 1
+      - name: per_page
+        in: query
+        type: integer
+        default: 20
+      - name: status
+        in: query
+        type: string
+    responses:
+      200:
+        description: Lista de jobs
+    """
+    from models import JobImportacao
+
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    status = request.args.get('status')
+
+    query = JobImportacao.query
+    if not current_user.is_admin:
+        query = query.filter_by(user_id=current_user.id)
+    if status:
+        query = query.filter_by(status=status.upper())
+    query = query.order_by(JobImportacao.id.desc())
+
+    return api_paginate(query, page, per_page, lambda j: j.to_dict())
+
+
+@api_bp.route('/jobs/<int:id>', methods=['GET'])
+@require_api_auth
+def obter_job(id):
+    """
+    Status e progresso de um job
+    ---
+    tags:
+      - Jobs
+    parameters:
+      - name: id
+        in: path
+        type: integer
+        required: true
+    responses:
+      200:
+        description: Job (status, progresso e resumo do resultado)
+      404:
+        description: Job não encontrado
+    """
+    job, erro = _job_do_usuario(id)
+    if erro:
+        return erro
+    return api_response(data=job.to_dict())
+
+
+@api_bp.route('/jobs/<int:id>/cancelar', methods=['POST'])
+@require_api_auth
+def cancelar_job(id):
+    """
+    Cancelar um job
+    ---
+    tags:
+      - Jobs
+    parameters:
+      - name: id
+        in: path
+        type: integer
+        required: true
+    responses:
+      200:
+        description: Cancelado (pendente) ou cancelamento solicitado (em execução)
+      409:
+        description: Job já finalizado
+    """
+    from shared import jobs
+
+    job, erro = _job_do_usuario(id)
+    if erro:
+        return erro
+    if not jobs.cancelar(id):
+        return api_error("Job já finalizado", "CONFLICT", status=409)
+
+    job = jobs.obter_job(id)
+    mensagem = "Job cancelado" if job.status == jobs.CANCELADO else "Cancelamento solicitado"
+    return api_response(data=job.to_dict(), message=mensagem)
+
+
+@api_bp.route('/jobs/<int:id>/resultado', methods=['GET'])
+@require_api_auth
+def resultado_job(id):
+    """
+    Resultado de um job concluído
+    ---
+    tags:
+      - Jobs
+    parameters:
+      - name: id
+        in: path
+        type: integer
+        required: true
+    responses:
+      200:
+        description: Resultado completo (para validar_arquivo, os dados e erros do grid)
+      409:
+        description: Job ainda não concluído
+    """
+    from shared import jobs
+
+    job, erro = _job_do_usuario(id)
+    if erro:
+        return erro
+    if job.status != jobs.CONCLUIDO:
+        return api_error(f"Job não concluído (status: {job.status})", "CONFLICT",
+                         details={'erro': job.erro} if job.erro else None, status=409)
+    return api_response(data=jobs.resultado_completo(job))
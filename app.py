@@ -35,7 +35,7 @@ app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
 )
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_UPLOAD_MB', '16')) * 1024 * 1024  # 16MB max upload (padrão)
 
 # Configurações de sessão segura
 app.config['SESSION_COOKIE_SECURE'] = PRODUCTION  # HTTPS only em produção
@@ -48,14 +48,15 @@ app.config['WTF_CSRF_ENABLED'] = True
 app.config['WTF_CSRF_TIME_LIMIT'] = 3600  # 1 hora
 
 # ==================== LOGGING ====================
-if not os.path.exists('logs'):
-    os.makedirs('logs')
+# logs/ não é versionado: criado na inicialização, ao lado do app.py
+LOGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs')
+os.makedirs(LOGS_DIR, exist_ok=True)
 
 logging.basicConfig(
     level=logging.INFO if PRODUCTION else logging.DEBUG,
     format='%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]',
     handlers=[
-        logging.FileHandler('logs/app.log'),
+        logging.FileHandler(os.path.join(LOGS_DIR, 'app.log')),
         logging.StreamHandler()
     ]
 )
@@ -238,6 +239,10 @@ cors_config = {
 from models import db, Fonograma, EnvioECAD, RetornoECAD, HistoricoFonograma, User
 db.init_app(app)
 
+# Gravações em fonogramas e titulares descartam os registros ECAD em cache
+from shared.cache_registros_ecad import registrar_invalidacao_cache
+registrar_invalidacao_cache()
+
 # Inicializar CORS e Swagger
 CORS(app, resources=cors_config)
 swagger = Swagger(app, config=swagger_config, template=swagger_template)
@@ -279,13 +284,28 @@ def api_lote_validar():
         return jsonify({"error": "Nenhum arquivo enviado"}), 400
     
     arquivo = request.files['file']
+    
+    # Validação em segundo plano: responde na hora com o job (resultado em /api/jobs/<id>/resultado)
+    # O job fica registrado para o usuário: enfileirar exige login
+    if request.values.get('assincrono') == '1':
+        if not current_user.is_authenticated:
+            return jsonify({"success": False, "error": "Não autenticado"}), 401
+        from shared import jobs
+        job = jobs.enfileirar('validar_arquivo', arquivo=arquivo, user_id=current_user.id)
+        return jsonify({
+            "success": True,
+            "job": job.to_dict(),
+            "status_url": f"/api/jobs/{job.id}",
+            "resultado_url": f"/api/jobs/{job.id}/resultado"
+        }), 202
+    
     from shared.processador import processar_csv
     import tempfile
     
     with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(arquivo.filename)[1]) as tmp:
         arquivo.save(tmp.name)
         try:
-            df, erros, encoding, delim = processar_csv(tmp.name)
+            df, erros, total_linhas, linhas_validas, linhas_com_erro = processar_csv(tmp.name)
             # Converter DataFrame para lista de dicts para o grid
             dados = df.to_dict('records')
             return jsonify({
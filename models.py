@@ -77,7 +77,7 @@ class Autor(db.Model):
     nacionalidade = db.Column(db.String(50))  # BRASILEIRO, ESTRANGEIRO, etc
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    fonograma = db.relationship('Fonograma', backref=db.backref('autores_list', lazy=True, cascade='all, delete-orphan'))
+    fonograma = db.relationship('Fonograma', backref=db.backref('autores_list', lazy=True, cascade='all, delete-orphan', order_by='Autor.id'))
     
     def to_dict(self):
         return {
@@ -104,7 +104,7 @@ class Editora(db.Model):
     nacionalidade = db.Column(db.String(50))  # BRASILEIRA, ESTRANGEIRA
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    fonograma = db.relationship('Fonograma', backref=db.backref('editoras_list', lazy=True, cascade='all, delete-orphan'))
+    fonograma = db.relationship('Fonograma', backref=db.backref('editoras_list', lazy=True, cascade='all, delete-orphan', order_by='Editora.id'))
     
     def to_dict(self):
         return {
@@ -132,7 +132,7 @@ class Interprete(db.Model):
     nacionalidade = db.Column(db.String(50))  # BRASILEIRO, ESTRANGEIRO, etc
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    fonograma = db.relationship('Fonograma', backref=db.backref('interpretes_list', lazy=True, cascade='all, delete-orphan'))
+    fonograma = db.relationship('Fonograma', backref=db.backref('interpretes_list', lazy=True, cascade='all, delete-orphan', order_by='Interprete.id'))
     
     def to_dict(self):
         return {
@@ -161,7 +161,7 @@ class Musico(db.Model):
     percentual = db.Column(db.Float, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    fonograma = db.relationship('Fonograma', backref=db.backref('musicos_list', lazy=True, cascade='all, delete-orphan'))
+    fonograma = db.relationship('Fonograma', backref=db.backref('musicos_list', lazy=True, cascade='all, delete-orphan', order_by='Musico.id'))
     
     def to_dict(self):
         return {
@@ -185,7 +185,7 @@ class Documento(db.Model):
     data = db.Column(db.String(20))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    fonograma = db.relationship('Fonograma', backref=db.backref('documentos_list', lazy=True, cascade='all, delete-orphan'))
+    fonograma = db.relationship('Fonograma', backref=db.backref('documentos_list', lazy=True, cascade='all, delete-orphan', order_by='Documento.id'))
     
     def to_dict(self):
         return {
@@ -359,7 +359,7 @@ class EnvioECAD(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True, index=True)
     protocolo = db.Column(db.String(100), unique=True, index=True)  # Protocolo ECAD
     data_envio = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
-    tipo_envio = db.Column(db.String(20), nullable=False)  # TOTAL, PARCIAL
+    tipo_envio = db.Column(db.String(20), nullable=False)  # TOTAL, PARCIAL, DELTA
     metodo = db.Column(db.String(20), default='MANUAL')  # MANUAL, API
     formato_arquivo = db.Column(db.String(10))  # EXCEL, EXP
     arquivo_gerado = db.Column(db.String(500))  # Path do arquivo gerado
@@ -401,6 +401,10 @@ class EnvioECAD(db.Model):
 class RetornoECAD(db.Model):
     """Registro de retorno do ECAD para cada fonograma"""
     __tablename__ = 'retorno_ecad'
+    __table_args__ = (
+        # Último retorno de cada fonograma no envio (processador_retorno_ecad.ultimos_retornos)
+        db.Index('idx_retorno_envio_fonograma_data', 'envio_id', 'fonograma_id', 'data_retorno'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     envio_id = db.Column(db.Integer, db.ForeignKey('envio_ecad.id', ondelete='CASCADE'), nullable=False, index=True)
@@ -490,4 +494,144 @@ class EcadLog(db.Model):
         }
 
 
+class FingerprintImportacao(db.Model):
+    """
+    Impressão digital (hash) da última versão de cada linha importada, por ISRC.
+    Permite que um reenvio da mesma planilha valide e salve apenas as linhas alteradas.
+    """
+    __tablename__ = 'importacao_fingerprint'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    isrc = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    fingerprint = db.Column(db.String(64))  # Linha validada por último
+    versao_validador = db.Column(db.String(20))
+    valido = db.Column(db.Boolean, default=False, nullable=False)
+    erros = db.Column(db.Text)  # JSON: erros da validação (sem o número da linha)
+    fingerprint_salvo = db.Column(db.String(64))  # Linha gravada por último em fonogramas
+    salvo_em = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+
+class FingerprintEnvio(db.Model):
+    """
+    Impressão digital (hash) dos dados de cada fonograma no último envio ao ECAD.
+    Permite o envio delta: só fonogramas novos ou alterados desde o último envio (shared/envio_delta.py).
+    """
+    __tablename__ = 'fonograma_envio_fingerprint'
+    
+    fonograma_id = db.Column(db.Integer, db.ForeignKey('fonogramas.id', ondelete='CASCADE'), primary_key=True)
+    envio_id = db.Column(db.Integer, db.ForeignKey('envio_ecad.id', ondelete='SET NULL'), index=True)  # Último envio
+    fingerprint = db.Column(db.String(64), nullable=False)  # Dados enviados no último envio
+    status = db.Column(db.String(20), default='ENVIADO', nullable=False)  # ENVIADO, ACEITO, RECUSADO
+    atualizado_em = db.Column(db.DateTime)  # updated_at do fonograma com este fingerprint
+    enviado_em = db.Column(db.DateTime, default=datetime.utcnow)
+    retorno_em = db.Column(db.DateTime)
+    
+    # Relacionamento com cascade delete
+    fonograma = db.relationship('Fonograma', backref=db.backref('fingerprint_envio', uselist=False, cascade='all, delete-orphan'))
+
 
+class CacheRegistroEcad(db.Model):
+    """
+    Registros OBM e FON de cada fonograma já montados para o TXT ECAD, na versão
+    do layout em que foram gerados (shared/cache_registros_ecad.py). Apagado a
+    cada alteração do fonograma ou dos titulares.
+    """
+    __tablename__ = 'ecad_registro_cache'
+
+    fonograma_id = db.Column(db.Integer, db.ForeignKey('fonogramas.id', ondelete='CASCADE'), primary_key=True)
+    versao_layout = db.Column(db.String(20), nullable=False)  # layout_ecad.VERSAO_LAYOUT
+    bloco_obm = db.Column(db.Text, nullable=False)
+    bloco_fon = db.Column(db.Text, nullable=False)  # FON1 sem a data do arquivo (preenchida na geração)
+    titulares = db.Column(db.Integer, nullable=False)
+    linhas = db.Column(db.Integer, nullable=False)
+    gerado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Relacionamento com cascade delete
+    fonograma = db.relationship('Fonograma', backref=db.backref('cache_registro_ecad', uselist=False, cascade='all, delete-orphan'))
+
+
+class ArquivoRetornoECAD(db.Model):
+    """
+    Arquivo de retorno do ECAD recebido para um envio, identificado pelo hash do
+    conteúdo (shared/retorno_incremental.py): o mesmo arquivo enviado de novo
+    não é processado outra vez.
+    """
+    __tablename__ = 'retorno_arquivo'
+    __table_args__ = (
+        db.UniqueConstraint('envio_id', 'hash_arquivo', name='uq_retorno_arquivo_envio_hash'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    envio_id = db.Column(db.Integer, db.ForeignKey('envio_ecad.id', ondelete='CASCADE'), nullable=False, index=True)
+    hash_arquivo = db.Column(db.String(64), nullable=False)  # SHA-256 do conteúdo
+    nome_arquivo = db.Column(db.String(255))
+    caminho = db.Column(db.String(500))
+    status = db.Column(db.String(20), default='PROCESSANDO', nullable=False)  # PROCESSANDO, CONCLUIDO, ERRO
+    total_linhas = db.Column(db.Integer, default=0)
+    aceitos = db.Column(db.Integer, default=0)
+    recusados = db.Column(db.Integer, default=0)
+    nao_encontrados = db.Column(db.Integer, default=0)
+    ja_aplicadas = db.Column(db.Integer, default=0)  # Linhas puladas por já terem sido aplicadas antes
+    erro = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processado_em = db.Column(db.DateTime)
+
+
+class FingerprintLinhaRetorno(db.Model):
+    """
+    Impressão digital (hash) de cada linha de retorno já aplicada a um envio
+    (ISRC, status e códigos). Linhas iguais num novo processamento são puladas.
+    """
+    __tablename__ = 'retorno_linha_fingerprint'
+
+    envio_id = db.Column(db.Integer, db.ForeignKey('envio_ecad.id', ondelete='CASCADE'), primary_key=True)
+    fingerprint = db.Column(db.String(40), primary_key=True)
+    arquivo_id = db.Column(db.Integer, db.ForeignKey('retorno_arquivo.id', ondelete='SET NULL'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class JobImportacao(db.Model):
+    """
+    Importação ou validação de planilha executada em segundo plano
+    (fila em shared/jobs.py, processada por scripts/worker_importacao.py)
+    """
+    __tablename__ = 'jobs_importacao'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(30), nullable=False)  # importar_catalogo, salvar_upload, importar_lote, validar_arquivo
+    status = db.Column(db.String(20), default='PENDENTE', nullable=False, index=True)  # PENDENTE, EXECUTANDO, CONCLUIDO, ERRO, CANCELADO
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
+    nome_arquivo = db.Column(db.String(255))
+    arquivo_entrada = db.Column(db.String(500))  # Cópia do arquivo/dados enviados (removida ao terminar)
+    arquivo_resultado = db.Column(db.String(500))  # Resultado completo, quando não cabe no resumo
+    parametros = db.Column(db.Text)  # JSON
+    progresso = db.Column(db.Text)  # JSON
+    resultado = db.Column(db.Text)  # JSON: resumo
+    erro = db.Column(db.Text)
+    cancelamento_solicitado = db.Column(db.Boolean, default=False, nullable=False)
+    worker = db.Column(db.String(100))
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    iniciado_em = db.Column(db.DateTime)
+    finalizado_em = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        import json
+        return {
+            'id': self.id,
+            'tipo': self.tipo,
+            'status': self.status,
+            'user_id': self.user_id,
+            'nome_arquivo': self.nome_arquivo,
+            'parametros': json.loads(self.parametros) if self.parametros else {},
+            'progresso': json.loads(self.progresso) if self.progresso else {},
+            'resultado': json.loads(self.resultado) if self.resultado else None,
+            'erro': self.erro,
+            'cancelamento_solicitado': self.cancelamento_solicitado,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'iniciado_em': self.iniciado_em.isoformat() if self.iniciado_em else None,
+            'finalizado_em': self.finalizado_em.isoformat() if self.finalizado_em else None,
+        }
@@ -0,0 +1,100 @@
+"""
+Benchmark - Cache de registros ECAD (TXT)
+Com os fonogramas do banco configurado (DATABASE_URL), mede a geração do TXT
+sem cache (gerar_txt_ecad), com o cache vazio (monta e grava os blocos) e com o
+cache preenchido (só junta os blocos), e confere se os arquivos são iguais byte
+a byte (exceto a hora no cabeçalho). Depois altera um fonograma e confere se o
+bloco dele saiu do cache e o arquivo continua igual ao gerado sem cache.
+
+Tudo roda numa transação desfeita no fim: o banco não é alterado.
+
+Uso: python scripts/benchmark_cache_ecad.py [num_fonogramas] [--workers N]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from models import db, Fonograma, CacheRegistroEcad
+from shared.gerador_ecad import gerar_txt_ecad, iterar_fonogramas_ecad
+from shared.cache_registros_ecad import gerar_txt_ecad_cache, invalidar_cache_registros
+
+NUM_FONOGRAMAS = 20000
+# Hora (HHMMSS) no registro 000: muda entre uma geração e outra
+HORA_CABECALHO = slice(20, 26)
+
+
+def _conteudo(caminho) -> bytes:
+    with open(caminho, 'rb') as f:
+        cabecalho = bytearray(f.readline())
+        cabecalho[HORA_CABECALHO] = b'0' * (HORA_CABECALHO.stop - HORA_CABECALHO.start)
+        return bytes(cabecalho) + f.read()
+
+
+def medir(nome, gerar, caminho, referencia=None):
+    inicio = time.perf_counter()
+    resultado = gerar(caminho)
+    segundos = time.perf_counter() - inicio
+    extra = ''
+    if 'registros_em_cache' in resultado:
+        extra = f" - {resultado['registros_em_cache']} do cache, {resultado['registros_montados']} montados"
+    print(f"   [{nome}] {segundos:.2f}s ({resultado['total_fonogramas'] / segundos:,.0f} fonogramas/s){extra}")
+    if referencia is not None and _conteudo(caminho) != referencia:
+        print(f"❌ [{nome}] arquivo diferente do gerado sem cache")
+        sys.exit(1)
+    return segundos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do cache de registros ECAD')
+    parser.add_argument('num_fonogramas', nargs='?', type=int, default=NUM_FONOGRAMAS)
+    parser.add_argument('--workers', type=int, default=1, help='Processos para montar os blocos que faltam')
+    args = parser.parse_args()
+
+    with app.app_context(), tempfile.TemporaryDirectory() as pasta:
+        ids = [i for (i,) in db.session.query(Fonograma.id).order_by(Fonograma.id).limit(args.num_fonogramas)]
+        if not ids:
+            print("❌ Nenhum fonograma no banco")
+            sys.exit(1)
+        print(f"Fonogramas: {len(ids)}")
+
+        def sem_cache(caminho):
+            resultado = gerar_txt_ecad(iterar_fonogramas_ecad(ids), caminho)
+            db.session.expunge_all()
+            return resultado
+
+        def com_cache(caminho):
+            return gerar_txt_ecad_cache(ids, caminho, args.workers)
+
+        try:
+            caminho = os.path.join(pasta, 'ecad.txt')
+            direto = medir('sem cache', sem_cache, caminho)
+            referencia = _conteudo(caminho)
+
+            invalidar_cache_registros(ids)
+            medir('cache vazio', com_cache, caminho, referencia)
+            cache = min(medir('cache preenchido', com_cache, caminho, referencia) for _ in range(2))
+
+            # Alteração pelo ORM: o bloco sai do cache e volta atualizado na próxima geração
+            fono = db.session.get(Fonograma, ids[len(ids) // 2])
+            fono.titulo = (fono.titulo or '') + ' (ALTERADO)'
+            db.session.flush()
+            if db.session.get(CacheRegistroEcad, fono.id) is not None:
+                print("❌ Bloco do fonograma alterado continua no cache")
+                sys.exit(1)
+            medir('sem cache, após alteração', sem_cache, caminho)
+            referencia = _conteudo(caminho)
+            medir('cache, após alteração', com_cache, caminho, referencia)
+        finally:
+            db.session.rollback()
+
+    print(f"\n✅ Arquivos idênticos - cache preenchido {direto / cache:.1f}x mais rápido que a geração sem cache")
+
+
+if __name__ == '__main__':
+    main()
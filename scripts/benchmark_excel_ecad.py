@@ -0,0 +1,118 @@
+"""
+Benchmark - Geração do Excel ECAD
+Mede tempo e pico de memória (tracemalloc, numa segunda execução) de
+gerar_excel_ecad (escritor_xlsx, modo write_only) com fonogramas sintéticos, sem banco.
+
+Com --referencia <commit>, carrega o gerador_ecad.py daquele commit (git show),
+mede o mesmo com ele e confere se as células (valores e estilos) são iguais.
+
+Uso: python scripts/benchmark_excel_ecad.py [num_fonogramas] [--referencia <commit>]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+from itertools import zip_longest
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import shared.gerador_ecad as gerador_atual
+from benchmark_layout_ecad import gerar_fonogramas, carregar_referencia
+
+NUM_FONOGRAMAS = 20000
+CELULAS_CONFERIDAS = 200000
+
+
+class _Fonograma:
+    """Fonograma sintético: campos que o benchmark do layout não gera ficam vazios"""
+    def __init__(self, registro):
+        self.__dict__.update(registro.__dict__)
+
+    def __getattr__(self, nome):
+        return None
+
+
+def medir(gerador, fonogramas, caminho):
+    inicio = time.perf_counter()
+    gerador.gerar_excel_ecad(fonogramas, caminho)
+    segundos = time.perf_counter() - inicio
+
+    # tracemalloc deixa a geração mais lenta: memória medida à parte
+    tracemalloc.start()
+    gerador.gerar_excel_ecad(fonogramas, caminho)
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return segundos, pico
+
+
+def _estilo(celula):
+    fonte, fundo, alinhamento, borda = celula.font, celula.fill, celula.alignment, celula.border
+    return (fonte.name, fonte.sz, fonte.b, fonte.color.rgb if fonte.color else None,
+            fundo.fgColor.rgb if fundo.fill_type else None, alinhamento.horizontal, alinhamento.vertical,
+            alinhamento.wrap_text, borda.left.style, borda.bottom.style)
+
+
+def conferir(caminho, caminho_ref) -> bool:
+    """Mesma aba, quantidade de linhas, valores e estilos (estilos só nas primeiras CELULAS_CONFERIDAS células)"""
+    from openpyxl import load_workbook
+
+    ws, ws_ref = load_workbook(caminho, read_only=True).active, load_workbook(caminho_ref, read_only=True).active
+    if ws.title != ws_ref.title:
+        print(f"❌ Abas divergentes: {ws.title} / {ws_ref.title}")
+        return False
+    conferidas = 0
+    for numero, (linha, linha_ref) in enumerate(zip_longest(ws.iter_rows(), ws_ref.iter_rows()), 1):
+        if linha is None or linha_ref is None or len(linha) != len(linha_ref):
+            print(f"❌ Linha {numero} só existe (ou tem outro tamanho) em um dos arquivos")
+            return False
+        if conferidas >= CELULAS_CONFERIDAS:
+            if [c.value or '' for c in linha] != [c.value or '' for c in linha_ref]:
+                print(f"❌ Linha {numero} divergente")
+                return False
+            continue
+        for celula, celula_ref in zip(linha, linha_ref):
+            if (celula.value or '') != (celula_ref.value or '') or _estilo(celula) != _estilo(celula_ref):
+                print(f"❌ Célula {celula.coordinate} divergente:\n  atual:      {celula.value!r} {_estilo(celula)}\n"
+                      f"  referência: {celula_ref.value!r} {_estilo(celula_ref)}")
+                return False
+            conferidas += 1
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da geração do Excel ECAD')
+    parser.add_argument('num_fonogramas', nargs='?', type=int, default=NUM_FONOGRAMAS)
+    parser.add_argument('--referencia', help='Commit com o gerador_ecad.py a comparar (ex.: HEAD~1)')
+    args = parser.parse_args()
+
+    fonogramas = [_Fonograma(f) for f in gerar_fonogramas(args.num_fonogramas)]
+    geradores = [('atual', gerador_atual)]
+    if args.referencia:
+        geradores.append((args.referencia, carregar_referencia(args.referencia)))
+
+    print(f"Fonogramas: {args.num_fonogramas}")
+    resultados = {}
+    with tempfile.TemporaryDirectory() as pasta:
+        for nome, gerador in geradores:
+            caminho = os.path.join(pasta, f'{len(resultados)}.xlsx')
+            segundos, pico = medir(gerador, fonogramas, caminho)
+            resultados[nome] = (segundos, pico, caminho)
+            print(f"   [{nome}] {segundos:.1f}s ({args.num_fonogramas / segundos:,.0f} fonogramas/s) - "
+                  f"pico de memória {pico / 1024 / 1024:,.1f} MB - {os.path.getsize(caminho):,} bytes")
+
+        if args.referencia:
+            segundos, pico, caminho = resultados['atual']
+            segundos_ref, pico_ref, caminho_ref = resultados[args.referencia]
+            if not conferir(caminho, caminho_ref):
+                sys.exit(1)
+            print(f"\n✅ Células idênticas - {segundos_ref / segundos:.1f}x mais rápido, "
+                  f"{pico_ref / pico:.0f}x menos memória")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+Benchmark - Montagem dos registros posicionais do TXT ECAD
+Mede a montagem de cada tipo de registro (OBM1, OBM2, OBM4, FON1, FON2, FON3)
+e do arquivo inteiro com os formatadores compilados de shared/layout_ecad.py.
+
+Com --referencia <commit>, carrega o gerador_ecad.py daquele commit (git show),
+mede o mesmo com ele e confere se os registros e o arquivo são idênticos byte a byte.
+
+Uso: python scripts/benchmark_layout_ecad.py [num_fonogramas] [--referencia <commit>]
+"""
+
+import os
+import sys
+import time
+import types
+import random
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, RAIZ)
+
+import shared.gerador_ecad as gerador_atual
+from shared.layout_ecad import VERSAO_LAYOUT
+
+NUM_FONOGRAMAS = 20000
+SEMENTE = 42
+
+NOMES = ['José da Silva', 'Maria Conceição', 'João Gonçalves', 'Ana Luíza Araújo', 'Ñoño Muñoz',
+         'Zé Ramalho', 'Gravadora Exemplo LTDA', 'Luiz Cláudio de Freitas']
+GENEROS = ['Samba', 'MPB', 'Pop', 'Forró', 'Rock', 'Sertanejo', 'Jazz', 'Outro']
+
+
+class _Registro:
+    def __init__(self, **campos):
+        self.__dict__.update(campos)
+
+
+class _DataFixa(datetime):
+    """Mesma data de geração nos dois geradores"""
+    @classmethod
+    def now(cls, tz=None):
+        return datetime(2026, 1, 15, 10, 30, 0)
+
+
+def gerar_fonogramas(quantidade):
+    rnd = random.Random(SEMENTE)
+    fonogramas = []
+    for i in range(quantidade):
+        autores = [_Registro(nome=rnd.choice(NOMES), cpf=f'{rnd.randrange(10**11):011d}', funcao=rnd.choice(['COMPOSITOR', 'Arranjador', 'ADAPTADOR']),
+                             percentual=rnd.choice([100, 50, 33.33]), cae_ipi=rnd.choice(['', '0033738984']))
+                   for _ in range(rnd.randint(1, 3))]
+        editoras = [_Registro(nome=rnd.choice(NOMES), cnpj='11.222.333/0001-81', percentual=25.0)
+                    for _ in range(rnd.randint(0, 1))]
+        interpretes = [_Registro(nome=rnd.choice(NOMES), doc=f'{rnd.randrange(10**11):011d}', percentual=100.0,
+                                 categoria=rnd.choice(['PRINCIPAL', 'COADJUVANTE', 'GRAVADORA']), associacao=rnd.choice(['', 'SBACEM', 'ABRAMUS']))
+                       for _ in range(rnd.randint(1, 2))]
+        fonogramas.append(_Registro(
+            id=i + 1, cod_interno=rnd.choice([None, f'{rnd.randrange(10**9):09d}']), cod_obra=rnd.choice([None, str(rnd.randrange(10**6))]),
+            isrc=f'BRABC{i:07d}', titulo=f'Canção Número {i} – Versão Ação', titulo_obra=rnd.choice([None, f'Obra {i}']),
+            duracao=f'{rnd.randint(1, 9):02d}:{rnd.randint(0, 59):02d}', ano_grav=rnd.choice([None, 2019, 2024]), ano_lanc=2024,
+            data_lanc=rnd.choice([None, '15/01/2024', '2024']), flag_nacional=rnd.choice([None, 'NACIONAL', 'INTERNACIONAL']),
+            genero=rnd.choice(GENEROS), idioma=rnd.choice([None, 'PT', 'EN']), prod_nome=rnd.choice(['', 'Gravadora Exemplo LTDA']),
+            prod_doc='11222333000181', prod_perc=100.0, prod_assoc=rnd.choice([None, 'SBACEM']),
+            autores_list=autores, editoras_list=editoras, interpretes_list=interpretes,
+        ))
+    return fonogramas
+
+
+def carregar_referencia(commit):
+    """gerador_ecad.py de outro commit, como módulo do pacote shared"""
+    fonte = subprocess.run(['git', 'show', f'{commit}:shared/gerador_ecad.py'], cwd=RAIZ,
+                           capture_output=True, text=True, check=True).stdout
+    modulo = types.ModuleType('shared.gerador_ecad_referencia')
+    modulo.__package__ = 'shared'
+    exec(compile(fonte, f'{commit}:shared/gerador_ecad.py', 'exec'), modulo.__dict__)
+    return modulo
+
+
+def montar_registros(gerador, fonogramas):
+    """Registros por tipo, montados pelos _build_* do gerador. Retorna ({tipo: [linhas]}, {tipo: segundos})"""
+    chamadas = {
+        'OBM1': lambda f, cod: [gerador._build_obm1(f, cod)],
+        'OBM2': lambda f, cod: [gerador._build_obm2(f, cod, '', a.nome, a.cpf, a.funcao, a.percentual, '', a.cae_ipi, i)
+                                for i, a in enumerate(f.autores_list, 1)]
+                               + [gerador._build_obm2(f, cod, '', e.nome, e.cnpj, 'EDITORA', e.percentual, '', '', 9)
+                                  for e in f.editoras_list],
+        'OBM4': lambda f, cod: [gerador._build_obm4(f.cod_obra, cod, p.nome, 'I') for p in f.interpretes_list],
+        'FON1': lambda f, cod: [gerador._build_fon1(f, cod, 1)],
+        'FON2': lambda f, cod: [gerador._build_fon2(f, p.nome, p.doc, 'INTERPRETE', p.percentual, p.associacao, 2)
+                                for p in f.interpretes_list],
+        'FON3': lambda f, cod: [gerador._build_fon3(f, 1)],
+    }
+    linhas, tempos = {}, {}
+    for tipo, chamada in chamadas.items():
+        inicio = time.perf_counter()
+        linhas[tipo] = [linha for f in fonogramas for linha in chamada(f, str(f.cod_interno or f.id))]
+        tempos[tipo] = time.perf_counter() - inicio
+    return linhas, tempos
+
+
+def gerar_arquivo(gerador, fonogramas, caminho):
+    inicio = time.perf_counter()
+    gerador.gerar_txt_ecad(fonogramas, caminho)
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da montagem dos registros do TXT ECAD')
+    parser.add_argument('num_fonogramas', nargs='?', type=int, default=NUM_FONOGRAMAS)
+    parser.add_argument('--referencia', help='Commit com o gerador_ecad.py a comparar (ex.: HEAD~1)')
+    args = parser.parse_args()
+
+    fonogramas = gerar_fonogramas(args.num_fonogramas)
+    geradores = [('atual', gerador_atual)]
+    if args.referencia:
+        geradores.append((args.referencia, carregar_referencia(args.referencia)))
+    for _, gerador in geradores:
+        gerador.datetime = _DataFixa
+
+    print(f"Fonogramas: {args.num_fonogramas} - layout {VERSAO_LAYOUT}")
+    resultados = {}
+    with tempfile.TemporaryDirectory() as pasta:
+        for nome, gerador in geradores:
+            linhas, tempos = montar_registros(gerador, fonogramas)
+            caminho = os.path.join(pasta, f'{len(resultados)}.txt')
+            tempo_arquivo = gerar_arquivo(gerador, fonogramas, caminho)
+            with open(caminho, 'rb') as f:
+                conteudo = f.read()
+            resultados[nome] = (linhas, tempos, tempo_arquivo, conteudo)
+
+            total = sum(len(l) for l in linhas.values())
+            print(f"\n[{nome}]")
+            for tipo, segundos in tempos.items():
+                print(f"   {tipo}: {len(linhas[tipo]):>7} registros em {segundos:.2f}s ({len(linhas[tipo]) / segundos:,.0f}/s)")
+            print(f"   Registros: {total} em {sum(tempos.values()):.2f}s - arquivo inteiro: {tempo_arquivo:.2f}s "
+                  f"({len(conteudo):,} bytes)")
+
+    if args.referencia:
+        linhas, tempos, tempo_arquivo, conteudo = resultados['atual']
+        linhas_ref, tempos_ref, tempo_arquivo_ref, conteudo_ref = resultados[args.referencia]
+        for tipo in linhas:
+            if linhas[tipo] != linhas_ref[tipo]:
+                i = next(i for i, (a, b) in enumerate(zip(linhas[tipo], linhas_ref[tipo])) if a != b)
+                print(f"❌ {tipo} divergente no registro #{i}:\n  atual:      {linhas[tipo][i]!r}\n  referência: {linhas_ref[tipo][i]!r}")
+                sys.exit(1)
+        if conteudo != conteudo_ref:
+            print("❌ Arquivos divergentes")
+            sys.exit(1)
+        print(f"\n✅ Registros e arquivo idênticos - montagem {sum(tempos_ref.values()) / sum(tempos.values()):.1f}x, "
+              f"arquivo {tempo_arquivo_ref / tempo_arquivo:.1f}x mais rápido")
+
+
+if __name__ == '__main__':
+    main()
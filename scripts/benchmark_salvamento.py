@@ -0,0 +1,113 @@
+"""
+Benchmark - Gravação de fonogramas no banco
+Compara salvar_fonogramas_do_dataframe linha a linha (uma consulta e um commit
+por fonograma) com o modo em lote (upsert por ISRC e um commit por lote), numa
+inserção e numa reimportação com alterações. Como nas importações, só as linhas
+aprovadas pelo validador são gravadas.
+
+Cada modo roda em um processo separado, com um banco SQLite temporário próprio,
+e no fim o conteúdo dos dois bancos é comparado.
+
+Uso: python scripts/benchmark_salvamento.py [num_linhas]
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import subprocess
+
+NUM_LINHAS = 5000
+MODOS = ('linha a linha', 'em lote')
+
+
+def medir(modo: str, banco: str, num_linhas: int, saida: str):
+    """Executado no processo filho: grava, regrava com alterações e exporta o banco"""
+    os.environ['DATABASE_URL'] = 'sqlite:///' + banco
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+    from app import app
+    from models import Fonograma
+    from shared.fonograma_service import salvar_fonogramas_do_dataframe, RELACIONAMENTOS_FILHOS
+    from shared.validador_vetorizado import validar_dataframe
+    from benchmark_validacao import gerar_dataframe
+
+    em_lote = modo == 'em lote'
+    df = gerar_dataframe(num_linhas)
+    linhas_com_erro = {erro['linha'] for erro in validar_dataframe(df)[0]}
+    df = df[[i + 2 not in linhas_com_erro for i in range(len(df))]].reset_index(drop=True)
+
+    inicio = time.perf_counter()
+    insercao = salvar_fonogramas_do_dataframe(df, app.app_context(), em_lote=em_lote)
+    tempo_insercao = time.perf_counter() - inicio
+
+    alterado = df.copy()
+    alterado.loc[::3, 'titulo'] = 'Título alterado'
+    inicio = time.perf_counter()
+    atualizacao = salvar_fonogramas_do_dataframe(alterado, app.app_context(), em_lote=em_lote)
+    tempo_atualizacao = time.perf_counter() - inicio
+
+    with app.app_context():
+        def exportar(modelo, ignorar):
+            colunas = [c.name for c in modelo.__table__.columns if c.name not in ignorar]
+            return sorted(json.dumps([str(getattr(o, c)) for c in colunas]) for o in modelo.query.all())
+
+        conteudo = {'fonogramas': exportar(Fonograma, {'id', 'created_at', 'updated_at'})}
+        isrcs = dict(Fonograma.query.with_entities(Fonograma.id, Fonograma.isrc))
+        for relacionamento, modelo in RELACIONAMENTOS_FILHOS:
+            colunas = [c.name for c in modelo.__table__.columns if c.name not in ('id', 'created_at', 'fonograma_id')]
+            conteudo[relacionamento] = sorted(
+                json.dumps([isrcs[o.fonograma_id]] + [str(getattr(o, c)) for c in colunas])
+                for o in modelo.query.all()
+            )
+
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump({'insercao': insercao, 'atualizacao': atualizacao, 'conteudo': conteudo}, f, sort_keys=True)
+    print(f"{tempo_insercao:.3f};{tempo_atualizacao:.3f}")
+
+
+def executar_filho(modo: str, num_linhas: int, pasta: str):
+    banco = os.path.join(pasta, f"{modo.replace(' ', '_')}.db")
+    saida = os.path.join(pasta, f"{modo.replace(' ', '_')}.json")
+    argumentos = [sys.executable, os.path.abspath(__file__), '--medir', modo, banco, str(num_linhas), saida]
+    resultado = subprocess.run(argumentos, capture_output=True, text=True, cwd=pasta)
+    if resultado.returncode != 0:
+        print(f"❌ {modo}: {resultado.stderr.strip().splitlines()[-1]}")
+        sys.exit(1)
+    tempos = resultado.stdout.strip().splitlines()[-1].split(';')
+    with open(saida, encoding='utf-8') as f:
+        return [float(t) for t in tempos], json.load(f)
+
+
+def main():
+    if len(sys.argv) > 5 and sys.argv[1] == '--medir':
+        medir(sys.argv[2], sys.argv[3], int(sys.argv[4]), sys.argv[5])
+        return
+
+    num_linhas = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_LINHAS
+    print(f"Linhas: {num_linhas}")
+
+    resultados = {}
+    with tempfile.TemporaryDirectory() as pasta:
+        for modo in MODOS:
+            (tempo_insercao, tempo_atualizacao), dados = executar_filho(modo, num_linhas, pasta)
+            resultados[modo] = (tempo_insercao, tempo_atualizacao, dados)
+            print(f"{modo:<14} inserção {tempo_insercao:6.2f}s | reimportação {tempo_atualizacao:6.2f}s | "
+                  f"{dados['insercao']['salvos']} salvos, {dados['atualizacao']['atualizados']} atualizados, "
+                  f"{len(dados['insercao']['erros']) + len(dados['atualizacao']['erros'])} erros")
+
+    referencia, lote = resultados['linha a linha'][2], resultados['em lote'][2]
+    for chave in ('insercao', 'atualizacao', 'conteudo'):
+        if referencia[chave] != lote[chave]:
+            print(f"❌ Resultados divergentes ({chave})")
+            sys.exit(1)
+
+    ganho_insercao = resultados['linha a linha'][0] / resultados['em lote'][0]
+    ganho_atualizacao = resultados['linha a linha'][1] / resultados['em lote'][1]
+    print(f"✅ Bancos idênticos - ganho de {ganho_insercao:.1f}x (inserção) e {ganho_atualizacao:.1f}x (reimportação)")
+
+
+if __name__ == '__main__':
+    main()
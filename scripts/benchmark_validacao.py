@@ -0,0 +1,674 @@
+"""
+Benchmark - Validação de planilhas de fonogramas
+Compara a validação linha a linha (iterrows, a de antes do motor vetorizado,
+mantida só aqui como referência) com o motor vetorizado (serial e em paralelo)
+e confere se todos produzem exatamente os mesmos erros.
+Compara também os parsers de campos compostos (parse_*) com o parser em lote.
+
+Uso: python scripts/benchmark_validacao.py [num_linhas]
+"""
+
+import os
+import sys
+import time
+import random
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from shared.processador import (
+    parse_autores, parse_editoras, parse_interpretes,
+    parse_musicos, parse_documentos, parse_composicoes_em_lote, listas_por_linha
+)
+from shared.validador import (
+    validar_cpf, validar_cnpj, validar_isrc, validar_duracao,
+    validar_percentuais_conexos, validar_percentuais_autorais,
+    validar_percentuais_editoras, validar_genero, validar_funcao_autor,
+    validar_categoria_interprete, validar_tipo_musico, validar_associacao,
+    validar_tipo_lancamento, validar_formato, validar_situacao,
+    validar_territorio, validar_tipo_execucao, validar_prioridade,
+    validar_tipo_documento, validar_ano, validar_data, validar_versao,
+    validar_idioma, limpar_documento, GENEROS
+)
+from shared.validador_vetorizado import validar_dataframe, validar_dataframe_paralelo
+
+NUM_LINHAS = 20000
+SEMENTE = 42
+
+CPFS_VALIDOS = ['12345678909', '52998224725', '11144477735']
+CNPJS_VALIDOS = ['11222333000181', '45997418000153']
+
+# Valores inválidos ou de borda misturados aos dados bons
+VARIACOES = {
+    'isrc': ['', 'BRXYZ', 'BR-ABC-24-00001', 'BRÃBC2400001', 'brabc2400001 '],
+    'titulo': ['', '  '],
+    'duracao': ['', '3:75', '123:00', 'abc', '1:05'],
+    'ano_lanc': ['', '1899', '2101', '2024.0', ' 2024 ', '+2020', '2_020', 'abcd'],
+    'genero': ['', 'pop', 'Samba', 'Bossa Nova'],
+    'versao': ['REMIX', 'ao vivo', 'xyz'],
+    'idioma': ['pt', 'XX'],
+    'ano_grav': ['1800', '20x0'],
+    'titulo_obra': [''],
+    'autores': [
+        '', 'Fulano', 'Fulano;Beltrano', '|12345678909|COMPOSITOR|100',
+        'Ana|11111111111|COMPOSITOR|50;Bia|12345678909|CANTORA|50',
+        'Ana|12345678909|compositor|33,33;Bia|52998224725|LETRISTA|33.33;Caio|11144477735|LETRISTA|33.34',
+        'Ana|12345678909|COMPOSITOR|abc', 'Ana|123|COMPOSITOR|100%',
+    ],
+    'editoras': ['', 'Ed A|11222333000181|60', 'Ed A|11222333000180|50;Ed B|45997418000153|50', 'Ed|x|y'],
+    'interpretes': [
+        '', 'Cantor', 'Cantor|12345678909|PRINCIPAL|40|XYZ', 'Cantor|123|SOLISTA|40',
+        'A|12345678909|PRINCIPAL|20|UBC;B|52998224725|COADJUVANTE|20|',
+    ],
+    'musicos': ['', 'M|12345678909|BATERIA|FIXO|10', 'M|00000000000|GUITARRA|AVULSO|5', 'M|1|2|3'],
+    'prod_nome': [''],
+    'prod_doc': ['', '123', '12345678900', '11222333000180', '112.223.330/0018-1'],
+    'prod_perc': ['', 'abc', '50%', '60,5'],
+    'prod_assoc': ['xyz', 'ubc'],
+    'prod_data_ini': ['31/02/2024', '2024-13-01', '01/01/1500', '1/1/2024'],
+    'tipo_lanc': ['single', 'LP'],
+    'formato': ['VINIL'],
+    'data_lanc': ['2024-02-30', '15/03/2024'],
+    'situacao': ['ARQUIVADO'],
+    'data_cad': ['00/00/0000'],
+    'documentos': ['DECLARACAO|REF|01/01/2024', 'XPTO|REF|2024-01-01', 'CONTRATO_CESSAO|R|32/01/2024', 'OUTRO|R'],
+    'territorio': ['MARTE'],
+    'tipos_exec': ['radio', 'PODCAST'],
+    'prioridade': ['BAIXA'],
+}
+
+
+def linha_base(i: int) -> dict:
+    cpf = CPFS_VALIDOS[i % len(CPFS_VALIDOS)]
+    return {
+        'isrc': f'BRABC{i:07d}'[:12],
+        'titulo': f'Fonograma {i}',
+        'duracao': '03:30',
+        'ano_lanc': '2024',
+        'genero': 'Pop',
+        'versao': 'original',
+        'idioma': 'PT',
+        'ano_grav': '2023',
+        'titulo_obra': f'Obra {i}',
+        'autores': f'Autor {i}|{cpf}|COMPOSITOR|100',
+        'editoras': '',
+        'interpretes': f'Intérprete {i}|{cpf}|PRINCIPAL|41.7|SBACEM',
+        'musicos': f'Músico {i}|{cpf}|BATERIA|FIXO|8.3',
+        'prod_nome': 'Gravadora',
+        'prod_doc': CNPJS_VALIDOS[i % len(CNPJS_VALIDOS)],
+        'prod_perc': '50',
+        'prod_assoc': 'SBACEM',
+        'prod_data_ini': '01/01/2020',
+        'tipo_lanc': 'SINGLE',
+        'formato': 'DIGITAL',
+        'data_lanc': '2024-01-15',
+        'situacao': 'ATIVO',
+        'data_cad': '15/01/2024',
+        'documentos': '',
+        'territorio': 'BRASIL',
+        'tipos_exec': 'TODOS',
+        'prioridade': 'NORMAL',
+    }
+
+
+def gerar_dataframe(num_linhas: int) -> pd.DataFrame:
+    random.seed(SEMENTE)
+    linhas = []
+    for i in range(num_linhas):
+        linha = linha_base(i)
+        # ~30% das linhas recebem de 1 a 3 campos problemáticos
+        if random.random() < 0.3:
+            for campo in random.sample(list(VARIACOES), random.randint(1, 3)):
+                linha[campo] = random.choice(VARIACOES[campo])
+        linhas.append(linha)
+    return pd.DataFrame(linhas, dtype=str)
+
+
+def cronometrar(funcao, df):
+    inicio = time.perf_counter()
+    resultado = funcao(df)
+    return resultado, time.perf_counter() - inicio
+
+
+PARSERS = {
+    'autores': parse_autores,
+    'editoras': parse_editoras,
+    'interpretes': parse_interpretes,
+    'musicos': parse_musicos,
+    'documentos': parse_documentos,
+}
+
+
+def validar_dataframe_linha_a_linha(df: pd.DataFrame) -> Tuple[List[Dict], int, int]:
+    """
+    Validação de referência, linha a linha, do DataFrame normalizado por processar_csv
+    (o laço que processar_csv usava antes de validador_vetorizado.validar_dataframe).
+    Retorna (erros, linhas_validas, linhas_com_erro).
+    """
+    erros = []
+    linhas_validas = 0
+    linhas_com_erro = 0
+    
+    # Validações linha por linha
+    for idx, (_, row) in enumerate(df.iterrows()):
+        linha_num = idx + 2  # +2 porque linha 1 é header e idx começa em 0
+        linha_tem_erro = False
+        
+        # SEÇÃO 1 - IDENTIFICAÇÃO
+        # ISRC (obrigatório)
+        if not row.get('isrc', '').strip():
+            erros.append({
+                "linha": linha_num,
+                "campo": "isrc",
+                "valor": "",
+                "erro": "ISRC é obrigatório"
+            })
+            linha_tem_erro = True
+        elif not validar_isrc(row.get('isrc', '')):
+            erros.append({
+                "linha": linha_num,
+                "campo": "isrc",
+                "valor": row.get('isrc', ''),
+                "erro": "ISRC inválido (deve ter 12 caracteres alfanuméricos)"
+            })
+            linha_tem_erro = True
+        
+        # Título (obrigatório)
+        if not row.get('titulo', '').strip():
+            erros.append({
+                "linha": linha_num,
+                "campo": "titulo",
+                "valor": "",
+                "erro": "Título é obrigatório"
+            })
+            linha_tem_erro = True
+        
+        # Duração (obrigatório)
+        if not row.get('duracao', '').strip():
+            erros.append({
+                "linha": linha_num,
+                "campo": "duracao",
+                "valor": "",
+                "erro": "Duração é obrigatória"
+            })
+            linha_tem_erro = True
+        elif not validar_duracao(row.get('duracao', '')):
+            erros.append({
+                "linha": linha_num,
+                "campo": "duracao",
+                "valor": row.get('duracao', ''),
+                "erro": "Duração inválida (formato esperado: mm:ss)"
+            })
+            linha_tem_erro = True
+        
+        # Ano lançamento (obrigatório)
+        if not row.get('ano_lanc', '').strip():
+            erros.append({
+                "linha": linha_num,
+                "campo": "ano_lanc",
+                "valor": "",
+                "erro": "Ano de lançamento é obrigatório"
+            })
+            linha_tem_erro = True
+        elif not validar_ano(row.get('ano_lanc', '')):
+            erros.append({
+                "linha": linha_num,
+                "campo": "ano_lanc",
+                "valor": row.get('ano_lanc', ''),
+                "erro": "Ano de lançamento inválido"
+            })
+            linha_tem_erro = True
+        
+        # Gênero (obrigatório)
+        if not row.get('genero', '').strip():
+            erros.append({
+                "linha": linha_num,
+                "campo": "genero",
+                "valor": "",
+                "erro": "Gênero é obrigatório"
+            })
+            linha_tem_erro = True
+        elif not validar_genero(row.get('genero', '')):
+            erros.append({
+                "linha": linha_num,
+                "campo": "genero",
+                "valor": row.get('genero', ''),
+                "erro": f"Gênero inválido (valores válidos: {', '.join(GENEROS[:5])}...)"
+            })
+            linha_tem_erro = True
+        
+        # Versão (opcional, mas valida se preenchido)
+        if row.get('versao', '').strip() and not validar_versao(row.get('versao', '')):
+            erros.append({
+                "linha": linha_num,
+                "campo": "versao",
+                "valor": row.get('versao', ''),
+                "erro": "Versão inválida"
+            })
+            linha_tem_erro = True
+        
+        # Idioma (opcional, mas valida se preenchido)
+        if row.get('idioma', '').strip() and not validar_idioma(row.get('idioma', '')):
+            erros.append({
+                "linha": linha_num,
+                "campo": "idioma",
+                "valor": row.get('idioma', ''),
+                "erro": "Idioma inválido"
+            })
+            linha_tem_erro = True
+        
+        # Ano gravação (opcional, mas valida se preenchido)
+        if row.get('ano_grav', '').strip() and not validar_ano(row.get('ano_grav', '')):
+            erros.append({
+                "linha": linha_num,
+                "campo": "ano_grav",
+                "valor": row.get('ano_grav', ''),
+                "erro": "Ano de gravação inválido"
+            })
+            linha_tem_erro = True
+        
+        # SEÇÃO 2 - OBRA MUSICAL
+        # Título obra (obrigatório)
+        if not row.get('titulo_obra', '').strip():
+            erros.append({
+                "linha": linha_num,
+                "campo": "titulo_obra",
+                "valor": "",
+                "erro": "Título da obra é obrigatório"
+            })
+            linha_tem_erro = True
+        
+        # Autores (obrigatório)
+        autores = parse_autores(row.get('autores', ''))
+        if not autores:
+            erros.append({
+                "linha": linha_num,
+                "campo": "autores",
+                "valor": row.get('autores', ''),
+                "erro": "Pelo menos um autor é obrigatório"
+            })
+            linha_tem_erro = True
+        else:
+            # Valida cada autor
+            for autor in autores:
+                if not autor.get('nome'):
+                    erros.append({
+                        "linha": linha_num,
+                        "campo": "autores",
+                        "valor": str(autor),
+                        "erro": "Autor sem nome"
+                    })
+                    linha_tem_erro = True
+                if not validar_cpf(autor.get('cpf', '')):
+                    erros.append({
+                        "linha": linha_num,
+                        "campo": "autores",
+                        "valor": autor.get('cpf', ''),
+                        "erro": f"CPF inválido para autor {autor.get('nome', '')}"
+                    })
+                    linha_tem_erro = True
+                if not validar_funcao_autor(autor.get('funcao', '')):
+                    erros.append({
+                        "linha": linha_num,
+                        "campo": "autores",
+                        "valor": autor.get('funcao', ''),
+                        "erro": f"Função inválida para autor {autor.get('nome', '')}"
+                    })
+                    linha_tem_erro = True
+            
+            # Valida soma dos percentuais autorais
+            percentuais_autores = [a.get('percentual', 0) for a in autores]
+            if not validar_percentuais_autorais(percentuais_autores):
+                erros.append({
+                    "linha": linha_num,
+                    "campo": "autores",
+                    "valor": f"Soma: {sum(percentuais_autores)}%",
+                    "erro": "Soma dos percentuais autorais deve ser 100%"
+                })
+                linha_tem_erro = True
+        
+        # Editoras (opcional)
+        editoras = parse_editoras(row.get('editoras', ''))
+        if editoras:
+            for editora in editoras:
+                if not validar_cnpj(editora.get('cnpj', '')):
+                    erros.append({
+                        "linha": linha_num,
+                        "campo": "editoras",
+                        "valor": editora.get('cnpj', ''),
+                        "erro": f"CNPJ inválido para editora {editora.get('nome', '')}"
+                    })
+                    linha_tem_erro = True
+            
+            percentuais_editoras = [e.get('percentual', 0) for e in editoras]
+            if not validar_percentuais_editoras(percentuais_editoras):
+                erros.append({
+                    "linha": linha_num,
+                    "campo": "editoras",
+                    "valor": f"Soma: {sum(percentuais_editoras)}%",
+                    "erro": "Soma dos percentuais de editoras deve ser 100%"
+                })
+                linha_tem_erro = True
+        
+        # SEÇÃO 3 - TITULARES CONEXOS
+        # Intérpretes (obrigatório)
+        interpretes = parse_interpretes(row.get('interpretes', ''))
+        if not interpretes:
+            erros.append({
+                "linha": linha_num,
+                "campo": "interpretes",
+                "valor": "",
+                "erro": "Pelo menos um intérprete é obrigatório"
+            })
+            linha_tem_erro = True
+        else:
+            for interprete in interpretes:
+                if not validar_cpf(interprete.get('doc', '')):
+                    erros.append({
+                        "linha": linha_num,
+                        "campo": "interpretes",
+                        "valor": interprete.get('doc', ''),
+                        "erro": f"CPF inválido para intérprete {interprete.get('nome', '')}"
+                    })
+                    linha_tem_erro = True
+                if not validar_categoria_interprete(interprete.get('categoria', '')):
+                    erros.append({
+                        "linha": linha_num,
+                        "campo": "interpretes",
+                        "valor": interprete.get('categoria', ''),
+                        "erro": f"Categoria inválida para intérprete {interprete.get('nome', '')}"
+                    })
+                    linha_tem_erro = True
+                if interprete.get('associacao') and not validar_associacao(interprete.get('associacao', '')):
+                    erros.append({
+                        "linha": linha_num,
+                        "campo": "interpretes",
+                        "valor": interprete.get('associacao', ''),
+                        "erro": f"Associação inválida para intérprete {interprete.get('nome', '')}"
+                    })
+                    linha_tem_erro = True
+        
+        # Músicos (opcional)
+        musicos = parse_musicos(row.get('musicos', ''))
+        if musicos:
+            for musico in musicos:
+                if not validar_cpf(musico.get('cpf', '')):
+                    erros.append({
+                        "linha": linha_num,
+                        "campo": "musicos",
+                        "valor": musico.get('cpf', ''),
+                        "erro": f"CPF inválido para músico {musico.get('nome', '')}"
+                    })
+                    linha_tem_erro = True
+                if not validar_tipo_musico(musico.get('tipo', '')):
+                    erros.append({
+                        "linha": linha_num,
+                        "campo": "musicos",
+                        "valor": musico.get('tipo', ''),
+                        "erro": f"Tipo inválido para músico {musico.get('nome', '')}"
+                    })
+                    linha_tem_erro = True
+        
+        # Valida soma dos direitos conexos
+        perc_interpretes = sum(i.get('percentual', 0) for i in interpretes)
+        perc_musicos = sum(m.get('percentual', 0) for m in musicos)
+        perc_produtor = 0
+        if row.get('prod_perc', '').strip():
+            try:
+                perc_produtor = float(str(row.get('prod_perc', '')).replace('%', '').replace(',', '.'))
+            except ValueError:
+                pass
+        
+        if not validar_percentuais_conexos(perc_interpretes, perc_musicos, perc_produtor):
+            erros.append({
+                "linha": linha_num,
+                "campo": "percentuais_conexos",
+                "valor": f"Intérpretes: {perc_interpretes}%, Músicos: {perc_musicos}%, Produtor: {perc_produtor}%",
+                "erro": "Soma dos direitos conexos (intérpretes + músicos + produtor) deve ser 100%"
+            })
+            linha_tem_erro = True
+        
+        # SEÇÃO 4 - PRODUTOR
+        # Nome produtor (obrigatório)
+        if not row.get('prod_nome', '').strip():
+            erros.append({
+                "linha": linha_num,
+                "campo": "prod_nome",
+                "valor": "",
+                "erro": "Nome do produtor é obrigatório"
+            })
+            linha_tem_erro = True
+        
+        # Documento produtor (obrigatório)
+        if not row.get('prod_doc', '').strip():
+            erros.append({
+                "linha": linha_num,
+                "campo": "prod_doc",
+                "valor": "",
+                "erro": "Documento do produtor é obrigatório"
+            })
+            linha_tem_erro = True
+        else:
+            doc_prod = limpar_documento(row.get('prod_doc', ''))
+            if len(doc_prod) == 11:
+                if not validar_cpf(doc_prod):
+                    erros.append({
+                        "linha": linha_num,
+                        "campo": "prod_doc",
+                        "valor": row.get('prod_doc', ''),
+                        "erro": "CPF do produtor inválido"
+                    })
+                    linha_tem_erro = True
+            elif len(doc_prod) == 14:
+                if not validar_cnpj(doc_prod):
+                    erros.append({
+                        "linha": linha_num,
+                        "campo": "prod_doc",
+                        "valor": row.get('prod_doc', ''),
+                        "erro": "CNPJ do produtor inválido"
+                    })
+                    linha_tem_erro = True
+            else:
+                erros.append({
+                    "linha": linha_num,
+                    "campo": "prod_doc",
+                    "valor": row.get('prod_doc', ''),
+                    "erro": "Documento do produtor deve ser CPF (11 dígitos) ou CNPJ (14 dígitos)"
+                })
+                linha_tem_erro = True
+        
+        # Percentual produtor (obrigatório)
+        if not row.get('prod_perc', '').strip():
+            erros.append({
+                "linha": linha_num,
+                "campo": "prod_perc",
+                "valor": "",
+                "erro": "Percentual do produtor é obrigatório"
+            })
+            linha_tem_erro = True
+        
+        # Associação produtor (opcional, mas valida se preenchido)
+        if row.get('prod_assoc', '').strip() and not validar_associacao(row.get('prod_assoc', '')):
+            erros.append({
+                "linha": linha_num,
+                "campo": "prod_assoc",
+                "valor": row.get('prod_assoc', ''),
+                "erro": "Associação do produtor inválida"
+            })
+            linha_tem_erro = True
+        
+        # Data início produtor (opcional, mas valida se preenchido)
+        if row.get('prod_data_ini', '').strip() and not validar_data(row.get('prod_data_ini', '')):
+            erros.append({
+                "linha": linha_num,
+                "campo": "prod_data_ini",
+                "valor": row.get('prod_data_ini', ''),
+                "erro": "Data de início do produtor inválida (formato: dd/mm/yyyy ou yyyy-mm-dd)"
+            })
+            linha_tem_erro = True
+        
+        # SEÇÃO 5 - LANÇAMENTO (validações opcionais)
+        if row.get('tipo_lanc', '').strip() and not validar_tipo_lancamento(row.get('tipo_lanc', '')):
+            erros.append({
+                "linha": linha_num,
+                "campo": "tipo_lanc",
+                "valor": row.get('tipo_lanc', ''),
+                "erro": "Tipo de lançamento inválido"
+            })
+            linha_tem_erro = True
+        
+        if row.get('formato', '').strip() and not validar_formato(row.get('formato', '')):
+            erros.append({
+                "linha": linha_num,
+                "campo": "formato",
+                "valor": row.get('formato', ''),
+                "erro": "Formato inválido"
+            })
+            linha_tem_erro = True
+        
+        if row.get('data_lanc', '').strip() and not validar_data(row.get('data_lanc', '')):
+            erros.append({
+                "linha": linha_num,
+                "campo": "data_lanc",
+                "valor": row.get('data_lanc', ''),
+                "erro": "Data de lançamento inválida (formato: dd/mm/yyyy ou yyyy-mm-dd)"
+            })
+            linha_tem_erro = True
+        
+        # SEÇÃO 6 - ADMINISTRATIVO
+        if row.get('situacao', '').strip() and not validar_situacao(row.get('situacao', '')):
+            erros.append({
+                "linha": linha_num,
+                "campo": "situacao",
+                "valor": row.get('situacao', ''),
+                "erro": "Situação inválida"
+            })
+            linha_tem_erro = True
+        
+        if row.get('data_cad', '').strip() and not validar_data(row.get('data_cad', '')):
+            erros.append({
+                "linha": linha_num,
+                "campo": "data_cad",
+                "valor": row.get('data_cad', ''),
+                "erro": "Data de cadastro inválida (formato: dd/mm/yyyy ou yyyy-mm-dd)"
+            })
+            linha_tem_erro = True
+        
+        # SEÇÃO 7 - DOCUMENTOS
+        documentos = parse_documentos(row.get('documentos', ''))
+        if documentos:
+            for doc in documentos:
+                if not validar_tipo_documento(doc.get('tipo', '')):
+                    erros.append({
+                        "linha": linha_num,
+                        "campo": "documentos",
+                        "valor": doc.get('tipo', ''),
+                        "erro": f"Tipo de documento inválido: {doc.get('tipo', '')}"
+                    })
+                    linha_tem_erro = True
+                if doc.get('data') and not validar_data(doc.get('data', '')):
+                    erros.append({
+                        "linha": linha_num,
+                        "campo": "documentos",
+                        "valor": doc.get('data', ''),
+                        "erro": f"Data inválida no documento {doc.get('tipo', '')}"
+                    })
+                    linha_tem_erro = True
+        
+        # SEÇÃO 8 - DISTRIBUIÇÃO
+        if row.get('territorio', '').strip() and not validar_territorio(row.get('territorio', '')):
+            erros.append({
+                "linha": linha_num,
+                "campo": "territorio",
+                "valor": row.get('territorio', ''),
+                "erro": "Território inválido"
+            })
+            linha_tem_erro = True
+        
+        if row.get('tipos_exec', '').strip() and not validar_tipo_execucao(row.get('tipos_exec', '')):
+            erros.append({
+                "linha": linha_num,
+                "campo": "tipos_exec",
+                "valor": row.get('tipos_exec', ''),
+                "erro": "Tipo de execução inválido"
+            })
+            linha_tem_erro = True
+        
+        if row.get('prioridade', '').strip() and not validar_prioridade(row.get('prioridade', '')):
+            erros.append({
+                "linha": linha_num,
+                "campo": "prioridade",
+                "valor": row.get('prioridade', ''),
+                "erro": "Prioridade inválida"
+            })
+            linha_tem_erro = True
+        
+        if not linha_tem_erro:
+            linhas_validas += 1
+        else:
+            linhas_com_erro += 1
+    
+    
+    return erros, linhas_validas, linhas_com_erro
+
+
+def comparar_parsers(df: pd.DataFrame):
+    """Parser linha a linha x parser em lote; retorna as tabelas em lote"""
+    inicio = time.perf_counter()
+    referencia = {tipo: [parser(v) for v in df[tipo].tolist()] for tipo, parser in PARSERS.items()}
+    tempo_ref = time.perf_counter() - inicio
+
+    composicoes, tempo_lote = cronometrar(parse_composicoes_em_lote, df)
+    print(f"Campos compostos - parse_* linha a linha: {tempo_ref:.2f}s | em lote: {tempo_lote:.2f}s")
+
+    for tipo, listas in referencia.items():
+        if listas_por_linha(composicoes[tipo], len(df)) != listas:
+            print(f"❌ Parser em lote divergente ({tipo})")
+            sys.exit(1)
+    return composicoes
+
+
+def main():
+    num_linhas = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_LINHAS
+    df = gerar_dataframe(num_linhas)
+    print(f"Linhas: {num_linhas}")
+
+    (erros_ref, validas_ref, com_erro_ref), tempo_ref = cronometrar(validar_dataframe_linha_a_linha, df)
+    print(f"Linha a linha (iterrows): {tempo_ref:.2f}s - {len(erros_ref)} erros, {com_erro_ref} linhas com erro")
+
+    (erros_vet, validas_vet, com_erro_vet), tempo_vet = cronometrar(validar_dataframe, df)
+    print(f"Vetorizado:               {tempo_vet:.2f}s - {len(erros_vet)} erros, {com_erro_vet} linhas com erro")
+
+    composicoes = comparar_parsers(df)
+    com_tabelas = lambda d: validar_dataframe(d, composicoes=composicoes)
+    (erros_tab, validas_tab, com_erro_tab), tempo_tab = cronometrar(com_tabelas, df)
+    print(f"Vetorizado (tabelas prontas): {tempo_tab:.2f}s")
+
+    workers = os.cpu_count() or 1
+    paralelo = lambda d: validar_dataframe_paralelo(d, workers=workers)
+    (erros_par, validas_par, com_erro_par), tempo_par = cronometrar(paralelo, df)
+    paralelo_tab = lambda d: validar_dataframe_paralelo(d, workers=workers, composicoes=composicoes)
+    resultado_par_tab = paralelo_tab(df)
+    print(f"Vetorizado ({workers} processos): {tempo_par:.2f}s - {len(erros_par)} erros, {com_erro_par} linhas com erro")
+
+    referencia = (erros_ref, validas_ref, com_erro_ref)
+    for nome, resultado in (('vetorizado', (erros_vet, validas_vet, com_erro_vet)),
+                            ('tabelas prontas', (erros_tab, validas_tab, com_erro_tab)),
+                            ('paralelo', (erros_par, validas_par, com_erro_par)),
+                            ('paralelo com tabelas', resultado_par_tab)):
+        if resultado != referencia:
+            for i, (a, b) in enumerate(zip(erros_ref, resultado[0])):
+                if a != b:
+                    print(f"Primeira divergência no erro #{i}:\n  linha a linha: {a}\n  {nome}: {b}")
+                    break
+            print(f"❌ Resultados divergentes ({nome})")
+            sys.exit(1)
+
+    print(f"✅ Resultados idênticos - ganho de {tempo_ref / tempo_vet:.1f}x (serial) "
+          f"e {tempo_ref / tempo_par:.1f}x (paralelo)")
+
+
+if __name__ == '__main__':
+    main()
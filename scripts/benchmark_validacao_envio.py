@@ -0,0 +1,57 @@
+"""
+Benchmark - Validação antes do envio ao ECAD
+Com os fonogramas do banco configurado (DATABASE_URL), mede a validação
+carregando os objetos (validar_antes_envio) e a validação em SQL
+(validar_envio_em_lote), e confere se os fonogramas com erro e os válidos são
+os mesmos. Só lê o banco.
+
+Uso: python scripts/benchmark_validacao_envio.py [num_fonogramas]
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from models import db, Fonograma
+from shared.gerador_ecad import validar_antes_envio, validar_envio_em_lote
+
+NUM_FONOGRAMAS = 5000
+
+
+def main():
+    num_fonogramas = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_FONOGRAMAS
+
+    with app.app_context():
+        ids = [i for (i,) in db.session.query(Fonograma.id).order_by(Fonograma.id).limit(num_fonogramas)]
+        if not ids:
+            print("❌ Nenhum fonograma no banco")
+            sys.exit(1)
+        print(f"Fonogramas: {len(ids)}")
+
+        inicio = time.perf_counter()
+        fonogramas = Fonograma.query.filter(Fonograma.id.in_(ids)).order_by(Fonograma.id).all()
+        objetos = validar_antes_envio(fonogramas)
+        tempo_objetos = time.perf_counter() - inicio
+        db.session.expunge_all()
+        print(f"   [objetos] {tempo_objetos:.2f}s")
+
+        inicio = time.perf_counter()
+        lote = validar_envio_em_lote(ids)
+        tempo_lote = time.perf_counter() - inicio
+        print(f"   [SQL]     {tempo_lote:.2f}s")
+
+    erros_objetos = [(e['fonograma_id'], e['erros']) for e in objetos['erros']]
+    erros_lote = [(e['fonograma_id'], e['erros']) for e in lote['erros']]
+    if erros_objetos != erros_lote or objetos['ids_validos'] != lote['ids_validos']:
+        print("❌ Resultados diferentes entre as duas validações")
+        sys.exit(1)
+
+    print(f"\n✅ {lote['validos']} válidos, {lote['com_erro']} com erro, {lote['com_aviso']} com aviso - "
+          f"validação em SQL {tempo_objetos / tempo_lote:.1f}x mais rápida")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark - Leitura de planilhas XLSX
+Compara pd.read_excel (modelo de objetos completo do openpyxl) com a leitura
+em streaming (openpyxl read_only) de shared/processador.py, numa planilha
+com o layout do template_fonograma_final.xlsx.
+
+Cada modo roda em um processo separado para que o pico de memória de um
+não contamine o outro.
+
+Uso: python scripts/benchmark_xlsx.py [num_linhas]
+"""
+
+import os
+import sys
+import time
+import tempfile
+import subprocess
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from shared.processador import ler_excel, ler_excel_em_blocos, limpar_dados_dataframe
+
+NUM_LINHAS = 20000
+TEMPLATE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'template_fonograma_final.xlsx')
+
+MODOS = {
+    'read_excel': lambda caminho: limpar_dados_dataframe(pd.read_excel(caminho, dtype=str)),
+    'streaming': lambda caminho: ler_excel(caminho),
+    'streaming em blocos': lambda caminho: sum(len(bloco) for bloco in ler_excel_em_blocos(caminho)),
+}
+
+
+def gerar_planilha(num_linhas: int) -> str:
+    """Repete a linha de exemplo do template (com ISRC/título únicos) num XLSX novo"""
+    from openpyxl import Workbook, load_workbook
+
+    modelo = load_workbook(TEMPLATE, read_only=True)
+    linhas = modelo.worksheets[0].iter_rows(values_only=True)
+    cabecalho = next(linhas)
+    exemplo = list(next(linhas))
+    modelo.close()
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Fonogramas')
+    ws.append(cabecalho)
+    for i in range(num_linhas):
+        linha = list(exemplo)
+        linha[0] = f'BRXXX24{i:05d}'[:12]
+        linha[1] = f'{exemplo[1]} {i}'
+        ws.append(linha)
+
+    arquivo = tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False)
+    arquivo.close()
+    wb.save(arquivo.name)
+    return arquivo.name
+
+
+def medir(modo: str, caminho: str, rastrear: bool):
+    """
+    Executado no processo filho. Sem rastrear: tempo e RSS máximo.
+    Com rastrear: pico de memória Python (tracemalloc deixa a leitura bem mais lenta).
+    """
+    if rastrear:
+        tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = MODOS[modo](caminho)
+    tempo = time.perf_counter() - inicio
+
+    if rastrear:
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{pico / 1024 / 1024:.1f}")
+        return
+
+    try:
+        import resource
+        rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:  # Windows
+        rss_mb = 0
+    linhas = resultado if isinstance(resultado, int) else len(resultado)
+    print(f"{tempo:.3f};{rss_mb:.1f};{linhas}")
+
+
+def executar_filho(modo: str, caminho: str, rastrear: bool) -> str:
+    argumentos = [sys.executable, os.path.abspath(__file__), '--medir', modo, caminho]
+    if rastrear:
+        argumentos.append('--tracemalloc')
+    saida = subprocess.run(argumentos, capture_output=True, text=True)
+    if saida.returncode != 0:
+        print(f"❌ {modo}: {saida.stderr.strip().splitlines()[-1]}")
+        sys.exit(1)
+    return saida.stdout.strip().splitlines()[-1]
+
+
+def main():
+    if len(sys.argv) > 3 and sys.argv[1] == '--medir':
+        medir(sys.argv[2], sys.argv[3], '--tracemalloc' in sys.argv)
+        return
+
+    num_linhas = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_LINHAS
+    caminho = gerar_planilha(num_linhas)
+    try:
+        tamanho_mb = os.path.getsize(caminho) / 1024 / 1024
+        print(f"Planilha: {num_linhas} linhas, {tamanho_mb:.1f} MB (layout {os.path.basename(TEMPLATE)})")
+
+        for modo in MODOS:
+            tempo, rss, linhas = executar_filho(modo, caminho, rastrear=False).split(';')
+            pico = executar_filho(modo, caminho, rastrear=True)
+            print(f"{modo:<20} {float(tempo):6.2f}s | RSS máx {rss:>7} MB | pico Python {pico:>7} MB | {linhas} linhas")
+
+        referencia = MODOS['read_excel'](caminho).reset_index(drop=True)
+        streaming = ler_excel(caminho)
+        try:
+            pd.testing.assert_frame_equal(referencia, streaming, check_dtype=False)
+        except AssertionError as e:
+            print(f"❌ Conteúdo divergente: {e}")
+            sys.exit(1)
+        print("✅ Conteúdo idêntico ao pd.read_excel(dtype=str)")
+    finally:
+        os.remove(caminho)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Carga inicial de catálogo (migração de uma associação nova)
+
+Lê o arquivo em blocos, valida cada bloco e grava só as linhas válidas com
+shared/carga_inicial.py (COPY + merge em SQL no PostgreSQL, upserts em massa
+no SQLite), sem passar pelo ORM. Ao final mostra a vazão de cada etapa.
+
+Para atualizações do dia a dia use scripts/importar_catalogo.py (incremental).
+
+Uso: python scripts/carga_catalogo.py <arquivo> [--email dono@exemplo.com] [--bloco 20000]
+"""
+
+import sys
+import os
+import argparse
+import time
+
+# Adiciona o diretório raiz ao path para importar app e models
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from models import User
+from shared.carga_inicial import carregar_dataframe
+from shared.processador import processar_csv_em_blocos, selecionar_composicoes
+
+TAMANHO_BLOCO_CARGA = 20000
+
+
+def vazao(linhas: int, segundos: float) -> str:
+    return f"{linhas / segundos:,.0f} linhas/s" if segundos > 0 else "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Carga inicial de um catálogo de fonogramas')
+    parser.add_argument('arquivo', help='Arquivo CSV ou XLSX')
+    parser.add_argument('--email', help='E-mail do usuário dono dos fonogramas novos')
+    parser.add_argument('--bloco', type=int, default=TAMANHO_BLOCO_CARGA, help='Linhas por bloco (uma transação por bloco)')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.arquivo):
+        print(f"❌ Arquivo não encontrado: {args.arquivo}")
+        sys.exit(1)
+
+    with app.app_context():
+        user_id = None
+        if args.email:
+            usuario = User.query.filter_by(email=args.email).first()
+            if not usuario:
+                print(f"❌ Usuário não encontrado: {args.email}")
+                sys.exit(1)
+            user_id = usuario.id
+
+        total = {'linhas': 0, 'validas': 0, 'com_erro': 0, 'erros': 0, 'salvos': 0, 'atualizados': 0}
+        tempos = {'leitura': 0.0, 'preparacao': 0.0, 'gravacao': 0.0}
+        modo = '-'
+        inicio = time.perf_counter()
+        marca = inicio
+
+        for bloco in processar_csv_em_blocos(args.arquivo, args.bloco):
+            erros = bloco['erros']
+            if erros and erros[0]['linha'] == 0:
+                print(f"❌ {erros[0]['erro']}")
+                sys.exit(1)
+            tempos['leitura'] += time.perf_counter() - marca
+
+            df = bloco['df_validos']
+            composicoes = selecionar_composicoes(bloco['composicoes'], bloco['df'].index.isin(df.index))
+            resultado = carregar_dataframe(df, user_id=user_id, composicoes=composicoes)
+            modo = resultado['modo']
+            tempos['preparacao'] += resultado['tempo_preparacao']
+            tempos['gravacao'] += resultado['tempo_gravacao']
+
+            total['linhas'] += bloco['total_linhas']
+            total['validas'] += bloco['linhas_validas']
+            total['com_erro'] += bloco['linhas_com_erro']
+            total['erros'] += len(erros)
+            total['salvos'] += resultado['salvos']
+            total['atualizados'] += resultado['atualizados']
+
+            decorrido = time.perf_counter() - inicio
+            print(f"Bloco {bloco['numero']}: {bloco['linhas_processadas']} linhas - "
+                  f"{total['salvos']} novos, {total['atualizados']} atualizados - "
+                  f"{decorrido:.1f}s ({vazao(bloco['linhas_processadas'], decorrido)})")
+            marca = time.perf_counter()
+
+    decorrido = time.perf_counter() - inicio
+    gravadas = total['salvos'] + total['atualizados']
+    print(f"\n✅ Carga concluída em {decorrido:.1f}s (modo {modo})")
+    print(f"   Linhas: {total['linhas']} ({total['validas']} válidas, {total['com_erro']} com erro, {total['erros']} erros)")
+    print(f"   Fonogramas: {total['salvos']} novos, {total['atualizados']} atualizados")
+    print(f"   Leitura e validação: {tempos['leitura']:.1f}s ({vazao(total['linhas'], tempos['leitura'])})")
+    print(f"   Preparação:          {tempos['preparacao']:.1f}s ({vazao(gravadas, tempos['preparacao'])})")
+    print(f"   Gravação no banco:   {tempos['gravacao']:.1f}s ({vazao(gravadas, tempos['gravacao'])})")
+    print(f"   Total:               {vazao(total['linhas'], decorrido)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Compactação dos arquivos TXT de envios antigos ao ECAD
+
+Envios gerados antes de ENVIO_COMPRESSAO (ou com ela vazia) ficam em
+uploads/envios como .txt sem compactação. Este script grava a versão
+compactada (gzip ou zip) dos envios com mais de --dias dias, aponta o envio
+para o novo arquivo e só então apaga o .txt. O download continua igual
+(admin/routes.py, download_arquivo_envio). Pode ser executado de novo.
+
+Uso: python scripts/compactar_envios_antigos.py [--dias 30] [--formato gzip|zip] [--simular]
+"""
+
+import os
+import sys
+import argparse
+from datetime import datetime, timedelta
+
+# Adiciona o diretório raiz ao path para importar app e models
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from models import db, EnvioECAD
+from shared.artefatos_envio import COMPRESSOES, ENVIO_COMPRESSAO, compactar_arquivo
+
+EXTENSOES_TXT = ('.txt', '.exp')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compacta os TXT de envios antigos ao ECAD')
+    parser.add_argument('--dias', type=int, default=30, help='Idade mínima do envio em dias (padrão: 30)')
+    parser.add_argument('--formato', choices=COMPRESSOES, default=ENVIO_COMPRESSAO or 'gzip',
+                        help='Formato (padrão: ENVIO_COMPRESSAO ou gzip)')
+    parser.add_argument('--simular', action='store_true', help='Só lista o que seria compactado')
+    args = parser.parse_args()
+
+    limite = datetime.utcnow() - timedelta(days=args.dias)
+    compactados = erros = 0
+    bytes_antes = bytes_depois = 0
+
+    with app.app_context():
+        envios = EnvioECAD.query.filter(
+            EnvioECAD.data_envio < limite,
+            EnvioECAD.arquivo_gerado.isnot(None),
+        ).order_by(EnvioECAD.id).all()
+        # Só o TXT (a planilha Excel já é compactada)
+        pendentes = [e for e in envios if e.arquivo_gerado.lower().endswith(EXTENSOES_TXT)
+                     and os.path.exists(e.arquivo_gerado)]
+        print(f"Envios com TXT sem compactação há mais de {args.dias} dias: {len(pendentes)}")
+
+        for envio in pendentes:
+            original = envio.arquivo_gerado
+            tamanho = os.path.getsize(original)
+            if args.simular:
+                print(f"   {envio.protocolo}: {original} ({tamanho:,} bytes)")
+                continue
+            try:
+                destino = compactar_arquivo(original, args.formato)
+                envio.arquivo_gerado = destino
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                erros += 1
+                print(f"   ❌ {envio.protocolo}: {e}")
+                continue
+            os.remove(original)
+            compactados += 1
+            bytes_antes += tamanho
+            bytes_depois += os.path.getsize(destino)
+            print(f"   {envio.protocolo}: {tamanho:,} -> {os.path.getsize(destino):,} bytes")
+
+    if not args.simular:
+        economia = f" ({bytes_antes:,} -> {bytes_depois:,} bytes)" if compactados else ''
+        print(f"{'❌' if erros else '✅'} {compactados} envio(s) compactado(s){economia}, {erros} erro(s)")
+
+
+if __name__ == '__main__':
+    main()
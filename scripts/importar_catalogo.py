@@ -0,0 +1,81 @@
+"""
+Importação de catálogos grandes (CSV/XLSX) em modo streaming
+
+Lê o arquivo em blocos, valida e salva cada bloco antes do próximo,
+exibindo o progresso. Não tem limite de tamanho de arquivo.
+Por padrão é incremental: linhas iguais às da última importação não são
+validadas nem gravadas de novo (--completo desativa).
+
+Uso: python scripts/importar_catalogo.py <arquivo> [--email dono@exemplo.com] [--bloco 5000] [--incluir-invalidos] [--completo]
+"""
+
+import sys
+import os
+import argparse
+import time
+
+# Adiciona o diretório raiz ao path para importar app e models
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from models import User
+from shared.fonograma_service import importar_arquivo_em_blocos
+from shared.processador import TAMANHO_BLOCO_PADRAO
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Importa um catálogo de fonogramas em blocos')
+    parser.add_argument('arquivo', help='Arquivo CSV ou XLSX')
+    parser.add_argument('--email', help='E-mail do usuário dono dos fonogramas novos')
+    parser.add_argument('--bloco', type=int, default=TAMANHO_BLOCO_PADRAO, help='Linhas por bloco')
+    parser.add_argument('--incluir-invalidos', action='store_true', help='Salva também linhas com erro')
+    parser.add_argument('--completo', action='store_true', help='Valida e grava todas as linhas, mesmo as inalteradas')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.arquivo):
+        print(f"❌ Arquivo não encontrado: {args.arquivo}")
+        sys.exit(1)
+
+    user_id = None
+    if args.email:
+        with app.app_context():
+            usuario = User.query.filter_by(email=args.email).first()
+            if not usuario:
+                print(f"❌ Usuário não encontrado: {args.email}")
+                sys.exit(1)
+            user_id = usuario.id
+
+    inicio = time.time()
+
+    def progresso(p):
+        decorrido = time.time() - inicio
+        print(f"Bloco {p['bloco']}: {p['linhas_processadas']} linhas "
+              f"({p['validos']} válidas, {p['com_erro']} com erro) - "
+              f"{p['salvos']} novos, {p['atualizados']} atualizados, {p['inalterados']} inalterados - {decorrido:.1f}s")
+
+    resumo = importar_arquivo_em_blocos(
+        args.arquivo,
+        app.app_context(),
+        user_id=user_id,
+        tamanho_bloco=args.bloco,
+        salvar_apenas_validos=not args.incluir_invalidos,
+        callback_progresso=progresso,
+        incremental=not args.completo
+    )
+
+    if not resumo['sucesso']:
+        print(f"❌ {resumo.get('erro')}")
+        sys.exit(1)
+
+    print(f"\n✅ Importação concluída em {time.time() - inicio:.1f}s")
+    print(f"   Linhas: {resumo['total']} ({resumo['validos']} válidas, {resumo['com_erro']} com erro)")
+    print(f"   Fonogramas: {resumo['salvos']} novos, {resumo['atualizados']} atualizados, {resumo['inalterados']} inalterados")
+    print(f"   Validação reaproveitada: {resumo['reaproveitadas']} linhas")
+    print(f"   Erros de validação: {resumo['total_erros']} | Erros ao salvar: {len(resumo['erros_salvamento'])}")
+
+    for erro in resumo['erros'][:20]:
+        print(f"   Linha {erro['linha']} [{erro['campo']}]: {erro['erro']}")
+
+
+if __name__ == '__main__':
+    main()
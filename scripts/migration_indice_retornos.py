@@ -0,0 +1,47 @@
+"""
+Migração - Índice do último retorno por fonograma
+
+Cria em bancos existentes o índice idx_retorno_envio_fonograma_data
+(envio_id, fonograma_id, data_retorno) de RetornoECAD, usado pela consulta do
+último retorno de cada fonograma no envio (ultimos_retornos em
+shared/processador_retorno_ecad.py). db.create_all só cria índices de tabelas
+novas. Funciona com SQLite e PostgreSQL (DATABASE_URL) e pode ser executado de novo.
+
+Uso: python scripts/migration_indice_retornos.py
+"""
+
+import sys
+import os
+import time
+
+# Adiciona o diretório raiz ao path para importar app e models
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect
+
+from app import app
+from models import db, RetornoECAD
+
+NOME_INDICE = 'idx_retorno_envio_fonograma_data'
+
+
+def main():
+    with app.app_context():
+        existentes = {i['name'] for i in inspect(db.engine).get_indexes(RetornoECAD.__tablename__)}
+        if NOME_INDICE in existentes:
+            print(f"✅ Índice {NOME_INDICE} já existe")
+            return
+
+        indice = next(i for i in RetornoECAD.__table__.indexes if i.name == NOME_INDICE)
+        inicio = time.perf_counter()
+        try:
+            indice.create(db.engine)
+        except Exception as e:
+            print(f"❌ Erro ao criar o índice {NOME_INDICE}: {e}")
+            sys.exit(1)
+        print(f"✅ Índice {NOME_INDICE} criado em {time.perf_counter() - inicio:.2f}s "
+              f"({RetornoECAD.query.count():,} retornos)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Registro inicial dos fingerprints de envio (envio delta)
+
+Fonogramas aceitos pelo ECAD antes do controle de fingerprints não têm a base
+de comparação do envio delta e entrariam todos nele (motivo SEM_REGISTRO).
+Este script grava o fingerprint atual de cada fonograma ACEITO sem registro,
+considerando os dados atuais como os últimos aceitos. Pode ser executado de novo.
+
+Uso: python scripts/registrar_fingerprints_envio.py
+"""
+
+import sys
+import os
+import time
+
+# Adiciona o diretório raiz ao path para importar app e models
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from models import db, Fonograma, FingerprintEnvio
+from shared.envio_delta import registrar_envio, sincronizar_atualizado_em
+
+TAMANHO_BLOCO = 5000
+
+
+def main():
+    with app.app_context():
+        ids = [i for (i,) in db.session.query(Fonograma.id)
+               .outerjoin(FingerprintEnvio, FingerprintEnvio.fonograma_id == Fonograma.id)
+               .filter(Fonograma.status_ecad == 'ACEITO', FingerprintEnvio.fonograma_id.is_(None))
+               .order_by(Fonograma.id)]
+        print(f"Fonogramas aceitos sem fingerprint: {len(ids)}")
+
+        inicio = time.perf_counter()
+        for bloco in range(0, len(ids), TAMANHO_BLOCO):
+            lote = ids[bloco:bloco + TAMANHO_BLOCO]
+            registrar_envio(None, lote, status='ACEITO')
+            db.session.commit()
+            sincronizar_atualizado_em(lote)
+            db.session.expunge_all()
+            print(f"   {bloco + len(lote)}/{len(ids)}")
+
+    print(f"✅ {len(ids)} fingerprints registrados em {time.perf_counter() - inicio:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
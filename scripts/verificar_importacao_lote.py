@@ -0,0 +1,105 @@
+"""
+Verificação - Importação em lote do admin (lote_service.executar_importacao)
+Importa um arquivo com mais linhas que um bloco (TAMANHO_BLOCO_IMPORTACAO) num
+banco SQLite temporário, como a rota faz: com o usuário carregado da sessão.
+Confere que:
+  - todas as linhas novas são gravadas, em todos os blocos, com o user_id e a
+    associação de quem importou;
+  - o usuário continua utilizável depois da importação (como o current_user
+    no template);
+  - reimportar o arquivo com alterações atualiza todas as linhas;
+  - o mesmo arquivo importado como job (fila em segundo plano, tipo
+    importar_lote, executado como pelo worker) grava todas as linhas.
+
+Uso: python scripts/verificar_importacao_lote.py [num_linhas]
+"""
+
+import os
+import sys
+import tempfile
+
+NUM_LINHAS = 2500
+
+
+def main():
+    num_linhas = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_LINHAS
+    pasta = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(pasta, 'lote.db')
+    os.environ['JOBS_DIR'] = os.path.join(pasta, 'jobs')
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+    import pandas as pd
+    from werkzeug.datastructures import FileStorage
+    from app import app
+    from models import db, Fonograma, User
+    from admin.services.lote_service import TAMANHO_BLOCO_IMPORTACAO, executar_importacao
+    from shared import jobs
+    from benchmark_validacao import linha_base
+
+    falhas = []
+    caminho = os.path.join(pasta, 'lote.csv')
+    df = pd.DataFrame([linha_base(i) for i in range(num_linhas)])
+
+    def importar(usuario):
+        with open(caminho, 'rb') as f:
+            return executar_importacao(FileStorage(stream=f, filename='lote.csv'), usuario)
+
+    with app.app_context():
+        dono = User(email='lote@exemplo.com', nome='Importador', role='admin', associacao='SBACEM')
+        db.session.add(dono)
+        db.session.commit()
+        user_id = dono.id
+        db.session.expunge_all()
+        usuario = db.session.get(User, user_id)
+
+        df.to_csv(caminho, index=False)
+        resultado = importar(usuario)
+        blocos = len(resultado.get('blocos', []))
+        print(f"Inserção: {num_linhas} linhas em {blocos} bloco(s) de até {TAMANHO_BLOCO_IMPORTACAO} - "
+              f"salvos {resultado.get('salvos')}, erros {resultado.get('erros')}")
+        if resultado.get('salvos') != num_linhas or resultado.get('erros'):
+            falhas.append(f"inserção: salvos {resultado.get('salvos')} e erros {resultado.get('erros')}, "
+                          f"esperado {num_linhas} e 0 ({resultado.get('erro', '')})")
+        gravados = Fonograma.query.count()
+        do_usuario = Fonograma.query.filter_by(user_id=user_id, assoc_gestao='SBACEM').count()
+        if gravados != num_linhas or do_usuario != num_linhas:
+            falhas.append(f"banco: {gravados} fonogramas, {do_usuario} do usuário, esperado {num_linhas}")
+        try:
+            usuario.email
+        except Exception as e:
+            falhas.append(f"usuário inutilizável depois da importação: {e}")
+
+        df['titulo'] = df['titulo'] + ' (revisado)'
+        df.to_csv(caminho, index=False)
+        resultado = importar(usuario)
+        print(f"Reimportação: atualizados {resultado.get('atualizados')}, erros {resultado.get('erros')}")
+        revisados = Fonograma.query.filter(Fonograma.titulo.like('% (revisado)')).count()
+        if resultado.get('atualizados') != num_linhas or revisados != num_linhas:
+            falhas.append(f"reimportação: {resultado.get('atualizados')} atualizados, {revisados} revisados no banco")
+
+        df_job = pd.DataFrame([linha_base(i) for i in range(num_linhas, 2 * num_linhas)])
+        df_job.to_csv(caminho, index=False)
+        job = jobs.enfileirar('importar_lote', user_id=user_id, arquivo=caminho, nome_arquivo='lote.csv')
+        job_id = job.id
+        status = jobs.executar_proximo('verificacao')
+        job = jobs.obter_job(job_id)
+        resumo = jobs.resultado_completo(job) or {}
+        print(f"Job #{job_id}: {status} - salvos {resumo.get('salvos')}, erros {resumo.get('erros')}")
+        if status != jobs.CONCLUIDO or resumo.get('salvos') != num_linhas or resumo.get('erros'):
+            falhas.append(f"job: {status}, salvos {resumo.get('salvos')} e erros {resumo.get('erros')}, "
+                          f"esperado {jobs.CONCLUIDO}, {num_linhas} e 0 ({job.erro or ''})")
+        do_usuario = Fonograma.query.filter_by(user_id=user_id, assoc_gestao='SBACEM').count()
+        if do_usuario != 2 * num_linhas:
+            falhas.append(f"banco depois do job: {do_usuario} fonogramas do usuário, esperado {2 * num_linhas}")
+
+    for falha in falhas:
+        print(f"   {falha}")
+    if falhas:
+        print(f"❌ {len(falhas)} falha(s) na importação em lote")
+        sys.exit(1)
+    print("✅ Importação em lote gravou todas as linhas em todos os blocos")
+
+
+if __name__ == '__main__':
+    main()
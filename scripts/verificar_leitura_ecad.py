@@ -0,0 +1,148 @@
+"""
+Verificação - Leitura do TXT ECAD posicional (ida e volta)
+Gera o TXT dos fonogramas do banco configurado (DATABASE_URL) com
+gerar_txt_ecad e lê de volta com shared/leitor_ecad_posicional.py, conferindo:
+  - toda linha tem tipo conhecido e, montada de novo a partir dos campos lidos
+    (layout_ecad), é igual à linha do arquivo;
+  - contagens de FON1/OBM1 e o total de linhas do trailer 999 batem com o arquivo;
+  - o ISRC e o id de cada FON1 são os dos fonogramas, na mesma ordem;
+  - como retorno, o TXT gerado por nós é recusado, e o mesmo arquivo com
+    cabeçalhos de outra origem só é lido com confirmação (todos CADASTRADO,
+    sem cod_ecad).
+Com --formato gzip/zip, o arquivo é gravado e lido compactado.
+
+Com --arquivo, só lê um arquivo existente (ex.: um arquivo do ECAD) e mostra a
+contagem por tipo de registro. Só lê o banco.
+
+Uso: python scripts/verificar_leitura_ecad.py [num_fonogramas] [--formato gzip|zip] [--arquivo caminho]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from collections import Counter
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.artefatos_envio import COMPRESSOES, caminho_artefato
+from shared.layout_ecad import REGISTROS, REGISTROS_ARQUIVO, limpar_texto
+from shared.leitor_ecad_posicional import DESCONHECIDO, eh_arquivo_sbacem, ler_registros
+
+NUM_FONOGRAMAS = 5000
+
+
+def conferir_como_retorno(caminho, pasta, isrcs):
+    """Falhas ao importar o TXT gerado como retorno: o nosso e o mesmo com cabeçalhos do ECAD"""
+    from shared.artefatos_envio import abrir_para_leitura
+    from shared.processador_retorno_ecad import importar_retorno_ecad
+
+    falhas = []
+    if not eh_arquivo_sbacem(caminho):
+        falhas.append("TXT gerado não reconhecido como da SBACEM")
+    if importar_retorno_ecad(caminho, 0, confirmar_posicional=True)['sucesso']:
+        falhas.append("TXT gerado pela SBACEM aceito como retorno")
+
+    # Mesmo conteúdo com cabeçalhos de outra origem (000 e 0660 regravados)
+    externo = os.path.join(pasta, 'retorno.txt')
+    with abrir_para_leitura(caminho) as origem, open(externo, 'wb') as destino:
+        for linha in origem:
+            if linha.startswith(b'000'):
+                linha = REGISTROS_ARQUIVO['000'].formatar({'sequencia': 1, 'data': '01012026', 'hora': '000000',
+                                                           'nome': 'ECAD RETORNO'}).encode('latin-1') + b'\n'
+            elif linha.startswith(b'0660') and linha.rstrip().isdigit():
+                linha = REGISTROS_ARQUIVO['0660'].formatar({'associacao': 1, 'sequencia': 2,
+                                                            'data': '01012026'}).encode('latin-1') + b'\n'
+            destino.write(linha)
+    sem_confirmacao = importar_retorno_ecad(externo, 0)
+    if sem_confirmacao['sucesso'] or not sem_confirmacao.get('requer_confirmacao'):
+        falhas.append("TXT posicional lido como retorno sem confirmação")
+    confirmado = importar_retorno_ecad(externo, 0, confirmar_posicional=True)
+    retornos = list(confirmado.get('retornos', []))
+    if [r['isrc'] for r in retornos] != isrcs:
+        falhas.append(f"retorno confirmado com {len(retornos)} linhas, esperado {len(isrcs)} ({confirmado.get('erro', '')})")
+    if any(r['status'] != 'CADASTRADO' or r['cod_ecad'] is not None for r in retornos):
+        falhas.append("retorno posicional com status diferente de CADASTRADO ou com cod_ecad")
+    return falhas
+
+
+def contar_tipos(caminho):
+    inicio = time.perf_counter()
+    tipos = Counter(registro.tipo for registro in ler_registros(caminho))
+    segundos = time.perf_counter() - inicio
+    print(f"{sum(tipos.values()):,} linhas lidas em {segundos:.2f}s")
+    for tipo, quantidade in sorted(tipos.items()):
+        print(f"   {tipo:<13} {quantidade:>9,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ida e volta do TXT ECAD posicional')
+    parser.add_argument('num_fonogramas', nargs='?', type=int, default=NUM_FONOGRAMAS)
+    parser.add_argument('--formato', choices=COMPRESSOES, help='Gravar e ler compactado')
+    parser.add_argument('--arquivo', help='Só lê este arquivo e conta os registros por tipo')
+    args = parser.parse_args()
+
+    if args.arquivo:
+        contar_tipos(args.arquivo)
+        return
+
+    from app import app
+    from models import db, Fonograma
+    from shared.gerador_ecad import gerar_txt_ecad, iterar_fonogramas_ecad
+
+    with app.app_context(), tempfile.TemporaryDirectory() as pasta:
+        fonogramas = db.session.query(Fonograma.id, Fonograma.isrc).order_by(Fonograma.id).limit(args.num_fonogramas).all()
+        if not fonogramas:
+            print("❌ Nenhum fonograma no banco")
+            sys.exit(1)
+        ids = [f.id for f in fonogramas]
+
+        caminho = caminho_artefato(os.path.join(pasta, 'ecad.txt'), args.formato or '')
+        resultado = gerar_txt_ecad(iterar_fonogramas_ecad(ids), caminho)
+        db.session.expunge_all()
+        print(f"Fonogramas: {len(ids)} - {os.path.basename(caminho)} ({resultado['tamanho_bytes']:,} bytes)")
+
+        inicio = time.perf_counter()
+        tipos = Counter()
+        fon1 = []
+        trailer = None
+        falhas = []
+        for registro in ler_registros(caminho):
+            tipos[registro.tipo] += 1
+            layout = REGISTROS.get(registro.tipo) or REGISTROS_ARQUIVO.get(registro.tipo)
+            if registro.tipo == DESCONHECIDO:
+                falhas.append(f"linha {registro.numero_linha}: tipo desconhecido")
+            elif layout is not None and layout.formatar(registro.campos) != registro.texto:
+                falhas.append(f"linha {registro.numero_linha} ({registro.tipo}): remontada diferente do arquivo")
+            if registro.tipo == 'FON1':
+                fon1.append((registro.campos['id_fonograma'], registro.campos['isrc']))
+            elif registro.tipo == '999':
+                trailer = registro.campos
+        segundos = time.perf_counter() - inicio
+        total_linhas = sum(tipos.values())
+        print(f"   {total_linhas:,} linhas lidas em {segundos:.2f}s ({total_linhas / segundos:,.0f} linhas/s)")
+
+        falhas += conferir_como_retorno(caminho, pasta, [isrc for _, isrc in fon1])
+
+    # ISRC como o gerador grava (sem acentos e hífens, em maiúsculas)
+    esperado = [(f.id, limpar_texto(f.isrc).replace('-', '')) for f in fonogramas]
+    if fon1 != esperado:
+        lido, gravado = next(((a, b) for a, b in zip(fon1, esperado) if a != b), (len(fon1), len(esperado)))
+        falhas.append(f"FON1 com id/ISRC diferentes dos fonogramas: lido {lido}, esperado {gravado}")
+    if tipos['FON1'] != resultado['total_fonogramas'] or tipos['OBM1'] != resultado['total_obras']:
+        falhas.append(f"contagens: {tipos['FON1']} FON1 e {tipos['OBM1']} OBM1, "
+                      f"esperado {resultado['total_fonogramas']} e {resultado['total_obras']}")
+    if trailer is None or trailer['total_linhas'] != total_linhas:
+        falhas.append(f"trailer 999: {trailer and trailer['total_linhas']} linhas, arquivo com {total_linhas}")
+
+    for falha in falhas[:20]:
+        print(f"   {falha}")
+    if falhas:
+        print(f"❌ {len(falhas)} divergência(s) na leitura")
+        sys.exit(1)
+    print(f"✅ Ida e volta sem divergências: {dict(sorted(tipos.items()))}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Worker da fila de importações em segundo plano (shared/jobs.py)
+
+Processa os jobs criados pelas rotas com assincrono=1 e por POST /api/jobs.
+Vários processos podem rodar ao mesmo tempo (nesta máquina ou em outras que
+usem o mesmo banco): cada job é reivindicado por um UPDATE atômico.
+
+Uso: python scripts/worker_importacao.py [--processos 2] [--uma-vez]
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+import multiprocessing
+
+# Adiciona o diretório raiz ao path para importar app e models
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def executar_worker(nome: str, uma_vez: bool = False):
+    """Laço de um processo: pega o próximo job, executa, repete"""
+    from app import app
+    from shared import jobs
+
+    with app.app_context():
+        recuperados = jobs.recuperar_travados()
+        if recuperados:
+            print(f"[{nome}] {recuperados} job(s) travado(s) devolvido(s) à fila")
+
+        while True:
+            try:
+                job = jobs.reivindicar(nome)
+            except Exception as e:
+                print(f"[{nome}] ❌ Erro ao consultar a fila: {e}")
+                job = None
+
+            if job is None:
+                if uma_vez:
+                    return
+                time.sleep(jobs.JOBS_INTERVALO_S)
+                continue
+
+            inicio = time.perf_counter()
+            print(f"[{nome}] Job #{job.id} ({job.tipo}, {job.nome_arquivo or '-'}) iniciado")
+            status = jobs.executar(job)
+            simbolo = '✅' if status == jobs.CONCLUIDO else '❌'
+            print(f"[{nome}] {simbolo} Job #{job.id}: {status} em {time.perf_counter() - inicio:.1f}s")
+
+
+def executar_processo(nome: str, uma_vez: bool = False):
+    """Alvo dos processos worker: Ctrl+C encerra o processo sem traceback"""
+    try:
+        executar_worker(nome, uma_vez)
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Processa a fila de importações em segundo plano')
+    parser.add_argument('--processos', type=int, default=int(os.environ.get('JOBS_WORKERS', '1')),
+                        help='Processos worker (padrão: JOBS_WORKERS ou 1)')
+    parser.add_argument('--uma-vez', action='store_true', help='Sai quando a fila estiver vazia')
+    args = parser.parse_args()
+
+    prefixo = f"{socket.gethostname()}-{os.getpid()}"
+    if args.processos <= 1:
+        try:
+            executar_worker(prefixo, args.uma_vez)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    # spawn: cada processo abre as próprias conexões com o banco. Não daemon:
+    # a validação paralela e a geração do TXT ECAD criam processos filhos
+    contexto = multiprocessing.get_context('spawn')
+    processos = [
+        contexto.Process(target=executar_processo, args=(f"{prefixo}-{i + 1}", args.uma_vez))
+        for i in range(args.processos)
+    ]
+    for processo in processos:
+        processo.start()
+    print(f"✅ {len(processos)} workers iniciados")
+    try:
+        for processo in processos:
+            processo.join()
+    except KeyboardInterrupt:
+        for processo in processos:
+            processo.terminate()
+        for processo in processos:
+            processo.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+Arquivos gerados nos envios ao ECAD, opcionalmente compactados
+
+O TXT ECAD é texto posicional muito repetitivo (registros de tamanho fixo
+completados com espaços e zeros) e compactado fica com uma fração do tamanho.
+ENVIO_COMPRESSAO define como os novos envios são gravados:
+  (vazio)  <protocolo>.txt, sem compactação
+  gzip     <protocolo>.txt.gz
+  zip      <protocolo>.zip, com <protocolo>.txt dentro
+A compactação acontece durante a geração: o TXT sem compactação não chega a
+ir para o disco. A planilha Excel já é um pacote zip e fica como está.
+
+O formato de cada arquivo vem da extensão, então envios antigos (sem
+compactação, ou compactados por scripts/compactar_envios_antigos.py) continuam
+sendo lidos e baixados normalmente.
+"""
+
+import gzip
+import io
+import os
+import shutil
+import zipfile
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional, TextIO
+
+# '', 'gzip' ou 'zip'
+ENVIO_COMPRESSAO = os.environ.get('ENVIO_COMPRESSAO', '').strip().lower()
+COMPRESSOES = ('gzip', 'zip')
+NIVEL_COMPRESSAO = 6
+BUFFER_ARTEFATO = 1024 * 1024
+
+# Texto do TXT ECAD (mesma codificação de gerador_ecad)
+ENCODING_ARTEFATO = 'latin-1'
+
+
+def compressao_do_arquivo(caminho: str) -> Optional[str]:
+    """'gzip', 'zip' ou None, pela extensão"""
+    nome = caminho.lower()
+    if nome.endswith('.gz'):
+        return 'gzip'
+    if nome.endswith('.zip'):
+        return 'zip'
+    return None
+
+
+def caminho_artefato(caminho: str, compressao: Optional[str] = None) -> str:
+    """Caminho do arquivo compactado de caminho (padrão: ENVIO_COMPRESSAO)"""
+    compressao = ENVIO_COMPRESSAO if compressao is None else compressao
+    if not compressao:
+        return caminho
+    if compressao not in COMPRESSOES:
+        raise ValueError(f"Compressão inválida: {compressao} (use {', '.join(COMPRESSOES)} ou vazio)")
+    if compressao == 'gzip':
+        return caminho + '.gz'
+    return os.path.splitext(caminho)[0] + '.zip'
+
+
+def _nome_interno_zip(caminho: str) -> str:
+    return os.path.splitext(os.path.basename(caminho))[0] + '.txt'
+
+
+def nome_original(caminho: str) -> str:
+    """Nome do arquivo sem compactação (nome do download descompactado)"""
+    compressao = compressao_do_arquivo(caminho)
+    if compressao == 'gzip':
+        return os.path.basename(caminho)[:-3]
+    if compressao == 'zip':
+        with zipfile.ZipFile(caminho) as arquivo_zip:
+            nomes = arquivo_zip.namelist()
+        return os.path.basename(nomes[0]) if nomes else _nome_interno_zip(caminho)
+    return os.path.basename(caminho)
+
+
+@contextmanager
+def abrir_para_escrita(caminho: str, buffering: int = BUFFER_ARTEFATO) -> Iterator[TextIO]:
+    """Arquivo de texto para gravar o TXT, compactado conforme a extensão de caminho"""
+    compressao = compressao_do_arquivo(caminho)
+    if compressao is None:
+        with open(caminho, 'w', encoding=ENCODING_ARTEFATO, errors='replace', buffering=buffering) as f:
+            yield f
+    elif compressao == 'gzip':
+        with gzip.open(caminho, 'wb', compresslevel=NIVEL_COMPRESSAO) as bruto, \
+                io.TextIOWrapper(io.BufferedWriter(bruto, buffering), encoding=ENCODING_ARTEFATO, errors='replace') as f:
+            yield f
+    else:
+        with zipfile.ZipFile(caminho, 'w', zipfile.ZIP_DEFLATED, compresslevel=NIVEL_COMPRESSAO) as arquivo_zip, \
+                arquivo_zip.open(_nome_interno_zip(caminho), 'w', force_zip64=True) as bruto, \
+                io.TextIOWrapper(io.BufferedWriter(bruto, buffering), encoding=ENCODING_ARTEFATO, errors='replace') as f:
+            yield f
+
+
+def abrir_para_leitura(caminho: str) -> BinaryIO:
+    """Conteúdo sem compactação (binário), lido aos poucos. Quem chama fecha o arquivo"""
+    compressao = compressao_do_arquivo(caminho)
+    if compressao == 'gzip':
+        return gzip.open(caminho, 'rb')
+    if compressao == 'zip':
+        # O arquivo do zip continua aberto até a entrada ser fechada
+        with zipfile.ZipFile(caminho) as arquivo_zip:
+            return arquivo_zip.open(arquivo_zip.namelist()[0])
+    return open(caminho, 'rb')
+
+
+def compactar_arquivo(caminho: str, compressao: str) -> str:
+    """
+    Grava a versão compactada de um arquivo sem compactação e retorna o novo
+    caminho. O original não é apagado. A cópia é gravada num arquivo temporário
+    e renomeada no fim: um arquivo pela metade nunca fica com o nome final.
+    """
+    destino = caminho_artefato(caminho, compressao)
+    temporario = destino + '.tmp'
+    try:
+        with open(caminho, 'rb') as origem:
+            if compressao == 'gzip':
+                with open(temporario, 'wb') as saida, \
+                        gzip.GzipFile(os.path.basename(caminho), 'wb', NIVEL_COMPRESSAO, saida,
+                                      mtime=os.path.getmtime(caminho)) as compactado:
+                    shutil.copyfileobj(origem, compactado, BUFFER_ARTEFATO)
+            else:
+                with zipfile.ZipFile(temporario, 'w', zipfile.ZIP_DEFLATED, compresslevel=NIVEL_COMPRESSAO) as arquivo_zip, \
+                        arquivo_zip.open(os.path.basename(caminho), 'w', force_zip64=True) as compactado:
+                    shutil.copyfileobj(origem, compactado, BUFFER_ARTEFATO)
+        os.replace(temporario, destino)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+    return destino
+
+
+def enviar_artefato(caminho: str, descompactar: bool = False):
+    """
+    Resposta de download (send_file, com requisições condicionais e Range).
+
+    - sem compactação: o arquivo como está;
+    - gzip: se o cliente aceita gzip (Accept-Encoding), o arquivo compactado com
+      Content-Encoding: gzip (o navegador descompacta ao salvar); senão, o
+      conteúdo descompactado aos poucos (condicional, sem Range);
+    - zip: o próprio .zip; com descompactar=True, o TXT de dentro.
+    """
+    from flask import request, send_file
+
+    compressao = compressao_do_arquivo(caminho)
+    if compressao is None:
+        return send_file(caminho, as_attachment=True)
+
+    if compressao == 'gzip' and not descompactar and request.accept_encodings.quality('gzip') > 0:
+        resposta = send_file(caminho, as_attachment=True, download_name=nome_original(caminho), mimetype='text/plain')
+        resposta.headers['Content-Encoding'] = 'gzip'
+    elif compressao == 'zip' and not descompactar:
+        resposta = send_file(caminho, as_attachment=True)
+    else:
+        estado = os.stat(caminho)
+        resposta = send_file(
+            abrir_para_leitura(caminho), as_attachment=True, download_name=nome_original(caminho),
+            mimetype='text/plain', etag=f'{estado.st_mtime}-{estado.st_size}-descompactado',
+            last_modified=estado.st_mtime
+        )
+    resposta.vary.add('Accept-Encoding')
+    return resposta
@@ -0,0 +1,259 @@
+"""
+Cache dos registros ECAD montados, por fonograma e versão do layout
+
+Os registros OBM1/OBM2/OBM4 e FON1/FON2/FON3 de um fonograma só dependem dos
+dados dele e dos titulares; a única parte do arquivo que muda de um envio para
+outro é a data de geração no FON1. O cache (CacheRegistroEcad) guarda o bloco
+OBM e o bloco FON de cada fonograma, com a data do FON1 em branco, e as
+contagens usadas no trailer. Gerar um envio vira juntar os blocos em ordem de
+id, preencher a data e somar as contagens; só os fonogramas sem bloco (ou com
+bloco de outra versão do layout) são montados, e entram no cache.
+
+Invalidação: toda gravação em fonogramas (colunas usadas nos registros) ou em
+autores/editoras/intérpretes apaga o bloco do fonograma, pelo evento after_flush
+da sessão (registrar_invalidacao_cache, chamado em app.py). Gravações em massa
+fora do ORM (upsert_service, carga_inicial, lote_service) chamam
+invalidar_cache_registros. Mudanças nas regras de montagem do gerador_ecad
+devem trocar layout_ecad.VERSAO_LAYOUT, o que descarta os blocos antigos.
+
+ECAD_CACHE_REGISTROS=0 desativa o cache (geração direta, como antes).
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from sqlalchemy import delete, event, inspect, select
+
+from models import db, Fonograma, Autor, Editora, Interprete, CacheRegistroEcad
+from .layout_ecad import REGISTROS, VERSAO_LAYOUT
+
+# 1 = ativo, 0 = desativado
+ECAD_CACHE_REGISTROS = int(os.environ.get('ECAD_CACHE_REGISTROS', '1'))
+# Fonogramas por consulta/gravação do cache
+LOTE_CACHE_REGISTROS = 500
+
+# Data do FON1 guardada no cache (substituída pela data do arquivo)
+_CAMPO_DATA = next(c for c in REGISTROS['FON1'].campos if c.nome == 'data_arquivo')
+DATA_ARQUIVO_CACHE = ' ' * _CAMPO_DATA.tamanho
+
+MODELOS_TITULARES = (Autor, Editora, Interprete)
+
+
+def cache_registros_ativo() -> bool:
+    return ECAD_CACHE_REGISTROS > 0
+
+
+def _em_lotes(ids: List[int]) -> Iterator[List[int]]:
+    for inicio in range(0, len(ids), LOTE_CACHE_REGISTROS):
+        yield ids[inicio:inicio + LOTE_CACHE_REGISTROS]
+
+
+# ==================== INVALIDAÇÃO ====================
+
+def invalidar_cache_registros(fonograma_ids: Iterable[int]):
+    """Apaga os blocos dos fonogramas (gravações fora do ORM). Não faz commit"""
+    ids = sorted(set(int(i) for i in fonograma_ids if i is not None))
+    tabela = CacheRegistroEcad.__table__
+    for lote in _em_lotes(ids):
+        db.session.execute(delete(tabela).where(tabela.c.fonograma_id.in_(lote)))
+
+
+def _fonogramas_alterados(session) -> set:
+    """Fonogramas cujos registros ECAD mudam com o que está sendo gravado no flush"""
+    from .gerador_ecad import COLUNAS_FONOGRAMA_ECAD
+
+    ids = set()
+    for obj in session.dirty:
+        if isinstance(obj, Fonograma):
+            # Só colunas que vão aos registros (status do envio/retorno não invalida)
+            if any(c in inspect(obj).committed_state for c in COLUNAS_FONOGRAMA_ECAD):
+                ids.add(obj.id)
+        elif isinstance(obj, MODELOS_TITULARES):
+            ids.add(obj.fonograma_id)
+            # Titular trocado de fonograma: o anterior também muda
+            ids.update(inspect(obj).attrs.fonograma_id.history.deleted or ())
+    for obj in session.new:
+        if isinstance(obj, MODELOS_TITULARES):
+            ids.add(obj.fonograma_id)
+    for obj in session.deleted:
+        if isinstance(obj, MODELOS_TITULARES):
+            ids.add(obj.fonograma_id)
+    ids.discard(None)
+    return ids
+
+
+def _invalidar_no_flush(session, flush_context):
+    ids = _fonogramas_alterados(session)
+    if not ids:
+        return
+    tabela = CacheRegistroEcad.__table__
+    conexao = session.connection()
+    for lote in _em_lotes(sorted(ids)):
+        conexao.execute(delete(tabela).where(tabela.c.fonograma_id.in_(lote)))
+
+
+def registrar_invalidacao_cache():
+    """Liga a invalidação do cache às gravações da sessão (db.session)"""
+    if not event.contains(db.session, 'after_flush', _invalidar_no_flush):
+        event.listen(db.session, 'after_flush', _invalidar_no_flush)
+
+
+# ==================== GERAÇÃO ====================
+
+def _gravar_blocos(blocos: List[Tuple[int, str, str, Dict]]):
+    """
+    Grava (ou substitui) os blocos no cache. Não faz commit. Em SQLite e
+    PostgreSQL é um upsert: dois envios montando o mesmo fonograma ao mesmo
+    tempo não conflitam na chave.
+    """
+    from .upsert_service import DIALETOS_UPSERT
+
+    if not blocos:
+        return
+    tabela = CacheRegistroEcad.__table__
+    agora = datetime.utcnow()
+    registros = [
+        {'fonograma_id': fonograma_id, 'versao_layout': VERSAO_LAYOUT, 'bloco_obm': obm, 'bloco_fon': fon,
+         'titulares': totais['titulares'], 'linhas': totais['linhas'], 'gerado_em': agora}
+        for fonograma_id, obm, fon, totais in blocos
+    ]
+
+    dialeto = db.session.get_bind().dialect.name
+    if dialeto not in DIALETOS_UPSERT:
+        db.session.execute(delete(tabela).where(tabela.c.fonograma_id.in_([b[0] for b in blocos])))
+        db.session.execute(tabela.insert(), registros)
+        return
+
+    if dialeto == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as insert_dialeto
+    else:
+        from sqlalchemy.dialects.sqlite import insert as insert_dialeto
+    instrucao = insert_dialeto(tabela)
+    instrucao = instrucao.on_conflict_do_update(
+        index_elements=[tabela.c.fonograma_id],
+        set_={c: instrucao.excluded[c] for c in registros[0] if c != 'fonograma_id'}
+    )
+    db.session.execute(instrucao, registros)
+
+
+def _carregar_para_cache(ids: List[int]):
+    """
+    Dados dos fonogramas a montar. No PostgreSQL as linhas ficam bloqueadas
+    (FOR SHARE) até o fim da transação: uma edição simultânea espera o bloco
+    ser gravado e o apaga em seguida, em vez de deixar no cache dados antigos.
+    """
+    from .gerador_ecad import _carregar_shard
+
+    if db.session.get_bind().dialect.name == 'postgresql':
+        db.session.execute(
+            select(Fonograma.id).where(Fonograma.id.in_(ids)).with_for_update(read=True)
+        ).all()
+    return _carregar_shard(ids)
+
+
+def _ids_sem_cache(ids: List[int]) -> List[int]:
+    tabela = CacheRegistroEcad.__table__
+    faltando = []
+    for lote in _em_lotes(ids):
+        em_cache = {i for (i,) in db.session.execute(
+            select(tabela.c.fonograma_id)
+            .where(tabela.c.fonograma_id.in_(lote), tabela.c.versao_layout == VERSAO_LAYOUT)
+        )}
+        faltando.extend(i for i in lote if i not in em_cache)
+    return faltando
+
+
+def _preencher_paralelo(ids: List[int], workers: int) -> int:
+    """Monta os blocos que faltam em vários processos, em fatias. Retorna quantos gravou"""
+    from .gerador_ecad import TAMANHO_SHARD_ECAD, _renderizar_blocos_shard
+
+    def gravar(futuro) -> int:
+        blocos = futuro.result()
+        for inicio in range(0, len(blocos), LOTE_CACHE_REGISTROS):
+            _gravar_blocos(blocos[inicio:inicio + LOTE_CACHE_REGISTROS])
+        return len(blocos)
+
+    gravados = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Até 2 fatias por processo em andamento, como em gerar_txt_ecad_paralelo
+            pendentes = deque()
+            for inicio in range(0, len(ids), TAMANHO_SHARD_ECAD):
+                linhas, titulares = _carregar_para_cache(ids[inicio:inicio + TAMANHO_SHARD_ECAD])
+                pendentes.append(executor.submit(_renderizar_blocos_shard, (linhas, titulares, DATA_ARQUIVO_CACHE)))
+                if len(pendentes) >= workers * 2:
+                    gravados += gravar(pendentes.popleft())
+            while pendentes:
+                gravados += gravar(pendentes.popleft())
+    except (BrokenProcessPool, OSError):
+        # Sem multiprocessamento: o que faltar é montado na geração, no processo atual
+        pass
+    return gravados
+
+
+def _preencher_data(bloco_fon: str, data_arquivo: str) -> str:
+    """Data do arquivo no FON1 (segunda linha do bloco)"""
+    posicao = bloco_fon.index('\n') + 1 + _CAMPO_DATA.inicio
+    return bloco_fon[:posicao] + data_arquivo + bloco_fon[posicao + _CAMPO_DATA.tamanho:]
+
+
+def _segmentos(ids: List[int], data_arquivo: str, estatisticas: Dict) -> Iterator[Tuple[str, str, Dict]]:
+    """Segmentos OBM/FON (como _renderizar_segmento) de cada lote de ids, a partir do cache"""
+    from .gerador_ecad import _fonogramas_do_shard, _renderizar_blocos
+
+    tabela = CacheRegistroEcad.__table__
+    for lote in _em_lotes(ids):
+        blocos = {
+            linha.fonograma_id: linha
+            for linha in db.session.execute(
+                select(tabela.c.fonograma_id, tabela.c.bloco_obm, tabela.c.bloco_fon, tabela.c.titulares, tabela.c.linhas)
+                .where(tabela.c.fonograma_id.in_(lote), tabela.c.versao_layout == VERSAO_LAYOUT)
+            )
+        }
+        faltando = [i for i in lote if i not in blocos]
+        if faltando:
+            novos = _renderizar_blocos(_fonogramas_do_shard(*_carregar_para_cache(faltando)), DATA_ARQUIVO_CACHE)
+            _gravar_blocos(novos)
+            estatisticas['renderizados'] += len(novos)
+            for fonograma_id, obm, fon, totais in novos:
+                blocos[fonograma_id] = (fonograma_id, obm, fon, totais['titulares'], totais['linhas'])
+
+        # Ids sem fonograma (excluídos) ficam de fora, como na geração direta
+        presentes = [blocos[i] for i in lote if i in blocos]
+        yield (
+            ''.join(b[1] for b in presentes),
+            ''.join(_preencher_data(b[2], data_arquivo) for b in presentes),
+            {
+                'obras': len(presentes),
+                'fonogramas': len(presentes),
+                'titulares': sum(b[3] for b in presentes),
+                'linhas': sum(b[4] for b in presentes),
+            },
+        )
+
+
+def gerar_txt_ecad_cache(fonograma_ids, output_path: str, workers: int = 1) -> Dict:
+    """
+    Mesmo arquivo de gerar_txt_ecad (byte a byte), juntando os blocos do cache.
+    Os fonogramas sem bloco são montados e gravados no cache (em vários processos
+    quando são pelo menos ECAD_PARALELO_MIN_FONOGRAMAS e workers > 1). Não faz
+    commit: os blocos novos vão para o banco com a transação do envio.
+    """
+    from .gerador_ecad import ECAD_PARALELO_MIN_FONOGRAMAS, _escrever_txt_ecad
+
+    ids = sorted(set(fonograma_ids))
+    estatisticas = {'renderizados': 0}
+    if workers > 1 and len(ids) >= ECAD_PARALELO_MIN_FONOGRAMAS:
+        faltando = _ids_sem_cache(ids)
+        if len(faltando) >= ECAD_PARALELO_MIN_FONOGRAMAS:
+            estatisticas['renderizados'] += _preencher_paralelo(faltando, workers)
+
+    now = datetime.now()
+    resultado = _escrever_txt_ecad(output_path, now, _segmentos(ids, now.strftime('%d%m%Y'), estatisticas))
+    resultado['registros_em_cache'] = resultado['total_fonogramas'] - estatisticas['renderizados']
+    resultado['registros_montados'] = estatisticas['renderizados']
+    return resultado
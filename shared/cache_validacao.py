@@ -0,0 +1,130 @@
+"""
+Cache em disco dos resultados de validação de uploads
+
+A chave é o SHA-256 do conteúdo do arquivo + a versão do validador
+(validador.VERSAO_VALIDADOR), então reenviar a mesma planilha reaproveita o
+resultado, e qualquer mudança de regra invalida o cache automaticamente.
+O tamanho total é limitado; ao passar do limite, as entradas usadas há mais
+tempo (mtime) são removidas primeiro.
+"""
+
+import os
+import pickle
+import hashlib
+import logging
+import tempfile
+from typing import Any, Optional
+
+from .validador import VERSAO_VALIDADOR
+
+logger = logging.getLogger(__name__)
+
+CACHE_VALIDACAO_DIR = os.environ.get(
+    'CACHE_VALIDACAO_DIR', os.path.join(os.getcwd(), 'instance', 'cache_validacao')
+)
+# Tamanho máximo do cache em MB (0 = desativado)
+CACHE_VALIDACAO_MAX_MB = int(os.environ.get('CACHE_VALIDACAO_MAX_MB', '256'))
+
+EXTENSAO_ENTRADA = '.cache'
+
+
+def cache_ativo() -> bool:
+    return CACHE_VALIDACAO_MAX_MB > 0
+
+
+def chave_cache(conteudo: bytes, tipo: str, extensao: str = '') -> str:
+    """
+    Chave do resultado: tipo do resultado + versão do validador + extensão
+    do arquivo (o mesmo conteúdo é lido de forma diferente como CSV ou XLSX)
+    + hash do conteúdo.
+    """
+    partes = f"{tipo}|{VERSAO_VALIDADOR}|{extensao.lower()}|".encode('utf-8')
+    return hashlib.sha256(partes + hashlib.sha256(conteudo).digest()).hexdigest()
+
+
+def _caminho(chave: str) -> str:
+    return os.path.join(CACHE_VALIDACAO_DIR, chave + EXTENSAO_ENTRADA)
+
+
+def obter(chave: str) -> Optional[Any]:
+    """Retorna o valor guardado (ou None) e marca a entrada como usada agora"""
+    if not cache_ativo():
+        return None
+
+    caminho = _caminho(chave)
+    try:
+        with open(caminho, 'rb') as f:
+            valor = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        # Entrada corrompida (gravação interrompida, versão antiga do Python...)
+        _remover(caminho)
+        return None
+
+    try:
+        os.utime(caminho)  # LRU: o mtime indica o último uso
+    except OSError:
+        pass
+    return valor
+
+
+def guardar(chave: str, valor: Any) -> bool:
+    """Grava o valor de forma atômica e aplica o limite de tamanho do cache"""
+    if not cache_ativo():
+        return False
+
+    try:
+        os.makedirs(CACHE_VALIDACAO_DIR, exist_ok=True)
+        fd, temporario = tempfile.mkstemp(dir=CACHE_VALIDACAO_DIR, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(valor, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, _caminho(chave))
+    except Exception as e:
+        logger.warning(f"Não foi possível gravar o cache de validação: {e}")
+        return False
+
+    aplicar_limite()
+    return True
+
+
+def aplicar_limite(limite_bytes: Optional[int] = None) -> int:
+    """Remove as entradas menos usadas até o cache caber no limite. Retorna quantas removeu"""
+    if limite_bytes is None:
+        limite_bytes = CACHE_VALIDACAO_MAX_MB * 1024 * 1024
+
+    entradas = []
+    try:
+        with os.scandir(CACHE_VALIDACAO_DIR) as it:
+            for entrada in it:
+                if entrada.name.endswith(EXTENSAO_ENTRADA):
+                    try:
+                        info = entrada.stat()
+                    except OSError:
+                        continue
+                    entradas.append((info.st_mtime, info.st_size, entrada.path))
+    except FileNotFoundError:
+        return 0
+
+    total = sum(tamanho for _, tamanho, _ in entradas)
+    removidas = 0
+    for _, tamanho, caminho in sorted(entradas):
+        if total <= limite_bytes:
+            break
+        if _remover(caminho):
+            total -= tamanho
+            removidas += 1
+    return removidas
+
+
+def limpar() -> int:
+    """Esvazia o cache"""
+    return aplicar_limite(0)
+
+
+def _remover(caminho: str) -> bool:
+    try:
+        os.remove(caminho)
+        return True
+    except OSError:
+        return False
@@ -0,0 +1,229 @@
+"""
+Carga inicial de catálogos (migração de uma associação nova)
+
+Grava DataFrames já validados direto com SQL, sem passar pelo ORM:
+  - PostgreSQL: COPY FROM STDIN para tabelas temporárias (staging) e merge
+    set-based: INSERT ... SELECT ... ON CONFLICT (isrc) em fonogramas e
+    DELETE ... USING + INSERT ... SELECT (ligando pelo ISRC) nos filhos;
+  - demais bancos (SQLite): upserts em massa (upsert_service) em lotes grandes.
+
+Os valores são os de _valores_criacao/_valores_filhos, os mesmos da importação
+normal. ISRC repetido no DataFrame: vale a última linha, como na gravação
+linha a linha.
+"""
+
+import time
+import tempfile
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from models import db, Fonograma, CacheRegistroEcad
+from .fonograma_service import (
+    normalizar_linha, _valores_criacao, _valores_filhos, RELACIONAMENTOS_FILHOS
+)
+from .processador import parse_composicoes_em_lote, listas_por_linha
+from .upsert_service import upsert_fonogramas, COLUNAS_PRESERVADAS
+
+# Fonogramas por upsert no caminho sem COPY
+TAMANHO_LOTE_CARGA = 5000
+# Acima disso o buffer do COPY vai para disco
+BUFFER_COPY_MAX_BYTES = 64 * 1024 * 1024
+
+
+def preparar_carga(df: pd.DataFrame, user_id: Optional[int] = None,
+                   composicoes: Optional[Dict[str, pd.DataFrame]] = None) -> Tuple[List[Dict], Dict[str, Dict], int]:
+    """
+    Valores de cada fonograma e dos seus filhos, um por ISRC.
+    Retorna (valores, filhos por ISRC, linhas com ISRC repetido).
+    """
+    if composicoes is None:
+        composicoes = parse_composicoes_em_lote(df)
+    listas = {tipo: listas_por_linha(tabela, len(df)) for tipo, tabela in composicoes.items()}
+
+    por_isrc = {}
+    repetidas = 0
+    for idx, registro in enumerate(df.to_dict('records')):
+        row = normalizar_linha(registro, listas, idx)
+        isrc = str(row.get('isrc', '')).strip()
+        if not isrc:
+            continue
+        if isrc in por_isrc:
+            repetidas += 1
+            del por_isrc[isrc]
+        valores = _valores_criacao(row)
+        if user_id:
+            valores['user_id'] = user_id
+        por_isrc[isrc] = (valores, _valores_filhos(row))
+
+    valores = [v for v, _ in por_isrc.values()]
+    filhos = {isrc: f for isrc, (_, f) in por_isrc.items()}
+    return valores, filhos, repetidas
+
+
+def carregar_dataframe(df: pd.DataFrame, user_id: Optional[int] = None,
+                       composicoes: Optional[Dict[str, pd.DataFrame]] = None) -> Dict:
+    """
+    Grava um DataFrame validado (uma transação). Precisa de contexto de aplicação.
+    Retorna salvos, atualizados, modo ('copy' ou 'upsert') e os tempos de
+    preparação e gravação em segundos.
+    """
+    inicio = time.perf_counter()
+    valores, filhos, repetidas = preparar_carga(df, user_id, composicoes)
+    tempo_preparacao = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    modo = 'copy' if db.session.get_bind().dialect.name == 'postgresql' else 'upsert'
+    try:
+        if not valores:
+            existentes = 0
+        elif modo == 'copy':
+            existentes = _carregar_postgresql(valores, filhos)
+        else:
+            existentes = _carregar_em_lotes(valores, filhos)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    tempo_gravacao = time.perf_counter() - inicio
+
+    return {
+        'salvos': len(valores) - existentes,
+        # Repetições do mesmo ISRC contam como atualização, como na gravação linha a linha
+        'atualizados': existentes + repetidas,
+        'modo': modo,
+        'tempo_preparacao': tempo_preparacao,
+        'tempo_gravacao': tempo_gravacao,
+    }
+
+
+def _carregar_em_lotes(valores: List[Dict], filhos: Dict[str, Dict]) -> int:
+    """Bancos sem COPY: upserts de TAMANHO_LOTE_CARGA fonogramas. Retorna quantos já existiam"""
+    existentes = 0
+    for inicio in range(0, len(valores), TAMANHO_LOTE_CARGA):
+        lote = valores[inicio:inicio + TAMANHO_LOTE_CARGA]
+        gravados = upsert_fonogramas(lote, {v['isrc']: filhos[v['isrc']] for v in lote})
+        existentes += sum(1 for _, criado in gravados.values() if not criado)
+    return existentes
+
+
+# ==================== POSTGRESQL ====================
+
+def _q(nome: str) -> str:
+    return '"' + nome.replace('"', '""') + '"'
+
+
+# Formato texto do COPY: \N é NULL; barra, tab e quebras de linha são escapados
+ESCAPES_COPY = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def _campo_copy(valor) -> str:
+    if valor is None:
+        return '\\N'
+    return str(valor).translate(ESCAPES_COPY)
+
+
+def _copiar(cursor, tabela: str, colunas: List[str], linhas):
+    """COPY FROM STDIN (formato texto, buffer em memória ou disco)"""
+    buffer = tempfile.SpooledTemporaryFile(max_size=BUFFER_COPY_MAX_BYTES, mode='w+', encoding='utf-8', newline='')
+    try:
+        for linha in linhas:
+            buffer.write('\t'.join(_campo_copy(v) for v in linha))
+            buffer.write('\n')
+        buffer.seek(0)
+
+        sql = f"COPY {tabela} ({', '.join(_q(c) for c in colunas)}) FROM STDIN"
+        if hasattr(cursor, 'copy_expert'):  # psycopg2
+            cursor.copy_expert(sql, buffer)
+        else:  # psycopg 3
+            with cursor.copy(sql) as copia:
+                while True:
+                    parte = buffer.read(1024 * 1024)
+                    if not parte:
+                        break
+                    copia.write(parte)
+    finally:
+        buffer.close()
+
+
+def _padroes_escalares(tabela, informadas) -> Dict:
+    """Defaults do modelo (ex.: status_ecad) que o ORM aplicaria às colunas não informadas"""
+    padroes = {}
+    for coluna in tabela.columns:
+        if coluna.name in informadas or coluna.primary_key or coluna.default is None:
+            continue
+        if coluna.default.is_scalar:
+            padroes[coluna.name] = coluna.default.arg
+    return padroes
+
+
+def _carregar_postgresql(valores: List[Dict], filhos: Dict[str, Dict]) -> int:
+    """Staging via COPY e merge set-based. Retorna quantos ISRCs já existiam"""
+    cursor = db.session.connection().connection.cursor()
+    agora = datetime.utcnow()
+    tabela = Fonograma.__table__
+
+    colunas = list(valores[0].keys())
+    lista = ', '.join(_q(c) for c in colunas)
+    cursor.execute(f"CREATE TEMP TABLE carga_fonogramas ON COMMIT DROP AS "
+                   f"SELECT {lista} FROM fonogramas WITH NO DATA")
+    _copiar(cursor, 'carga_fonogramas', colunas, ([v[c] for c in colunas] for v in valores))
+    cursor.execute("CREATE UNIQUE INDEX ON carga_fonogramas (isrc)")
+    cursor.execute("ANALYZE carga_fonogramas")
+
+    cursor.execute("SELECT count(*) FROM carga_fonogramas c JOIN fonogramas f ON f.isrc = c.isrc")
+    existentes = cursor.fetchone()[0]
+
+    # Defaults só na inserção; num ISRC existente ficam os valores atuais
+    padroes = _padroes_escalares(tabela, set(colunas) | {'created_at', 'updated_at'})
+    padroes.update(created_at=agora, updated_at=agora)
+    atualizar = [c for c in colunas if c not in COLUNAS_PRESERVADAS]
+    cursor.execute(
+        f"INSERT INTO fonogramas ({lista}, {', '.join(_q(c) for c in padroes)}) "
+        f"SELECT {lista}, {', '.join('%(' + c + ')s' for c in padroes)} FROM carga_fonogramas "
+        f"ON CONFLICT (isrc) DO UPDATE SET "
+        f"{', '.join(f'{_q(c)} = EXCLUDED.{_q(c)}' for c in atualizar)}, updated_at = EXCLUDED.updated_at",
+        padroes
+    )
+
+    # Registros ECAD em cache dos ISRCs regravados
+    cursor.execute(
+        f"DELETE FROM {CacheRegistroEcad.__tablename__} r USING fonogramas f, carga_fonogramas c "
+        f"WHERE r.fonograma_id = f.id AND f.isrc = c.isrc"
+    )
+
+    for relacionamento, modelo in RELACIONAMENTOS_FILHOS:
+        nome_tabela = modelo.__tablename__
+        cursor.execute(
+            f"DELETE FROM {nome_tabela} t USING fonogramas f, carga_fonogramas c "
+            f"WHERE t.fonograma_id = f.id AND f.isrc = c.isrc"
+        )
+        registros = [
+            (isrc, valores_filho)
+            for isrc, filhos_linha in filhos.items()
+            for valores_filho in filhos_linha[relacionamento]
+        ]
+        if not registros:
+            continue
+
+        colunas_filho = list(registros[0][1].keys())
+        lista_filho = ', '.join(_q(c) for c in colunas_filho)
+        staging = f"carga_{nome_tabela}"
+        cursor.execute(f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+                       f"SELECT {lista_filho} FROM {nome_tabela} WITH NO DATA")
+        cursor.execute(f"ALTER TABLE {staging} ADD COLUMN isrc VARCHAR, ADD COLUMN ordem INTEGER")
+        _copiar(cursor, staging, colunas_filho + ['isrc', 'ordem'], (
+            [valores_filho.get(c) for c in colunas_filho] + [isrc, ordem]
+            for ordem, (isrc, valores_filho) in enumerate(registros)
+        ))
+        # ORDER BY mantém a ordem dos titulares de cada fonograma nos ids gerados
+        cursor.execute(
+            f"INSERT INTO {nome_tabela} (fonograma_id, {lista_filho}, created_at) "
+            f"SELECT f.id, {', '.join('c.' + _q(c) for c in colunas_filho)}, %(agora)s "
+            f"FROM {staging} c JOIN fonogramas f ON f.isrc = c.isrc ORDER BY c.ordem",
+            {'agora': agora}
+        )
+
+    cursor.close()
+    return existentes
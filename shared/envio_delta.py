@@ -0,0 +1,243 @@
+"""
+Envio delta ao ECAD
+
+Guarda, por fonograma, um hash (fingerprint) dos dados que foram ao ECAD no
+último envio (FingerprintEnvio) e o updated_at do fonograma naquele momento.
+O envio delta inclui só:
+  - NOVO: fonogramas nunca enviados;
+  - SEM_REGISTRO: enviados antes do controle de fingerprints;
+  - RECUSADO: recusados no retorno do último envio;
+  - ALTERADO: updated_at mais novo que o do último envio e fingerprint diferente.
+O updated_at é o filtro barato (em SQL); o fingerprint só é recalculado para os
+fonogramas tocados depois do envio, e descarta mudanças que não vão ao ECAD
+(ex.: status_ecad, cod_ecad gravado pelo retorno).
+
+Para não reenviar o catálogo já aceito antes desse controle, registre os
+fingerprints atuais dos aceitos com scripts/registrar_fingerprints_envio.py.
+"""
+
+import hashlib
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import or_, select, update, func
+
+from models import db, Fonograma, Autor, Editora, Interprete, FingerprintEnvio
+
+# Fonogramas por consulta/gravação no banco
+LOTE_FINGERPRINTS_ENVIO = 500
+
+SEPARADOR_CAMPOS = '\x1f'
+SEPARADOR_REGISTROS = '\x1e'
+
+# Motivos de inclusão no envio delta
+MOTIVO_NOVO = 'NOVO'
+MOTIVO_SEM_REGISTRO = 'SEM_REGISTRO'
+MOTIVO_RECUSADO = 'RECUSADO'
+MOTIVO_ALTERADO = 'ALTERADO'
+# Motivos de fora do envio delta
+MOTIVO_SEM_ALTERACAO = 'SEM_ALTERACAO'
+MOTIVO_AGUARDANDO_RETORNO = 'AGUARDANDO_RETORNO'
+
+DESCRICAO_MOTIVOS = {
+    MOTIVO_NOVO: 'Nunca enviado ao ECAD',
+    MOTIVO_SEM_REGISTRO: 'Enviado antes do controle de envio delta (sem fingerprint)',
+    MOTIVO_RECUSADO: 'Recusado no retorno do último envio',
+    MOTIVO_ALTERADO: 'Alterado depois do último envio',
+    MOTIVO_SEM_ALTERACAO: 'Sem alteração desde o último envio aceito',
+    MOTIVO_AGUARDANDO_RETORNO: 'Enviado sem alteração, aguardando retorno',
+}
+
+# Colunas do fonograma que não vão ao ECAD (controle do sistema e do próprio envio)
+COLUNAS_CONTROLE = frozenset({
+    'id', 'user_id', 'status_ecad', 'data_ultimo_envio', 'tentativas_envio',
+    'ultimo_protocolo_ecad', 'cod_ecad', 'created_at', 'updated_at',
+})
+COLUNAS_CONTROLE_FILHOS = frozenset({'id', 'fonograma_id', 'created_at'})
+
+COLUNAS_FINGERPRINT = [c.name for c in Fonograma.__table__.columns if c.name not in COLUNAS_CONTROLE]
+# Titulares enviados ao ECAD (mesmos relacionamentos de iterar_fonogramas_ecad)
+FILHOS_FINGERPRINT = [
+    (relacionamento, [c.name for c in modelo.__table__.columns if c.name not in COLUNAS_CONTROLE_FILHOS])
+    for relacionamento, modelo in (('autores_list', Autor), ('editoras_list', Editora), ('interpretes_list', Interprete))
+]
+
+
+def _texto(valor) -> str:
+    return '' if valor is None else str(valor)
+
+
+def fingerprint_fonograma(fono) -> str:
+    """SHA-1 dos dados do fonograma e dos titulares que vão ao ECAD"""
+    partes = [SEPARADOR_CAMPOS.join(_texto(getattr(fono, c)) for c in COLUNAS_FINGERPRINT)]
+    for relacionamento, colunas in FILHOS_FINGERPRINT:
+        partes.append(relacionamento)
+        partes.extend(SEPARADOR_CAMPOS.join(_texto(getattr(filho, c)) for c in colunas)
+                      for filho in getattr(fono, relacionamento))
+    return hashlib.sha1(SEPARADOR_REGISTROS.join(partes).encode('utf-8')).hexdigest()
+
+
+def _em_lotes(ids: List[int]) -> Iterable[List[int]]:
+    for inicio in range(0, len(ids), LOTE_FINGERPRINTS_ENVIO):
+        yield ids[inicio:inicio + LOTE_FINGERPRINTS_ENVIO]
+
+
+def selecionar_delta(limite_previa: Optional[int] = None) -> Dict:
+    """
+    Fonogramas do envio delta, com o motivo de cada um.
+
+    Args:
+        limite_previa: Máximo de fonogramas detalhados em 'fonogramas' (None: todos)
+
+    Returns:
+        Dict com ids (todos os incluídos, em ordem de id), fonogramas (prévia:
+        id, isrc, titulo, status_ecad, protocolo anterior, motivo e descrição),
+        por_motivo (incluídos) e ignorados (fora do delta), contados por motivo
+    """
+    from .gerador_ecad import iterar_fonogramas_ecad
+
+    fp = FingerprintEnvio
+    # Candidatos: sem fingerprint, recusados ou tocados depois do último envio
+    candidatos = db.session.execute(
+        select(Fonograma.id, Fonograma.isrc, Fonograma.titulo, Fonograma.status_ecad, Fonograma.ultimo_protocolo_ecad,
+               Fonograma.data_ultimo_envio, fp.fingerprint, fp.status)
+        .outerjoin(fp, fp.fonograma_id == Fonograma.id)
+        .where(or_(fp.fonograma_id.is_(None), fp.status == MOTIVO_RECUSADO,
+                   fp.atualizado_em.is_(None), Fonograma.updated_at > fp.atualizado_em))
+        .order_by(Fonograma.id)
+    ).all()
+
+    # Os demais estão como no último envio: só contados
+    ignorados = {MOTIVO_SEM_ALTERACAO: 0, MOTIVO_AGUARDANDO_RETORNO: 0}
+    for status, quantidade in db.session.execute(
+        select(fp.status, func.count())
+        .join(Fonograma, Fonograma.id == fp.fonograma_id)
+        .where(fp.status != MOTIVO_RECUSADO, fp.atualizado_em.isnot(None), Fonograma.updated_at <= fp.atualizado_em)
+        .group_by(fp.status)
+    ):
+        ignorados[MOTIVO_AGUARDANDO_RETORNO if status == 'ENVIADO' else MOTIVO_SEM_ALTERACAO] += quantidade
+
+    motivos = {}
+    conferir = {}
+    for linha in candidatos:
+        if linha.fingerprint is None:
+            motivos[linha.id] = MOTIVO_NOVO if linha.data_ultimo_envio is None else MOTIVO_SEM_REGISTRO
+        elif linha.status == MOTIVO_RECUSADO:
+            motivos[linha.id] = MOTIVO_RECUSADO
+        else:
+            conferir[linha.id] = linha
+
+    # Tocados depois do envio: só entram se os dados enviados mudaram
+    for fono in iterar_fonogramas_ecad(list(conferir), LOTE_FINGERPRINTS_ENVIO):
+        linha = conferir[fono.id]
+        if fingerprint_fonograma(fono) != linha.fingerprint:
+            motivos[fono.id] = MOTIVO_ALTERADO
+        elif linha.status == 'ENVIADO':
+            ignorados[MOTIVO_AGUARDANDO_RETORNO] += 1
+        else:
+            ignorados[MOTIVO_SEM_ALTERACAO] += 1
+
+    por_motivo = {MOTIVO_NOVO: 0, MOTIVO_SEM_REGISTRO: 0, MOTIVO_ALTERADO: 0, MOTIVO_RECUSADO: 0}
+    fonogramas = []
+    for linha in candidatos:
+        motivo = motivos.get(linha.id)
+        if motivo is None:
+            continue
+        por_motivo[motivo] += 1
+        if limite_previa is None or len(fonogramas) < limite_previa:
+            fonogramas.append({
+                'id': linha.id,
+                'isrc': linha.isrc,
+                'titulo': linha.titulo,
+                'status_ecad': linha.status_ecad,
+                'protocolo_anterior': linha.ultimo_protocolo_ecad,
+                'motivo': motivo,
+                'descricao': DESCRICAO_MOTIVOS[motivo],
+            })
+
+    return {
+        'ids': [linha.id for linha in candidatos if linha.id in motivos],
+        'total': len(motivos),
+        'fonogramas': fonogramas,
+        'por_motivo': por_motivo,
+        'ignorados': ignorados,
+    }
+
+
+def registrar_envio(envio_id: Optional[int], fonograma_ids: List[int], status: str = 'ENVIADO',
+                    atualizado_em: Optional[datetime] = None) -> int:
+    """
+    Grava o fingerprint atual dos fonogramas de um envio (status ENVIADO; ACEITO
+    no registro inicial do catálogo já aceito, sem envio).
+    atualizado_em: updated_at que a mesma transação gravou nos fonogramas (o
+    envio grava o seu 'agora'); sem ele, depois do commit chame
+    sincronizar_atualizado_em. Não faz commit.
+    """
+    from .gerador_ecad import iterar_fonogramas_ecad
+
+    agora = datetime.utcnow()
+    existentes = {}
+    ids = sorted(set(int(i) for i in fonograma_ids))
+    for lote in _em_lotes(ids):
+        existentes.update((r.fonograma_id, r) for r in FingerprintEnvio.query.filter(FingerprintEnvio.fonograma_id.in_(lote)))
+
+    total = 0
+    for fono in iterar_fonogramas_ecad(ids, LOTE_FINGERPRINTS_ENVIO):
+        registro = existentes.get(fono.id)
+        if registro is None:
+            registro = FingerprintEnvio(fonograma_id=fono.id)
+            db.session.add(registro)
+        registro.envio_id = envio_id
+        registro.fingerprint = fingerprint_fonograma(fono)
+        registro.status = status
+        registro.atualizado_em = atualizado_em  # None: preenchido por sincronizar_atualizado_em
+        registro.enviado_em = agora
+        registro.retorno_em = None
+        total += 1
+    return total
+
+
+def registrar_retornos(envio_id: int, status_por_fonograma: Dict[int, str],
+                       updated_at_por_fonograma: Dict[int, datetime]) -> List[int]:
+    """
+    Marca como ACEITO ou RECUSADO os fingerprints cujo último envio é envio_id
+    (um UPDATE por status em cada lote). updated_at_por_fonograma é o updated_at
+    dos fonogramas antes de o retorno alterá-los. Retorna os fonogramas sem
+    alteração desde o envio, cujo updated_at deve ser sincronizado depois do
+    commit. Não faz commit.
+    """
+    agora = datetime.utcnow()
+    sincronizar = []
+    for lote in _em_lotes(sorted(status_por_fonograma)):
+        por_status = {}
+        for fonograma_id, atualizado_em in db.session.execute(
+            select(FingerprintEnvio.fonograma_id, FingerprintEnvio.atualizado_em)
+            .where(FingerprintEnvio.envio_id == envio_id, FingerprintEnvio.fonograma_id.in_(lote))
+        ):
+            por_status.setdefault(status_por_fonograma[fonograma_id], []).append(fonograma_id)
+            updated_at = updated_at_por_fonograma.get(fonograma_id)
+            if atualizado_em is not None and updated_at is not None and updated_at <= atualizado_em:
+                sincronizar.append(fonograma_id)
+        for status, ids in por_status.items():
+            db.session.execute(
+                update(FingerprintEnvio).where(FingerprintEnvio.fonograma_id.in_(ids))
+                .values(status=status, retorno_em=agora)
+                .execution_options(synchronize_session=False)
+            )
+    return sincronizar
+
+
+def sincronizar_atualizado_em(fonograma_ids: Iterable[int]):
+    """
+    Copia o updated_at atual dos fonogramas para os fingerprints (depois do
+    commit de um retorno ou do registro inicial, que não alteram os dados
+    enviados) e faz commit.
+    """
+    ids = sorted(set(int(i) for i in fonograma_ids))
+    atual = select(Fonograma.updated_at).where(Fonograma.id == FingerprintEnvio.fonograma_id).scalar_subquery()
+    for lote in _em_lotes(ids):
+        db.session.execute(
+            update(FingerprintEnvio).where(FingerprintEnvio.fonograma_id.in_(lote)).values(atualizado_em=atual)
+            .execution_options(synchronize_session=False)
+        )
+    db.session.commit()
@@ -0,0 +1,115 @@
+"""
+Escrita de planilhas XLSX estilizadas em memória constante
+
+Usa o modo write_only do openpyxl: cada linha vai para o disco assim que é
+escrita, em vez de ficar num Workbook com um objeto Cell por célula. Os
+estilos são registrados uma vez por planilha como estilos nomeados; cada
+célula só referencia o estilo (sem Font/Fill/Border novos por célula).
+
+Uso:
+    estilos = [estilo('cabecalho', fundo='22164C', fonte=Font(bold=True, color='FFFFFF')),
+               estilo('dados', vertical='center')]
+    colunas = [Coluna('ISRC', 'cabecalho', 14), Coluna('Título', 'cabecalho', 25)]
+    escrever_planilha(caminho, 'Fonogramas', colunas, linhas, estilos, ['dados'])
+"""
+
+from copy import copy
+from typing import Iterable, List, NamedTuple, Optional, Sequence
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.styles.fonts import DEFAULT_FONT
+from openpyxl.utils import get_column_letter
+
+
+class Coluna(NamedTuple):
+    titulo: str
+    estilo_cabecalho: str
+    largura: Optional[float] = None
+
+
+def borda_fina(cor: Optional[str] = None) -> Border:
+    """Borda fina nos quatro lados (cor padrão: preta)"""
+    lado = Side(style='thin', color=cor)
+    return Border(left=lado, right=lado, top=lado, bottom=lado)
+
+
+def estilo(nome: str, fundo: Optional[str] = None, fonte: Optional[Font] = None,
+           horizontal: Optional[str] = None, vertical: Optional[str] = None,
+           quebrar_texto: bool = False, borda: Optional[Border] = None) -> NamedStyle:
+    """Estilo nomeado de célula. Sem fonte, usa a fonte padrão da planilha"""
+    return NamedStyle(
+        name=nome,
+        font=fonte or copy(DEFAULT_FONT),
+        fill=PatternFill(start_color=fundo, end_color=fundo, fill_type='solid') if fundo else None,
+        border=borda,
+        alignment=Alignment(horizontal=horizontal, vertical=vertical, wrap_text=quebrar_texto),
+    )
+
+
+def escrever_planilha(caminho: str, titulo: str, colunas: Sequence[Coluna], linhas: Iterable[Sequence],
+                      estilos: Sequence[NamedStyle], estilos_dados: Sequence[str],
+                      altura_cabecalho: Optional[float] = None, altura_dados: Optional[float] = None,
+                      congelar: Optional[str] = None, filtro: bool = False) -> int:
+    """
+    Escreve cabeçalho e linhas numa planilha nova e salva em caminho.
+
+    Args:
+        colunas: Título, estilo do cabeçalho e largura de cada coluna
+        linhas: Valores de cada linha (pode ser um gerador; é consumido uma vez)
+        estilos: Estilos nomeados usados pelas colunas e pelas linhas
+        estilos_dados: Estilo das linhas de dados, alternado linha a linha
+            (ex.: ['dados_cinza', 'dados_branco'] para linhas zebradas)
+        congelar: Célula do freeze_panes (ex.: 'B2')
+        filtro: Autofiltro no cabeçalho (só com pelo menos uma linha de dados)
+
+    Returns:
+        Quantidade de linhas de dados escritas
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(titulo)
+
+    # Estilo de cada nome resolvido uma vez; as células só copiam o índice
+    for estilo_nomeado in estilos:
+        wb.add_named_style(estilo_nomeado)
+    referencias = {}
+    for nome in {c.estilo_cabecalho for c in colunas} | set(estilos_dados):
+        referencia = WriteOnlyCell(ws)
+        referencia.style = nome
+        referencias[nome] = referencia._style
+
+    # Larguras, painéis congelados e alturas precisam estar definidos antes da primeira linha
+    for idx, coluna in enumerate(colunas, 1):
+        if coluna.largura is not None:
+            ws.column_dimensions[get_column_letter(idx)].width = coluna.largura
+    if congelar:
+        ws.freeze_panes = congelar
+    if altura_cabecalho is not None:
+        ws.row_dimensions[1].height = altura_cabecalho
+
+    ws.append([_celula(ws, c.titulo, referencias[c.estilo_cabecalho]) for c in colunas])
+
+    estilos_linha = [referencias[nome] for nome in estilos_dados]
+    total = 0
+    for total, valores in enumerate(linhas, 1):
+        linha_planilha = total + 1
+        if altura_dados is not None:
+            ws.row_dimensions[linha_planilha].height = altura_dados
+        referencia = estilos_linha[total % len(estilos_linha) - 1]
+        ws.append([_celula(ws, valor, referencia) for valor in valores])
+        if altura_dados is not None:
+            # Linha já escrita: a dimensão não precisa ficar em memória
+            del ws.row_dimensions[linha_planilha]
+
+    if filtro and total:
+        ws.auto_filter.ref = f"A1:{get_column_letter(len(colunas))}{total + 1}"
+
+    wb.save(caminho)
+    return total
+
+
+def _celula(ws, valor, referencia) -> WriteOnlyCell:
+    celula = WriteOnlyCell(ws, valor)
+    celula._style = copy(referencia)
+    return celula
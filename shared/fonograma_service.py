@@ -3,10 +3,15 @@ Serviço para operações CRUD de fonogramas
 """
 
 import pandas as pd
+from datetime import datetime
 from models import db, Fonograma, Autor, Editora, Interprete, Musico, Documento
-from .processador import parse_autores, parse_interpretes, parse_musicos, parse_editoras, parse_documentos
+from .processador import (
+    parse_autores, parse_interpretes, parse_musicos, parse_editoras, parse_documentos,
+    parse_composicoes_em_lote, listas_por_linha
+)
 from .validador import limpar_documento
-from typing import Dict
+from .cache_registros_ecad import invalidar_cache_registros
+from typing import Dict, List
 
 
 def safe_str(value, default=''):
@@ -40,239 +45,556 @@ def safe_float(value, default=0.0):
         return default
 
 
-def criar_fonograma_do_dataframe(row: Dict) -> Fonograma:
-    """Cria um fonograma a partir de uma linha do DataFrame"""
-    fonograma = Fonograma(
-        isrc=safe_str(row.get('isrc')),
-        titulo=safe_str(row.get('titulo')),
-        versao=safe_str(row.get('versao')) or None,
-        duracao=safe_str(row.get('duracao')),
-        ano_grav=safe_int(row.get('ano_grav')),
-        ano_lanc=safe_int(row.get('ano_lanc')) or safe_int(row.get('ano_grav')) or 2024,  # Garantir valor não-nulo
-        idioma=safe_str(row.get('idioma')) or None,
-        genero=safe_str(row.get('genero')),
-        cod_interno=safe_str(row.get('cod_interno')) or None,
-        titulo_obra=safe_str(row.get('titulo_obra')),
-        cod_obra=safe_str(row.get('cod_obra')) or None,
+def safe_bool(value, default=False):
+    """
+    Converte valor para bool de forma segura: 'False' (célula booleana lida
+    como texto) e zero são falsos; outros valores preenchidos são verdadeiros
+    """
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return default
+    if isinstance(value, str):
+        s = value.strip()
+        if not s:
+            return default
+        if s.lower() == 'false':
+            return False
+        return safe_float(s, default=1.0) != 0
+    return bool(value)
+
+
+def _valores_criacao(row: Dict) -> Dict:
+    """Colunas de um Fonograma novo a partir de uma linha do DataFrame"""
+    return {
+        'isrc': safe_str(row.get('isrc')),
+        'titulo': safe_str(row.get('titulo')),
+        'versao': safe_str(row.get('versao')) or None,
+        'duracao': safe_str(row.get('duracao')),
+        'ano_grav': safe_int(row.get('ano_grav')),
+        'ano_lanc': safe_int(row.get('ano_lanc')) or safe_int(row.get('ano_grav')) or 2024,  # Garantir valor não-nulo
+        'idioma': safe_str(row.get('idioma')) or None,
+        'genero': safe_str(row.get('genero')),
+        'cod_interno': safe_str(row.get('cod_interno')) or None,
+        'titulo_obra': safe_str(row.get('titulo_obra')),
+        'cod_obra': safe_str(row.get('cod_obra')) or None,
         # Novos campos
-        pais_origem=safe_str(row.get('pais_origem')) or None,
-        paises_adicionais=safe_str(row.get('paises_adicionais')) or None,
-        flag_nacional=safe_str(row.get('flag_nacional')) or None,
-        classificacao_trilha=safe_str(row.get('classificacao_trilha')) or None,
-        tipo_arranjo=safe_str(row.get('tipo_arranjo')) or None,
-        subdivisao_estrangeiro=safe_str(row.get('subdivisao_estrangeiro')) or None,
-        publicacao_simultanea=bool(row.get('publicacao_simultanea')) if row.get('publicacao_simultanea') else False,
+        'pais_origem': safe_str(row.get('pais_origem')) or None,
+        'paises_adicionais': safe_str(row.get('paises_adicionais')) or None,
+        'flag_nacional': safe_str(row.get('flag_nacional')) or None,
+        'classificacao_trilha': safe_str(row.get('classificacao_trilha')) or None,
+        'tipo_arranjo': safe_str(row.get('tipo_arranjo')) or None,
+        'subdivisao_estrangeiro': safe_str(row.get('subdivisao_estrangeiro')) or None,
+        'publicacao_simultanea': safe_bool(row.get('publicacao_simultanea')),
         
-        prod_nome=safe_str(row.get('prod_nome')),
-        prod_doc=limpar_documento(safe_str(row.get('prod_doc'))),
-        prod_fantasia=safe_str(row.get('prod_fantasia')) or None,
-        prod_endereco=safe_str(row.get('prod_endereco')) or None,
-        prod_perc=safe_float(row.get('prod_perc')),
-        prod_assoc=safe_str(row.get('prod_assoc')) or None,
-        prod_data_ini=safe_str(row.get('prod_data_ini')) or None,
-        tipo_lanc=safe_str(row.get('tipo_lanc')) or None,
-        album=safe_str(row.get('album')) or None,
-        faixa=safe_int(row.get('faixa')),
-        selo=safe_str(row.get('selo')) or None,
-        formato=safe_str(row.get('formato')) or None,
-        pais=safe_str(row.get('pais')) or None,
-        data_lanc=safe_str(row.get('data_lanc')) or None,
-        assoc_gestao=safe_str(row.get('assoc_gestao')) or None,
-        data_cad=safe_str(row.get('data_cad')) or None,
-        situacao=safe_str(row.get('situacao')) or 'ATIVO',
-        obs_juridicas=safe_str(row.get('obs_juridicas')) or None,
-        historico=safe_str(row.get('historico')) or None,
-        territorio=safe_str(row.get('territorio')) or None,
-        tipos_exec=safe_str(row.get('tipos_exec')) or None,
-        prioridade=safe_str(row.get('prioridade')) or None,
-        cod_ecad=safe_str(row.get('cod_ecad')) or None,
-    )
-    
-    # Adiciona autores
+        'prod_nome': safe_str(row.get('prod_nome')),
+        'prod_doc': limpar_documento(safe_str(row.get('prod_doc'))),
+        'prod_fantasia': safe_str(row.get('prod_fantasia')) or None,
+        'prod_endereco': safe_str(row.get('prod_endereco')) or None,
+        'prod_perc': safe_float(row.get('prod_perc')),
+        'prod_assoc': safe_str(row.get('prod_assoc')) or None,
+        'prod_data_ini': safe_str(row.get('prod_data_ini')) or None,
+        'tipo_lanc': safe_str(row.get('tipo_lanc')) or None,
+        'album': safe_str(row.get('album')) or None,
+        'faixa': safe_int(row.get('faixa')),
+        'selo': safe_str(row.get('selo')) or None,
+        'formato': safe_str(row.get('formato')) or None,
+        'pais': safe_str(row.get('pais')) or None,
+        'data_lanc': safe_str(row.get('data_lanc')) or None,
+        'assoc_gestao': safe_str(row.get('assoc_gestao')) or None,
+        'data_cad': safe_str(row.get('data_cad')) or None,
+        'situacao': safe_str(row.get('situacao')) or 'ATIVO',
+        'obs_juridicas': safe_str(row.get('obs_juridicas')) or None,
+        'historico': safe_str(row.get('historico')) or None,
+        'territorio': safe_str(row.get('territorio')) or None,
+        'tipos_exec': safe_str(row.get('tipos_exec')) or None,
+        'prioridade': safe_str(row.get('prioridade')) or None,
+        'cod_ecad': safe_str(row.get('cod_ecad')) or None,
+    }
+
+
+# Relacionamento do Fonograma -> modelo dos registros filhos
+RELACIONAMENTOS_FILHOS = (
+    ('autores_list', Autor),
+    ('editoras_list', Editora),
+    ('interpretes_list', Interprete),
+    ('musicos_list', Musico),
+    ('documentos_list', Documento),
+)
+
+
+def _valores_filhos(row: Dict) -> Dict[str, List[Dict]]:
+    """Colunas dos autores, editoras, intérpretes, músicos e documentos da linha, por relacionamento"""
     autores_input = row.get('autores')
     if isinstance(autores_input, list):
         autores_data = autores_input
     else:
         autores_data = parse_autores(autores_input or '')
-    for autor_data in autores_data:
-        autor = Autor(
-            nome=autor_data['nome'],
-            cpf=autor_data['cpf'],
-            funcao=autor_data['funcao'],
-            percentual=autor_data['percentual'],
-            cae_ipi=autor_data.get('cae_ipi') or None,
-            data_nascimento=autor_data.get('data_nascimento') or None,
-            nacionalidade=autor_data.get('nacionalidade') or None
-        )
-        fonograma.autores_list.append(autor)
+    autores = [{
+        'nome': autor_data['nome'],
+        'cpf': autor_data['cpf'],
+        'funcao': autor_data['funcao'],
+        'percentual': autor_data['percentual'],
+        'cae_ipi': autor_data.get('cae_ipi') or None,
+        'data_nascimento': autor_data.get('data_nascimento') or None,
+        'nacionalidade': autor_data.get('nacionalidade') or None
+    } for autor_data in autores_data]
     
-    # Adiciona editoras
     editoras_input = row.get('editoras')
     if isinstance(editoras_input, list):
         editoras_data = editoras_input
     else:
         editoras_data = parse_editoras(editoras_input or '')
-    for editora_data in editoras_data:
-        editora = Editora(
-            nome=editora_data['nome'],
-            cnpj=editora_data['cnpj'],
-            percentual=editora_data['percentual'],
-            nacionalidade=editora_data.get('nacionalidade') or None
-        )
-        fonograma.editoras_list.append(editora)
+    editoras = [{
+        'nome': editora_data['nome'],
+        'cnpj': editora_data['cnpj'],
+        'percentual': editora_data['percentual'],
+        'nacionalidade': editora_data.get('nacionalidade') or None
+    } for editora_data in editoras_data]
     
-    # Adiciona intérpretes
     interpretes_input = row.get('interpretes')
     if isinstance(interpretes_input, list):
         interpretes_data = interpretes_input
     else:
         interpretes_data = parse_interpretes(interpretes_input or '')
-    for interprete_data in interpretes_data:
-        interprete = Interprete(
-            nome=interprete_data['nome'],
-            doc=interprete_data['doc'],
-            categoria=interprete_data['categoria'],
-            percentual=interprete_data['percentual'],
-            associacao=interprete_data.get('associacao', '') or None,
-            cae_ipi=interprete_data.get('cae_ipi') or None,
-            data_nascimento=interprete_data.get('data_nascimento') or None,
-            nacionalidade=interprete_data.get('nacionalidade') or None
-        )
-        fonograma.interpretes_list.append(interprete)
+    interpretes = [{
+        'nome': interprete_data['nome'],
+        'doc': interprete_data['doc'],
+        'categoria': interprete_data['categoria'],
+        'percentual': interprete_data['percentual'],
+        'associacao': interprete_data.get('associacao', '') or None,
+        'cae_ipi': interprete_data.get('cae_ipi') or None,
+        'data_nascimento': interprete_data.get('data_nascimento') or None,
+        'nacionalidade': interprete_data.get('nacionalidade') or None
+    } for interprete_data in interpretes_data]
     
-    # Adiciona músicos
     musicos_input = row.get('musicos')
     if isinstance(musicos_input, list):
         musicos_data = musicos_input
     else:
         musicos_data = parse_musicos(musicos_input or '')
-    for musico_data in musicos_data:
-        musico = Musico(
-            nome=musico_data['nome'],
-            cpf=musico_data['cpf'],
-            instrumento=musico_data['instrumento'],
-            tipo=musico_data['tipo'],
-            percentual=musico_data['percentual']
-        )
-        fonograma.musicos_list.append(musico)
+    musicos = [{
+        'nome': musico_data['nome'],
+        'cpf': musico_data['cpf'],
+        'instrumento': musico_data['instrumento'],
+        'tipo': musico_data['tipo'],
+        'percentual': musico_data['percentual']
+    } for musico_data in musicos_data]
     
-    # Adiciona documentos
     documentos_input = row.get('documentos')
     if isinstance(documentos_input, list):
         documentos_data = documentos_input
     else:
         documentos_data = parse_documentos(documentos_input or '')
-    for documento_data in documentos_data:
-        documento = Documento(
-            tipo=documento_data['tipo'],
-            referencia=documento_data.get('referencia', ''),
-            data=documento_data.get('data', '')
-        )
-        fonograma.documentos_list.append(documento)
+    documentos = [{
+        'tipo': documento_data['tipo'],
+        'referencia': documento_data.get('referencia', ''),
+        'data': documento_data.get('data', '')
+    } for documento_data in documentos_data]
     
+    return {
+        'autores_list': autores,
+        'editoras_list': editoras,
+        'interpretes_list': interpretes,
+        'musicos_list': musicos,
+        'documentos_list': documentos,
+    }
+
+
+def _adicionar_filhos(fonograma: Fonograma, row: Dict):
+    filhos = _valores_filhos(row)
+    for relacionamento, modelo in RELACIONAMENTOS_FILHOS:
+        lista = getattr(fonograma, relacionamento)
+        for valores in filhos[relacionamento]:
+            lista.append(modelo(**valores))
+
+
+def criar_fonograma_do_dataframe(row: Dict) -> Fonograma:
+    """Cria um fonograma a partir de uma linha do DataFrame"""
+    fonograma = Fonograma(**_valores_criacao(row))
+    _adicionar_filhos(fonograma, row)
     return fonograma
 
 
-def salvar_fonogramas_do_dataframe(df, app_context, salvar_apenas_validos=True, user_id=None):
-    """Salva fonogramas do DataFrame no banco de dados"""
+def normalizar_linha(row_dict: Dict, listas: Dict[str, List], idx: int) -> Dict:
+    """
+    Linha do DataFrame pronta para _valores_criacao/_valores_filhos: NaN vira '',
+    textos sem espaços nas pontas e autores, editoras etc. vindos das tabelas em lote
+    (listas = {tipo: listas_por_linha(...)})
+    """
+    for key, val in row_dict.items():
+        if pd.isna(val):
+            row_dict[key] = ''
+        else:
+            row_dict[key] = str(val).strip() if not isinstance(val, (int, float)) else val
+    for tipo, lista in listas.items():
+        row_dict[tipo] = lista[idx]
+    return row_dict
+
+
+# Linhas gravadas por commit no modo em lote de salvar_fonogramas_do_dataframe
+TAMANHO_LOTE_SALVAMENTO = 500
+
+
+def salvar_fonogramas_do_dataframe(df, app_context, salvar_apenas_validos=True, user_id=None, composicoes=None,
+                                   incremental=False, em_lote=True, callback_progresso=None):
+    """
+    Salva fonogramas do DataFrame no banco de dados
+    
+    composicoes: tabelas de titulares de parse_composicoes_em_lote para este df
+    (se omitido, as colunas compostas são lidas aqui, uma vez para o df inteiro)
+    incremental: pula linhas idênticas às gravadas na última importação
+    (ver importacao_incremental)
+    em_lote: grava TAMANHO_LOTE_SALVAMENTO linhas por vez com INSERT ... ON CONFLICT
+    (ver _salvar_lote e upsert_service), com um commit por lote; com em_lote=False
+    cada linha tem sua consulta e seu commit
+    callback_progresso(progresso: Dict) é chamado a cada TAMANHO_LOTE_SALVAMENTO
+    linhas gravadas, com linhas_processadas, total, salvos e atualizados
+    """
     salvos = 0
     atualizados = 0
+    inalterados = 0
     erros = []
     
+    if composicoes is None:
+        composicoes = parse_composicoes_em_lote(df)
+    listas = {tipo: listas_por_linha(tabela, len(df)) for tipo, tabela in composicoes.items()}
+    
+    def notificar(processadas):
+        if callback_progresso:
+            callback_progresso({'linhas_processadas': processadas, 'total': len(df),
+                                'salvos': salvos, 'atualizados': atualizados})
+    
     with app_context:
+        marcar = sincronizar = None
+        if incremental:
+            from .importacao_incremental import preparar_salvamento, marcar_salvo, sincronizar_salvo_em
+            inalteradas, isrcs_df, fingerprints, contexto_incremental = preparar_salvamento(df)
+            marcar = lambda idx: marcar_salvo(contexto_incremental, isrcs_df[idx], fingerprints[idx])
+            sincronizar = lambda: sincronizar_salvo_em(contexto_incremental)
+        
+        lote = []
         for idx, (_, row) in enumerate(df.iterrows()):
-            try:
-                # Converter Series para dict e tratar valores NaN
-                row_dict = row.to_dict()
-                # Converter NaN para string vazia
-                for key, val in row_dict.items():
-                    if pd.isna(val):
-                        row_dict[key] = ''
+            if incremental and inalteradas[idx]:
+                inalterados += 1
+                continue
+            row_dict = normalizar_linha(row.to_dict(), listas, idx)
+            
+            isrc = str(row_dict.get('isrc', '')).strip()
+            if not isrc:
+                continue
+            
+            if not em_lote:
+                try:
+                    if _salvar_linha(row_dict, isrc, user_id):
+                        salvos += 1
                     else:
-                        row_dict[key] = str(val).strip() if not isinstance(val, (int, float)) else val
-                
-                isrc = str(row_dict.get('isrc', '')).strip()
-                if not isrc:
-                    continue
-                
-                # Verifica se já existe
-                fonograma_existente = Fonograma.query.filter_by(isrc=isrc).first()
-                
-                if fonograma_existente:
-                    # Atualiza existente
-                    fonograma = atualizar_fonograma_do_dataframe(fonograma_existente, row_dict)
-                    atualizados += 1
-                else:
-                    # Cria novo
-                    fonograma = criar_fonograma_do_dataframe(row_dict)
-                    # IMPORTANTE: Atribuir user_id para ownership
-                    if user_id:
-                        fonograma.user_id = user_id
-                    db.session.add(fonograma)
-                    salvos += 1
-                
-                db.session.commit()
-            except Exception as e:
-                db.session.rollback()
-                erros.append({
-                    'linha': idx + 2,
-                    'isrc': str(row_dict.get('isrc', '')),
-                    'erro': str(e)
-                })
+                        atualizados += 1
+                    if marcar:
+                        marcar(idx)
+                        sincronizar()
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    erros.append(_erro_salvamento(idx, row_dict, e))
+                if (idx + 1) % TAMANHO_LOTE_SALVAMENTO == 0:
+                    notificar(idx + 1)
+                continue
+            
+            lote.append((idx, row_dict, isrc))
+            if len(lote) >= TAMANHO_LOTE_SALVAMENTO:
+                resultado = _salvar_lote(lote, user_id, marcar, sincronizar)
+                salvos, atualizados = salvos + resultado['salvos'], atualizados + resultado['atualizados']
+                erros.extend(resultado['erros'])
+                lote = []
+                notificar(idx + 1)
+        
+        if lote:
+            resultado = _salvar_lote(lote, user_id, marcar, sincronizar)
+            salvos, atualizados = salvos + resultado['salvos'], atualizados + resultado['atualizados']
+            erros.extend(resultado['erros'])
+        notificar(len(df))
     
     return {
         'salvos': salvos,
         'atualizados': atualizados,
+        'inalterados': inalterados,
         'erros': erros
     }
 
 
-def atualizar_fonograma_do_dataframe(fonograma: Fonograma, row: Dict) -> Fonograma:
-    """Atualiza um fonograma existente com dados do DataFrame"""
-    fonograma.titulo = row.get('titulo', '').strip()
-    fonograma.versao = row.get('versao', '').strip() or None
-    fonograma.duracao = row.get('duracao', '').strip()
-    fonograma.ano_grav = int(row.get('ano_grav', '')) if row.get('ano_grav', '').strip() else None
-    fonograma.ano_lanc = int(row.get('ano_lanc', '')) if row.get('ano_lanc', '').strip() else None
-    fonograma.idioma = row.get('idioma', '').strip() or None
-    fonograma.genero = row.get('genero', '').strip()
-    fonograma.cod_interno = row.get('cod_interno', '').strip() or None
-    fonograma.titulo_obra = row.get('titulo_obra', '').strip()
-    fonograma.cod_obra = row.get('cod_obra', '').strip() or None
-    fonograma.cod_obra = row.get('cod_obra', '').strip() or None
+def _erro_salvamento(idx: int, row_dict: Dict, erro: Exception) -> Dict:
+    return {
+        'linha': idx + 2,
+        'isrc': str(row_dict.get('isrc', '')),
+        'erro': str(erro)
+    }
+
+
+def _salvar_linha(row_dict: Dict, isrc: str, user_id=None) -> bool:
+    """Cria ou atualiza o fonograma da linha pelo ORM (sem commit). Retorna True se criou"""
+    # Verifica se já existe
+    fonograma_existente = Fonograma.query.filter_by(isrc=isrc).first()
     
-    # Novos campos
-    fonograma.pais_origem = row.get('pais_origem', '').strip() or None
-    fonograma.paises_adicionais = row.get('paises_adicionais', '').strip() or None
-    fonograma.flag_nacional = row.get('flag_nacional', '').strip() or None
-    fonograma.classificacao_trilha = row.get('classificacao_trilha', '').strip() or None
-    fonograma.tipo_arranjo = row.get('tipo_arranjo', '').strip() or None
-    fonograma.subdivisao_estrangeiro = row.get('subdivisao_estrangeiro', '').strip() or None
-    fonograma.publicacao_simultanea = bool(row.get('publicacao_simultanea')) if row.get('publicacao_simultanea') else False
+    if fonograma_existente:
+        # Atualiza existente
+        atualizar_fonograma_do_dataframe(fonograma_existente, row_dict)
+        return False
+    
+    # Cria novo
+    fonograma = criar_fonograma_do_dataframe(row_dict)
+    # IMPORTANTE: Atribuir user_id para ownership
+    if user_id:
+        fonograma.user_id = user_id
+    db.session.add(fonograma)
+    return True
+
+
+def _salvar_lote(lote: List, user_id=None, marcar=None, sincronizar=None) -> Dict:
+    """
+    Grava um lote de linhas (idx, row_dict, isrc) com um único commit.
     
-    fonograma.prod_nome = row.get('prod_nome', '').strip()
-    fonograma.prod_doc = limpar_documento(row.get('prod_doc', ''))
-    fonograma.prod_fantasia = row.get('prod_fantasia', '').strip() or None
-    fonograma.prod_endereco = row.get('prod_endereco', '').strip() or None
-    fonograma.prod_perc = float(str(row.get('prod_perc', '0')).replace('%', '').replace(',', '.')) if row.get('prod_perc', '').strip() else 0.0
-    fonograma.prod_assoc = row.get('prod_assoc', '').strip() or None
-    fonograma.prod_data_ini = row.get('prod_data_ini', '').strip() or None
-    fonograma.tipo_lanc = row.get('tipo_lanc', '').strip() or None
-    fonograma.album = row.get('album', '').strip() or None
-    fonograma.faixa = int(row.get('faixa', '')) if row.get('faixa', '').strip() else None
-    fonograma.selo = row.get('selo', '').strip() or None
-    fonograma.formato = row.get('formato', '').strip() or None
-    fonograma.pais = row.get('pais', '').strip() or None
-    fonograma.data_lanc = row.get('data_lanc', '').strip() or None
-    fonograma.assoc_gestao = row.get('assoc_gestao', '').strip() or None
-    fonograma.data_cad = row.get('data_cad', '').strip() or None
-    fonograma.situacao = row.get('situacao', '').strip() or 'ATIVO'
-    fonograma.obs_juridicas = row.get('obs_juridicas', '').strip() or None
-    fonograma.historico = row.get('historico', '').strip() or None
-    fonograma.territorio = row.get('territorio', '').strip() or None
-    fonograma.tipos_exec = row.get('tipos_exec', '').strip() or None
-    fonograma.prioridade = row.get('prioridade', '').strip() or None
-    fonograma.cod_ecad = row.get('cod_ecad', '').strip() or None
+    Cada passada é gravada com um upsert dentro de um savepoint (_gravar_em_massa).
+    Se a passada falhar no banco, ela é refeita linha a linha, cada linha no
+    seu próprio savepoint, e só as linhas com problema viram erro.
+    ISRCs repetidos no lote vão para passadas seguintes (a 1ª ocorrência cria,
+    as demais atualizam), como na gravação linha a linha.
+    marcar(idx) registra cada linha gravada e sincronizar() fecha esses
+    registros antes do commit (importacao_incremental).
+    """
+    resultado = {'salvos': 0, 'atualizados': 0, 'erros': []}
+    
+    passadas = []
+    ocorrencias = {}
+    for item in lote:
+        n = ocorrencias.get(item[2], 0)
+        ocorrencias[item[2]] = n + 1
+        if n == len(passadas):
+            passadas.append([])
+        passadas[n].append(item)
+    
+    for passada in passadas:
+        try:
+            with db.session.begin_nested():
+                salvos, atualizados, erros = _gravar_em_massa(passada, user_id, marcar)
+            resultado['salvos'] += salvos
+            resultado['atualizados'] += atualizados
+            resultado['erros'].extend(erros)
+        except Exception:
+            for idx, row_dict, isrc in passada:
+                try:
+                    with db.session.begin_nested():
+                        criado = _salvar_linha(row_dict, isrc, user_id)
+                        if marcar:
+                            marcar(idx)
+                    resultado['salvos' if criado else 'atualizados'] += 1
+                except Exception as e:
+                    resultado['erros'].append(_erro_salvamento(idx, row_dict, e))
+    
+    try:
+        if sincronizar:
+            sincronizar()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        erro = str(e)
+        return {
+            'salvos': 0,
+            'atualizados': 0,
+            'erros': [_erro_salvamento(idx, row_dict, erro) for idx, row_dict, _ in lote]
+        }
+    
+    resultado['erros'].sort(key=lambda e: e['linha'])
+    return resultado
+
+
+def _gravar_em_massa(passada: List, user_id=None, marcar=None):
+    """
+    Grava linhas com ISRCs distintos num único upsert (upsert_service), que
+    também troca os registros filhos. Não faz commit.
+    ISRCs novos usam _valores_criacao e os já cadastrados _valores_atualizacao,
+    como na gravação linha a linha (os padrões de criação, ex. ano_lanc 2024,
+    não sobrescrevem fonogramas existentes).
+    Linhas cujos valores não podem ser convertidos viram erro e ficam de fora.
+    Retorna (salvos, atualizados, erros).
+    """
+    from .upsert_service import upsert_fonogramas
+    
+    isrcs = [isrc for _, _, isrc in passada]
+    existentes = {
+        isrc for (isrc,) in db.session.query(Fonograma.isrc).filter(Fonograma.isrc.in_(isrcs))
+    }
+    
+    valores, filhos, gravadas, erros = [], {}, [], []
+    for idx, row_dict, isrc in passada:
+        try:
+            if isrc in existentes:
+                linha = {'isrc': isrc, **_valores_atualizacao(row_dict)}
+            else:
+                linha = _valores_criacao(row_dict)
+            # IMPORTANTE: Atribuir user_id para ownership (só na criação;
+            # o upsert nunca sobrescreve user_id de um fonograma existente)
+            linha['user_id'] = user_id
+            filhos[isrc] = _valores_filhos(row_dict)
+        except Exception as e:
+            erros.append(_erro_salvamento(idx, row_dict, e))
+            continue
+        valores.append(linha)
+        gravadas.append(idx)
+    
+    gravados = upsert_fonogramas(valores, filhos)
+    
+    if marcar:
+        for idx in gravadas:
+            marcar(idx)
+    
+    salvos = sum(1 for _, criado in gravados.values() if criado)
+    return salvos, len(gravados) - salvos, erros
+
+
+# Máximo de erros de validação guardados no resumo da importação em blocos
+# (a contagem continua completa; evita que arquivos ruins estourem a memória)
+LIMITE_ERROS_RETIDOS = 1000
+
+
+def importar_arquivo_em_blocos(caminho_arquivo, app_context, user_id=None, tamanho_bloco=None,
+                               salvar_apenas_validos=True, callback_progresso=None, incremental=True) -> Dict:
+    """
+    Importa um arquivo grande (CSV/XLSX) em modo streaming: cada bloco é lido,
+    validado e persistido antes do próximo, com memória constante.
+    
+    incremental: linhas iguais às da última importação reaproveitam a validação
+    e não são gravadas de novo (ver importacao_incremental).
+    
+    callback_progresso(progresso: Dict) é chamado ao fim de cada bloco com
+    bloco, linhas_processadas, validos, com_erro, salvos e atualizados.
+    """
+    from contextlib import nullcontext
+    from .processador import processar_csv_em_blocos, selecionar_composicoes, TAMANHO_BLOCO_PADRAO
+    
+    resumo = {
+        'sucesso': True,
+        'total': 0,
+        'validos': 0,
+        'com_erro': 0,
+        'salvos': 0,
+        'atualizados': 0,
+        'inalterados': 0,
+        'reaproveitadas': 0,
+        'total_erros': 0,
+        'erros': [],
+        'erros_salvamento': [],
+        'blocos': 0
+    }
+    
+    with app_context:
+        for bloco in processar_csv_em_blocos(caminho_arquivo, tamanho_bloco or TAMANHO_BLOCO_PADRAO,
+                                             incremental=incremental):
+            erros_bloco = bloco['erros']
+            if erros_bloco and erros_bloco[0]['linha'] == 0:
+                resumo['sucesso'] = False
+                resumo['erro'] = erros_bloco[0]['erro']
+                resumo['erros'].append(erros_bloco[0])
+                break
+            
+            resumo['blocos'] += 1
+            resumo['total'] += bloco['total_linhas']
+            resumo['validos'] += bloco['linhas_validas']
+            resumo['com_erro'] += bloco['linhas_com_erro']
+            resumo['reaproveitadas'] += bloco['linhas_reaproveitadas']
+            resumo['total_erros'] += len(erros_bloco)
+            espaco = LIMITE_ERROS_RETIDOS - len(resumo['erros'])
+            if espaco > 0:
+                resumo['erros'].extend(erros_bloco[:espaco])
+            
+            if salvar_apenas_validos:
+                df_salvar = bloco['df_validos']
+                composicoes = selecionar_composicoes(bloco['composicoes'], bloco['df'].index.isin(df_salvar.index))
+            else:
+                df_salvar = bloco['df']
+                composicoes = bloco['composicoes']
+            if not df_salvar.empty:
+                resultado = salvar_fonogramas_do_dataframe(df_salvar, nullcontext(), salvar_apenas_validos,
+                                                           user_id=user_id, composicoes=composicoes,
+                                                           incremental=incremental)
+                resumo['salvos'] += resultado['salvos']
+                resumo['atualizados'] += resultado['atualizados']
+                resumo['inalterados'] += resultado['inalterados']
+                # salvar_fonogramas_do_dataframe numera pela posição dentro do bloco
+                linhas = (df_salvar.index.to_numpy() + 2).tolist()
+                for erro in resultado['erros']:
+                    erro['linha'] = linhas[erro['linha'] - 2]
+                    resumo['erros_salvamento'].append(erro)
+            # Fingerprints da validação incremental do bloco (mesmo sem linhas a salvar)
+            db.session.commit()
+            
+            if callback_progresso:
+                callback_progresso({
+                    'bloco': bloco['numero'],
+                    'linhas_processadas': bloco['linhas_processadas'],
+                    'validos': resumo['validos'],
+                    'com_erro': resumo['com_erro'],
+                    'salvos': resumo['salvos'],
+                    'atualizados': resumo['atualizados'],
+                    'inalterados': resumo['inalterados']
+                })
+    
+    return resumo
+
+
+def _valores_atualizacao(row: Dict) -> Dict:
+    """Colunas de um Fonograma existente atualizadas a partir de uma linha do DataFrame"""
+    return {
+        'titulo': row.get('titulo', '').strip(),
+        'versao': row.get('versao', '').strip() or None,
+        'duracao': row.get('duracao', '').strip(),
+        'ano_grav': int(row.get('ano_grav', '')) if row.get('ano_grav', '').strip() else None,
+        'ano_lanc': int(row.get('ano_lanc', '')) if row.get('ano_lanc', '').strip() else None,
+        'idioma': row.get('idioma', '').strip() or None,
+        'genero': row.get('genero', '').strip(),
+        'cod_interno': row.get('cod_interno', '').strip() or None,
+        'titulo_obra': row.get('titulo_obra', '').strip(),
+        'cod_obra': row.get('cod_obra', '').strip() or None,
+
+        # Novos campos
+        'pais_origem': row.get('pais_origem', '').strip() or None,
+        'paises_adicionais': row.get('paises_adicionais', '').strip() or None,
+        'flag_nacional': row.get('flag_nacional', '').strip() or None,
+        'classificacao_trilha': row.get('classificacao_trilha', '').strip() or None,
+        'tipo_arranjo': row.get('tipo_arranjo', '').strip() or None,
+        'subdivisao_estrangeiro': row.get('subdivisao_estrangeiro', '').strip() or None,
+        'publicacao_simultanea': safe_bool(row.get('publicacao_simultanea')),
+
+        'prod_nome': row.get('prod_nome', '').strip(),
+        'prod_doc': limpar_documento(row.get('prod_doc', '')),
+        'prod_fantasia': row.get('prod_fantasia', '').strip() or None,
+        'prod_endereco': row.get('prod_endereco', '').strip() or None,
+        'prod_perc': float(str(row.get('prod_perc', '0')).replace('%', '').replace(',', '.')) if row.get('prod_perc', '').strip() else 0.0,
+        'prod_assoc': row.get('prod_assoc', '').strip() or None,
+        'prod_data_ini': row.get('prod_data_ini', '').strip() or None,
+        'tipo_lanc': row.get('tipo_lanc', '').strip() or None,
+        'album': row.get('album', '').strip() or None,
+        'faixa': int(row.get('faixa', '')) if row.get('faixa', '').strip() else None,
+        'selo': row.get('selo', '').strip() or None,
+        'formato': row.get('formato', '').strip() or None,
+        'pais': row.get('pais', '').strip() or None,
+        'data_lanc': row.get('data_lanc', '').strip() or None,
+        'assoc_gestao': row.get('assoc_gestao', '').strip() or None,
+        'data_cad': row.get('data_cad', '').strip() or None,
+        'situacao': row.get('situacao', '').strip() or 'ATIVO',
+        'obs_juridicas': row.get('obs_juridicas', '').strip() or None,
+        'historico': row.get('historico', '').strip() or None,
+        'territorio': row.get('territorio', '').strip() or None,
+        'tipos_exec': row.get('tipos_exec', '').strip() or None,
+        'prioridade': row.get('prioridade', '').strip() or None,
+        'cod_ecad': row.get('cod_ecad', '').strip() or None,
+    }
+
+
+def atualizar_fonograma_do_dataframe(fonograma: Fonograma, row: Dict) -> Fonograma:
+    """Atualiza um fonograma existente com dados do DataFrame"""
+    for campo, valor in _valores_atualizacao(row).items():
+        setattr(fonograma, campo, valor)
+    # Titulares são sempre regravados: conta como alteração mesmo sem mudança nas colunas
+    fonograma.updated_at = datetime.utcnow()
     
     # Remove relacionamentos antigos
     Autor.query.filter_by(fonograma_id=fonograma.id).delete()
@@ -280,84 +602,10 @@ def atualizar_fonograma_do_dataframe(fonograma: Fonograma, row: Dict) -> Fonogra
     Interprete.query.filter_by(fonograma_id=fonograma.id).delete()
     Musico.query.filter_by(fonograma_id=fonograma.id).delete()
     Documento.query.filter_by(fonograma_id=fonograma.id).delete()
+    # Exclusão em massa não passa pelo evento de invalidação do cache de registros ECAD
+    invalidar_cache_registros([fonograma.id])
     
     # Adiciona novos relacionamentos
-    autores_input = row.get('autores')
-    if isinstance(autores_input, list):
-        autores_data = autores_input
-    else:
-        autores_data = parse_autores(autores_input or '')
-    for autor_data in autores_data:
-        autor = Autor(
-            nome=autor_data['nome'],
-            cpf=autor_data['cpf'],
-            funcao=autor_data['funcao'],
-            percentual=autor_data['percentual'],
-            cae_ipi=autor_data.get('cae_ipi') or None,
-            data_nascimento=autor_data.get('data_nascimento') or None,
-            nacionalidade=autor_data.get('nacionalidade') or None
-        )
-        fonograma.autores_list.append(autor)
-    
-    editoras_input = row.get('editoras')
-    if isinstance(editoras_input, list):
-        editoras_data = editoras_input
-    else:
-        editoras_data = parse_editoras(editoras_input or '')
-    for editora_data in editoras_data:
-        editora = Editora(
-            nome=editora_data['nome'],
-            cnpj=editora_data['cnpj'],
-            percentual=editora_data['percentual'],
-            nacionalidade=editora_data.get('nacionalidade') or None
-        )
-        fonograma.editoras_list.append(editora)
-    
-    interpretes_input = row.get('interpretes')
-    if isinstance(interpretes_input, list):
-        interpretes_data = interpretes_input
-    else:
-        interpretes_data = parse_interpretes(interpretes_input or '')
-    for interprete_data in interpretes_data:
-        interprete = Interprete(
-            nome=interprete_data['nome'],
-            doc=interprete_data['doc'],
-            categoria=interprete_data['categoria'],
-            percentual=interprete_data['percentual'],
-            associacao=interprete_data.get('associacao', '') or None,
-            cae_ipi=interprete_data.get('cae_ipi') or None,
-            data_nascimento=interprete_data.get('data_nascimento') or None,
-            nacionalidade=interprete_data.get('nacionalidade') or None
-        )
-        fonograma.interpretes_list.append(interprete)
-    
-    musicos_input = row.get('musicos')
-    if isinstance(musicos_input, list):
-        musicos_data = musicos_input
-    else:
-        musicos_data = parse_musicos(musicos_input or '')
-    for musico_data in musicos_data:
-        musico = Musico(
-            nome=musico_data['nome'],
-            cpf=musico_data['cpf'],
-            instrumento=musico_data['instrumento'],
-            tipo=musico_data['tipo'],
-            percentual=musico_data['percentual']
-        )
-        fonograma.musicos_list.append(musico)
-    
-    documentos_input = row.get('documentos')
-    if isinstance(documentos_input, list):
-        documentos_data = documentos_input
-    else:
-        documentos_data = parse_documentos(documentos_input or '')
-    for documento_data in documentos_data:
-        documento = Documento(
-            tipo=documento_data['tipo'],
-            referencia=documento_data.get('referencia', ''),
-            data=documento_data.get('data', '')
-        )
-        fonograma.documentos_list.append(documento)
+    _adicionar_filhos(fonograma, row)
     
     return fonograma
-
@@ -4,265 +4,142 @@ Gera arquivos Excel e EXP no formato aceito pelo ECAD
 """
 
 import os
+import shutil
+import tempfile
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
-from typing import List, Dict
-import pandas as pd
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
+from openpyxl.styles import Font
 from models import Fonograma
+from .artefatos_envio import abrir_para_escrita
+from .escritor_xlsx import Coluna, borda_fina, escrever_planilha, estilo
+from .layout_ecad import (
+    ASSOCIACAO_SBACEM, FIM_SECAO, INICIO_SECAO, NOME_ARQUIVO_SBACEM, REGISTROS, REGISTROS_ARQUIVO, VERSAO_LAYOUT,
+    texto, numero, limpar_texto
+)
+
+
+# Colunas do Excel ECAD: (título, seção). A seção define a cor do cabeçalho
+COLUNAS_EXCEL_ECAD = [
+    # Identificação
+    ('ISRC', 'identificacao'), ('Título do Fonograma', 'identificacao'), ('Versão', 'identificacao'),
+    ('Duração', 'identificacao'), ('Ano de Gravação', 'identificacao'), ('Ano de Lançamento', 'identificacao'),
+    ('Idioma', 'identificacao'), ('Gênero', 'identificacao'), ('Nacional/Internacional', 'identificacao'),
+    ('Classificação Trilha', 'identificacao'),
+    # Obra Musical
+    ('Título da Obra', 'obra'), ('Código da Obra', 'obra'), ('Tipo de Arranjo', 'obra'),
+    # Autores (concatenados com ;)
+    ('Autores - Nome', 'autores'), ('Autores - CPF', 'autores'), ('Autores - Função', 'autores'),
+    ('Autores - Percentual', 'autores'),
+    # Intérpretes
+    ('Intérpretes - Nome', 'interpretes'), ('Intérpretes - Documento', 'interpretes'),
+    ('Intérpretes - Categoria', 'interpretes'),
+    # Produtor
+    ('Produtor - Nome', 'produtor'), ('Produtor - Documento', 'produtor'), ('Produtor - Nome Fantasia', 'produtor'),
+    ('Produtor - Endereço', 'produtor'), ('Produtor - Percentual', 'produtor'), ('Produtor - Associação', 'produtor'),
+    # Lançamento
+    ('Tipo de Lançamento', 'lancamento'), ('Álbum', 'lancamento'), ('Número da Faixa', 'lancamento'),
+    ('Selo', 'lancamento'), ('Formato', 'lancamento'), ('País', 'lancamento'), ('País de Origem', 'lancamento'),
+    ('Outros Países', 'lancamento'), ('Data de Lançamento', 'lancamento'),
+    # Administrativo
+    ('Associação de Gestão', 'admin'), ('Território', 'admin'), ('Tipos de Execução', 'admin'),
+]
+
+# Cores por seção (cores institucionais SBACEM)
+CORES_SECAO_EXCEL_ECAD = {
+    'identificacao': '22164C',  # Roxo
+    'obra': '3D2E6B',  # Roxo claro
+    'autores': 'EF234D',  # Vermelho
+    'interpretes': 'E75A7B',  # Vermelho claro
+    'produtor': 'D4A574',  # Bege escuro
+    'lancamento': 'E1C8B0',  # Bege
+    'admin': '4A4A4A',  # Cinza
+}
 
 
-def gerar_excel_ecad(fonogramas: List[Fonograma], output_path: str) -> Dict:
+def _largura_coluna_ecad(titulo: str) -> int:
+    if 'Nome' in titulo and 'Fantasia' not in titulo:
+        return 30
+    if 'Título' in titulo:
+        return 25
+    if 'Documento' in titulo or 'CPF' in titulo:
+        return 16
+    if 'ISRC' in titulo:
+        return 14
+    if 'Percentual' in titulo:
+        return 12
+    return 15
+
+
+def _linha_excel_ecad(fono) -> list:
+    """Valores de um fonograma na ordem de COLUNAS_EXCEL_ECAD"""
+    autores = fono.autores_list
+    interpretes = fono.interpretes_list
+    return [
+        fono.isrc, fono.titulo, fono.versao or '', fono.duracao, fono.ano_grav or '', fono.ano_lanc,
+        fono.idioma or '', fono.genero, fono.flag_nacional or '', fono.classificacao_trilha or '',
+        fono.titulo_obra, fono.cod_obra or '', fono.tipo_arranjo or '',
+        ';'.join(a.nome for a in autores), ';'.join(a.cpf for a in autores),
+        ';'.join(a.funcao for a in autores), ';'.join(str(a.percentual) for a in autores),
+        ';'.join(i.nome for i in interpretes), ';'.join(i.doc for i in interpretes),
+        ';'.join(i.categoria for i in interpretes),
+        fono.prod_nome, fono.prod_doc, fono.prod_fantasia or '', fono.prod_endereco or '', fono.prod_perc,
+        fono.prod_assoc or '',
+        fono.tipo_lanc or '', fono.album or '', fono.faixa or '', fono.selo or '', fono.formato or '',
+        fono.pais or '', fono.pais_origem or '', fono.paises_adicionais or '', fono.data_lanc or '',
+        fono.assoc_gestao or '', fono.territorio or '', fono.tipos_exec or '',
+    ]
+
+
+def gerar_excel_ecad(fonogramas: Iterable[Fonograma], output_path: str) -> Dict:
     """
     Gera arquivo Excel no formato ECAD
     
+    As linhas são escritas à medida que os fonogramas são lidos (escritor_xlsx),
+    então fonogramas pode ser um iterador (ex.: iterar_fonogramas_ecad).
+    
     Args:
-        fonogramas: Lista de objetos Fonograma
+        fonogramas: Objetos Fonograma
         output_path: Caminho do arquivo de saída
         
     Returns:
         Dict com informações do arquivo gerado
     """
-    
-    # Preparar dados
-    dados = []
-    for fono in fonogramas:
-        # Extrair autores
-        autores_nomes = []
-        autores_cpf = []
-        autores_funcao = []
-        autores_perc = []
-        
-        for autor in fono.autores_list:
-            autores_nomes.append(autor.nome)
-            autores_cpf.append(autor.cpf)
-            autores_funcao.append(autor.funcao)
-            autores_perc.append(str(autor.percentual))
-        
-        # Extrair intérpretes
-        interpretes_nomes = []
-        interpretes_doc = []
-        interpretes_cat = []
-        
-        for interp in fono.interpretes_list:
-            interpretes_nomes.append(interp.nome)
-            interpretes_doc.append(interp.doc)
-            interpretes_cat.append(interp.categoria)
-        
-        # Montar linha
-        linha = {
-            # Identificação
-            'ISRC': fono.isrc,
-            'Título do Fonograma': fono.titulo,
-            'Versão': fono.versao or '',
-            'Duração': fono.duracao,
-            'Ano de Gravação': fono.ano_grav or '',
-            'Ano de Lançamento': fono.ano_lanc,
-            'Idioma': fono.idioma or '',
-            'Gênero': fono.genero,
-            'Nacional/Internacional': fono.flag_nacional or '',
-            'Classificação Trilha': fono.classificacao_trilha or '',
-            
-            # Obra Musical
-            'Título da Obra': fono.titulo_obra,
-            'Código da Obra': fono.cod_obra or '',
-            'Tipo de Arranjo': fono.tipo_arranjo or '',
-            
-            # Autores (concatenados com ;)
-            'Autores - Nome': ';'.join(autores_nomes),
-            'Autores - CPF': ';'.join(autores_cpf),
-            'Autores - Função': ';'.join(autores_funcao),
-            'Autores - Percentual': ';'.join(autores_perc),
-            
-            # Intérpretes
-            'Intérpretes - Nome': ';'.join(interpretes_nomes),
-            'Intérpretes - Documento': ';'.join(interpretes_doc),
-            'Intérpretes - Categoria': ';'.join(interpretes_cat),
-            
-            # Produtor
-            'Produtor - Nome': fono.prod_nome,
-            'Produtor - Documento': fono.prod_doc,
-            'Produtor - Nome Fantasia': fono.prod_fantasia or '',
-            'Produtor - Endereço': fono.prod_endereco or '',
-            'Produtor - Percentual': fono.prod_perc,
-            'Produtor - Associação': fono.prod_assoc or '',
-            
-            # Lançamento
-            'Tipo de Lançamento': fono.tipo_lanc or '',
-            'Álbum': fono.album or '',
-            'Número da Faixa': fono.faixa or '',
-            'Selo': fono.selo or '',
-            'Formato': fono.formato or '',
-            'País': fono.pais or '',
-            'País de Origem': fono.pais_origem or '',
-            'Outros Países': fono.paises_adicionais or '',
-            'Data de Lançamento': fono.data_lanc or '',
-            
-            # Administrativo
-            'Associação de Gestão': fono.assoc_gestao or '',
-            'Território': fono.territorio or '',
-            'Tipos de Execução': fono.tipos_exec or '',
-        }
-        
-        dados.append(linha)
-    
-    # Criar DataFrame
-    df = pd.DataFrame(dados)
-    
-    # Criar arquivo Excel com formatação por seções
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Fonogramas ECAD"
-    
-    # Definir cores por seção (usando cores institucionais SBACEM)
-    cores_secao = {
-        'identificacao': PatternFill(start_color="22164C", end_color="22164C", fill_type="solid"),  # Roxo
-        'obra': PatternFill(start_color="3D2E6B", end_color="3D2E6B", fill_type="solid"),  # Roxo claro
-        'autores': PatternFill(start_color="EF234D", end_color="EF234D", fill_type="solid"),  # Vermelho
-        'interpretes': PatternFill(start_color="E75A7B", end_color="E75A7B", fill_type="solid"),  # Vermelho claro
-        'produtor': PatternFill(start_color="D4A574", end_color="D4A574", fill_type="solid"),  # Bege escuro
-        'lancamento': PatternFill(start_color="E1C8B0", end_color="E1C8B0", fill_type="solid"),  # Bege
-        'admin': PatternFill(start_color="4A4A4A", end_color="4A4A4A", fill_type="solid"),  # Cinza
-    }
-    
-    # Mapeamento de colunas para seções
-    mapa_secao = {
-        'ISRC': 'identificacao',
-        'Título do Fonograma': 'identificacao',
-        'Versão': 'identificacao',
-        'Duração': 'identificacao',
-        'Ano de Gravação': 'identificacao',
-        'Ano de Lançamento': 'identificacao',
-        'Idioma': 'identificacao',
-        'Gênero': 'identificacao',
-        'Nacional/Internacional': 'identificacao',
-        'Classificação Trilha': 'identificacao',
-        'Título da Obra': 'obra',
-        'Código da Obra': 'obra',
-        'Tipo de Arranjo': 'obra',
-        'Autores - Nome': 'autores',
-        'Autores - CPF': 'autores',
-        'Autores - Função': 'autores',
-        'Autores - Percentual': 'autores',
-        'Intérpretes - Nome': 'interpretes',
-        'Intérpretes - Documento': 'interpretes',
-        'Intérpretes - Categoria': 'interpretes',
-        'Produtor - Nome': 'produtor',
-        'Produtor - Documento': 'produtor',
-        'Produtor - Nome Fantasia': 'produtor',
-        'Produtor - Endereço': 'produtor',
-        'Produtor - Percentual': 'produtor',
-        'Produtor - Associação': 'produtor',
-        'Tipo de Lançamento': 'lancamento',
-        'Álbum': 'lancamento',
-        'Número da Faixa': 'lancamento',
-        'Selo': 'lancamento',
-        'Formato': 'lancamento',
-        'País': 'lancamento',
-        'País de Origem': 'lancamento',
-        'Outros Países': 'lancamento',
-        'Data de Lançamento': 'lancamento',
-        'Associação de Gestão': 'admin',
-        'Território': 'admin',
-        'Tipos de Execução': 'admin',
-    }
-    
-    header_font = Font(bold=True, color="FFFFFF", size=10)
-    header_font_dark = Font(bold=True, color="22164C", size=10)
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
+    borda = borda_fina()
+    # Fonte branca para cores escuras, escura para cores claras
+    estilos = [
+        estilo(f'cabecalho_{secao}', fundo=cor, horizontal='center', vertical='center', borda=borda,
+               fonte=Font(bold=True, color='22164C' if secao == 'lancamento' else 'FFFFFF', size=10))
+        for secao, cor in CORES_SECAO_EXCEL_ECAD.items()
+    ]
+    # Dados com cores alternadas, sem wrap para células compactas
+    estilos += [
+        estilo('dados_cinza', fundo='F8F8F8', vertical='center', borda=borda),
+        estilo('dados_branco', fundo='FFFFFF', vertical='center', borda=borda),
+    ]
+    colunas = [Coluna(titulo, f'cabecalho_{secao}', _largura_coluna_ecad(titulo))
+               for titulo, secao in COLUNAS_EXCEL_ECAD]
+
+    # Congelar primeira linha e primeira coluna (ISRC), cabeçalho compacto e filtros
+    total = escrever_planilha(
+        output_path, 'Fonogramas ECAD', colunas, (_linha_excel_ecad(f) for f in fonogramas),
+        estilos, ['dados_cinza', 'dados_branco'], altura_cabecalho=25, congelar='B2', filtro=True
     )
     
-    # Cores para dados alternados
-    row_fill_light = PatternFill(start_color="F8F8F8", end_color="F8F8F8", fill_type="solid")
-    row_fill_white = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
-    
-    # Escrever cabeçalhos com cores por seção
-    for col_idx, col_name in enumerate(df.columns, 1):
-        cell = ws.cell(row=1, column=col_idx, value=col_name)
-        
-        # Determinar seção e cor
-        secao = mapa_secao.get(col_name, 'admin')
-        cell.fill = cores_secao[secao]
-        
-        # Fonte branca para cores escuras, escura para cores claras
-        if secao in ['lancamento']:
-            cell.font = header_font_dark
-        else:
-            cell.font = header_font
-        
-        cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=False)
-        cell.border = border
-        
-        # Ajustar largura da coluna
-        if 'Nome' in col_name and 'Fantasia' not in col_name:
-            ws.column_dimensions[cell.column_letter].width = 30
-        elif 'Título' in col_name:
-            ws.column_dimensions[cell.column_letter].width = 25
-        elif 'Documento' in col_name or 'CPF' in col_name:
-            ws.column_dimensions[cell.column_letter].width = 16
-        elif 'ISRC' in col_name:
-            ws.column_dimensions[cell.column_letter].width = 14
-        elif 'Percentual' in col_name:
-            ws.column_dimensions[cell.column_letter].width = 12
-        else:
-            ws.column_dimensions[cell.column_letter].width = 15
-    
-    # Escrever dados com cores alternadas
-    for row_idx, row_data in enumerate(df.values, 2):
-        row_fill = row_fill_light if row_idx % 2 == 0 else row_fill_white
-        for col_idx, value in enumerate(row_data, 1):
-            cell = ws.cell(row=row_idx, column=col_idx, value=value)
-            cell.border = border
-            cell.fill = row_fill
-            cell.alignment = Alignment(vertical='center', wrap_text=False)  # Sem wrap para células compactas
-    
-    # Congelar primeira linha e primeira coluna (ISRC)
-    ws.freeze_panes = 'B2'
-    
-    # Altura da linha do cabeçalho (compacto)
-    ws.row_dimensions[1].height = 25
-    
-    # Adicionar filtros
-    ws.auto_filter.ref = ws.dimensions
-    
-    # Salvar
-    wb.save(output_path)
-    
     return {
         'arquivo': output_path,
-        'total_fonogramas': len(fonogramas),
+        'total_fonogramas': total,
         'formato': 'EXCEL',
         'tamanho_bytes': os.path.getsize(output_path) if os.path.exists(output_path) else 0
     }
 
 
-def _pad(value, width, fill=' '):
-    """Left-align and pad/truncate a value to exact fixed width."""
-    s = str(value or '')[:width]
-    return s.ljust(width, fill)
-
-
-def _zpad(value, width):
-    """Zero-pad a numeric value to exact fixed width."""
-    s = str(value or '0')
-    digits = ''.join(c for c in s if c.isdigit())
-    if not digits:
-        digits = '0'
-    return digits[:width].rjust(width, '0')
-
-
-def _clean_text(text):
-    """Remove accents and normalize text to uppercase for ECAD."""
-    if not text:
-        return ''
-    import unicodedata
-    nfkd = unicodedata.normalize('NFKD', str(text))
-    result = ''.join(c for c in nfkd if not unicodedata.combining(c))
-    return result.upper()
+# Preenchimento posicional e limpeza de texto (ver layout_ecad)
+_pad = texto
+_zpad = numero
+_clean_text = limpar_texto
 
 
 # Mapeamento de gêneros para códigos ECAD
@@ -318,116 +195,28 @@ def _format_duracao_seconds(duracao_str):
 
 
 def _build_obm1(fono, cod_interno_str):
-    """
-    Gera linha OBM1 (292 chars) - informação principal da obra.
-    
-    Mapa de posições verificado contra arquivo real aceito pelo ECAD:
-      [0:8]     record type     '0661OBM1'
-      [8:21]    cod_obra        13 chars zero-padded
-      [21:36]   cod_interno     15 chars zero-padded
-      [36:131]  título          95 chars space-padded
-      [131:134] flags           3 chars (SNN/SSN/NSN)
-      [134:158] zeros           24 chars
-      [158:169] spaces          11 chars
-      [169:175] duração         6 chars (segundos zero-padded)
-      [175:177] país            2 chars 'BR'
-      [177:187] gênero          10 chars (código + spaces)
-      [187:190] flags2          3 chars 'NNN'
-      [190:203] zeros           13 chars
-      [203:218] spaces          15 chars
-      [218:221] idioma          3 chars 'PTN'/'ENN'
-      [221:224] spaces          3 chars
-      [224:246] assoc gestão    22 chars
-      [246:268] assoc receb     22 chars
-      [268:271] 'IDN'           3 chars
-      [271:274] '000'           3 chars
-      [274:275] 'N'             1 char
-      [275:283] zeros           8 chars
-      [283:284] space           1 char
-      [284:292] zeros           8 chars
-    Total: 292 chars
-    """
-    titulo = _clean_text(fono.titulo_obra or fono.titulo or '')
+    """Gera linha OBM1 (292 chars) - informação principal da obra (layout_ecad.OBM1)."""
     idioma = (fono.idioma or 'PT').upper()[:3]
-    flag_nacional = 'S' if (fono.flag_nacional or '').upper() != 'INTERNACIONAL' else 'N'
-    flag_letra = 'N'
-    flag3 = 'N'
-    genero_code = _get_genero_code(fono.genero)
-    duracao = _format_duracao_seconds(fono.duracao)
-    idioma_ecad = 'PTN' if idioma.startswith('P') else 'ENN'
-
-    line = ''
-    line += '0661OBM1'                          # [0:8]     8       record type
-    line += _zpad(fono.cod_obra or '', 13)      # [8:21]    13      cod obra ECAD
-    line += _zpad(cod_interno_str, 15)          # [21:36]   15      cod interno
-    line += _pad(titulo, 95)                    # [36:131]  95      título
-    line += flag_nacional + flag_letra + flag3  # [131:134] 3       flags
-    line += '0' * 24                            # [134:158] 24      zeros
-    line += ' ' * 11                            # [158:169] 11      spaces
-    line += duracao                             # [169:175] 6       duração (seg)
-    line += 'BR'                                # [175:177] 2       país
-    line += _pad(genero_code, 10)               # [177:187] 10      gênero
-    line += 'NNN'                               # [187:190] 3       flags
-    line += '0' * 13                            # [190:203] 13      zeros
-    line += ' ' * 15                            # [203:218] 15      spaces
-    line += _pad(idioma_ecad, 3)                # [218:221] 3       idioma
-    line += ' ' * 3                             # [221:224] 3       spaces
-    line += _pad(ASSOCIACAO_PADRAO, 22)         # [224:246] 22      assoc gestão
-    line += _pad(ASSOCIACAO_PADRAO, 22)         # [246:268] 22      assoc recebedora
-    line += 'IDN'                               # [268:271] 3
-    line += '000'                               # [271:274] 3
-    line += 'N'                                 # [274:275] 1
-    line += '0' * 8                             # [275:283] 8       zeros
-    line += ' '                                 # [283:284] 1       space
-    line += '0' * 8                             # [284:292] 8       zeros
-
-    assert len(line) == 292, f"OBM1 len={len(line)}, expected 292"
-    return line
+    return REGISTROS['OBM1'].formatar({
+        'cod_obra': fono.cod_obra,
+        'cod_interno': cod_interno_str,
+        'titulo': fono.titulo_obra or fono.titulo,
+        'flag_nacional': 'S' if (fono.flag_nacional or '').upper() != 'INTERNACIONAL' else 'N',
+        'duracao': _format_duracao_seconds(fono.duracao),
+        'genero': _get_genero_code(fono.genero),
+        'idioma': 'PTN' if idioma.startswith('P') else 'ENN',
+        'assoc_gestao': ASSOCIACAO_PADRAO,
+        'assoc_receb': ASSOCIACAO_PADRAO,
+    })
 
 
 def _build_obm2(fono, cod_interno_str, titular_cod, titular_nome, titular_doc,
                 titular_funcao, titular_perc, titular_pseudonimo,
                 titular_ipi='', seq_num=1):
-    """
-    Gera linha OBM2 (329 chars) - informação de titular da obra.
-
-    Mapa de posições verificado contra arquivo real:
-      [0:8]     record type     '0661OBM2'
-      [8:21]    cod_obra        13 chars
-      [21:36]   cod_interno     15 chars
-      [36:49]   cod_titular     13 chars
-      [49:64]   zeros           15 chars
-      [64:134]  nome            70 chars
-      [134:135] tipo pessoa     1 char F/J
-      [135:146] CPF             11 chars
-      [146:160] CNPJ/spaces     14 chars
-      [160:169] complemento     9 chars (IPI ou zeros)
-      [169:171] spaces          2 chars
-      [171:174] 'TD1'           3 chars
-      [174:177] spaces          3 chars
-      [177:178] tipo titular    1 char A/E
-      [178:179] space           1 char
-      [179:181] sub-função      2 chars CA/AR/E_/AS
-      [181:186] percentual      5 chars (perc*100 zero-padded)
-      [186:202] zeros           16 chars
-      [202:204] assoc flag      2 chars AS/AN
-      [204:279] assoc+pseudo    75 chars spaces
-      [279:292] zeros           13 chars
-      [292:307] spaces          15 chars
-      [307:312] zeros           5 chars
-      [312:313] tipo extra      1 char (I ou space)
-      [313:322] IPI code        9 chars
-      [322:325] seq             3 chars
-      [325:329] end code        4 chars '1001'
-    Total: 329 chars
-    """
-    nome = _clean_text(titular_nome or '')
+    """Gera linha OBM2 (329 chars) - informação de titular da obra (layout_ecad.OBM2)."""
     doc = _format_cpf_cnpj(titular_doc)
     tipo_pessoa = 'J' if len(doc) > 11 else 'F'
 
-    perc_int = int(round(float(titular_perc or 0) * 100))
-    perc_str = _zpad(perc_int, 5)
-
     # Sub-função
     funcao_upper = (titular_funcao or '').upper()
     if funcao_upper == 'ARRANJADOR':
@@ -441,115 +230,46 @@ def _build_obm2(fono, cod_interno_str, titular_cod, titular_nome, titular_doc,
     else:
         sub_func = 'CA'
 
-    tipo_tit = 'E' if funcao_upper == 'EDITORA' else 'A'
-
     ipi_clean = _format_cpf_cnpj(titular_ipi)
-    pseudo = _clean_text(titular_pseudonimo or '')
-
-    line = ''
-    line += '0661OBM2'                              # [0:8]     8
-    line += _zpad(fono.cod_obra or '', 13)          # [8:21]    13
-    line += _zpad(cod_interno_str, 15)              # [21:36]   15
-    line += _zpad(titular_cod or '', 13)            # [36:49]   13    cod titular ECAD
-    line += '0' * 15                                # [49:64]   15    zeros
-    line += _pad(nome, 70)                          # [64:134]  70    nome
-    line += tipo_pessoa                             # [134:135] 1     F ou J
-
-    if tipo_pessoa == 'F':
-        line += _pad(doc, 11)                       # [135:146] 11    CPF
-        line += ' ' * 14                            # [146:160] 14    (CNPJ vazio)
-    else:
-        line += ' ' * 11                            # [135:146] 11    (CPF vazio)
-        line += _pad(doc, 14)                       # [146:160] 14    CNPJ
-
-    line += _pad(ipi_clean, 9)                      # [160:169] 9     complemento/IPI
-    line += ' ' * 2                                 # [169:171] 2     spaces
-    line += 'TD1'                                   # [171:174] 3
-    line += ' ' * 3                                 # [174:177] 3     spaces
-    line += tipo_tit                                # [177:178] 1     A ou E
-    line += ' '                                     # [178:179] 1     space
-    line += sub_func                                # [179:181] 2     CA/AR/E_/AS
-    line += perc_str                                # [181:186] 5     percentual
-    line += '0' * 16                                # [186:202] 16    zeros
-    line += 'AS'                                    # [202:204] 2     assoc flag
-
-    # Área de associação + pseudônimo (75 chars)
-    assoc_pseudo = _pad(pseudo, 75) if pseudo else ' ' * 75
-    line += assoc_pseudo                            # [204:279] 75
-
-    line += '0' * 13                                # [279:292] 13    zeros
-    line += ' ' * 15                                # [292:307] 15    spaces
-    line += '0' * 5                                 # [307:312] 5     zeros
-
-    # Tipo extra + IPI final
-    if ipi_clean:
-        line += 'I'                                 # [312:313] 1
-        line += _pad(ipi_clean, 9)                  # [313:322] 9     IPI code
-    else:
-        line += ' '                                 # [312:313] 1
-        line += ' ' * 9                             # [313:322] 9
 
-    line += _zpad(seq_num, 3)                       # [322:325] 3     seq
-    line += '1001'                                  # [325:329] 4     end code
-
-    assert len(line) == 329, f"OBM2 len={len(line)}, expected 329"
-    return line
+    return REGISTROS['OBM2'].formatar({
+        'cod_obra': fono.cod_obra,
+        'cod_interno': cod_interno_str,
+        'cod_titular': titular_cod,
+        'nome': titular_nome,
+        'tipo_pessoa': tipo_pessoa,
+        # Documento no campo de CPF ou no de CNPJ, conforme o tipo de pessoa
+        'cpf': doc if tipo_pessoa == 'F' else '',
+        'cnpj': doc if tipo_pessoa == 'J' else '',
+        'ipi': ipi_clean,
+        'tipo_titular': 'E' if funcao_upper == 'EDITORA' else 'A',
+        'sub_funcao': sub_func,
+        'percentual': int(round(float(titular_perc or 0) * 100)),
+        'pseudonimo': titular_pseudonimo,
+        # Tipo extra + IPI final
+        'marca_ipi': 'I' if ipi_clean else '',
+        'ipi_final': ipi_clean,
+        'seq': seq_num,
+    })
 
 
 def _build_obm4(cod_obra, cod_interno_str, nome, role):
-    """
-    Gera linha OBM4 (82 chars) - participantes.
-
-    Mapa verificado:
-      [0:8]     record type     '0661OBM4'
-      [8:21]    cod_obra        13 chars
-      [21:36]   cod_interno     15 chars
-      [36:81]   nome            45 chars
-      [81:82]   role            1 char (I/A/C/G)
-    Total: 82 chars
-    """
-    nome_clean = _clean_text(nome or '')
+    """Gera linha OBM4 (82 chars) - participantes (layout_ecad.OBM4)."""
+    return REGISTROS['OBM4'].formatar({
+        'cod_obra': cod_obra,
+        'cod_interno': cod_interno_str,
+        'nome': nome,
+        'papel': role,
+    })
 
-    line = ''
-    line += '0661OBM4'                          # [0:8]    8
-    line += _zpad(cod_obra or '', 13)           # [8:21]   13
-    line += _zpad(cod_interno_str, 15)          # [21:36]  15
-    line += _pad(nome_clean, 45)                # [36:81]  45
-    line += role                                # [81:82]  1
 
-    assert len(line) == 82, f"OBM4 len={len(line)}, expected 82"
-    return line
-
-
-def _build_fon1(fono, cod_interno_str, seq_num):
+def _build_fon1(fono, cod_interno_str, seq_num, data_arquivo=None):
     """
-    Gera linha FON1 (333 chars) - Dados do Fonograma.
+    Gera linha FON1 (333 chars) - Dados do Fonograma (layout_ecad.FON1).
     
-    Layout baseado na engenharia reversa do arquivo txt ecad.txt:
-    [0:8]    : 0661FON1
-    [8:20]   : ID Fonograma (12 chars zero-pad)
-    [20:35]  : Código Interno (15 chars zero-pad)
-    [35:48]  : Código Obra (13 chars zero-pad)
-    [48:93]  : Zeros (45 chars)
-    [93:105] : ISRC (12 chars)
-    [105:113]: Data Gravação (DDMMAAAA)
-    [113:121]: Data Lançamento (DDMMAAAA)
-    [121:129]: Data Arquivo (DDMMAAAA)
-    [129:130]: Flag Nacional (S/N)
-    [130:136]: Duração (6 chars zero-pad seconds)
-    [136:148]: Espaços (12 chars)
-    [148:149]: 'S' (Fixo?)
-    [149:151]: País (BR)
-    [151:164]: Gênero (13 chars)
-    [164:173]: '001000000' (Fixo?)
-    [173:330]: Espaços/Zeros (Padding para completar 333)
-    [330:333]: '0NN'
+    Layout baseado na engenharia reversa do arquivo txt ecad.txt.
+    data_arquivo (DDMMAAAA): data de geração do arquivo; padrão, a data atual.
     """
-    # Preparar dados
-    id_fono_str = _zpad(fono.id, 12)
-    cod_obra_str = _zpad(fono.cod_obra or '', 13)
-    isrc = _clean_text(fono.isrc or '').replace('-', '')
-    
     # Datas (padrão DDMMAAAA)
     def fmt_data(ano):
         if not ano: return '00000000'
@@ -560,89 +280,32 @@ def _build_fon1(fono, cod_interno_str, seq_num):
         if len(parts) == 3: return f"{parts[0]:0>2}{parts[1]:0>2}{parts[2]}"
         return '00000000'
 
-    data_grav = fmt_data(fono.ano_grav)
     data_lanc = _clean_text(fono.data_lanc or '').replace('/', '')
     if len(data_lanc) != 8:
          data_lanc = fmt_data(fono.ano_lanc)
-            
-    data_hoje = datetime.now().strftime('%d%m%Y')
-    
-    flag_nasc = 'S' if (fono.flag_nacional or 'NACIONAL').upper() != 'INTERNACIONAL' else 'N'
-    duracao = _format_duracao_seconds(fono.duracao)
-    genero_code = _get_genero_code(fono.genero)
-    
-    line = ''
-    line += '0661FON1'                          # [0:8]
-    line += id_fono_str                         # [8:20]
-    line += _zpad(cod_interno_str, 15)          # [20:35]
-    line += cod_obra_str                        # [35:48]
-    line += '0' * 45                            # [48:93]
-    line += _pad(isrc, 12, ' ')                 # [93:105] (ISRC alinhado esq ou zeros?) - Reference is aligned left
-    line += _pad(data_grav, 8, '0')             # [105:113]
-    line += _pad(data_lanc, 8, '0')             # [113:121]
-    line += data_hoje                           # [121:129]
-    line += flag_nasc                           # [129:130] 
-    line += duracao                             # [130:136]
-    line += ' ' * 12                            # [136:148]
-    line += 'S'                                 # [148:149]
-    line += 'BR'                                # [149:151]
-    line += _pad(genero_code, 13)               # [151:164]
-    line += '001000000'                         # [164:173]
-    
-    # Padding restante até 330
-    # O arquivo de referência tem muitos espaços e alguns zeros no final. 
-    # Vamos preencher com espaços baseado no visual ruler
-    rest_len = 330 - len(line)
-    line += ' ' * rest_len
-    
-    line += '0NN'                               # [330:333]
-    
-    # Ajuste fino hardcoded para bater com observação visual do ruler
-    # O ruler mostrou muito espaço em branco e final fixo.
-    # Se sobrar ou faltar, o assert pega.
-    if len(line) < 333:
-        line += ' ' * (333 - len(line))
-    elif len(line) > 333:
-        line = line[:333]
-        
-    return line
+
+    return REGISTROS['FON1'].formatar({
+        'id_fonograma': fono.id,
+        'cod_interno': cod_interno_str,
+        'cod_obra': fono.cod_obra,
+        'isrc': _clean_text(fono.isrc or '').replace('-', ''),
+        'data_grav': fmt_data(fono.ano_grav),
+        'data_lanc': data_lanc,
+        'data_arquivo': data_arquivo or datetime.now().strftime('%d%m%Y'),
+        'flag_nacional': 'S' if (fono.flag_nacional or 'NACIONAL').upper() != 'INTERNACIONAL' else 'N',
+        'duracao': _format_duracao_seconds(fono.duracao),
+        'genero': _get_genero_code(fono.genero),
+    })
 
 def _build_fon2(fono, titular_nome, titular_doc, titular_func, titular_perc, assoc, seq_num):
-    """
-    Gera linha FON2 (348 chars) - Titular do Fonograma.
-    
-    Layout:
-    [0:8]    : TVFON2
-    [8:20]   : ID Fonograma (Link FON1)
-    [20:35]  : Zeros
-    [35:48]  : Cod Titular (13 zeros or code)
-    [48:63]  : Zeros
-    [63:133] : Nome (70 chars)
-    [133:134]: Tipo Pessoa (F/J)
-    [134:147]: CPF/CNPJ (13 chars)
-    [147:160]: Zeros (13 chars - maybe extra doc?)
-    [160:170]: Spaces (10 chars)
-    [170:173]: 'PFP' ou '   ' (Depende da função?, reference tem PFP e MAM)
-    [173:176]: 'FN ' (Fixo?) ou 'AN '
-    [176:181]: Percentual (5 chars)
-    [181:188]: '00000SS' (Fixo?)
-    [188:194]: Associação (6 chars)
-    [194:200]: Spaces (6 chars)
-    [200:275]: Nome Fantasia/Pseudônimo (75 chars) - Reference appears to use this for role description too?
-    [275:348]: Padding
-    """
-    id_fono_str = _zpad(fono.id, 12)
-    nome = _clean_text(titular_nome)
+    """Gera linha FON2 (348 chars) - Titular do Fonograma (layout_ecad.FON2)."""
     doc = _format_cpf_cnpj(titular_doc)
-    tipo_pessoa = 'J' if len(doc) > 11 else 'F'
     
     # Função map (Exemplos do arquivo: PFP=Produtor Fonográfico Pessoa?, MAM=Músico Acompanhante?)
-    # Vamos usar PFP para Produtor e MAM para outros por default, ou I I para intérprete
     # No arquivo reference:
     # PRODUTOR -> PFPFN (PFP FN)
     # INTÉRPRETE -> I I N (I I N)
     # MUSICO -> MAMAN (MAM AN)
-    
     func_upper = titular_func.upper()
     if 'PRODUTOR' in func_upper:
         tipo_code = 'PFP'
@@ -657,239 +320,394 @@ def _build_fon2(fono, titular_nome, titular_doc, titular_func, titular_perc, ass
         tipo_code = 'I I'
         cat_code = ' N'
 
-    perc_int = int(round(float(titular_perc or 0) * 100))
-    perc_str = _zpad(perc_int, 5)
-    
-    assoc_str = _pad(assoc or 'SBACEM', 6)
-    
-    line = ''
-    line += '0661FON2'                          # [0:8]
-    line += id_fono_str                         # [8:20]
-    line += '0' * 15                            # [20:35]
-    line += '0' * 13                            # [35:48] (Cod titular - usando zeros por enqto)
-    line += '0' * 15                            # [48:63]
-    line += _pad(nome, 70)                      # [63:133]
-    line += tipo_pessoa                         # [133:134]
-    
-    # CPF/CNPJ no campo [134:147] (13 chars)
-    # Se CPF (11), pad left with 0s to 13? Reference: F 085... -> 0 prefix
-    line += _zpad(doc, 13)                      # [134:147]
-    line += '0' * 13                            # [147:160] (Campo extra zerado)
-    line += ' ' * 10                            # [160:170]
-    line += _pad(tipo_code, 3)                  # [170:173]
-    line += _pad(cat_code, 3)                   # [173:176]
-    line += perc_str                            # [176:181]
-    line += '00000SS'                           # [181:188]
-    line += assoc_str                           # [188:194]
-    line += ' ' * 6                             # [194:200]
-    
-    # Campo 200:275 (75 chars) - Pseudônimo/Fantasia ou Nome Artístico
-    # Vamos usar o nome artístico se houver ou repetir nome
-    line += ' ' * 75                            # [200:275]
-    
-    line += 'A'                                 # [275:276] (Status?)
-    line += '0' * 71                            # [276:347] Padding zeros
-    line += 'S'                                 # [347:348] Fim
-    
-    # Ajuste fino length 348
-    if len(line) < 348:
-        line += '0' * (348 - len(line))
-    elif len(line) > 348:
-        line = line[:348]
-        
-    return line
+    return REGISTROS['FON2'].formatar({
+        'id_fonograma': fono.id,
+        'nome': titular_nome,
+        'tipo_pessoa': 'J' if len(doc) > 11 else 'F',
+        'documento': doc,
+        'tipo_codigo': tipo_code,
+        'categoria': cat_code,
+        'percentual': int(round(float(titular_perc or 0) * 100)),
+        'associacao': assoc or 'SBACEM',
+    })
 
 def _build_fon3(fono, seq_num):
-    """
-    Gera linha FON3 (65 chars) - Dados Auxiliares.
-    [0:8]: 0661FON3
-    [8:20]: Zeros (12)
-    [20:35]: Zeros (15)
-    [35:48]: ID Fonograma ou Obra? Reference: 0000014257280 (13 chars)
-    [48:62]: Zeros (14)
-    [62:65]: '56A' (3 chars)
-    """
-    line = '0661FON3'
-    line += '0' * 12 # [8:20]
-    line += '0' * 15 # [20:35]
-    line += _zpad(fono.id, 13) # [35:48]
-    line += '0' * 14 # [48:62] - Adjusted to 14 to leave 3 chars for 56A
-    line += '56A' # [62:65]
-    
-    return line # Exact 65 chars
+    """Gera linha FON3 (65 chars) - Dados Auxiliares (layout_ecad.FON3)."""
+    return REGISTROS['FON3'].formatar({'id_fonograma': fono.id})
 
 
-def gerar_txt_ecad(fonogramas: List[Fonograma], output_path: str) -> Dict:
-    """
-    Gera arquivo TXT no formato posicional fixo aceito pelo ECAD (seções OBM e FON).
-    
-    Formato verificado caractere-por-caractere contra arquivo real aceito pelo ECAD.
-    """
-    lines = []
+# Fonogramas por consulta (IN + selectinload dos titulares) na geração do TXT
+TAMANHO_LOTE_ECAD = 500
+# Acima disso a seção FON vai do buffer em memória para disco
+BUFFER_FON_MAX_BYTES = 16 * 1024 * 1024
+BUFFER_ESCRITA_ECAD = 1024 * 1024
 
-    # === FILE HEADER (19 chars) ===
-    # 0660 + 226 (SBACEM) + 0002 (seq) + ddMMyyyy (data)
-    now = datetime.now()
-    date_str = now.strftime('%d%m%Y')
-    header = '0660' + '226' + '0002' + date_str
-    lines.append(header)
-
-    total_obras = 0
-    total_fonogramas = 0
-    total_titulares = 0
 
-    # === SEÇÃO 1: OBRAS (OBM) ===
-    for fono in fonogramas:
-        # Código interno (usar cod_interno do fonograma ou id)
-        cod_num = fono.cod_interno or str(fono.id)
-        cod_num_str = ''.join(c for c in str(cod_num) if c.isdigit()) or str(fono.id)
-
-        # Separador de obra
-        lines.append('0660OBM000000')
-
-        # OBM1: Dados principais
-        lines.append(_build_obm1(fono, cod_num_str))
-
-        # OBM2: Titulares (autores)
-        seq = 1
-        for autor in (fono.autores_list or []):
-            obm2 = _build_obm2(
-                fono, cod_num_str,
-                titular_cod='',
-                titular_nome=autor.nome,
-                titular_doc=autor.cpf,
-                titular_funcao=autor.funcao or 'COMPOSITOR',
-                titular_perc=autor.percentual,
-                titular_pseudonimo='',
-                titular_ipi=autor.cae_ipi or '',
-                seq_num=seq
-            )
-            lines.append(obm2)
-            total_titulares += 1
-            seq += 1
-
-        # OBM2: Titulares (editoras)
-        for editora in (fono.editoras_list or []):
-            obm2 = _build_obm2(
-                fono, cod_num_str,
-                titular_cod='',
-                titular_nome=editora.nome,
-                titular_doc=editora.cnpj,
-                titular_funcao='EDITORA',
-                titular_perc=editora.percentual,
-                titular_pseudonimo='',
-                titular_ipi='',
-                seq_num=seq
-            )
-            lines.append(obm2)
-            total_titulares += 1
-            seq += 1
-
-        # OBM4: Participantes (intérpretes apenas como info de obra? No ref, OBM4 tem participantes também)
-        for interp in (fono.interpretes_list or []):
-            cat = (interp.categoria or '').upper()
-            role = 'I'
-            if cat in ('COADJUVANTE', 'PARTICIPACAO'): role = 'C'
-            elif cat in ('GRAVADORA',): role = 'G'
-            lines.append(_build_obm4(fono.cod_obra, cod_num_str, interp.nome, role))
-
-        # Trailer da obra
-        lines.append('0669OBM0')
-        total_obras += 1
-
-    # === SEÇÃO 2: FONOGRAMAS (FON) ===
+def iterar_fonogramas_ecad(fonograma_ids, tamanho_lote: int = TAMANHO_LOTE_ECAD) -> Iterator[Fonograma]:
+    """
+    Fonogramas dos ids (em ordem de id) com autores, editoras e intérpretes
+    carregados: uma consulta por lote + uma por relacionamento, em vez de
+    três consultas por fonograma.
+    """
+    from sqlalchemy.orm import selectinload
+
+    ids = sorted(set(fonograma_ids))
+    for inicio in range(0, len(ids), tamanho_lote):
+        lote = ids[inicio:inicio + tamanho_lote]
+        yield from Fonograma.query.filter(Fonograma.id.in_(lote)).options(
+            selectinload(Fonograma.autores_list),
+            selectinload(Fonograma.editoras_list),
+            selectinload(Fonograma.interpretes_list),
+        ).order_by(Fonograma.id)
+
+
+def _cod_interno_numerico(fono) -> str:
+    """Código interno (cod_interno do fonograma ou id), só dígitos"""
+    cod_num = fono.cod_interno or str(fono.id)
+    return ''.join(c for c in str(cod_num) if c.isdigit()) or str(fono.id)
+
+
+def _linhas_obm(fono, cod_num_str, totais) -> Iterator[str]:
+    """Registros da obra do fonograma (seção OBM)"""
+    # Separador de obra
+    yield INICIO_SECAO['OBM']
+
+    # OBM1: Dados principais
+    yield _build_obm1(fono, cod_num_str)
+
+    # OBM2: Titulares (autores)
+    seq = 1
+    for autor in (fono.autores_list or []):
+        yield _build_obm2(
+            fono, cod_num_str,
+            titular_cod='',
+            titular_nome=autor.nome,
+            titular_doc=autor.cpf,
+            titular_funcao=autor.funcao or 'COMPOSITOR',
+            titular_perc=autor.percentual,
+            titular_pseudonimo='',
+            titular_ipi=autor.cae_ipi or '',
+            seq_num=seq
+        )
+        totais['titulares'] += 1
+        seq += 1
+
+    # OBM2: Titulares (editoras)
+    for editora in (fono.editoras_list or []):
+        yield _build_obm2(
+            fono, cod_num_str,
+            titular_cod='',
+            titular_nome=editora.nome,
+            titular_doc=editora.cnpj,
+            titular_funcao='EDITORA',
+            titular_perc=editora.percentual,
+            titular_pseudonimo='',
+            titular_ipi='',
+            seq_num=seq
+        )
+        totais['titulares'] += 1
+        seq += 1
+
+    # OBM4: Participantes (intérpretes apenas como info de obra? No ref, OBM4 tem participantes também)
+    for interp in (fono.interpretes_list or []):
+        cat = (interp.categoria or '').upper()
+        role = 'I'
+        if cat in ('COADJUVANTE', 'PARTICIPACAO'): role = 'C'
+        elif cat in ('GRAVADORA',): role = 'G'
+        yield _build_obm4(fono.cod_obra, cod_num_str, interp.nome, role)
+
+    # Trailer da obra
+    yield FIM_SECAO['OBM']
+    totais['obras'] += 1
+
+
+def _linhas_fon(fono, cod_num_str, totais, data_arquivo=None) -> Iterator[str]:
+    """Registros do fonograma (seção FON)"""
+    # Separador Fonograma
+    yield INICIO_SECAO['FON']
+
+    # FON1: Dados principais
+    yield _build_fon1(fono, cod_num_str, 1, data_arquivo)
+
+    seq = 1
+
+    # FON2: Produtor (Mandatório)
+    if fono.prod_nome:
+        # percentual produtor geralmente 100% dos conexos produtores? Ou o valor do campo.
+        yield _build_fon2(
+            fono,
+            titular_nome=fono.prod_nome,
+            titular_doc=fono.prod_doc,
+            titular_func='PRODUTOR',
+            titular_perc=fono.prod_perc,
+            assoc=fono.prod_assoc,
+            seq_num=seq
+        )
+        seq += 1
+        totais['titulares'] += 1  # Conta como titular?
+
+    # FON2: Intérpretes
+    for interp in (fono.interpretes_list or []):
+        yield _build_fon2(
+            fono,
+            titular_nome=interp.nome,
+            titular_doc=interp.doc,
+            titular_func='INTERPRETE',
+            titular_perc=interp.percentual,
+            assoc=interp.associacao,
+            seq_num=seq
+        )
+        seq += 1
+        totais['titulares'] += 1
+
+    # FON3: Trailer? Ou registro extra? No ref aparece FON3 antes do 0669FON0
+    yield _build_fon3(fono, seq)
+
+    # Trailer do fonograma
+    yield FIM_SECAO['FON']
+    totais['fonogramas'] += 1
+
+
+def _renderizar_segmento(fonogramas, data_arquivo: str) -> Tuple[str, str, Dict]:
+    """Texto das seções OBM e FON de um grupo de fonogramas, com as contagens"""
+    totais = {'obras': 0, 'fonogramas': 0, 'titulares': 0, 'linhas': 0}
+    obm = []
+    fon = []
     for fono in fonogramas:
-        # Separador Fonograma
-        lines.append('0660FON000000')
-        
-        # Código interno numérico
-        cod_num = fono.cod_interno or str(fono.id)
-        cod_num_str = ''.join(c for c in str(cod_num) if c.isdigit()) or str(fono.id)
-        
-        # FON1: Dados principais
-        lines.append(_build_fon1(fono, cod_num_str, 1))
-        
-        seq = 1
-        
-        # FON2: Produtor (Mandatório)
-        if fono.prod_nome:
-             # percentual produtor geralmente 100% dos conexos produtores? Ou o valor do campo.
-             prod_line = _build_fon2(
-                fono,
-                titular_nome=fono.prod_nome,
-                titular_doc=fono.prod_doc,
-                titular_func='PRODUTOR',
-                titular_perc=fono.prod_perc,
-                assoc=fono.prod_assoc,
-                seq_num=seq
-             )
-             lines.append(prod_line)
-             seq += 1
-             total_titulares += 1 # Conta como titular?
-             
-        # FON2: Intérpretes
-        for interp in (fono.interpretes_list or []):
-            interp_line = _build_fon2(
-                fono,
-                titular_nome=interp.nome,
-                titular_doc=interp.doc,
-                titular_func='INTERPRETE',
-                titular_perc=interp.percentual,
-                assoc=interp.associacao,
-                seq_num=seq
-            )
-            lines.append(interp_line)
-            seq += 1
-            total_titulares += 1
-            
-        # FON3: Trailer? Ou registro extra? No ref aparece FON3 antes do 0669FON0
-        lines.append(_build_fon3(fono, seq))
-        
-        # Trailer do fonograma
-        lines.append('0669FON0')
-        total_fonogramas += 1
+        cod_num_str = _cod_interno_numerico(fono)
+        obm.extend(_linhas_obm(fono, cod_num_str, totais))
+        fon.extend(_linhas_fon(fono, cod_num_str, totais, data_arquivo))
+    totais['linhas'] = len(obm) + len(fon)
+    return ''.join(line + '\n' for line in obm), ''.join(line + '\n' for line in fon), totais
 
-    # === FILE HEADER REAL (Registro 000) ===
-    # Layout 0661: 000 + 0661 + SEQ(5) + DATA(8) + HORA(6) + NOME(30) + ...
-    data_hoje = datetime.now().strftime('%d%m%Y')
-    hora_hoje = datetime.now().strftime('%H%M%S')
-    header_000 = '000' + '0661' + '00001' + data_hoje + hora_hoje + _pad('SBACEM FONOGRAMAS', 30)
-    lines.insert(0, header_000)
-
-    total_obras = 0
-    total_fonogramas = 0
-    total_titulares = 0
-
-    # ... (Seção OBM e FON já populadas em lines) ...
-
-    # === FILE TRAILER REAL (Registro 999) ===
-    # 999 + TOTAL_LINHAS(9) + TOTAL_GRUPOS(9)
-    # +1 para a própria linha 999
-    total_linhas = len(lines) + 1
-    total_grupos = total_obras + total_fonogramas
-    trailer_999 = '999' + _zpad(total_linhas, 9) + _zpad(total_grupos, 9)
-    lines.append(trailer_999)
+
+def _escrever_txt_ecad(output_path: str, now: datetime, segmentos: Iterable[Tuple[str, str, Dict]]) -> Dict:
+    """
+    Grava o arquivo: cabeçalhos, OBM de cada segmento na ordem, depois o FON
+    de cada segmento (guardado num buffer temporário até o fim) e o trailer.
+    """
+    totais = {'obras': 0, 'fonogramas': 0, 'titulares': 0}
+    total_linhas = 0
 
     # Ajustar extensão se necessário
     if output_path.lower().endswith('.exp'):
         output_path = output_path[:-4] + '.txt'
 
-    # Escrever no encoding latin-1 (padrão ECAD)
-    with open(output_path, 'w', encoding='latin-1', errors='replace') as f:
-        for line in lines:
-            f.write(line + '\n')
+    # === FILE HEADER REAL (Registro 000) ===
+    # Layout 0661: 000 + 0661 + SEQ(5) + DATA(8) + HORA(6) + NOME(30) (layout_ecad.CABECALHO_000)
+    header_000 = REGISTROS_ARQUIVO['000'].formatar({
+        'sequencia': 1, 'data': now.strftime('%d%m%Y'), 'hora': now.strftime('%H%M%S'), 'nome': NOME_ARQUIVO_SBACEM,
+    })
+
+    # === FILE HEADER (19 chars) ===
+    # 0660 + 226 (SBACEM) + 0002 (seq) + ddMMyyyy (data) (layout_ecad.CABECALHO_0660)
+    header = REGISTROS_ARQUIVO['0660'].formatar({'associacao': ASSOCIACAO_SBACEM, 'sequencia': 2, 'data': now.strftime('%d%m%Y')})
+
+    # Escrever no encoding latin-1 (padrão ECAD); .gz/.zip compactados durante a escrita
+    with abrir_para_escrita(output_path, BUFFER_ESCRITA_ECAD) as f, \
+            tempfile.SpooledTemporaryFile(max_size=BUFFER_FON_MAX_BYTES, mode='w+', encoding='utf-8', newline='') as secao_fon:
+        f.write(header_000 + '\n')
+        f.write(header + '\n')
+        total_linhas += 2
+
+        # === SEÇÃO 1: OBRAS (OBM) direto no arquivo; SEÇÃO 2: FONOGRAMAS (FON) no buffer ===
+        for obm, fon, totais_segmento in segmentos:
+            f.write(obm)
+            secao_fon.write(fon)
+            total_linhas += totais_segmento['linhas']
+            for chave in totais:
+                totais[chave] += totais_segmento[chave]
+
+        secao_fon.seek(0)
+        shutil.copyfileobj(secao_fon, f, BUFFER_ESCRITA_ECAD)
+
+        # === FILE TRAILER REAL (Registro 999) ===
+        # 999 + TOTAL_LINHAS(9) + TOTAL_GRUPOS(9)
+        # +1 para a própria linha 999. O total de grupos sempre saiu zerado
+        # no arquivo aceito; mantido assim.
+        total_linhas += 1
+        trailer_999 = REGISTROS_ARQUIVO['999'].formatar({'total_linhas': total_linhas, 'total_grupos': 0})
+        f.write(trailer_999 + '\n')
 
     return {
         'arquivo': output_path,
-        'total_fonogramas': total_fonogramas,
-        'total_obras': total_obras,
-        'total_titulares': total_titulares,
+        'total_fonogramas': totais['fonogramas'],
+        'total_obras': totais['obras'],
+        'total_titulares': totais['titulares'],
         'formato': 'TXT_ECAD',
+        'versao_layout': VERSAO_LAYOUT,
         'tamanho_bytes': os.path.getsize(output_path) if os.path.exists(output_path) else 0
     }
 
 
-def gerar_exp_ecad(fonogramas: List[Fonograma], output_path: str) -> Dict:
+def gerar_txt_ecad(fonogramas: Iterable[Fonograma], output_path: str) -> Dict:
+    """
+    Gera arquivo TXT no formato posicional fixo aceito pelo ECAD (seções OBM e FON).
+    
+    Formato verificado caractere-por-caractere contra arquivo real aceito pelo ECAD.
+    Com output_path terminado em .gz ou .zip, o arquivo é gravado compactado
+    (ver artefatos_envio).
+    
+    fonogramas pode ser uma lista ou um iterável (ex.: iterar_fonogramas_ecad(ids)):
+    cada fonograma é lido uma vez e as linhas vão direto para o arquivo; a seção
+    FON, que vem depois de todas as obras, fica num buffer temporário até o fim.
+    Para envios grandes, ver gerar_txt_ecad_paralelo.
+    """
+    now = datetime.now()
+    data_arquivo = now.strftime('%d%m%Y')
+    segmentos = (
+        _renderizar_segmento(lote, data_arquivo)
+        for lote in _em_lotes(fonogramas, TAMANHO_LOTE_ECAD)
+    )
+    return _escrever_txt_ecad(output_path, now, segmentos)
+
+
+def _em_lotes(itens: Iterable, tamanho: int) -> Iterator[List]:
+    lote = []
+    for item in itens:
+        lote.append(item)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+# ==================== GERAÇÃO PARALELA ====================
+
+# Processos na geração do TXT (0 = um por núcleo; 1 = desativa) e tamanho mínimo do envio
+ECAD_WORKERS = int(os.environ.get('ECAD_WORKERS', '0'))
+ECAD_PARALELO_MIN_FONOGRAMAS = int(os.environ.get('ECAD_PARALELO_MIN_FONOGRAMAS', '20000'))
+# Fonogramas por fatia entregue a um processo
+TAMANHO_SHARD_ECAD = 5000
+
+# Colunas lidas para montar os registros (sem ORM nos processos)
+COLUNAS_FONOGRAMA_ECAD = (
+    'id', 'cod_interno', 'cod_obra', 'isrc', 'titulo', 'titulo_obra', 'duracao', 'ano_grav',
+    'ano_lanc', 'data_lanc', 'flag_nacional', 'genero', 'idioma',
+    'prod_nome', 'prod_doc', 'prod_perc', 'prod_assoc',
+)
+COLUNAS_TITULARES_ECAD = {
+    'autores_list': ('nome', 'cpf', 'funcao', 'percentual', 'cae_ipi'),
+    'editoras_list': ('nome', 'cnpj', 'percentual'),
+    'interpretes_list': ('nome', 'doc', 'categoria', 'percentual', 'associacao'),
+}
+
+_FonogramaEcad = namedtuple('_FonogramaEcad', COLUNAS_FONOGRAMA_ECAD + tuple(COLUNAS_TITULARES_ECAD))
+_TITULARES_ECAD = {
+    relacionamento: namedtuple(f'_Titular_{relacionamento}', colunas)
+    for relacionamento, colunas in COLUNAS_TITULARES_ECAD.items()
+}
+
+
+def _carregar_shard(ids: List[int]) -> Tuple[List[tuple], Dict[str, Dict[int, List[tuple]]]]:
+    """Fonogramas e titulares da fatia como tuplas simples (Core, sem objetos do ORM)"""
+    from sqlalchemy import select
+    from models import db, Autor, Editora, Interprete
+
+    modelos = {'autores_list': Autor, 'editoras_list': Editora, 'interpretes_list': Interprete}
+    tabela = Fonograma.__table__
+    linhas = [tuple(linha) for linha in db.session.execute(
+        select(*[tabela.c[c] for c in COLUNAS_FONOGRAMA_ECAD]).where(tabela.c.id.in_(ids)).order_by(tabela.c.id)
+    )]
+
+    titulares = {}
+    for relacionamento, colunas in COLUNAS_TITULARES_ECAD.items():
+        tabela_filho = modelos[relacionamento].__table__
+        por_fonograma = {}
+        for linha in db.session.execute(
+            select(tabela_filho.c.fonograma_id, *[tabela_filho.c[c] for c in colunas])
+            .where(tabela_filho.c.fonograma_id.in_(ids))
+            .order_by(tabela_filho.c.fonograma_id, tabela_filho.c.id)
+        ):
+            por_fonograma.setdefault(linha[0], []).append(tuple(linha[1:]))
+        titulares[relacionamento] = por_fonograma
+    return linhas, titulares
+
+
+def _fonogramas_do_shard(linhas, titulares) -> List[_FonogramaEcad]:
+    """Tuplas lidas por _carregar_shard no formato usado pelos registros (atributos do Fonograma)"""
+    fonogramas = []
+    for linha in linhas:
+        fonograma_id = linha[0]
+        listas = [
+            [_TITULARES_ECAD[relacionamento](*t) for t in titulares[relacionamento].get(fonograma_id, ())]
+            for relacionamento in COLUNAS_TITULARES_ECAD
+        ]
+        fonogramas.append(_FonogramaEcad(*linha, *listas))
+    return fonogramas
+
+
+def _renderizar_shard(shard) -> Tuple[str, str, Dict]:
+    """Executado num processo separado: monta OBM e FON da fatia a partir das tuplas"""
+    linhas, titulares, data_arquivo = shard
+    return _renderizar_segmento(_fonogramas_do_shard(linhas, titulares), data_arquivo)
+
+
+def _renderizar_blocos(fonogramas, data_arquivo: str) -> List[Tuple[int, str, str, Dict]]:
+    """OBM e FON de cada fonograma separadamente (id, obm, fon, contagens), para o cache_registros_ecad"""
+    return [(fono.id, *_renderizar_segmento((fono,), data_arquivo)) for fono in fonogramas]
+
+
+def _renderizar_blocos_shard(shard) -> List[Tuple[int, str, str, Dict]]:
+    """Executado num processo separado: blocos de cada fonograma da fatia"""
+    linhas, titulares, data_arquivo = shard
+    return _renderizar_blocos(_fonogramas_do_shard(linhas, titulares), data_arquivo)
+
+
+def gerar_txt_ecad_paralelo(fonograma_ids, output_path: str, workers: Optional[int] = None) -> Dict:
+    """
+    Mesmo arquivo de gerar_txt_ecad (byte a byte), com os registros montados em
+    vários processos. Os ids (em ordem) são divididos em fatias de TAMANHO_SHARD_ECAD;
+    este processo lê cada fatia do banco, os processos montam os segmentos OBM/FON
+    e os segmentos são gravados na ordem das fatias.
+    
+    Envios com menos de ECAD_PARALELO_MIN_FONOGRAMAS fonogramas (ou workers <= 1)
+    são gerados no processo atual. Precisa de contexto de aplicação.
+    
+    Com o cache de registros ativo (ECAD_CACHE_REGISTROS), os blocos OBM/FON de
+    cada fonograma vêm do cache e só os que faltam são montados (em vários
+    processos quando são muitos); ver cache_registros_ecad.
+    """
+    from .cache_registros_ecad import cache_registros_ativo, gerar_txt_ecad_cache
+
+    ids = sorted(set(fonograma_ids))
+    if workers is None:
+        workers = ECAD_WORKERS or os.cpu_count() or 1
+    workers = min(workers, -(-len(ids) // TAMANHO_SHARD_ECAD) or 1)
+
+    if cache_registros_ativo():
+        return gerar_txt_ecad_cache(ids, output_path, workers)
+
+    if workers <= 1 or len(ids) < ECAD_PARALELO_MIN_FONOGRAMAS:
+        return gerar_txt_ecad(iterar_fonogramas_ecad(ids), output_path)
+
+    now = datetime.now()
+    data_arquivo = now.strftime('%d%m%Y')
+
+    def segmentos(executor):
+        # Até 2 fatias por processo em andamento: memória limitada ao que está na fila
+        pendentes = deque()
+        for inicio in range(0, len(ids), TAMANHO_SHARD_ECAD):
+            linhas, titulares = _carregar_shard(ids[inicio:inicio + TAMANHO_SHARD_ECAD])
+            pendentes.append(executor.submit(_renderizar_shard, (linhas, titulares, data_arquivo)))
+            if len(pendentes) >= workers * 2:
+                yield pendentes.popleft().result()
+        while pendentes:
+            yield pendentes.popleft().result()
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            resultado = _escrever_txt_ecad(output_path, now, segmentos(executor))
+    except (BrokenProcessPool, OSError):
+        # Ambiente sem suporte a multiprocessamento: gera no processo atual
+        return gerar_txt_ecad(iterar_fonogramas_ecad(ids), output_path)
+
+    resultado['processos'] = workers
+    return resultado
+
+
+def gerar_exp_ecad(fonogramas: Iterable[Fonograma], output_path: str) -> Dict:
     """Wrapper de compatibilidade - chama gerar_txt_ecad."""
     return gerar_txt_ecad(fonogramas, output_path)
 
@@ -898,6 +716,9 @@ def validar_antes_envio(fonogramas: List[Fonograma]) -> Dict:
     """
     Valida se fonogramas estão prontos para envio ao ECAD
     
+    Para uma seleção por ids, validar_envio_em_lote faz o mesmo em SQL, sem
+    carregar os objetos e os titulares de cada fonograma.
+    
     Args:
         fonogramas: Lista de objetos Fonograma
         
@@ -980,3 +801,138 @@ def validar_antes_envio(fonogramas: List[Fonograma]) -> Dict:
         'avisos': avisos,
         'ids_validos': validos
     }
+
+
+# ==================== VALIDAÇÃO EM LOTE (SQL) ====================
+
+# Ids por consulta na validação em lote (abaixo do limite de parâmetros do SQLite)
+TAMANHO_LOTE_VALIDACAO_ENVIO = 10000
+TOLERANCIA_PERCENTUAL = 0.01
+# Avisos de soma das editoras e dos direitos conexos (intérpretes + músicos +
+# produtor) fora de 100% na validação do envio (1 = ativo). Desativados por
+# padrão: o envio nunca conferiu essas somas e parte do catálogo gravado antes
+# das regras do upload não as cumpre
+ENVIO_AVISOS_PERCENTUAIS = int(os.environ.get('ENVIO_AVISOS_PERCENTUAIS', '0'))
+
+# Campos obrigatórios do envio: (coluna, mensagem). Vazio = NULL, '' ou 0
+CAMPOS_OBRIGATORIOS_ENVIO = (
+    ('isrc', "ISRC é obrigatório"),
+    ('titulo', "Título é obrigatório"),
+    ('duracao', "Duração é obrigatória"),
+    ('ano_lanc', "Ano de lançamento é obrigatório"),
+    ('genero', "Gênero é obrigatório"),
+    ('titulo_obra', "Título da obra é obrigatório"),
+    ('prod_nome', "Nome do produtor é obrigatório"),
+    ('prod_doc', "Documento do produtor é obrigatório"),
+)
+
+
+def _somas_percentuais(modelo, ids: List[int]) -> Dict[int, Tuple[int, float]]:
+    """(quantidade, soma dos percentuais) dos titulares de cada fonograma, numa consulta agrupada"""
+    from sqlalchemy import func, select
+    from models import db
+
+    tabela = modelo.__table__
+    return {
+        fonograma_id: (quantidade, soma or 0.0)
+        for fonograma_id, quantidade, soma in db.session.execute(
+            select(tabela.c.fonograma_id, func.count(), func.sum(tabela.c.percentual))
+            .where(tabela.c.fonograma_id.in_(ids))
+            .group_by(tabela.c.fonograma_id)
+        )
+    }
+
+
+def validar_envio_em_lote(fonograma_ids) -> Dict:
+    """
+    Mesma validação de validar_antes_envio, feita no banco para uma seleção de ids:
+    uma consulta com os campos obrigatórios e uma consulta agrupada (COUNT/SUM
+    dos percentuais) por tabela de titulares, em vez de carregar cada fonograma
+    com autores e editoras. Com ENVIO_AVISOS_PERCENTUAIS confere também, como
+    avisos (não impedem o envio), a soma das editoras e a dos direitos conexos
+    (intérpretes + músicos + produtor), com as mesmas regras do upload
+    (shared/validador.py).
+    
+    Returns:
+        Dict no formato de validar_antes_envio (fonogramas em ordem de id)
+    """
+    from sqlalchemy import Integer, func, select
+    from models import db, Autor, Editora, Interprete, Musico
+    from .validador import validar_percentuais_conexos, validar_percentuais_editoras
+
+    tabela = Fonograma.__table__
+    vazios = []
+    for coluna, _ in CAMPOS_OBRIGATORIOS_ENVIO:
+        vazio = 0 if isinstance(tabela.c[coluna].type, Integer) else ''
+        vazios.append((func.coalesce(tabela.c[coluna], vazio) == vazio).label(f'sem_{coluna}'))
+
+    erros = []
+    avisos = []
+    validos = []
+    total = 0
+    ids = sorted(set(int(i) for i in fonograma_ids))
+    for inicio in range(0, len(ids), TAMANHO_LOTE_VALIDACAO_ENVIO):
+        lote = ids[inicio:inicio + TAMANHO_LOTE_VALIDACAO_ENVIO]
+        linhas = db.session.execute(
+            select(tabela.c.id, tabela.c.isrc, tabela.c.titulo, tabela.c.status_ecad, tabela.c.prod_perc, *vazios)
+            .where(tabela.c.id.in_(lote))
+            .order_by(tabela.c.id)
+        ).all()
+        autores = _somas_percentuais(Autor, lote)
+        if ENVIO_AVISOS_PERCENTUAIS:
+            editoras = _somas_percentuais(Editora, lote)
+            interpretes = _somas_percentuais(Interprete, lote)
+            musicos = _somas_percentuais(Musico, lote)
+        total += len(linhas)
+
+        for linha in linhas:
+            erros_fono = [mensagem for (coluna, mensagem), vazio in zip(CAMPOS_OBRIGATORIOS_ENVIO, linha[5:]) if vazio]
+            avisos_fono = []
+
+            qtd_autores, total_autores = autores.get(linha.id, (0, 0.0))
+            if not qtd_autores:
+                erros_fono.append("Pelo menos um autor é obrigatório")
+            elif abs(total_autores - 100.0) > TOLERANCIA_PERCENTUAL:
+                avisos_fono.append(f"Percentual de autores não soma 100% ({total_autores}%)")
+
+            if ENVIO_AVISOS_PERCENTUAIS:
+                qtd_editoras, total_editoras = editoras.get(linha.id, (0, 0.0))
+                if qtd_editoras and not validar_percentuais_editoras([total_editoras]):
+                    avisos_fono.append(f"Percentual de editoras não soma 100% ({total_editoras}%)")
+
+                total_interpretes = interpretes.get(linha.id, (0, 0.0))[1]
+                total_musicos = musicos.get(linha.id, (0, 0.0))[1]
+                if not validar_percentuais_conexos(total_interpretes, total_musicos, linha.prod_perc):
+                    total_conexos = total_interpretes + total_musicos + (linha.prod_perc or 0)
+                    avisos_fono.append(f"Direitos conexos (intérpretes + músicos + produtor) não somam 100% ({total_conexos}%)")
+
+            if linha.status_ecad in ['ENVIADO', 'ACEITO']:
+                avisos_fono.append(f"Fonograma já foi enviado (status: {linha.status_ecad})")
+
+            if erros_fono:
+                erros.append({
+                    'fonograma_id': linha.id,
+                    'isrc': linha.isrc,
+                    'titulo': linha.titulo,
+                    'erros': erros_fono,
+                    'avisos': avisos_fono
+                })
+            else:
+                validos.append(linha.id)
+                if avisos_fono:
+                    avisos.append({
+                        'fonograma_id': linha.id,
+                        'isrc': linha.isrc,
+                        'titulo': linha.titulo,
+                        'avisos': avisos_fono
+                    })
+
+    return {
+        'total': total,
+        'validos': len(validos),
+        'com_erro': len(erros),
+        'com_aviso': len(avisos),
+        'erros': erros,
+        'avisos': avisos,
+        'ids_validos': validos
+    }
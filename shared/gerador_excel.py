@@ -4,24 +4,19 @@ Usa layout idêntico ao template_fonograma_final.xlsx
 """
 
 import pandas as pd
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
-from typing import List, Dict
-from processador import (
-    parse_autores, parse_interpretes, parse_musicos,
-    parse_editoras, parse_documentos
-)
+from openpyxl.styles import Font
+
+from .escritor_xlsx import Coluna, borda_fina, escrever_planilha, estilo
 
 
 # Cores institucionais SBACEM (igual ao template)
 CORES_SECAO = {
-    'id': PatternFill(start_color="22164C", end_color="22164C", fill_type="solid"),      # Roxo escuro
-    'obra': PatternFill(start_color="3D2E6B", end_color="3D2E6B", fill_type="solid"),    # Roxo claro
-    'autor': PatternFill(start_color="EF234D", end_color="EF234D", fill_type="solid"),   # Vermelho
-    'interp': PatternFill(start_color="EF234D", end_color="EF234D", fill_type="solid"),  # Vermelho
-    'prod': PatternFill(start_color="E1C8B0", end_color="E1C8B0", fill_type="solid"),    # Bege
-    'opc': PatternFill(start_color="4A4A4A", end_color="4A4A4A", fill_type="solid"),     # Cinza
+    'id': '22164C',      # Roxo escuro
+    'obra': '3D2E6B',    # Roxo claro
+    'autor': 'EF234D',   # Vermelho
+    'interp': 'EF234D',  # Vermelho
+    'prod': 'E1C8B0',    # Bege
+    'opc': '4A4A4A',     # Cinza
 }
 
 # Colunas na mesma ordem do template (larguras otimizadas)
@@ -90,76 +85,36 @@ def gerar_excel(df: pd.DataFrame, caminho_saida: str):
     Gera arquivo Excel formatado a partir do DataFrame processado
     Usa layout idêntico ao template_fonograma_final.xlsx
     """
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Fonogramas"
-    
-    # Fontes
-    font_branco = Font(bold=True, color="FFFFFF", size=10)
-    font_preto = Font(bold=True, color="22164C", size=10)
-    font_normal = Font(size=10)
-    
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-    
-    # Cores para linhas alternadas
-    row_fill_light = PatternFill(start_color="F8F8F8", end_color="F8F8F8", fill_type="solid")
-    row_fill_white = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
-    
-    # Criar cabeçalhos
-    for col_idx, col_info in enumerate(COLUNAS_TEMPLATE, 1):
-        cell = ws.cell(row=1, column=col_idx, value=col_info["titulo"])
-        cell.fill = CORES_SECAO[col_info["secao"]]
-        
-        # Fonte branca para cores escuras, preta para bege
-        if col_info["secao"] == "prod":
-            cell.font = font_preto
-        else:
-            cell.font = font_branco
-        
-        cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=False)
-        cell.border = border
-        ws.column_dimensions[get_column_letter(col_idx)].width = col_info["largura"]
-    
-    # Altura do cabeçalho (compacto)
-    ws.row_dimensions[1].height = 25
-    
-    # Preencher dados
-    for row_idx, (_, row) in enumerate(df.iterrows(), start=2):
-        row_fill = row_fill_light if row_idx % 2 == 0 else row_fill_white
-        
-        for col_idx, col_info in enumerate(COLUNAS_TEMPLATE, 1):
-            campo = col_info["nome"]
-            valor = row.get(campo, '')
-            
-            # Valor formatado (truncar para evitar células gigantes)
-            if pd.isna(valor) or valor == 'nan':
-                valor_formatado = ''
-            else:
-                valor_str = str(valor)
-                # Truncar valores muito longos (máximo 100 caracteres)
-                if len(valor_str) > 100:
-                    valor_formatado = valor_str[:97] + '...'
-                else:
-                    valor_formatado = valor_str
-            
-            cell = ws.cell(row=row_idx, column=col_idx, value=valor_formatado)
-            cell.fill = row_fill
-            cell.font = font_normal
-            cell.alignment = Alignment(vertical='center', wrap_text=False)  # Sem wrap para células compactas
-            cell.border = border
-    
-    # Congelar primeira linha e primeiras 2 colunas (ISRC e Título)
-    ws.freeze_panes = 'C2'
-    
-    # Adicionar filtros
-    if ws.max_row > 1:
-        ws.auto_filter.ref = ws.dimensions
-    
-    # Salvar
-    wb.save(caminho_saida)
+    borda = borda_fina()
+    
+    # Fonte branca para cores escuras, preta para bege
+    estilos = [
+        estilo(f'cabecalho_{secao}', fundo=cor, horizontal='center', vertical='center', borda=borda,
+               fonte=Font(bold=True, color='22164C' if secao == 'prod' else 'FFFFFF', size=10))
+        for secao, cor in CORES_SECAO.items()
+    ]
+    # Linhas alternadas, sem wrap para células compactas
+    estilos += [
+        estilo('dados_cinza', fundo='F8F8F8', fonte=Font(size=10), vertical='center', borda=borda),
+        estilo('dados_branco', fundo='FFFFFF', fonte=Font(size=10), vertical='center', borda=borda),
+    ]
+    colunas = [Coluna(c["titulo"], f'cabecalho_{c["secao"]}', c["largura"]) for c in COLUNAS_TEMPLATE]
+    
+    # Colunas do template que faltam no DataFrame ficam vazias
+    dados = df.reindex(columns=[c["nome"] for c in COLUNAS_TEMPLATE])
+    linhas = ([_valor_formatado(v) for v in row] for row in dados.itertuples(index=False, name=None))
+    
+    # Congelar primeira linha e primeiras 2 colunas (ISRC e Título), cabeçalho compacto e filtros
+    escrever_planilha(caminho_saida, 'Fonogramas', colunas, linhas, estilos, ['dados_cinza', 'dados_branco'],
+                      altura_cabecalho=25, congelar='C2', filtro=True)
     return caminho_saida
+
+
+def _valor_formatado(valor) -> str:
+    """Texto da célula (truncado em 100 caracteres para evitar células gigantes)"""
+    if pd.isna(valor) or valor == 'nan':
+        return ''
+    valor_str = str(valor)
+    if len(valor_str) > 100:
+        return valor_str[:97] + '...'
+    return valor_str
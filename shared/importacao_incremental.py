@@ -0,0 +1,260 @@
+"""
+Importação incremental de planilhas de fonogramas
+
+Guarda, por ISRC, um hash (fingerprint) da linha normalizada por processar_csv.
+No reenvio da mesma planilha:
+  - linhas com o mesmo fingerprint reaproveitam o resultado da validação anterior;
+  - linhas já gravadas com o mesmo fingerprint não são salvas de novo, desde que o
+    fonograma não tenha sido alterado depois (updated_at posterior a salvo_em,
+    ex.: edição pela interface ou pela API).
+Só linhas novas ou alteradas passam pela validação e por salvar_fonogramas_do_dataframe.
+
+Linhas sem ISRC ou com ISRC repetido na planilha são sempre tratadas como alteradas.
+"""
+
+import json
+import heapq
+import hashlib
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .validador import VERSAO_VALIDADOR
+
+# Quantidade de ISRCs por consulta/gravação no banco
+LOTE_FINGERPRINTS = 500
+
+SEPARADOR_CAMPOS = '\x1f'
+SEPARADOR_VALOR = '\x1e'
+
+
+def chaves_isrc(df: pd.DataFrame) -> pd.Series:
+    """ISRC de cada linha como gravado em fonogramas ('' quando ausente)"""
+    if 'isrc' not in df.columns:
+        return pd.Series([''] * len(df), index=df.index, dtype=object)
+    isrc = df['isrc']
+    return isrc.where(isrc.notna(), '').astype(str).str.strip()
+
+
+def calcular_fingerprints(df: pd.DataFrame) -> List[str]:
+    """
+    SHA-1 de cada linha (nome e valor de todas as colunas, em ordem alfabética).
+    Colunas novas ou removidas na planilha mudam todos os fingerprints.
+    """
+    if len(df) == 0:
+        return []
+    colunas = sorted(str(c) for c in df.columns)
+    texto = df[colunas].fillna('').astype(str)
+    campos = [c + SEPARADOR_VALOR + texto[c] for c in colunas]
+    linhas = campos[0].str.cat(campos[1:], sep=SEPARADOR_CAMPOS) if len(campos) > 1 else campos[0]
+    return [hashlib.sha1(linha.encode('utf-8')).hexdigest() for linha in linhas.tolist()]
+
+
+def _isrcs_unicos(isrcs: pd.Series) -> np.ndarray:
+    """Máscara das linhas com ISRC preenchido e que não se repete na planilha"""
+    return ((isrcs != '') & ~isrcs.duplicated(keep=False)).to_numpy(dtype=bool)
+
+
+def carregar_registros(isrcs) -> Dict:
+    """FingerprintImportacao existentes para os ISRCs informados, por ISRC"""
+    from models import FingerprintImportacao
+
+    unicos = list({i for i in isrcs if i})
+    registros = {}
+    for inicio in range(0, len(unicos), LOTE_FINGERPRINTS):
+        lote = unicos[inicio:inicio + LOTE_FINGERPRINTS]
+        for registro in FingerprintImportacao.query.filter(FingerprintImportacao.isrc.in_(lote)):
+            registros[registro.isrc] = registro
+    return registros
+
+
+def validar_incremental(df: pd.DataFrame, linhas: Optional[np.ndarray] = None,
+                        composicoes: Optional[Dict[str, pd.DataFrame]] = None) -> Tuple[List[Dict], int, int, Dict]:
+    """
+    Mesmo resultado de validar_dataframe_paralelo, validando apenas as linhas que
+    mudaram desde a última importação. Precisa de contexto de aplicação (banco).
+
+    Retorna (erros, linhas_validas, linhas_com_erro, resumo), com
+    resumo = {'reaproveitadas': n, 'validadas': n}.
+    Se o banco não estiver disponível, valida tudo.
+
+    Os fingerprints das linhas validadas ficam na transação da sessão, num
+    savepoint (uma falha descarta só eles); commit e rollback são do chamador.
+    """
+    from flask import current_app
+    from models import db
+    from .validador_vetorizado import validar_dataframe_paralelo
+    from .processador import selecionar_composicoes
+
+    total = len(df)
+    if linhas is None:
+        linhas = np.arange(total, dtype=np.int64) + 2
+    linhas = np.asarray(linhas, dtype=np.int64)
+
+    isrcs = chaves_isrc(df)
+    fingerprints = calcular_fingerprints(df)
+    rastreaveis = _isrcs_unicos(isrcs)
+
+    try:
+        with db.session.begin_nested():
+            registros = carregar_registros(isrcs[rastreaveis].tolist())
+    except Exception as e:
+        current_app.logger.warning(f"Validação incremental indisponível ({e}); validando todas as linhas")
+        erros, validas, com_erro = validar_dataframe_paralelo(df, linhas, composicoes=composicoes)
+        return erros, validas, com_erro, {'reaproveitadas': 0, 'validadas': total}
+
+    # Linhas cujo resultado anterior ainda vale
+    reaproveitar = np.zeros(total, dtype=bool)
+    lista_isrcs = isrcs.tolist()
+    for pos in np.flatnonzero(rastreaveis):
+        registro = registros.get(lista_isrcs[pos])
+        if (registro is not None and registro.fingerprint == fingerprints[pos]
+                and registro.versao_validador == VERSAO_VALIDADOR):
+            reaproveitar[pos] = True
+
+    validar = ~reaproveitar
+    erros_novos, validas, com_erro = [], 0, 0
+    if validar.any():
+        erros_novos, validas, com_erro = validar_dataframe_paralelo(
+            df[validar], linhas[validar],
+            composicoes=selecionar_composicoes(composicoes, validar) if composicoes is not None else None
+        )
+
+    erros_reaproveitados = []
+    for pos in np.flatnonzero(reaproveitar):
+        registro = registros[lista_isrcs[pos]]
+        if registro.valido:
+            validas += 1
+            continue
+        com_erro += 1
+        linha = int(linhas[pos])
+        erros_reaproveitados.extend(
+            {'linha': linha, 'campo': e['campo'], 'valor': e['valor'], 'erro': e['erro']}
+            for e in json.loads(registro.erros or '[]')
+        )
+
+    # Cada linha está em só uma das listas e ambas vêm ordenadas por linha
+    erros = list(heapq.merge(erros_novos, erros_reaproveitados, key=lambda e: e['linha']))
+
+    try:
+        with db.session.begin_nested():
+            _registrar_validacao(registros, lista_isrcs, fingerprints, linhas, validar & rastreaveis, erros_novos)
+    except Exception as e:
+        current_app.logger.warning(f"Não foi possível gravar os fingerprints da validação: {e}")
+
+    return erros, validas, com_erro, {'reaproveitadas': int(reaproveitar.sum()), 'validadas': int(validar.sum())}
+
+
+def _registrar_validacao(registros: Dict, isrcs: List[str], fingerprints: List[str], linhas: np.ndarray,
+                         mascara: np.ndarray, erros: List[Dict]):
+    """Grava fingerprint e resultado das linhas que acabaram de ser validadas (sem commit)"""
+    from models import db, FingerprintImportacao
+    from sqlalchemy import insert, update
+
+    erros_por_linha = {}
+    for erro in erros:
+        erros_por_linha.setdefault(erro['linha'], []).append(
+            {'campo': erro['campo'], 'valor': erro['valor'], 'erro': erro['erro']}
+        )
+
+    agora = datetime.utcnow()
+    novos, alterados = [], []
+    for pos in np.flatnonzero(mascara):
+        erros_linha = erros_por_linha.get(int(linhas[pos]), [])
+        valores = {
+            'fingerprint': fingerprints[pos],
+            'versao_validador': VERSAO_VALIDADOR,
+            'valido': not erros_linha,
+            'erros': json.dumps(erros_linha, ensure_ascii=False) if erros_linha else None,
+            'updated_at': agora,
+        }
+        registro = registros.get(isrcs[pos])
+        if registro is None:
+            novos.append({'isrc': isrcs[pos], **valores})
+        else:
+            alterados.append({'id': registro.id, **valores})
+
+    for inicio in range(0, len(novos), LOTE_FINGERPRINTS):
+        db.session.execute(insert(FingerprintImportacao), novos[inicio:inicio + LOTE_FINGERPRINTS])
+    for inicio in range(0, len(alterados), LOTE_FINGERPRINTS):
+        db.session.execute(update(FingerprintImportacao), alterados[inicio:inicio + LOTE_FINGERPRINTS])
+
+
+def preparar_salvamento(df: pd.DataFrame) -> Tuple[np.ndarray, List[str], List[str], Dict]:
+    """
+    Para salvar_fonogramas_do_dataframe: indica as linhas que podem ser puladas
+    (mesmo fingerprint da última gravação e fonograma ainda cadastrado, sem
+    alteração depois dela: updated_at <= salvo_em).
+    Retorna (inalteradas, isrcs, fingerprints, contexto); contexto é usado por
+    marcar_salvo e sincronizar_salvo_em.
+    """
+    from models import db, Fonograma
+
+    isrcs = chaves_isrc(df)
+    fingerprints = calcular_fingerprints(df)
+    rastreaveis = _isrcs_unicos(isrcs)
+    lista_isrcs = isrcs.tolist()
+
+    registros = carregar_registros(isrcs[rastreaveis].tolist())
+    candidatos = [
+        pos for pos in np.flatnonzero(rastreaveis)
+        if lista_isrcs[pos] in registros and registros[lista_isrcs[pos]].fingerprint_salvo == fingerprints[pos]
+        and registros[lista_isrcs[pos]].salvo_em is not None
+    ]
+
+    inalterados = set()
+    isrcs_candidatos = [lista_isrcs[pos] for pos in candidatos]
+    for inicio in range(0, len(isrcs_candidatos), LOTE_FINGERPRINTS):
+        lote = isrcs_candidatos[inicio:inicio + LOTE_FINGERPRINTS]
+        for isrc, updated_at in db.session.query(Fonograma.isrc, Fonograma.updated_at).filter(Fonograma.isrc.in_(lote)):
+            if updated_at is not None and updated_at <= registros[isrc].salvo_em:
+                inalterados.add(isrc)
+
+    inalteradas = np.zeros(len(df), dtype=bool)
+    for pos in candidatos:
+        inalteradas[pos] = lista_isrcs[pos] in inalterados
+
+    rastreadas = {lista_isrcs[pos] for pos in np.flatnonzero(rastreaveis)}
+    return inalteradas, lista_isrcs, fingerprints, {'registros': registros, 'rastreadas': rastreadas, 'marcadas': set()}
+
+
+def marcar_salvo(contexto: Dict, isrc: str, fingerprint: str):
+    """
+    Registra na sessão (sem commit) que a linha foi gravada; vai para o banco
+    no mesmo commit do fonograma. salvo_em é preenchido por sincronizar_salvo_em.
+    """
+    from models import db, FingerprintImportacao
+
+    if isrc not in contexto['rastreadas']:
+        return
+    registro = contexto['registros'].get(isrc)
+    if registro is None:
+        registro = FingerprintImportacao(isrc=isrc)
+        contexto['registros'][isrc] = registro
+    # Também recoloca na sessão um registro novo descartado pelo rollback de um savepoint
+    db.session.add(registro)
+    registro.fingerprint_salvo = fingerprint
+    contexto['marcadas'].add(isrc)
+
+
+def sincronizar_salvo_em(contexto: Dict):
+    """
+    Copia o updated_at dos fonogramas das linhas marcadas para salvo_em, na
+    transação da gravação (chamar antes do commit, sem commit). Assim uma
+    alteração posterior do fonograma (updated_at > salvo_em) não é pulada.
+    """
+    from sqlalchemy import select, update
+    from models import db, Fonograma, FingerprintImportacao
+
+    marcadas = sorted(contexto['marcadas'])
+    contexto['marcadas'].clear()
+    atual = select(Fonograma.updated_at).where(Fonograma.isrc == FingerprintImportacao.isrc).scalar_subquery()
+    for inicio in range(0, len(marcadas), LOTE_FINGERPRINTS):
+        db.session.execute(
+            update(FingerprintImportacao)
+            .where(FingerprintImportacao.isrc.in_(marcadas[inicio:inicio + LOTE_FINGERPRINTS]))
+            .values(salvo_em=atual)
+            .execution_options(synchronize_session=False)
+        )
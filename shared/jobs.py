@@ -0,0 +1,390 @@
+"""
+Fila de importações em segundo plano
+
+As rotas de upload/importação apenas gravam o arquivo e criam um
+JobImportacao (enfileirar), respondendo na hora. O processamento é feito por
+scripts/worker_importacao.py, que reivindica os jobs pendentes com um UPDATE
+atômico (vários processos podem rodar ao mesmo tempo) e grava progresso,
+resultado ou erro no próprio job.
+
+O cancelamento de um job pendente é imediato; num job em execução ele é
+atendido no próximo bloco/lote (o que já foi gravado continua gravado).
+
+Enquanto o job roda, o worker renova updated_at a cada JOBS_BATIMENTO_S
+(batimento), mesmo num passo longo sem progresso; só um job sem batimento há
+JOBS_TIMEOUT_MIN (worker morto) volta para a fila. Se o batimento não consegue
+ser gravado por metade desse tempo, o job é interrompido com erro no próximo
+progresso, antes que outro worker o pegue de novo.
+"""
+
+import os
+import json
+import uuid
+import shutil
+import time
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, Tuple
+
+JOBS_DIR = os.environ.get('JOBS_DIR', os.path.join(os.getcwd(), 'instance', 'jobs'))
+# Intervalo (s) entre consultas à fila quando não há job pendente
+JOBS_INTERVALO_S = float(os.environ.get('JOBS_INTERVALO_S', '2'))
+# Job em execução sem atualização de progresso há mais tempo que isso volta para a fila
+JOBS_TIMEOUT_MIN = int(os.environ.get('JOBS_TIMEOUT_MIN', '60'))
+# Intervalo (s) em que o worker renova updated_at do job em execução
+JOBS_BATIMENTO_S = float(os.environ.get('JOBS_BATIMENTO_S', '60'))
+
+PENDENTE = 'PENDENTE'
+EXECUTANDO = 'EXECUTANDO'
+CONCLUIDO = 'CONCLUIDO'
+ERRO = 'ERRO'
+CANCELADO = 'CANCELADO'
+STATUS_FINAIS = (CONCLUIDO, ERRO, CANCELADO)
+
+
+class JobCancelado(Exception):
+    """Levantada pelo callback de progresso quando o cancelamento foi solicitado"""
+
+
+class BatimentoPerdido(Exception):
+    """Levantada pelo callback de progresso quando o batimento do job deixou de ser gravado"""
+
+
+# ==================== FILA ====================
+
+def enfileirar(tipo: str, user_id: Optional[int] = None, arquivo=None, dados=None,
+               nome_arquivo: Optional[str] = None, parametros: Optional[Dict] = None):
+    """
+    Cria um job pendente.
+
+    arquivo: FileStorage (upload) ou caminho de arquivo, copiado para JOBS_DIR
+    dados: alternativa ao arquivo, gravada como JSON (ex.: resultado da validação da sessão)
+    """
+    from models import db, JobImportacao
+
+    if tipo not in EXECUTORES:
+        raise ValueError(f'Tipo de job desconhecido: {tipo}')
+
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    entrada = None
+    if arquivo is not None:
+        nome_arquivo = nome_arquivo or os.path.basename(getattr(arquivo, 'filename', None) or str(arquivo))
+        entrada = os.path.join(JOBS_DIR, uuid.uuid4().hex + os.path.splitext(nome_arquivo)[1].lower())
+        if hasattr(arquivo, 'save'):
+            arquivo.save(entrada)
+        else:
+            shutil.copyfile(arquivo, entrada)
+    elif dados is not None:
+        entrada = os.path.join(JOBS_DIR, uuid.uuid4().hex + '.json')
+        with open(entrada, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, ensure_ascii=False, default=str)
+
+    job = JobImportacao(
+        tipo=tipo,
+        user_id=user_id,
+        nome_arquivo=nome_arquivo,
+        arquivo_entrada=entrada,
+        parametros=json.dumps(parametros or {}, ensure_ascii=False),
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def obter_job(job_id: int):
+    from models import db, JobImportacao
+    return db.session.get(JobImportacao, job_id)
+
+
+def cancelar(job_id: int) -> bool:
+    """Cancela um job pendente ou pede o cancelamento de um em execução. False se já terminou"""
+    from sqlalchemy import update
+    from models import db, JobImportacao
+
+    agora = datetime.utcnow()
+    pendente = db.session.execute(
+        update(JobImportacao)
+        .where(JobImportacao.id == job_id, JobImportacao.status == PENDENTE)
+        .values(status=CANCELADO, cancelamento_solicitado=True, finalizado_em=agora, updated_at=agora)
+    )
+    if pendente.rowcount:
+        db.session.commit()
+        job = obter_job(job_id)
+        _remover_entrada(job)
+        return True
+
+    executando = db.session.execute(
+        update(JobImportacao)
+        .where(JobImportacao.id == job_id, JobImportacao.status == EXECUTANDO)
+        .values(cancelamento_solicitado=True)
+    )
+    db.session.commit()
+    return executando.rowcount > 0
+
+
+def resultado_completo(job) -> Optional[Dict]:
+    """Resultado do job (arquivo de resultado, se houver, ou o resumo)"""
+    if job.arquivo_resultado and os.path.exists(job.arquivo_resultado):
+        with open(job.arquivo_resultado, encoding='utf-8') as f:
+            return json.load(f)
+    return json.loads(job.resultado) if job.resultado else None
+
+
+# ==================== WORKER ====================
+
+def reivindicar(worker: str):
+    """Pega o job pendente mais antigo. O UPDATE condicional garante um único dono por job"""
+    from sqlalchemy import update
+    from models import db, JobImportacao
+
+    while True:
+        candidato = (db.session.query(JobImportacao.id)
+                     .filter(JobImportacao.status == PENDENTE)
+                     .order_by(JobImportacao.id)
+                     .first())
+        if candidato is None:
+            db.session.commit()
+            return None
+
+        agora = datetime.utcnow()
+        reivindicado = db.session.execute(
+            update(JobImportacao)
+            .where(JobImportacao.id == candidato.id, JobImportacao.status == PENDENTE)
+            .values(status=EXECUTANDO, worker=worker, iniciado_em=agora, updated_at=agora)
+        )
+        db.session.commit()
+        if reivindicado.rowcount == 1:
+            return obter_job(candidato.id)
+        # Outro worker pegou antes: tenta o próximo
+
+
+def recuperar_travados() -> int:
+    """Devolve à fila jobs em execução sem progresso há mais de JOBS_TIMEOUT_MIN (worker morto)"""
+    from sqlalchemy import update
+    from models import db, JobImportacao
+
+    limite = datetime.utcnow() - timedelta(minutes=JOBS_TIMEOUT_MIN)
+    recuperados = db.session.execute(
+        update(JobImportacao)
+        .where(JobImportacao.status == EXECUTANDO, JobImportacao.updated_at < limite)
+        .values(status=PENDENTE, worker=None)
+    )
+    db.session.commit()
+    return recuperados.rowcount
+
+
+def executar(job) -> str:
+    """Executa um job reivindicado e grava o desfecho. Retorna o status final"""
+    from models import db
+
+    job_id = job.id
+    parar_batimento, batimento_perdido = _iniciar_batimento(job_id)
+    try:
+        resultado = EXECUTORES[job.tipo](job, _callback_progresso(job_id, batimento_perdido))
+        status, campos = CONCLUIDO, {'resultado': json.dumps(resultado, ensure_ascii=False, default=str)}
+    except JobCancelado:
+        db.session.rollback()
+        status, campos = CANCELADO, {}
+    except Exception as e:
+        db.session.rollback()
+        status, campos = ERRO, {'erro': str(e)}
+    finally:
+        parar_batimento()
+
+    job = obter_job(job_id)
+    job.status = status
+    job.finalizado_em = datetime.utcnow()
+    for campo, valor in campos.items():
+        setattr(job, campo, valor)
+    db.session.commit()
+    _remover_entrada(job)
+    return status
+
+
+def executar_proximo(worker: str) -> Optional[str]:
+    """Reivindica e executa um job. None se a fila está vazia"""
+    job = reivindicar(worker)
+    if job is None:
+        return None
+    return executar(job)
+
+
+def _callback_progresso(job_id: int, batimento_perdido: Optional[threading.Event] = None) -> Callable[[Dict], None]:
+    """
+    Grava o progresso no job e interrompe a execução se o cancelamento foi
+    pedido ou se o batimento deixou de ser gravado
+    """
+    from sqlalchemy import update
+    from models import db, JobImportacao
+
+    def callback(progresso: Dict):
+        if batimento_perdido is not None and batimento_perdido.is_set():
+            raise BatimentoPerdido(f'Batimento do job não gravado há {JOBS_TIMEOUT_MIN / 2:g} min; '
+                                   f'job interrompido para não ser executado duas vezes')
+        db.session.execute(
+            update(JobImportacao)
+            .where(JobImportacao.id == job_id)
+            .values(progresso=json.dumps(progresso, default=str), updated_at=datetime.utcnow())
+        )
+        db.session.commit()
+        if _cancelamento_solicitado(job_id):
+            raise JobCancelado()
+
+    return callback
+
+
+def _iniciar_batimento(job_id: int) -> Tuple[Callable[[], None], threading.Event]:
+    """
+    Renova updated_at do job a cada JOBS_BATIMENTO_S numa thread com conexão
+    própria (a sessão do job pode estar no meio de uma transação), para que
+    recuperar_travados não devolva à fila um job ainda em execução.
+
+    Falhas são registradas no log e o batimento é tentado de novo; sem nenhum
+    gravado há metade de JOBS_TIMEOUT_MIN, o evento devolvido é marcado e o
+    callback de progresso interrompe o job (BatimentoPerdido).
+    Retorna (função que para o batimento, evento de batimento perdido).
+    """
+    from flask import current_app
+    from sqlalchemy import update
+    from models import db, JobImportacao
+
+    engine = db.engine
+    logger = current_app.logger
+    parar = threading.Event()
+    perdido = threading.Event()
+
+    def bater():
+        ultimo = time.monotonic()
+        while not parar.wait(JOBS_BATIMENTO_S):
+            try:
+                with engine.begin() as conexao:
+                    conexao.execute(
+                        update(JobImportacao.__table__)
+                        .where(JobImportacao.id == job_id, JobImportacao.status == EXECUTANDO)
+                        .values(updated_at=datetime.utcnow())
+                    )
+                ultimo = time.monotonic()
+            except Exception:
+                logger.warning('Batimento do job %s não gravado', job_id, exc_info=True)
+                if time.monotonic() - ultimo >= JOBS_TIMEOUT_MIN * 60 / 2:
+                    logger.error('Job %s sem batimento há %.0fs: será interrompido', job_id, time.monotonic() - ultimo)
+                    perdido.set()
+                    return
+
+    thread = threading.Thread(target=bater, name=f'batimento-job-{job_id}', daemon=True)
+    thread.start()
+
+    def parar_batimento():
+        parar.set()
+        thread.join()
+
+    return parar_batimento, perdido
+
+
+def _cancelamento_solicitado(job_id: int) -> bool:
+    from models import db, JobImportacao
+    return bool(db.session.query(JobImportacao.cancelamento_solicitado).filter_by(id=job_id).scalar())
+
+
+def _remover_entrada(job):
+    if job.arquivo_entrada and os.path.exists(job.arquivo_entrada):
+        try:
+            os.remove(job.arquivo_entrada)
+        except OSError:
+            pass
+
+
+def _parametros(job) -> Dict:
+    return json.loads(job.parametros) if job.parametros else {}
+
+
+def _usuario(job):
+    from models import db, User
+    return db.session.get(User, job.user_id) if job.user_id else None
+
+
+def _exigir_sucesso(job, resultado: Dict) -> Dict:
+    """Serviços que devolvem {'sucesso': False, 'erro': ...} em vez de levantar exceção"""
+    if not resultado.get('sucesso', True):
+        if _cancelamento_solicitado(job.id):
+            raise JobCancelado()
+        raise RuntimeError(resultado.get('erro') or 'Falha na importação')
+    return resultado
+
+
+# ==================== EXECUTORES ====================
+
+def _executar_importar_catalogo(job, callback_progresso) -> Dict:
+    """Arquivo grande: validação e gravação em blocos (importar_arquivo_em_blocos)"""
+    from contextlib import nullcontext
+    from .fonograma_service import importar_arquivo_em_blocos
+
+    parametros = _parametros(job)
+    resumo = importar_arquivo_em_blocos(
+        job.arquivo_entrada, nullcontext(), user_id=job.user_id,
+        tamanho_bloco=parametros.get('tamanho_bloco'),
+        salvar_apenas_validos=parametros.get('salvar_apenas_validos', True),
+        callback_progresso=callback_progresso,
+        incremental=parametros.get('incremental', True),
+    )
+    return _exigir_sucesso(job, resumo)
+
+
+def _executar_salvar_upload(job, callback_progresso) -> Dict:
+    """Botão "Salvar" do upload: mesmos dados que estavam na sessão"""
+    from usuario.services.upload_service import salvar_fonogramas
+
+    with open(job.arquivo_entrada, encoding='utf-8') as f:
+        resultado_validacao = json.load(f)
+    resultado = salvar_fonogramas(
+        resultado_validacao, _usuario(job),
+        salvar_apenas_validos=_parametros(job).get('salvar_apenas_validos', False),
+        callback_progresso=callback_progresso,
+    )
+    return _exigir_sucesso(job, resultado)
+
+
+def _executar_importar_lote(job, callback_progresso) -> Dict:
+    """Importação em lote do admin (lote_service.executar_importacao)"""
+    from werkzeug.datastructures import FileStorage
+    from admin.services.lote_service import executar_importacao
+
+    with open(job.arquivo_entrada, 'rb') as f:
+        arquivo = FileStorage(stream=f, filename=job.nome_arquivo)
+        resultado = executar_importacao(arquivo, _usuario(job), callback_progresso=callback_progresso)
+    return _exigir_sucesso(job, resultado)
+
+
+def _executar_validar_arquivo(job, callback_progresso) -> Dict:
+    """Validação para o grid (/api/lote/validar). Os dados vão para um arquivo de resultado"""
+    from models import db
+    from .processador import processar_csv
+
+    callback_progresso({'etapa': 'validando'})
+    df, erros, total_linhas, linhas_validas, linhas_com_erro = processar_csv(job.arquivo_entrada)
+    callback_progresso({'etapa': 'gravando resultado', 'total_linhas': total_linhas,
+                        'linhas_validas': linhas_validas, 'linhas_com_erro': linhas_com_erro})
+    dados = df.to_dict('records')
+
+    caminho = os.path.join(JOBS_DIR, f'{job.id}-resultado.json')
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump({'success': True, 'data': dados, 'errors': erros, 'total': len(dados)},
+                  f, ensure_ascii=False, default=str)
+    job = obter_job(job.id)
+    job.arquivo_resultado = caminho
+    db.session.commit()
+
+    return {
+        'total_linhas': total_linhas,
+        'linhas_validas': linhas_validas,
+        'linhas_com_erro': linhas_com_erro,
+        'total_erros': len(erros),
+    }
+
+
+EXECUTORES = {
+    'importar_catalogo': _executar_importar_catalogo,
+    'salvar_upload': _executar_salvar_upload,
+    'importar_lote': _executar_importar_lote,
+    'validar_arquivo': _executar_validar_arquivo,
+}
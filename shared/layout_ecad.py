@@ -0,0 +1,304 @@
+"""
+Layout posicional ECAD (arquivo 0660) - tabelas declarativas por tipo de registro
+
+Cada registro é uma tabela de campos (nome, posição inicial, tamanho, regra de
+preenchimento, transformação ou valor fixo), validada e compilada uma vez na
+importação do módulo. Uma revisão do layout do ECAD vira uma mudança de tabela
+(e de VERSAO_LAYOUT); as regras de negócio (gênero, flags, percentuais) ficam em
+gerador_ecad.py, que só monta o dicionário de valores de cada registro. As mesmas
+tabelas servem à leitura (leitor_ecad_posicional.py).
+
+Regras de preenchimento (as mesmas de _pad/_zpad do gerador):
+  TEXTO        alinhado à esquerda, completa com espaços, corta no tamanho
+  TEXTO_ZEROS  alinhado à esquerda, completa com zeros
+  NUMERICO     só os dígitos, zeros à esquerda (corta mantendo os da esquerda)
+  FIXO         valor constante do layout
+"""
+
+import unicodedata
+from functools import lru_cache
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+VERSAO_LAYOUT = '0660-2026.1'
+
+TEXTO = 'TEXTO'
+TEXTO_ZEROS = 'TEXTO_ZEROS'
+NUMERICO = 'NUMERICO'
+FIXO = 'FIXO'
+
+# Transformações aplicadas antes do preenchimento
+LIMPAR = 'LIMPAR'
+
+
+class Campo(NamedTuple):
+    nome: str
+    inicio: int
+    tamanho: int
+    regra: str
+    transformacao: Optional[str] = None  # em campos FIXO, o valor
+
+
+@lru_cache(maxsize=65536)
+def _limpar_cache(texto: str) -> str:
+    nfkd = unicodedata.normalize('NFKD', texto)
+    return ''.join(c for c in nfkd if not unicodedata.combining(c)).upper()
+
+
+def limpar_texto(text) -> str:
+    """Remove acentos e converte para maiúsculas (memoizado: nomes se repetem muito num envio)"""
+    if not text:
+        return ''
+    return _limpar_cache(str(text))
+
+
+def texto(value, width: int, fill: str = ' ') -> str:
+    """Alinha à esquerda e completa/corta no tamanho exato"""
+    return str(value or '')[:width].ljust(width, fill)
+
+
+def numero(value, width: int) -> str:
+    """Só dígitos, zeros à esquerda, tamanho exato"""
+    s = str(value or '0')
+    digits = s if s.isdigit() else ''.join(c for c in s if c.isdigit())
+    if not digits:
+        digits = '0'
+    return digits[:width].rjust(width, '0')
+
+
+TRANSFORMACOES: Dict[str, Callable] = {
+    LIMPAR: limpar_texto,
+}
+
+
+def _formatador_campo(campo: Campo) -> Callable:
+    largura = campo.tamanho
+    if campo.regra == NUMERICO:
+        formatar = lambda v: numero(v, largura)
+    elif campo.regra == TEXTO_ZEROS:
+        formatar = lambda v: texto(v, largura, '0')
+    else:
+        formatar = lambda v: texto(v, largura)
+
+    transformacao = TRANSFORMACOES.get(campo.transformacao)
+    if transformacao:
+        return lambda v: formatar(transformacao(v))
+    return formatar
+
+
+class RegistroCompilado:
+    """Formatador de um tipo de registro: constantes vizinhas já concatenadas"""
+
+    def __init__(self, tipo: str, campos: Tuple[Campo, ...], tamanho: int):
+        self.tipo = tipo
+        self.campos = campos
+        self.tamanho = tamanho
+        self.nomes = tuple(c.nome for c in campos if c.regra != FIXO)
+
+        partes = []  # (constante, None) ou (nome, formatador)
+        for campo in campos:
+            if campo.regra == FIXO:
+                if partes and partes[-1][1] is None:
+                    partes[-1] = (partes[-1][0] + campo.transformacao, None)
+                else:
+                    partes.append((campo.transformacao, None))
+            else:
+                partes.append((campo.nome, _formatador_campo(campo)))
+        self._partes = tuple(partes)
+
+    def formatar(self, valores: Dict) -> str:
+        return ''.join([
+            parte if formatador is None else formatador(valores.get(parte))
+            for parte, formatador in self._partes
+        ])
+
+
+def compilar(tipo: str, campos: Tuple[Campo, ...], tamanho: int) -> RegistroCompilado:
+    """Valida posições e tamanhos da tabela (contígua, sem sobreposição) e compila"""
+    posicao = 0
+    for campo in campos:
+        if campo.inicio != posicao:
+            raise ValueError(f"{tipo}: campo {campo.nome} começa em {campo.inicio}, esperado {posicao}")
+        if campo.regra not in (TEXTO, TEXTO_ZEROS, NUMERICO, FIXO):
+            raise ValueError(f"{tipo}: regra inválida no campo {campo.nome}: {campo.regra}")
+        if campo.regra == FIXO and len(campo.transformacao or '') != campo.tamanho:
+            raise ValueError(f"{tipo}: valor fixo do campo {campo.nome} não tem {campo.tamanho} caracteres")
+        if campo.regra != FIXO and campo.transformacao and campo.transformacao not in TRANSFORMACOES:
+            raise ValueError(f"{tipo}: transformação desconhecida no campo {campo.nome}: {campo.transformacao}")
+        posicao += campo.tamanho
+    if posicao != tamanho:
+        raise ValueError(f"{tipo}: campos somam {posicao} caracteres, esperado {tamanho}")
+    return RegistroCompilado(tipo, campos, tamanho)
+
+
+# ==================== TABELAS (layout 0660) ====================
+# Posições verificadas contra arquivo real aceito pelo ECAD
+
+OBM1 = (
+    Campo('registro',         0,   8, FIXO, '0661OBM1'),
+    Campo('cod_obra',         8,  13, NUMERICO),                # cod obra ECAD
+    Campo('cod_interno',     21,  15, NUMERICO),
+    Campo('titulo',          36,  95, TEXTO, LIMPAR),
+    Campo('flag_nacional',  131,   1, TEXTO),                   # S/N
+    Campo('flag_letra',     132,   1, FIXO, 'N'),
+    Campo('flag3',          133,   1, FIXO, 'N'),
+    Campo('zeros1',         134,  24, FIXO, '0' * 24),
+    Campo('brancos1',       158,  11, FIXO, ' ' * 11),
+    Campo('duracao',        169,   6, NUMERICO),                # segundos
+    Campo('pais',           175,   2, FIXO, 'BR'),
+    Campo('genero',         177,  10, TEXTO),                   # código + espaços
+    Campo('flags2',         187,   3, FIXO, 'NNN'),
+    Campo('zeros2',         190,  13, FIXO, '0' * 13),
+    Campo('brancos2',       203,  15, FIXO, ' ' * 15),
+    Campo('idioma',         218,   3, TEXTO),                   # PTN/ENN
+    Campo('brancos3',       221,   3, FIXO, ' ' * 3),
+    Campo('assoc_gestao',   224,  22, TEXTO),
+    Campo('assoc_receb',    246,  22, TEXTO),
+    Campo('idn',            268,   3, FIXO, 'IDN'),
+    Campo('fixo1',          271,   3, FIXO, '000'),
+    Campo('fixo2',          274,   1, FIXO, 'N'),
+    Campo('zeros3',         275,   8, FIXO, '0' * 8),
+    Campo('branco4',        283,   1, FIXO, ' '),
+    Campo('zeros4',         284,   8, FIXO, '0' * 8),
+)
+
+OBM2 = (
+    Campo('registro',         0,   8, FIXO, '0661OBM2'),
+    Campo('cod_obra',         8,  13, NUMERICO),
+    Campo('cod_interno',     21,  15, NUMERICO),
+    Campo('cod_titular',     36,  13, NUMERICO),                # cod titular ECAD
+    Campo('zeros1',          49,  15, FIXO, '0' * 15),
+    Campo('nome',            64,  70, TEXTO, LIMPAR),
+    Campo('tipo_pessoa',    134,   1, TEXTO),                   # F/J
+    Campo('cpf',            135,  11, TEXTO),                   # vazio se J
+    Campo('cnpj',           146,  14, TEXTO),                   # vazio se F
+    Campo('ipi',            160,   9, TEXTO),                   # complemento/IPI
+    Campo('brancos1',       169,   2, FIXO, ' ' * 2),
+    Campo('td1',            171,   3, FIXO, 'TD1'),
+    Campo('brancos2',       174,   3, FIXO, ' ' * 3),
+    Campo('tipo_titular',   177,   1, TEXTO),                   # A/E
+    Campo('branco3',        178,   1, FIXO, ' '),
+    Campo('sub_funcao',     179,   2, TEXTO),                   # CA/AR/E_/SR/AS
+    Campo('percentual',     181,   5, NUMERICO),                # perc * 100
+    Campo('zeros2',         186,  16, FIXO, '0' * 16),
+    Campo('assoc_flag',     202,   2, FIXO, 'AS'),
+    Campo('pseudonimo',     204,  75, TEXTO, LIMPAR),           # área de associação + pseudônimo
+    Campo('zeros3',         279,  13, FIXO, '0' * 13),
+    Campo('brancos4',       292,  15, FIXO, ' ' * 15),
+    Campo('zeros4',         307,   5, FIXO, '0' * 5),
+    Campo('marca_ipi',      312,   1, TEXTO),                   # I ou espaço
+    Campo('ipi_final',      313,   9, TEXTO),
+    Campo('seq',            322,   3, NUMERICO),
+    Campo('fim',            325,   4, FIXO, '1001'),
+)
+
+OBM4 = (
+    Campo('registro',         0,   8, FIXO, '0661OBM4'),
+    Campo('cod_obra',         8,  13, NUMERICO),
+    Campo('cod_interno',     21,  15, NUMERICO),
+    Campo('nome',            36,  45, TEXTO, LIMPAR),
+    Campo('papel',           81,   1, TEXTO),                   # I/A/C/G
+)
+
+FON1 = (
+    Campo('registro',         0,   8, FIXO, '0661FON1'),
+    Campo('id_fonograma',     8,  12, NUMERICO),
+    Campo('cod_interno',     20,  15, NUMERICO),
+    Campo('cod_obra',        35,  13, NUMERICO),
+    Campo('zeros1',          48,  45, FIXO, '0' * 45),
+    Campo('isrc',            93,  12, TEXTO),                   # alinhado à esquerda
+    Campo('data_grav',      105,   8, TEXTO_ZEROS),             # DDMMAAAA
+    Campo('data_lanc',      113,   8, TEXTO_ZEROS),             # DDMMAAAA
+    Campo('data_arquivo',   121,   8, TEXTO),                   # DDMMAAAA (data de geração)
+    Campo('flag_nacional',  129,   1, TEXTO),                   # S/N
+    Campo('duracao',        130,   6, NUMERICO),                # segundos
+    Campo('brancos1',       136,  12, FIXO, ' ' * 12),
+    Campo('fixo1',          148,   1, FIXO, 'S'),
+    Campo('pais',           149,   2, FIXO, 'BR'),
+    Campo('genero',         151,  13, TEXTO),
+    Campo('fixo2',          164,   9, FIXO, '001000000'),
+    Campo('brancos2',       173, 157, FIXO, ' ' * 157),
+    Campo('fim',            330,   3, FIXO, '0NN'),
+)
+
+FON2 = (
+    Campo('registro',         0,   8, FIXO, '0661FON2'),
+    Campo('id_fonograma',     8,  12, NUMERICO),                # liga ao FON1
+    Campo('zeros1',          20,  15, FIXO, '0' * 15),
+    Campo('cod_titular',     35,  13, FIXO, '0' * 13),          # zeros por enquanto
+    Campo('zeros2',          48,  15, FIXO, '0' * 15),
+    Campo('nome',            63,  70, TEXTO, LIMPAR),
+    Campo('tipo_pessoa',    133,   1, TEXTO),                   # F/J
+    Campo('documento',      134,  13, NUMERICO),                # CPF/CNPJ
+    Campo('zeros3',         147,  13, FIXO, '0' * 13),
+    Campo('brancos1',       160,  10, FIXO, ' ' * 10),
+    Campo('tipo_codigo',    170,   3, TEXTO),                   # PFP / I I / MAM
+    Campo('categoria',      173,   3, TEXTO),                   # FN / N / AN
+    Campo('percentual',     176,   5, NUMERICO),                # perc * 100
+    Campo('fixo1',          181,   7, FIXO, '00000SS'),
+    Campo('associacao',     188,   6, TEXTO),
+    Campo('brancos2',       194,   6, FIXO, ' ' * 6),
+    Campo('pseudonimo',     200,  75, FIXO, ' ' * 75),
+    Campo('status',         275,   1, FIXO, 'A'),
+    Campo('zeros4',         276,  71, FIXO, '0' * 71),
+    Campo('fim',            347,   1, FIXO, 'S'),
+)
+
+FON3 = (
+    Campo('registro',         0,   8, FIXO, '0661FON3'),
+    Campo('zeros1',           8,  27, FIXO, '0' * 27),
+    Campo('id_fonograma',    35,  13, NUMERICO),
+    Campo('zeros2',          48,  14, FIXO, '0' * 14),
+    Campo('fim',             62,   3, FIXO, '56A'),
+)
+
+REGISTROS: Dict[str, RegistroCompilado] = {
+    tipo: compilar(tipo, campos, tamanho)
+    for tipo, campos, tamanho in (
+        ('OBM1', OBM1, 292),
+        ('OBM2', OBM2, 329),
+        ('OBM4', OBM4, 82),
+        ('FON1', FON1, 333),
+        ('FON2', FON2, 348),
+        ('FON3', FON3, 65),
+    )
+}
+
+# Cabeçalhos, trailer e separadores de seção do arquivo
+# Identificação dos arquivos gerados pela SBACEM (nome no 000, associação no 0660)
+NOME_ARQUIVO_SBACEM = 'SBACEM FONOGRAMAS'
+ASSOCIACAO_SBACEM = 226
+
+CABECALHO_000 = (
+    Campo('registro',         0,   3, FIXO, '000'),
+    Campo('layout',           3,   4, FIXO, '0661'),
+    Campo('sequencia',        7,   5, NUMERICO),
+    Campo('data',            12,   8, TEXTO),                   # DDMMAAAA
+    Campo('hora',            20,   6, TEXTO),                   # HHMMSS
+    Campo('nome',            26,  30, TEXTO),
+)
+
+CABECALHO_0660 = (
+    Campo('registro',         0,   4, FIXO, '0660'),
+    Campo('associacao',       4,   3, NUMERICO),                # ASSOCIACAO_SBACEM nos nossos
+    Campo('sequencia',        7,   4, NUMERICO),
+    Campo('data',            11,   8, TEXTO),                   # DDMMAAAA
+)
+
+TRAILER_999 = (
+    Campo('registro',         0,   3, FIXO, '999'),
+    Campo('total_linhas',     3,   9, NUMERICO),                # inclui a própria linha 999
+    Campo('total_grupos',    12,   9, NUMERICO),
+)
+
+REGISTROS_ARQUIVO: Dict[str, RegistroCompilado] = {
+    tipo: compilar(tipo, campos, tamanho)
+    for tipo, campos, tamanho in (
+        ('000', CABECALHO_000, 56),
+        ('0660', CABECALHO_0660, 19),
+        ('999', TRAILER_999, 21),
+    )
+}
+
+SECOES = ('OBM', 'FON')
+INICIO_SECAO = {secao: f'0660{secao}000000' for secao in SECOES}  # antes de cada obra/fonograma
+FIM_SECAO = {secao: f'0669{secao}0' for secao in SECOES}
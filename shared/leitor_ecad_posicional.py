@@ -0,0 +1,203 @@
+"""
+Leitura de arquivos posicionais ECAD (layout 0660)
+
+Lê o arquivo linha a linha sobre um mmap (o arquivo não é carregado na memória)
+e separa cada linha pelo tipo de registro, com os mesmos campos e posições que o
+gerador usa (layout_ecad.REGISTROS e REGISTROS_ARQUIVO):
+  000, 0660, 999              cabeçalhos e trailer do arquivo
+  INICIO_OBM/FIM_OBM, ...     separadores de obra e de fonograma
+  OBM1, OBM2, OBM4            obra, titulares e participantes
+  FON1, FON2, FON3            fonograma, titulares conexos e dados auxiliares
+Tipos fora do layout (ex.: OBM3 e FON5, que aparecem em arquivos do ECAD) vêm
+com o código do registro como tipo e sem campos; linhas sem tipo conhecido vêm
+como DESCONHECIDO.
+
+Valores dos campos: TEXTO sem os espaços à direita, NUMERICO como int
+(percentuais multiplicados por 100, como gravados), TEXTO_ZEROS como está
+(datas DDMMAAAA). Campos FIXO ficam de fora. Assim, para um registro gerado
+por nós, REGISTROS[tipo].formatar(registro.campos) devolve a linha original
+(ver scripts/verificar_leitura_ecad.py).
+
+Arquivos compactados (.gz/.zip, ver artefatos_envio) são lidos do fluxo
+descompactado, sem mmap.
+"""
+
+import mmap
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from .artefatos_envio import abrir_para_leitura, compressao_do_arquivo
+from .layout_ecad import (
+    ASSOCIACAO_SBACEM, FIM_SECAO, FIXO, INICIO_SECAO, NOME_ARQUIVO_SBACEM, NUMERICO, REGISTROS, REGISTROS_ARQUIVO,
+    TEXTO_ZEROS, RegistroCompilado
+)
+
+# Registros por lote em ler_registros_em_lotes
+LOTE_LEITURA_ECAD = 5000
+
+DESCONHECIDO = 'DESCONHECIDO'
+
+_SEPARADORES = {
+    **{linha: f'INICIO_{secao}' for secao, linha in INICIO_SECAO.items()},
+    **{linha: f'FIM_{secao}' for secao, linha in FIM_SECAO.items()},
+}
+
+
+class RegistroEcad(NamedTuple):
+    tipo: str
+    numero_linha: int  # a partir de 1
+    campos: Dict
+    texto: str         # linha sem a quebra
+
+
+def _numerico(valor: str):
+    return int(valor) if valor.isdigit() else valor.strip()
+
+
+def _texto(valor: str) -> str:
+    return valor.rstrip(' ')
+
+
+def _mesmo_valor(valor: str) -> str:
+    return valor
+
+
+def _extratores(registro: RegistroCompilado) -> Tuple[Tuple[str, int, int, Callable], ...]:
+    """(nome, início, fim, conversão) de cada campo não fixo do registro"""
+    conversoes = {NUMERICO: _numerico, TEXTO_ZEROS: _mesmo_valor}
+    return tuple(
+        (c.nome, c.inicio, c.inicio + c.tamanho, conversoes.get(c.regra, _texto))
+        for c in registro.campos if c.regra != FIXO
+    )
+
+
+_EXTRATORES = {tipo: _extratores(registro) for tipo, registro in REGISTROS.items()}
+_EXTRATORES_ARQUIVO = {tipo: _extratores(registro) for tipo, registro in REGISTROS_ARQUIVO.items()}
+
+
+def _decodificar(linha: bytes, encoding: Optional[str]) -> str:
+    """Sem encoding: UTF-8 (arquivos do ECAD) ou, se não for UTF-8 válido, latin-1 (os nossos)"""
+    if encoding:
+        return linha.decode(encoding, errors='replace')
+    try:
+        return linha.decode('utf-8')
+    except UnicodeDecodeError:
+        return linha.decode('latin-1')
+
+
+def _campos(texto: str, extratores) -> Dict:
+    return {nome: converter(texto[inicio:fim]) for nome, inicio, fim, converter in extratores}
+
+
+def classificar_linha(texto: str, numero_linha: int = 0) -> RegistroEcad:
+    """Tipo e campos de uma linha do arquivo (sem a quebra de linha)"""
+    separador = _SEPARADORES.get(texto)
+    if separador:
+        return RegistroEcad(separador, numero_linha, {}, texto)
+
+    codigo = texto[4:8]
+    if texto[:3] == '066' and codigo[:3] in INICIO_SECAO:
+        extratores = _EXTRATORES.get(codigo)
+        return RegistroEcad(codigo, numero_linha, _campos(texto, extratores) if extratores else {}, texto)
+
+    for tipo in ('000', '999'):
+        if texto.startswith(tipo):
+            return RegistroEcad(tipo, numero_linha, _campos(texto, _EXTRATORES_ARQUIVO[tipo]), texto)
+    if texto.startswith('0660') and len(texto) == REGISTROS_ARQUIVO['0660'].tamanho and texto.isdigit():
+        return RegistroEcad('0660', numero_linha, _campos(texto, _EXTRATORES_ARQUIVO['0660']), texto)
+    return RegistroEcad(DESCONHECIDO, numero_linha, {}, texto)
+
+
+def _linhas_binarias(caminho: str) -> Iterator[bytes]:
+    """Linhas do arquivo (com a quebra), pelo mmap; compactados, pelo fluxo descompactado"""
+    if compressao_do_arquivo(caminho):
+        with abrir_para_leitura(caminho) as arquivo:
+            yield from arquivo
+        return
+
+    with open(caminho, 'rb') as arquivo:
+        try:
+            mapa = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return  # arquivo vazio
+        with mapa:
+            yield from iter(mapa.readline, b'')
+
+
+def ler_registros(caminho: str, tipos: Optional[Iterable[str]] = None,
+                  encoding: Optional[str] = None) -> Iterator[RegistroEcad]:
+    """
+    Registros do arquivo, em ordem. Com tipos, só os desses tipos (as outras
+    linhas não são separadas em campos).
+    """
+    tipos = set(tipos) if tipos else None
+    # Só registros do layout (OBM1, FON1...): as outras linhas nem são decodificadas
+    codigos = {t.encode('ascii') for t in tipos} if tipos and tipos <= REGISTROS.keys() else None
+    for numero_linha, bruta in enumerate(_linhas_binarias(caminho), 1):
+        if codigos is not None and bruta[4:8] not in codigos:
+            continue
+        texto = _decodificar(bruta.rstrip(b'\r\n'), encoding)
+        if not texto:
+            continue
+        registro = classificar_linha(texto, numero_linha)
+        if tipos is None or registro.tipo in tipos:
+            yield registro
+
+
+def ler_registros_em_lotes(caminho: str, tamanho_lote: int = LOTE_LEITURA_ECAD,
+                           tipos: Optional[Iterable[str]] = None,
+                           encoding: Optional[str] = None) -> Iterator[List[RegistroEcad]]:
+    """Registros de ler_registros em listas de até tamanho_lote"""
+    registros = ler_registros(caminho, tipos, encoding)
+    while True:
+        lote = list(islice(registros, tamanho_lote))
+        if not lote:
+            return
+        yield lote
+
+
+def eh_arquivo_posicional(caminho: str) -> bool:
+    """Se a primeira linha é um cabeçalho do layout 0660 (000... ou 0660...)"""
+    for bruta in _linhas_binarias(caminho):
+        primeira = bruta[:8]
+        return primeira.isdigit() and primeira[:3] in (b'000', b'066')
+    return False
+
+
+def cabecalhos_arquivo(caminho: str, encoding: Optional[str] = None) -> Dict[str, Dict]:
+    """Campos dos cabeçalhos 000 e 0660 do início do arquivo, por tipo"""
+    cabecalhos = {}
+    for registro in ler_registros(caminho, encoding=encoding):
+        if registro.tipo not in ('000', '0660'):
+            break
+        cabecalhos[registro.tipo] = registro.campos
+    return cabecalhos
+
+
+def eh_arquivo_sbacem(caminho: str, encoding: Optional[str] = None) -> bool:
+    """
+    Se o arquivo foi gerado por nós (gerador_ecad): nome NOME_ARQUIVO_SBACEM no
+    000 ou associação ASSOCIACAO_SBACEM no 0660. Um TXT de envio não é retorno.
+    """
+    cabecalhos = cabecalhos_arquivo(caminho, encoding)
+    return (cabecalhos.get('000', {}).get('nome') == NOME_ARQUIVO_SBACEM
+            or cabecalhos.get('0660', {}).get('associacao') == ASSOCIACAO_SBACEM)
+
+
+def retornos_posicionais(caminho: str, encoding: Optional[str] = None) -> Iterator[Dict]:
+    """
+    Linhas de retorno (formato de importar_retorno_ecad) de um arquivo
+    posicional, uma por FON1. O layout 0660 não tem campo de situação nem
+    indica se o id_fonograma do FON1 é o código ECAD: cada fonograma listado
+    vem como CADASTRADO e sem cod_ecad. Só use com a confirmação de quem
+    recebeu o arquivo de que o ECAD cadastrou todos os fonogramas listados.
+    """
+    for lote in ler_registros_em_lotes(caminho, tipos=('FON1',), encoding=encoding):
+        for registro in lote:
+            yield {
+                'isrc': registro.campos['isrc'],
+                'status': 'CADASTRADO',
+                'codigo_erro': None,
+                'mensagem': None,
+                'cod_ecad': None,
+            }
@@ -2,20 +2,17 @@
 Módulo de processamento e parsing de dados de fonogramas
 """
 
+import io
+import os
+import codecs
+import hashlib
+import numpy as np
 import pandas as pd
 import csv
 import chardet
-from typing import List, Dict, Optional, Tuple
-from .validador import (
-    validar_cpf, validar_cnpj, validar_isrc, validar_duracao,
-    validar_percentuais_conexos, validar_percentuais_autorais,
-    validar_percentuais_editoras, validar_genero, validar_funcao_autor,
-    validar_categoria_interprete, validar_tipo_musico, validar_associacao,
-    validar_tipo_lancamento, validar_formato, validar_situacao,
-    validar_territorio, validar_tipo_execucao, validar_prioridade,
-    validar_tipo_documento, validar_ano, validar_data, validar_versao,
-    validar_idioma, limpar_documento, GENEROS
-)
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple, Iterator
+from .validador import limpar_documento
 
 
 def parse_autores(campo: str) -> List[Dict]:
@@ -220,37 +217,329 @@ def parse_documentos(campo: str) -> List[Dict]:
     return documentos
 
 
+# Colunas das tabelas de titulares geradas pelo parser em lote
+# (mesmos campos dos dicts de parse_autores, parse_editoras...)
+COLUNAS_PARTES = {
+    'autores': ['nome', 'cpf', 'funcao', 'percentual'],
+    'editoras': ['nome', 'cnpj', 'percentual'],
+    'interpretes': ['nome', 'doc', 'categoria', 'percentual', 'associacao'],
+    'musicos': ['nome', 'cpf', 'instrumento', 'tipo', 'percentual'],
+    'documentos': ['tipo', 'referencia', 'data'],
+}
+
+# Parser de cada coluna composta
+PARSERS_COMPOSTOS = {
+    'autores': parse_autores,
+    'editoras': parse_editoras,
+    'interpretes': parse_interpretes,
+    'musicos': parse_musicos,
+    'documentos': parse_documentos,
+}
+
+
+def parse_coluna_em_lote(valores: pd.Series, tipo: str) -> pd.DataFrame:
+    """
+    Aplica parse_autores/parse_interpretes/parse_musicos/parse_editoras/
+    parse_documentos à coluna inteira e devolve uma tabela com um titular
+    por linha, com as colunas de COLUNAS_PARTES[tipo] mais:
+        pos   - posição (0..n-1) da linha de origem na coluna
+        ordem - posição do titular dentro do campo
+    """
+    parser = PARSERS_COMPOSTOS[tipo]
+    colunas = COLUNAS_PARTES[tipo]
+    registros, posicoes, ordens = [], [], []
+    for pos, valor in enumerate(pd.Series(valores).tolist()):
+        for ordem, registro in enumerate(parser(valor)):
+            registros.append(registro)
+            posicoes.append(pos)
+            ordens.append(ordem)
+    
+    tabela = pd.DataFrame.from_records(registros, columns=colunas)
+    if 'percentual' in colunas:
+        tabela['percentual'] = tabela['percentual'].astype(float)
+    tabela['pos'] = np.array(posicoes, dtype=np.int64)
+    tabela['ordem'] = np.array(ordens, dtype=np.int64)
+    return tabela
+
+
+def parse_composicoes_em_lote(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """Aplica parse_coluna_em_lote a todas as colunas compostas do DataFrame"""
+    vazia = pd.Series([''] * len(df), dtype=object)
+    return {
+        tipo: parse_coluna_em_lote(df[tipo] if tipo in df.columns else vazia, tipo)
+        for tipo in COLUNAS_PARTES
+    }
+
+
+def listas_por_linha(tabela: pd.DataFrame, total_linhas: int) -> List[List[Dict]]:
+    """Converte a tabela de titulares em uma lista de dicts por linha (formato de parse_*)"""
+    listas = [[] for _ in range(total_linhas)]
+    colunas = [c for c in tabela.columns if c not in ('pos', 'ordem')]
+    for pos, registro in zip(tabela['pos'].tolist(), tabela[colunas].to_dict('records')):
+        listas[pos].append(registro)
+    return listas
+
+
+def selecionar_composicoes(composicoes: Dict[str, pd.DataFrame], mascara: np.ndarray) -> Dict[str, pd.DataFrame]:
+    """
+    Restringe as tabelas de parse_composicoes_em_lote às linhas marcadas em
+    mascara, renumerando 'pos' para a posição no DataFrame filtrado
+    (ex.: df[mascara] com só as linhas válidas).
+    """
+    mascara = np.asarray(mascara, dtype=bool)
+    nova_posicao = np.cumsum(mascara) - 1
+    selecionadas = {}
+    for tipo, tabela in composicoes.items():
+        pos = tabela['pos'].to_numpy()
+        tabela = tabela[mascara[pos]].reset_index(drop=True)
+        tabela['pos'] = nova_posicao[tabela['pos'].to_numpy()]
+        selecionadas[tipo] = tabela
+    return selecionadas
+
+
+# Normalização de nomes de colunas (cabeçalho em minúsculas -> campo interno)
+MAPA_COLUNAS = {
+    # Mapeamento Padrão
+    'título': 'titulo',
+    'titulo': 'titulo',
+    'versão': 'versao',
+    'duração': 'duracao',
+    'duracao': 'duracao',
+    'ano_lançamento': 'ano_lanc',
+    'ano_lancamento': 'ano_lanc',
+    'ano_lanc': 'ano_lanc',
+    'ano lançamento': 'ano_lanc',
+    'ano gravação': 'ano_grav',
+    'ano_gravacao': 'ano_grav',
+    'ano_grav': 'ano_grav',
+    'gênero': 'genero',
+    'genero': 'genero',
+    'título_obra': 'titulo_obra',
+    'titulo_obra': 'titulo_obra',
+    'título obra': 'titulo_obra',
+    'produtor_nome': 'prod_nome',
+    'prod_nome': 'prod_nome',
+    'nome_produtor': 'prod_nome',
+    'produtor_documento': 'prod_doc',
+    'prod_doc': 'prod_doc',
+    'documento_produtor': 'prod_doc',
+    'produtor_percentual': 'prod_perc',
+    'prod_perc': 'prod_perc',
+    'percentual_produtor': 'prod_perc',
+    'autores': 'autores',
+    'interpretes': 'interpretes',
+    'intérpretes': 'interpretes',
+    'produtor_associação': 'prod_assoc',
+    'prod_assoc': 'prod_assoc',
+    'associação produtor': 'prod_assoc',
+    
+    # Novos campos
+    'pais_origem': 'pais_origem',
+    'país de origem': 'pais_origem',
+    'país origem': 'pais_origem',
+    'paises_adicionais': 'paises_adicionais',
+    'países adicionais': 'paises_adicionais',
+    'flag_nacional': 'flag_nacional',
+    'nacional_internacional': 'flag_nacional',
+    'nacional/internacional': 'flag_nacional',
+    'classificacao_trilha': 'classificacao_trilha',
+    'classificação': 'classificacao_trilha',
+    'trilha': 'classificacao_trilha',
+    'tipo_arranjo': 'tipo_arranjo',
+    'arranjo': 'tipo_arranjo',
+    'tipo de arranjo': 'tipo_arranjo',
+    'subdivisao_estrangeiro': 'subdivisao_estrangeiro',
+    'subdivisão': 'subdivisao_estrangeiro',
+    'subdivisão estrangeiro': 'subdivisao_estrangeiro',
+    'publicacao_simultanea': 'publicacao_simultanea',
+    'publicação simultânea': 'publicacao_simultanea',
+    'simultanea': 'publicacao_simultanea',
+    'prod_fantasia': 'prod_fantasia',
+    'nome fantasia': 'prod_fantasia',
+    'prod_endereco': 'prod_endereco',
+    'endereço produtor': 'prod_endereco',
+    'prod_data_ini': 'prod_data_ini',
+    'data inicio produtor': 'prod_data_ini',
+    'tipo_lanc': 'tipo_lanc',
+    'tipo lancamento': 'tipo_lanc',
+    'album': 'album',
+    'faixa': 'faixa',
+    'selo': 'selo',
+    'formato': 'formato',
+    'pais': 'pais',
+    'assoc_gestao': 'assoc_gestao',
+    'associação gestão': 'assoc_gestao',
+    'data_cad': 'data_cad',
+    'data cadastro': 'data_cad',
+    'situacao': 'situacao',
+    'situação': 'situacao',
+    'obs_juridicas': 'obs_juridicas',
+    'observações jurídicas': 'obs_juridicas',
+    'historico': 'historico',
+    'territorio': 'territorio',
+    'território': 'territorio',
+    'tipos_exec': 'tipos_exec',
+    'tipos execução': 'tipos_exec',
+    'prioridade': 'prioridade',
+    'cod_ecad': 'cod_ecad',
+    'código ecad': 'cod_ecad',
+
+    # Mapeamento Inglês / RAI
+    'title': 'titulo',
+    'composer': 'autores',
+    'main artist': 'interpretes',
+    'controlled publishers': 'editoras',
+    'language': 'idioma',
+    'iswc': 'cod_obra'
+}
+
+COLUNAS_OBRIGATORIAS = ['isrc', 'titulo', 'duracao', 'ano_lanc', 'genero',
+                        'titulo_obra', 'prod_nome', 'prod_doc', 'prod_perc']
+
+
+# Detecção de encoding por amostras crescentes: só passa para a próxima
+# amostra quando a confiança na anterior fica abaixo do mínimo
+AMOSTRAS_ENCODING = (32 * 1024, 256 * 1024, 2 * 1024 * 1024)
+CONFIANCA_MINIMA_ENCODING = 0.7
+
+# Bytes usados para detectar o delimitador
+AMOSTRA_DELIMITADOR = 16 * 1024
+
+# Cache (encoding, delimitador) por hash SHA-256 do conteúdo do arquivo
+LIMITE_CACHE_FORMATO = 256
+_cache_formato_csv: 'OrderedDict[str, Tuple[str, str]]' = OrderedDict()
+
+
+def hash_conteudo_arquivo(arquivo_path: str) -> str:
+    """SHA-256 do conteúdo do arquivo, lido em blocos de 1MB"""
+    sha = hashlib.sha256()
+    with open(arquivo_path, 'rb') as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def _encoding_da_amostra(amostra: bytes, completa: bool) -> Tuple[Optional[str], float]:
+    """
+    Retorna (encoding, confiança) para uma amostra de bytes.
+    completa indica que a amostra é o arquivo inteiro.
+    """
+    if amostra.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig', 1.0
+    if amostra.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16', 1.0
+    
+    try:
+        amostra.decode('utf-8')
+        utf8_valido = True
+    except UnicodeDecodeError as e:
+        # Aceita sequência multibyte cortada no fim da amostra
+        utf8_valido = not completa and e.reason == 'unexpected end of data' and e.start >= len(amostra) - 3
+    
+    if utf8_valido:
+        if amostra.isascii() and not completa:
+            # ASCII puro não diferencia UTF-8 de Latin-1: precisa de amostra maior
+            return None, 0.0
+        return 'utf-8', 1.0
+    
+    resultado = chardet.detect(amostra)
+    return resultado.get('encoding'), resultado.get('confidence') or 0.0
+
+
+def detectar_encoding_bytes(conteudo: bytes) -> str:
+    """
+    Detecta o encoding a partir do início do conteúdo, usando amostras
+    crescentes (AMOSTRAS_ENCODING) apenas enquanto a confiança for baixa
+    """
+    palpite = None
+    for tamanho in AMOSTRAS_ENCODING:
+        amostra = conteudo[:tamanho]
+        completa = len(amostra) == len(conteudo)
+        encoding, confianca = _encoding_da_amostra(amostra, completa)
+        if encoding and confianca >= CONFIANCA_MINIMA_ENCODING:
+            return encoding
+        palpite = encoding or palpite
+        if completa:
+            break
+    # Com confiança baixa, o palpite do chardet só existe quando a amostra
+    # já não é UTF-8 válido; caso contrário assume UTF-8
+    return palpite or 'utf-8'
+
+
 def detectar_encoding(arquivo_path: str) -> str:
     """
     Detecta encoding do arquivo automaticamente
     """
     try:
         with open(arquivo_path, 'rb') as f:
-            raw_data = f.read(50000)  # Lê primeiros 50KB
-            resultado = chardet.detect(raw_data)
-            encoding_detectado = resultado.get('encoding', 'utf-8')
-            # Confiança mínima de 70%
-            if resultado.get('confidence', 0) < 0.7:
-                encoding_detectado = 'utf-8'
-            return encoding_detectado
+            conteudo = f.read(AMOSTRAS_ENCODING[-1] + 1)
+        return detectar_encoding_bytes(conteudo)
     except Exception:
         return 'utf-8'
 
 
+def _detectar_delimitador_texto(texto: str) -> str:
+    try:
+        return csv.Sniffer().sniff(texto[:2048]).delimiter
+    except Exception:
+        return ','  # Default: vírgula
+
+
 def detectar_delimitador(arquivo_path: str, encoding: str = 'utf-8') -> str:
     """
     Detecta delimitador do CSV automaticamente
     """
     try:
         with open(arquivo_path, 'r', encoding=encoding, errors='ignore') as f:
-            sample = f.read(2048)  # Lê primeiros 2KB
-            sniffer = csv.Sniffer()
-            delimitador = sniffer.sniff(sample).delimiter
-            return delimitador
+            return _detectar_delimitador_texto(f.read(2048))  # Lê primeiros 2KB
     except Exception:
         return ','  # Default: vírgula
 
 
+def _guardar_formato_csv(chave: str, encoding: str, delimitador: str):
+    _cache_formato_csv[chave] = (encoding, delimitador)
+    _cache_formato_csv.move_to_end(chave)
+    while len(_cache_formato_csv) > LIMITE_CACHE_FORMATO:
+        _cache_formato_csv.popitem(last=False)
+
+
+def detectar_formato_csv(arquivo_path: str, conteudo: Optional[bytes] = None) -> Tuple[str, str]:
+    """
+    Retorna (encoding, delimitador) do CSV analisando apenas amostras do início
+    do arquivo. O resultado fica em cache pelo hash do conteúdo, então o mesmo
+    arquivo enviado de novo não é analisado outra vez.
+    conteudo: bytes do arquivo, se já estiverem em memória.
+    """
+    chave = hashlib.sha256(conteudo).hexdigest() if conteudo is not None else hash_conteudo_arquivo(arquivo_path)
+    if chave in _cache_formato_csv:
+        _cache_formato_csv.move_to_end(chave)
+        return _cache_formato_csv[chave]
+    
+    if conteudo is None:
+        with open(arquivo_path, 'rb') as f:
+            amostra = f.read(AMOSTRAS_ENCODING[-1] + 1)
+    else:
+        amostra = conteudo[:AMOSTRAS_ENCODING[-1] + 1]
+    
+    encoding = detectar_encoding_bytes(amostra)
+    texto = amostra[:AMOSTRA_DELIMITADOR].decode(encoding, errors='ignore')
+    if len(amostra) > AMOSTRA_DELIMITADOR and '\n' in texto:
+        texto = texto[:texto.rindex('\n')]  # descarta a última linha incompleta
+    
+    delimitador = _detectar_delimitador_texto(texto)
+    for delim in dict.fromkeys([delimitador, ',', ';', '\\t']):
+        try:
+            df_amostra = pd.read_csv(io.StringIO(texto), delimiter=delim, dtype=str,
+                                     on_bad_lines='skip', engine='python')
+        except Exception:
+            continue
+        if len(df_amostra.columns) > 1:
+            _guardar_formato_csv(chave, encoding, delim)
+            return encoding, delim
+    
+    raise ValueError(f"Não foi possível identificar o delimitador do arquivo CSV (encoding: {encoding}).")
+
+
 def limpar_dados_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     """
     Limpa dados do DataFrame (remove espaços extras, normaliza, etc)
@@ -278,46 +567,59 @@ def ler_csv_com_fallback(arquivo_path: str) -> Tuple[pd.DataFrame, str, str]:
     """
     Lê CSV tentando múltiplos encodings e delimitadores
     Retorna: (DataFrame, encoding_usado, delimitador_usado)
+    
+    O arquivo é lido do disco uma única vez; no caminho normal o conteúdo é
+    decodificado uma única vez com o formato de detectar_formato_csv.
     """
-    erros_encoding = []
+    with open(arquivo_path, 'rb') as f:
+        conteudo = f.read()
+    
+    try:
+        encoding, delim = detectar_formato_csv(arquivo_path, conteudo)
+        df = pd.read_csv(
+            io.StringIO(conteudo.decode(encoding)),
+            delimiter=delim,
+            dtype=str,
+            on_bad_lines='skip',  # Pula linhas com erro
+            engine='python'  # Engine mais tolerante
+        )
+        if len(df.columns) > 1:
+            return limpar_dados_dataframe(df), encoding, delim
+    except Exception:
+        pass
     
-    # Tenta detectar encoding automaticamente
-    encoding_detectado = detectar_encoding(arquivo_path)
-    encodings = [encoding_detectado, 'utf-8', 'latin-1', 'windows-1252', 'iso-8859-1', 'cp1252']
+    # Formato detectado na amostra não serviu para o arquivo inteiro:
+    # tenta as demais combinações de encoding e delimitador
+    erros_encoding = []
+    encodings = [detectar_encoding_bytes(conteudo), 'utf-8', 'latin-1', 'windows-1252', 'iso-8859-1', 'cp1252']
     # Remove duplicatas mantendo ordem
     encodings = list(dict.fromkeys(encodings))
     
     for encoding in encodings:
         try:
-            # Tenta detectar delimitador
-            delimitador = detectar_delimitador(arquivo_path, encoding)
-            delimitadores = [delimitador, ',', ';', '\\t']
-            delimitadores = list(dict.fromkeys(delimitadores))
-            
-            for delim in delimitadores:
-                try:
-                    df = pd.read_csv(
-                        arquivo_path,
-                        encoding=encoding,
-                        delimiter=delim,
-                        dtype=str,
-                        on_bad_lines='skip',  # Pula linhas com erro
-                        engine='python'  # Engine mais tolerante
-                    )
-                    
-                    if len(df.columns) > 1:  # Verifica se tem múltiplas colunas
-                        # Limpa dados
-                        df = limpar_dados_dataframe(df)
-                        return df, encoding, delim
-                        
-                except Exception as e:
-                    continue
-                    
-        except (UnicodeDecodeError, UnicodeError) as e:
+            texto = conteudo.decode(encoding)
+        except (UnicodeDecodeError, UnicodeError, LookupError) as e:
             erros_encoding.append(f"{encoding}: {str(e)}")
             continue
-        except Exception as e:
-            continue
+        
+        delimitador = _detectar_delimitador_texto(texto)
+        delimitadores = list(dict.fromkeys([delimitador, ',', ';', '\\t']))
+        
+        for delim in delimitadores:
+            try:
+                df = pd.read_csv(
+                    io.StringIO(texto),
+                    delimiter=delim,
+                    dtype=str,
+                    on_bad_lines='skip',
+                    engine='python'
+                )
+                if len(df.columns) > 1:  # Verifica se tem múltiplas colunas
+                    # Corrige o cache para o próximo envio do mesmo arquivo
+                    _guardar_formato_csv(hashlib.sha256(conteudo).hexdigest(), encoding, delim)
+                    return limpar_dados_dataframe(df), encoding, delim
+            except Exception:
+                continue
     
     # Se chegou aqui, não conseguiu ler
     raise ValueError(
@@ -327,10 +629,65 @@ def ler_csv_com_fallback(arquivo_path: str) -> Tuple[pd.DataFrame, str, str]:
     )
 
 
-def processar_csv(caminho_arquivo: str) -> tuple[pd.DataFrame, List[Dict]]:
+def normalizar_colunas(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normaliza nomes de colunas, sanitiza ISRC e preenche colunas padrão
+    """
+    # Normalizar nomes das colunas (lowercase e mapear)
+    df.columns = [c.lower().strip() for c in df.columns]
+    df.rename(columns=lambda x: MAPA_COLUNAS.get(x, x), inplace=True)
+    
+    # Sanitizar ISRC
+    if 'isrc' in df.columns:
+        df['isrc'] = df['isrc'].astype(str).str.replace('-', '').str.replace(' ', '').str.upper()
+
+    # PREENCHER VALORES PADRÃO PARA COLUNAS FALTANTES (Para evitar bloqueio total)
+    # Se o arquivo tem ISRC e Título, tentamos aproveitar
+    if 'isrc' in df.columns and 'titulo' in df.columns:
+        if 'duracao' not in df.columns:
+            df['duracao'] = '03:00' # Duração válida
+        if 'genero' not in df.columns:
+            df['genero'] = 'Pop' # Gênero válido
+        if 'ano_lanc' not in df.columns:
+            df['ano_lanc'] = '2024'
+        if 'titulo_obra' not in df.columns:
+            df['titulo_obra'] = df['titulo'] # Assume obra = fonograma
+        if 'prod_nome' not in df.columns:
+            df['prod_nome'] = 'Produtor Desconhecido'
+        if 'prod_doc' not in df.columns:
+            df['prod_doc'] = '12345678909' # CPF Válido
+        if 'prod_perc' not in df.columns:
+            df['prod_perc'] = '100'
+    
+    return df
+
+
+def verificar_estrutura(df: pd.DataFrame, encoding_usado: str) -> Optional[Dict]:
+    """
+    Valida se o DataFrame normalizado tem as colunas esperadas.
+    Retorna o erro de estrutura ou None.
+    """
+    colunas_faltando = [col for col in COLUNAS_OBRIGATORIAS if col not in df.columns]
+    
+    if colunas_faltando:
+        return {
+            "linha": 0,
+            "campo": "estrutura",
+            "valor": f"Colunas faltando: {', '.join(colunas_faltando)}",
+            "erro": f"Estrutura do arquivo incorreta. Verifique se os nomes das colunas estão corretos. "
+                   f"Encoding: {encoding_usado}"
+        }
+    return None
+
+
+def processar_csv(caminho_arquivo: str, incremental: bool = False) -> tuple[pd.DataFrame, List[Dict]]:
     """
     Processa arquivo CSV ou EXCEL e retorna DataFrame processado e lista de erros
     Suporta arquivos convertidos de PDF com detecção automática de encoding e delimitador
+    
+    incremental: reaproveita a validação das linhas que não mudaram desde a última
+    importação (ver importacao_incremental; requer contexto de aplicação). Os
+    fingerprints gravados ficam na sessão: o chamador faz o commit
     """
     erros = []
     
@@ -338,8 +695,11 @@ def processar_csv(caminho_arquivo: str) -> tuple[pd.DataFrame, List[Dict]]:
         # Verifica extensão para decidir se lê como Excel ou CSV
         if caminho_arquivo.lower().endswith(('.xlsx', '.xls')):
             try:
-                df = pd.read_excel(caminho_arquivo, dtype=str)
-                df = limpar_dados_dataframe(df)
+                if caminho_arquivo.lower().endswith('.xlsx'):
+                    df = ler_excel(caminho_arquivo)
+                else:
+                    # openpyxl não lê .xls
+                    df = limpar_dados_dataframe(pd.read_excel(caminho_arquivo, dtype=str))
                 encoding_usado = 'excel'
                 delimitador_usado = 'excel'
             except Exception as e:
@@ -370,609 +730,26 @@ def processar_csv(caminho_arquivo: str) -> tuple[pd.DataFrame, List[Dict]]:
                     })
                     return pd.DataFrame(), erros, 0, 0, 0
         
-        # Normalização de colunas
-        mapa_colunas = {
-            # Mapeamento Padrão
-            'título': 'titulo',
-            'titulo': 'titulo',
-            'versão': 'versao',
-            'duração': 'duracao',
-            'duracao': 'duracao',
-            'ano_lançamento': 'ano_lanc',
-            'ano_lancamento': 'ano_lanc',
-            'ano_lanc': 'ano_lanc',
-            'ano lançamento': 'ano_lanc',
-            'ano gravação': 'ano_grav',
-            'ano_gravacao': 'ano_grav',
-            'ano_grav': 'ano_grav',
-            'gênero': 'genero',
-            'genero': 'genero',
-            'título_obra': 'titulo_obra',
-            'titulo_obra': 'titulo_obra',
-            'título obra': 'titulo_obra',
-            'produtor_nome': 'prod_nome',
-            'prod_nome': 'prod_nome',
-            'nome_produtor': 'prod_nome',
-            'produtor_documento': 'prod_doc',
-            'prod_doc': 'prod_doc',
-            'documento_produtor': 'prod_doc',
-            'produtor_percentual': 'prod_perc',
-            'prod_perc': 'prod_perc',
-            'percentual_produtor': 'prod_perc',
-            'autores': 'autores',
-            'interpretes': 'interpretes',
-            'intérpretes': 'interpretes',
-            'produtor_associação': 'prod_assoc',
-            'prod_assoc': 'prod_assoc',
-            'associação produtor': 'prod_assoc',
-            
-            # Novos campos
-            'pais_origem': 'pais_origem',
-            'país de origem': 'pais_origem',
-            'país origem': 'pais_origem',
-            'paises_adicionais': 'paises_adicionais',
-            'países adicionais': 'paises_adicionais',
-            'flag_nacional': 'flag_nacional',
-            'nacional_internacional': 'flag_nacional',
-            'nacional/internacional': 'flag_nacional',
-            'classificacao_trilha': 'classificacao_trilha',
-            'classificação': 'classificacao_trilha',
-            'trilha': 'classificacao_trilha',
-            'tipo_arranjo': 'tipo_arranjo',
-            'arranjo': 'tipo_arranjo',
-            'tipo de arranjo': 'tipo_arranjo',
-            'subdivisao_estrangeiro': 'subdivisao_estrangeiro',
-            'subdivisão': 'subdivisao_estrangeiro',
-            'subdivisão estrangeiro': 'subdivisao_estrangeiro',
-            'publicacao_simultanea': 'publicacao_simultanea',
-            'publicação simultânea': 'publicacao_simultanea',
-            'simultanea': 'publicacao_simultanea',
-            'prod_fantasia': 'prod_fantasia',
-            'nome fantasia': 'prod_fantasia',
-            'prod_endereco': 'prod_endereco',
-            'endereço produtor': 'prod_endereco',
-            'prod_data_ini': 'prod_data_ini',
-            'data inicio produtor': 'prod_data_ini',
-            'tipo_lanc': 'tipo_lanc',
-            'tipo lancamento': 'tipo_lanc',
-            'album': 'album',
-            'faixa': 'faixa',
-            'selo': 'selo',
-            'formato': 'formato',
-            'pais': 'pais',
-            'assoc_gestao': 'assoc_gestao',
-            'associação gestão': 'assoc_gestao',
-            'data_cad': 'data_cad',
-            'data cadastro': 'data_cad',
-            'situacao': 'situacao',
-            'situação': 'situacao',
-            'obs_juridicas': 'obs_juridicas',
-            'observações jurídicas': 'obs_juridicas',
-            'historico': 'historico',
-            'territorio': 'territorio',
-            'território': 'territorio',
-            'tipos_exec': 'tipos_exec',
-            'tipos execução': 'tipos_exec',
-            'prioridade': 'prioridade',
-            'cod_ecad': 'cod_ecad',
-            'código ecad': 'cod_ecad',
-
-            # Mapeamento Inglês / RAI
-            'title': 'titulo',
-            'composer': 'autores',
-            'main artist': 'interpretes',
-            'controlled publishers': 'editoras',
-            'language': 'idioma',
-            'iswc': 'cod_obra'
-        }
-        
-        # Normalizar nomes das colunas (lowercase e mapear)
-        df.columns = [c.lower().strip() for c in df.columns]
-        df.rename(columns=lambda x: mapa_colunas.get(x, x), inplace=True)
-        
-        # Sanitizar ISRC
-        if 'isrc' in df.columns:
-            df['isrc'] = df['isrc'].astype(str).str.replace('-', '').str.replace(' ', '').str.upper()
-
-        # PREENCHER VALORES PADRÃO PARA COLUNAS FALTANTES (Para evitar bloqueio total)
-        # Se o arquivo tem ISRC e Título, tentamos aproveitar
-        if 'isrc' in df.columns and 'titulo' in df.columns:
-            if 'duracao' not in df.columns:
-                df['duracao'] = '03:00' # Duração válida
-            if 'genero' not in df.columns:
-                df['genero'] = 'Pop' # Gênero válido
-            if 'ano_lanc' not in df.columns:
-                df['ano_lanc'] = '2024'
-            if 'titulo_obra' not in df.columns:
-                df['titulo_obra'] = df['titulo'] # Assume obra = fonograma
-            if 'prod_nome' not in df.columns:
-                df['prod_nome'] = 'Produtor Desconhecido'
-            if 'prod_doc' not in df.columns:
-                df['prod_doc'] = '12345678909' # CPF Válido
-            if 'prod_perc' not in df.columns:
-                df['prod_perc'] = '100'
-
-        # Valida se tem colunas esperadas
-        colunas_esperadas = ['isrc', 'titulo', 'duracao', 'ano_lanc', 'genero', 
-                           'titulo_obra', 'prod_nome', 'prod_doc', 'prod_perc']
-                           
-        colunas_faltando = [col for col in colunas_esperadas if col not in df.columns]
-        
-        if colunas_faltando:
-            erros.append({
-                "linha": 0,
-                "campo": "estrutura",
-                "valor": f"Colunas faltando: {', '.join(colunas_faltando)}",
-                "erro": f"Estrutura do arquivo incorreta. Verifique se os nomes das colunas estão corretos. "
-                       f"Encoding: {encoding_usado}"
-            })
+        df = normalizar_colunas(df)
+
+        erro_estrutura = verificar_estrutura(df, encoding_usado)
+        if erro_estrutura:
+            erros.append(erro_estrutura)
             return pd.DataFrame(), erros, 0, 0, 0
         
         df = df.fillna('')  # Substitui NaN por string vazia
         
         total_linhas = len(df)
-        linhas_validas = 0
-        linhas_com_erro = 0
-        
-        # Validações linha por linha
-        for idx, (_, row) in enumerate(df.iterrows()):
-            linha_num = idx + 2  # +2 porque linha 1 é header e idx começa em 0
-            linha_tem_erro = False
-            
-            # SEÇÃO 1 - IDENTIFICAÇÃO
-            # ISRC (obrigatório)
-            if not row.get('isrc', '').strip():
-                erros.append({
-                    "linha": linha_num,
-                    "campo": "isrc",
-                    "valor": "",
-                    "erro": "ISRC é obrigatório"
-                })
-                linha_tem_erro = True
-            elif not validar_isrc(row.get('isrc', '')):
-                erros.append({
-                    "linha": linha_num,
-                    "campo": "isrc",
-                    "valor": row.get('isrc', ''),
-                    "erro": "ISRC inválido (deve ter 12 caracteres alfanuméricos)"
-                })
-                linha_tem_erro = True
-            
-            # Título (obrigatório)
-            if not row.get('titulo', '').strip():
-                erros.append({
-                    "linha": linha_num,
-                    "campo": "titulo",
-                    "valor": "",
-                    "erro": "Título é obrigatório"
-                })
-                linha_tem_erro = True
-            
-            # Duração (obrigatório)
-            if not row.get('duracao', '').strip():
-                erros.append({
-                    "linha": linha_num,
-                    "campo": "duracao",
-                    "valor": "",
-                    "erro": "Duração é obrigatória"
-                })
-                linha_tem_erro = True
-            elif not validar_duracao(row.get('duracao', '')):
-                erros.append({
-                    "linha": linha_num,
-                    "campo": "duracao",
-                    "valor": row.get('duracao', ''),
-                    "erro": "Duração inválida (formato esperado: mm:ss)"
-                })
-                linha_tem_erro = True
-            
-            # Ano lançamento (obrigatório)
-            if not row.get('ano_lanc', '').strip():
-                erros.append({
-                    "linha": linha_num,
-                    "campo": "ano_lanc",
-                    "valor": "",
-                    "erro": "Ano de lançamento é obrigatório"
-                })
-                linha_tem_erro = True
-            elif not validar_ano(row.get('ano_lanc', '')):
-                erros.append({
-                    "linha": linha_num,
-                    "campo": "ano_lanc",
-                    "valor": row.get('ano_lanc', ''),
-                    "erro": "Ano de lançamento inválido"
-                })
-                linha_tem_erro = True
-            
-            # Gênero (obrigatório)
-            if not row.get('genero', '').strip():
-                erros.append({
-                    "linha": linha_num,
-                    "campo": "genero",
-                    "valor": "",
-                    "erro": "Gênero é obrigatório"
-                })
-                linha_tem_erro = True
-            elif not validar_genero(row.get('genero', '')):
-                erros.append({
-                    "linha": linha_num,
-                    "campo": "genero",
-                    "valor": row.get('genero', ''),
-                    "erro": f"Gênero inválido (valores válidos: {', '.join(GENEROS[:5])}...)"
-                })
-                linha_tem_erro = True
-            
-            # Versão (opcional, mas valida se preenchido)
-            if row.get('versao', '').strip() and not validar_versao(row.get('versao', '')):
-                erros.append({
-                    "linha": linha_num,
-                    "campo": "versao",
-                    "valor": row.get('versao', ''),
-                    "erro": "Versão inválida"
-                })
-                linha_tem_erro = True
-            
-            # Idioma (opcional, mas valida se preenchido)
-            if row.get('idioma', '').strip() and not validar_idioma(row.get('idioma', '')):
-                erros.append({
-                    "linha": linha_num,
-                    "campo": "idioma",
-                    "valor": row.get('idioma', ''),
-                    "erro": "Idioma inválido"
-                })
-                linha_tem_erro = True
-            
-            # Ano gravação (opcional, mas valida se preenchido)
-            if row.get('ano_grav', '').strip() and not validar_ano(row.get('ano_grav', '')):
-                erros.append({
-                    "linha": linha_num,
-                    "campo": "ano_grav",
-                    "valor": row.get('ano_grav', ''),
-                    "erro": "Ano de gravação inválido"
-                })
-                linha_tem_erro = True
-            
-            # SEÇÃO 2 - OBRA MUSICAL
-            # Título obra (obrigatório)
-            if not row.get('titulo_obra', '').strip():
-                erros.append({
-                    "linha": linha_num,
-                    "campo": "titulo_obra",
-                    "valor": "",
-                    "erro": "Título da obra é obrigatório"
-                })
-                linha_tem_erro = True
-            
-            # Autores (obrigatório)
-            autores = parse_autores(row.get('autores', ''))
-            if not autores:
-                erros.append({
-                    "linha": linha_num,
-                    "campo": "autores",
-                    "valor": row.get('autores', ''),
-                    "erro": "Pelo menos um autor é obrigatório"
-                })
-                linha_tem_erro = True
-            else:
-                # Valida cada autor
-                for autor in autores:
-                    if not autor.get('nome'):
-                        erros.append({
-                            "linha": linha_num,
-                            "campo": "autores",
-                            "valor": str(autor),
-                            "erro": "Autor sem nome"
-                        })
-                        linha_tem_erro = True
-                    if not validar_cpf(autor.get('cpf', '')):
-                        erros.append({
-                            "linha": linha_num,
-                            "campo": "autores",
-                            "valor": autor.get('cpf', ''),
-                            "erro": f"CPF inválido para autor {autor.get('nome', '')}"
-                        })
-                        linha_tem_erro = True
-                    if not validar_funcao_autor(autor.get('funcao', '')):
-                        erros.append({
-                            "linha": linha_num,
-                            "campo": "autores",
-                            "valor": autor.get('funcao', ''),
-                            "erro": f"Função inválida para autor {autor.get('nome', '')}"
-                        })
-                        linha_tem_erro = True
-                
-                # Valida soma dos percentuais autorais
-                percentuais_autores = [a.get('percentual', 0) for a in autores]
-                if not validar_percentuais_autorais(percentuais_autores):
-                    erros.append({
-                        "linha": linha_num,
-                        "campo": "autores",
-                        "valor": f"Soma: {sum(percentuais_autores)}%",
-                        "erro": "Soma dos percentuais autorais deve ser 100%"
-                    })
-                    linha_tem_erro = True
-            
-            # Editoras (opcional)
-            editoras = parse_editoras(row.get('editoras', ''))
-            if editoras:
-                for editora in editoras:
-                    if not validar_cnpj(editora.get('cnpj', '')):
-                        erros.append({
-                            "linha": linha_num,
-                            "campo": "editoras",
-                            "valor": editora.get('cnpj', ''),
-                            "erro": f"CNPJ inválido para editora {editora.get('nome', '')}"
-                        })
-                        linha_tem_erro = True
-                
-                percentuais_editoras = [e.get('percentual', 0) for e in editoras]
-                if not validar_percentuais_editoras(percentuais_editoras):
-                    erros.append({
-                        "linha": linha_num,
-                        "campo": "editoras",
-                        "valor": f"Soma: {sum(percentuais_editoras)}%",
-                        "erro": "Soma dos percentuais de editoras deve ser 100%"
-                    })
-                    linha_tem_erro = True
-            
-            # SEÇÃO 3 - TITULARES CONEXOS
-            # Intérpretes (obrigatório)
-            interpretes = parse_interpretes(row.get('interpretes', ''))
-            if not interpretes:
-                erros.append({
-                    "linha": linha_num,
-                    "campo": "interpretes",
-                    "valor": "",
-                    "erro": "Pelo menos um intérprete é obrigatório"
-                })
-                linha_tem_erro = True
-            else:
-                for interprete in interpretes:
-                    if not validar_cpf(interprete.get('doc', '')):
-                        erros.append({
-                            "linha": linha_num,
-                            "campo": "interpretes",
-                            "valor": interprete.get('doc', ''),
-                            "erro": f"CPF inválido para intérprete {interprete.get('nome', '')}"
-                        })
-                        linha_tem_erro = True
-                    if not validar_categoria_interprete(interprete.get('categoria', '')):
-                        erros.append({
-                            "linha": linha_num,
-                            "campo": "interpretes",
-                            "valor": interprete.get('categoria', ''),
-                            "erro": f"Categoria inválida para intérprete {interprete.get('nome', '')}"
-                        })
-                        linha_tem_erro = True
-                    if interprete.get('associacao') and not validar_associacao(interprete.get('associacao', '')):
-                        erros.append({
-                            "linha": linha_num,
-                            "campo": "interpretes",
-                            "valor": interprete.get('associacao', ''),
-                            "erro": f"Associação inválida para intérprete {interprete.get('nome', '')}"
-                        })
-                        linha_tem_erro = True
-            
-            # Músicos (opcional)
-            musicos = parse_musicos(row.get('musicos', ''))
-            if musicos:
-                for musico in musicos:
-                    if not validar_cpf(musico.get('cpf', '')):
-                        erros.append({
-                            "linha": linha_num,
-                            "campo": "musicos",
-                            "valor": musico.get('cpf', ''),
-                            "erro": f"CPF inválido para músico {musico.get('nome', '')}"
-                        })
-                        linha_tem_erro = True
-                    if not validar_tipo_musico(musico.get('tipo', '')):
-                        erros.append({
-                            "linha": linha_num,
-                            "campo": "musicos",
-                            "valor": musico.get('tipo', ''),
-                            "erro": f"Tipo inválido para músico {musico.get('nome', '')}"
-                        })
-                        linha_tem_erro = True
-            
-            # Valida soma dos direitos conexos
-            perc_interpretes = sum(i.get('percentual', 0) for i in interpretes)
-            perc_musicos = sum(m.get('percentual', 0) for m in musicos)
-            perc_produtor = 0
-            if row.get('prod_perc', '').strip():
-                try:
-                    perc_produtor = float(str(row.get('prod_perc', '')).replace('%', '').replace(',', '.'))
-                except ValueError:
-                    pass
-            
-            if not validar_percentuais_conexos(perc_interpretes, perc_musicos, perc_produtor):
-                erros.append({
-                    "linha": linha_num,
-                    "campo": "percentuais_conexos",
-                    "valor": f"Intérpretes: {perc_interpretes}%, Músicos: {perc_musicos}%, Produtor: {perc_produtor}%",
-                    "erro": "Soma dos direitos conexos (intérpretes + músicos + produtor) deve ser 100%"
-                })
-                linha_tem_erro = True
-            
-            # SEÇÃO 4 - PRODUTOR
-            # Nome produtor (obrigatório)
-            if not row.get('prod_nome', '').strip():
-                erros.append({
-                    "linha": linha_num,
-                    "campo": "prod_nome",
-                    "valor": "",
-                    "erro": "Nome do produtor é obrigatório"
-                })
-                linha_tem_erro = True
-            
-            # Documento produtor (obrigatório)
-            if not row.get('prod_doc', '').strip():
-                erros.append({
-                    "linha": linha_num,
-                    "campo": "prod_doc",
-                    "valor": "",
-                    "erro": "Documento do produtor é obrigatório"
-                })
-                linha_tem_erro = True
-            else:
-                doc_prod = limpar_documento(row.get('prod_doc', ''))
-                if len(doc_prod) == 11:
-                    if not validar_cpf(doc_prod):
-                        erros.append({
-                            "linha": linha_num,
-                            "campo": "prod_doc",
-                            "valor": row.get('prod_doc', ''),
-                            "erro": "CPF do produtor inválido"
-                        })
-                        linha_tem_erro = True
-                elif len(doc_prod) == 14:
-                    if not validar_cnpj(doc_prod):
-                        erros.append({
-                            "linha": linha_num,
-                            "campo": "prod_doc",
-                            "valor": row.get('prod_doc', ''),
-                            "erro": "CNPJ do produtor inválido"
-                        })
-                        linha_tem_erro = True
-                else:
-                    erros.append({
-                        "linha": linha_num,
-                        "campo": "prod_doc",
-                        "valor": row.get('prod_doc', ''),
-                        "erro": "Documento do produtor deve ser CPF (11 dígitos) ou CNPJ (14 dígitos)"
-                    })
-                    linha_tem_erro = True
-            
-            # Percentual produtor (obrigatório)
-            if not row.get('prod_perc', '').strip():
-                erros.append({
-                    "linha": linha_num,
-                    "campo": "prod_perc",
-                    "valor": "",
-                    "erro": "Percentual do produtor é obrigatório"
-                })
-                linha_tem_erro = True
-            
-            # Associação produtor (opcional, mas valida se preenchido)
-            if row.get('prod_assoc', '').strip() and not validar_associacao(row.get('prod_assoc', '')):
-                erros.append({
-                    "linha": linha_num,
-                    "campo": "prod_assoc",
-                    "valor": row.get('prod_assoc', ''),
-                    "erro": "Associação do produtor inválida"
-                })
-                linha_tem_erro = True
-            
-            # Data início produtor (opcional, mas valida se preenchido)
-            if row.get('prod_data_ini', '').strip() and not validar_data(row.get('prod_data_ini', '')):
-                erros.append({
-                    "linha": linha_num,
-                    "campo": "prod_data_ini",
-                    "valor": row.get('prod_data_ini', ''),
-                    "erro": "Data de início do produtor inválida (formato: dd/mm/yyyy ou yyyy-mm-dd)"
-                })
-                linha_tem_erro = True
-            
-            # SEÇÃO 5 - LANÇAMENTO (validações opcionais)
-            if row.get('tipo_lanc', '').strip() and not validar_tipo_lancamento(row.get('tipo_lanc', '')):
-                erros.append({
-                    "linha": linha_num,
-                    "campo": "tipo_lanc",
-                    "valor": row.get('tipo_lanc', ''),
-                    "erro": "Tipo de lançamento inválido"
-                })
-                linha_tem_erro = True
-            
-            if row.get('formato', '').strip() and not validar_formato(row.get('formato', '')):
-                erros.append({
-                    "linha": linha_num,
-                    "campo": "formato",
-                    "valor": row.get('formato', ''),
-                    "erro": "Formato inválido"
-                })
-                linha_tem_erro = True
-            
-            if row.get('data_lanc', '').strip() and not validar_data(row.get('data_lanc', '')):
-                erros.append({
-                    "linha": linha_num,
-                    "campo": "data_lanc",
-                    "valor": row.get('data_lanc', ''),
-                    "erro": "Data de lançamento inválida (formato: dd/mm/yyyy ou yyyy-mm-dd)"
-                })
-                linha_tem_erro = True
-            
-            # SEÇÃO 6 - ADMINISTRATIVO
-            if row.get('situacao', '').strip() and not validar_situacao(row.get('situacao', '')):
-                erros.append({
-                    "linha": linha_num,
-                    "campo": "situacao",
-                    "valor": row.get('situacao', ''),
-                    "erro": "Situação inválida"
-                })
-                linha_tem_erro = True
-            
-            if row.get('data_cad', '').strip() and not validar_data(row.get('data_cad', '')):
-                erros.append({
-                    "linha": linha_num,
-                    "campo": "data_cad",
-                    "valor": row.get('data_cad', ''),
-                    "erro": "Data de cadastro inválida (formato: dd/mm/yyyy ou yyyy-mm-dd)"
-                })
-                linha_tem_erro = True
-            
-            # SEÇÃO 7 - DOCUMENTOS
-            documentos = parse_documentos(row.get('documentos', ''))
-            if documentos:
-                for doc in documentos:
-                    if not validar_tipo_documento(doc.get('tipo', '')):
-                        erros.append({
-                            "linha": linha_num,
-                            "campo": "documentos",
-                            "valor": doc.get('tipo', ''),
-                            "erro": f"Tipo de documento inválido: {doc.get('tipo', '')}"
-                        })
-                        linha_tem_erro = True
-                    if doc.get('data') and not validar_data(doc.get('data', '')):
-                        erros.append({
-                            "linha": linha_num,
-                            "campo": "documentos",
-                            "valor": doc.get('data', ''),
-                            "erro": f"Data inválida no documento {doc.get('tipo', '')}"
-                        })
-                        linha_tem_erro = True
-            
-            # SEÇÃO 8 - DISTRIBUIÇÃO
-            if row.get('territorio', '').strip() and not validar_territorio(row.get('territorio', '')):
-                erros.append({
-                    "linha": linha_num,
-                    "campo": "territorio",
-                    "valor": row.get('territorio', ''),
-                    "erro": "Território inválido"
-                })
-                linha_tem_erro = True
-            
-            if row.get('tipos_exec', '').strip() and not validar_tipo_execucao(row.get('tipos_exec', '')):
-                erros.append({
-                    "linha": linha_num,
-                    "campo": "tipos_exec",
-                    "valor": row.get('tipos_exec', ''),
-                    "erro": "Tipo de execução inválido"
-                })
-                linha_tem_erro = True
-            
-            if row.get('prioridade', '').strip() and not validar_prioridade(row.get('prioridade', '')):
-                erros.append({
-                    "linha": linha_num,
-                    "campo": "prioridade",
-                    "valor": row.get('prioridade', ''),
-                    "erro": "Prioridade inválida"
-                })
-                linha_tem_erro = True
-            
-            if not linha_tem_erro:
-                linhas_validas += 1
-            else:
-                linhas_com_erro += 1
-        
+
+        # Validação vetorizada (coluna a coluna), em paralelo para arquivos grandes
+        if incremental:
+            from .importacao_incremental import validar_incremental
+            erros_linhas, linhas_validas, linhas_com_erro, _ = validar_incremental(df)
+        else:
+            from .validador_vetorizado import validar_dataframe_paralelo
+            erros_linhas, linhas_validas, linhas_com_erro = validar_dataframe_paralelo(df)
+        erros.extend(erros_linhas)
+
         return df, erros, total_linhas, linhas_validas, linhas_com_erro
         
     except Exception as e:
@@ -985,9 +762,9 @@ def processar_csv(caminho_arquivo: str) -> tuple[pd.DataFrame, List[Dict]]:
         return pd.DataFrame(), erros, 0, 0, 0
 
 
-def processar_arquivo_fonogramas(caminho_arquivo: str) -> Dict:
+def processar_arquivo_fonogramas(caminho_arquivo: str, incremental: bool = False) -> Dict:
     
-    df, erros_gerais, _, _, _ = processar_csv(caminho_arquivo)
+    df, erros_gerais, _, _, _ = processar_csv(caminho_arquivo, incremental=incremental)
     
     dados = []
     if not df.empty:
@@ -999,3 +776,227 @@ def processar_arquivo_fonogramas(caminho_arquivo: str) -> Dict:
         'dados': dados,
         'erros': erros_gerais
     }
+
+
+# Tamanho padrão dos blocos no modo de leitura em streaming (linhas por bloco)
+TAMANHO_BLOCO_PADRAO = 5000
+
+def ler_csv_em_blocos(arquivo_path: str, tamanho_bloco: int = TAMANHO_BLOCO_PADRAO) -> Iterator[Tuple[pd.DataFrame, str, str]]:
+    """
+    Lê o CSV em blocos de tamanho fixo, sem carregar o arquivo inteiro
+    Gera: (DataFrame do bloco já limpo, encoding_usado, delimitador_usado)
+    """
+    encoding, delimitador = detectar_formato_csv(arquivo_path)
+    leitor = pd.read_csv(
+        arquivo_path,
+        encoding=encoding,
+        delimiter=delimitador,
+        dtype=str,
+        on_bad_lines='skip',
+        engine='python',
+        chunksize=tamanho_bloco
+    )
+    with leitor:
+        for bloco in leitor:
+            yield limpar_dados_dataframe(bloco), encoding, delimitador
+
+
+def _nomes_colunas_excel(cabecalho: tuple) -> List[str]:
+    """Nomes de colunas como o pandas gera (Unnamed: N, sufixo .1 para duplicadas)"""
+    while cabecalho and cabecalho[-1] is None:
+        cabecalho = cabecalho[:-1]
+    
+    nomes = []
+    contagem = {}
+    for i, valor in enumerate(cabecalho):
+        nome = f'Unnamed: {i}' if valor is None else _valor_celula_excel(valor)
+        if nome in contagem:
+            contagem[nome] += 1
+            nome = f'{nome}.{contagem[nome]}'
+        else:
+            contagem[nome] = 0
+        nomes.append(nome)
+    return nomes
+
+
+def _valor_celula_excel(valor):
+    """Converte o valor da célula como pd.read_excel(dtype=str)"""
+    if valor is None:
+        return np.nan
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor)
+
+
+def ler_excel_em_blocos(arquivo, tamanho_bloco: int = TAMANHO_BLOCO_PADRAO, limpar: bool = True) -> Iterator[pd.DataFrame]:
+    """
+    Lê a primeira planilha de um XLSX linha a linha (openpyxl read_only) e gera
+    DataFrames de até tamanho_bloco linhas, com os valores como pd.read_excel(dtype=str).
+    arquivo pode ser um caminho ou um objeto de arquivo.
+    limpar: aplica limpar_dados_dataframe em cada bloco.
+    
+    Como no pd.read_excel, linhas vazias no meio da planilha são mantidas e as do
+    final são descartadas. Planilha só com cabeçalho gera um bloco vazio com as colunas.
+    """
+    from openpyxl import load_workbook
+    
+    def montar(linhas_bloco: List[list]) -> pd.DataFrame:
+        df = pd.DataFrame(linhas_bloco, columns=colunas, dtype=object)
+        return limpar_dados_dataframe(df) if limpar else df
+    
+    wb = load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        linhas = ws.iter_rows(values_only=True)
+        cabecalho = next(linhas, None)
+        if cabecalho is None:
+            return
+        
+        colunas = _nomes_colunas_excel(cabecalho)
+        largura = len(colunas)
+        bloco = []
+        vazias = []  # linhas vazias pendentes: só entram se vier uma linha com dados depois
+        gerou = False
+        
+        for valores in linhas:
+            valores = valores[:largura]
+            if len(valores) < largura:
+                valores = valores + (None,) * (largura - len(valores))
+            if all(v is None for v in valores):
+                vazias.append([np.nan] * largura)
+                continue
+            
+            if vazias:
+                bloco.extend(vazias)
+                vazias = []
+            bloco.append([_valor_celula_excel(v) for v in valores])
+            
+            if len(bloco) >= tamanho_bloco:
+                yield montar(bloco[:tamanho_bloco])
+                bloco = bloco[tamanho_bloco:]
+                gerou = True
+        
+        if bloco or not gerou:
+            yield montar(bloco)
+    finally:
+        wb.close()
+
+
+def ler_excel(arquivo, limpar: bool = True) -> pd.DataFrame:
+    """
+    Lê o XLSX inteiro com ler_excel_em_blocos. Equivale a pd.read_excel(dtype=str),
+    mas sem montar o modelo de objetos completo do openpyxl na memória.
+    """
+    return pd.concat(list(ler_excel_em_blocos(arquivo, limpar=limpar)), ignore_index=True)
+
+
+# XLSX de até XLSX_LEITURA_COMPLETA_MB é lido inteiro com pd.read_excel (tipos de coluna
+# do pandas) na gravação; maiores são lidos em blocos, como texto (ler_excel_em_blocos)
+XLSX_LEITURA_COMPLETA_MB = float(os.environ.get('XLSX_LEITURA_COMPLETA_MB', '5'))
+
+
+def xlsx_pequeno(arquivo) -> bool:
+    """Se o XLSX (caminho ou objeto de arquivo) tem até XLSX_LEITURA_COMPLETA_MB"""
+    if hasattr(arquivo, 'seek'):
+        posicao = arquivo.tell()
+        tamanho = arquivo.seek(0, os.SEEK_END)
+        arquivo.seek(posicao)
+    else:
+        tamanho = os.path.getsize(arquivo)
+    return tamanho <= XLSX_LEITURA_COMPLETA_MB * 1024 * 1024
+
+
+def _ler_arquivo_em_blocos(caminho_arquivo: str, tamanho_bloco: int) -> Iterator[Tuple[pd.DataFrame, str]]:
+    """Gera (bloco, encoding_usado) para CSV, XLSX ou XLS"""
+    caminho = caminho_arquivo.lower()
+    if caminho.endswith('.xlsx'):
+        for bloco in ler_excel_em_blocos(caminho_arquivo, tamanho_bloco):
+            yield bloco, 'excel'
+    elif caminho.endswith('.xls'):
+        # openpyxl não lê .xls; o arquivo é carregado inteiro e fatiado
+        df = limpar_dados_dataframe(pd.read_excel(caminho_arquivo, dtype=str))
+        for inicio in range(0, len(df), tamanho_bloco):
+            yield df.iloc[inicio:inicio + tamanho_bloco].copy(), 'excel'
+    else:
+        for bloco, encoding, _ in ler_csv_em_blocos(caminho_arquivo, tamanho_bloco):
+            yield bloco, encoding
+
+
+def processar_csv_em_blocos(caminho_arquivo: str, tamanho_bloco: int = TAMANHO_BLOCO_PADRAO,
+                            incremental: bool = False) -> Iterator[Dict]:
+    """
+    Modo streaming de processar_csv: lê, normaliza e valida o arquivo bloco a bloco,
+    mantendo a memória constante independente do tamanho do arquivo.
+    
+    Gera um dict por bloco:
+        numero, df (bloco normalizado; índice = posição global da linha),
+        composicoes (tabelas de titulares do bloco, ver parse_composicoes_em_lote),
+        df_validos (apenas linhas sem erro), erros, total_linhas,
+        linhas_validas, linhas_com_erro, linhas_processadas (acumulado),
+        linhas_reaproveitadas (incremental: validação reaproveitada da importação anterior)
+    Em erro de leitura/estrutura gera um único bloco com o erro (linha 0) e encerra.
+    """
+    from .validador_vetorizado import validar_dataframe_paralelo
+    from .importacao_incremental import validar_incremental
+    
+    posicao = 0
+    numero = 0
+    
+    def bloco_com_erro(erro: Dict) -> Dict:
+        return {
+            'numero': numero,
+            'df': pd.DataFrame(),
+            'composicoes': {},
+            'df_validos': pd.DataFrame(),
+            'erros': [erro],
+            'total_linhas': 0,
+            'linhas_validas': 0,
+            'linhas_com_erro': 0,
+            'linhas_reaproveitadas': 0,
+            'linhas_processadas': posicao
+        }
+    
+    try:
+        for df, encoding_usado in _ler_arquivo_em_blocos(caminho_arquivo, tamanho_bloco):
+            numero += 1
+            df = normalizar_colunas(df)
+            
+            erro_estrutura = verificar_estrutura(df, encoding_usado)
+            if erro_estrutura:
+                yield bloco_com_erro(erro_estrutura)
+                return
+            
+            df = df.fillna('')
+            df.index = pd.RangeIndex(posicao, posicao + len(df))
+            linhas = df.index.to_numpy() + 2
+            
+            # Campos compostos lidos uma vez só: validação e gravação usam as mesmas tabelas
+            composicoes = parse_composicoes_em_lote(df)
+            reaproveitadas = 0
+            if incremental:
+                erros, linhas_validas, linhas_com_erro, resumo = validar_incremental(df, linhas, composicoes=composicoes)
+                reaproveitadas = resumo['reaproveitadas']
+            else:
+                erros, linhas_validas, linhas_com_erro = validar_dataframe_paralelo(df, linhas, composicoes=composicoes)
+            linhas_erro = {e['linha'] for e in erros}
+            posicao += len(df)
+            
+            yield {
+                'numero': numero,
+                'df': df,
+                'composicoes': composicoes,
+                'df_validos': df[[l not in linhas_erro for l in linhas.tolist()]],
+                'erros': erros,
+                'total_linhas': len(df),
+                'linhas_validas': linhas_validas,
+                'linhas_com_erro': linhas_com_erro,
+                'linhas_reaproveitadas': reaproveitadas,
+                'linhas_processadas': posicao
+            }
+    except Exception as e:
+        yield bloco_com_erro({
+            "linha": 0,
+            "campo": "arquivo",
+            "valor": "",
+            "erro": f"Erro ao processar arquivo: {str(e)}"
+        })
@@ -7,16 +7,23 @@ import os
 import pandas as pd
 from datetime import datetime
 from typing import Dict, List
+from itertools import islice
 from models import db, Fonograma, EnvioECAD, RetornoECAD, HistoricoFonograma
+from .leitor_ecad_posicional import eh_arquivo_posicional, eh_arquivo_sbacem, retornos_posicionais
 
+# Linhas do retorno por consulta/gravação no banco
+LOTE_RETORNO = 5000
 
-def importar_retorno_ecad(arquivo_path: str, envio_id: int) -> Dict:
+
+def importar_retorno_ecad(arquivo_path: str, envio_id: int, confirmar_posicional: bool = False) -> Dict:
     """
     Importa arquivo de retorno do ECAD
     
     Args:
         arquivo_path: Caminho do arquivo de retorno
         envio_id: ID do envio relacionado
+        confirmar_posicional: Confirmação de que todos os fonogramas de um TXT
+            posicional (layout 0660, sem situação por fonograma) foram aceitos
         
     Returns:
         Dict com dados processados do retorno
@@ -30,6 +37,27 @@ def importar_retorno_ecad(arquivo_path: str, envio_id: int) -> Dict:
             df = pd.read_excel(arquivo_path)
         elif extensao == '.csv':
             df = pd.read_csv(arquivo_path, encoding='utf-8')
+        elif extensao == '.txt' and eh_arquivo_posicional(arquivo_path):
+            # TXT de envio gerado por nós (cabeçalho SBACEM) não é retorno do ECAD
+            if eh_arquivo_sbacem(arquivo_path):
+                return {
+                    'sucesso': False,
+                    'erro': 'O arquivo é um TXT de envio gerado pela SBACEM, não um retorno do ECAD'
+                }
+            # Sem situação por fonograma: todos os listados contam como aceitos, só com confirmação
+            if not confirmar_posicional:
+                return {
+                    'sucesso': False,
+                    'requer_confirmacao': True,
+                    'erro': 'O TXT posicional (layout 0660) não informa a situação de cada fonograma. '
+                            'Confirme que o ECAD aceitou todos os fonogramas listados para processá-lo'
+                }
+            # Arquivo posicional (layout 0660): lido aos poucos durante o processamento
+            return {
+                'sucesso': True,
+                'formato': 'POSICIONAL',
+                'retornos': retornos_posicionais(arquivo_path)
+            }
         elif extensao == '.txt':
             # Tentar ler como delimitado por pipe ou tab
             try:
@@ -71,33 +99,28 @@ def importar_retorno_ecad(arquivo_path: str, envio_id: int) -> Dict:
                 'colunas_encontradas': list(df.columns)
             }
         
-        # Processar linhas
-        retornos_processados = []
-        for _, row in df.iterrows():
-            isrc = str(row[colunas_encontradas['ISRC']]).strip()
-            status = str(row[colunas_encontradas['STATUS']]).strip().upper()
-            
-            # Extrair outros campos se existirem
-            codigo_erro = None
-            mensagem = None
-            cod_ecad = None
-            
-            if 'CODIGO_ERRO' in colunas_encontradas:
-                codigo_erro = str(row[colunas_encontradas['CODIGO_ERRO']]) if pd.notna(row[colunas_encontradas['CODIGO_ERRO']]) else None
-            
-            if 'MENSAGEM' in colunas_encontradas:
-                mensagem = str(row[colunas_encontradas['MENSAGEM']]) if pd.notna(row[colunas_encontradas['MENSAGEM']]) else None
-            
-            if 'COD_ECAD' in colunas_encontradas:
-                cod_ecad = str(row[colunas_encontradas['COD_ECAD']]) if pd.notna(row[colunas_encontradas['COD_ECAD']]) else None
-            
-            retornos_processados.append({
-                'isrc': isrc,
-                'status': status,
+        # Processar linhas (coluna a coluna: iterrows monta uma Series por linha)
+        def coluna(campo):
+            return df[colunas_encontradas[campo]].tolist()
+        
+        def opcional(campo):
+            if campo not in colunas_encontradas:
+                return [None] * len(df)
+            return [str(valor) if pd.notna(valor) else None for valor in coluna(campo)]
+        
+        retornos_processados = [
+            {
+                'isrc': str(isrc).strip(),
+                'status': str(status).strip().upper(),
                 'codigo_erro': codigo_erro,
                 'mensagem': mensagem,
                 'cod_ecad': cod_ecad
-            })
+            }
+            for isrc, status, codigo_erro, mensagem, cod_ecad in zip(
+                coluna('ISRC'), coluna('STATUS'),
+                opcional('CODIGO_ERRO'), opcional('MENSAGEM'), opcional('COD_ECAD')
+            )
+        ]
         
         return {
             'sucesso': True,
@@ -112,17 +135,37 @@ def importar_retorno_ecad(arquivo_path: str, envio_id: int) -> Dict:
         }
 
 
-def processar_retorno(retorno_data: Dict, envio_id: int) -> Dict:
+def processar_retorno(retorno_data: Dict, envio_id: int, arquivo_retorno=None) -> Dict:
     """
     Processa dados do retorno e atualiza banco de dados
     
+    Em lotes de LOTE_RETORNO linhas: os ISRCs do lote são buscados numa consulta
+    só (IN), os registros de retorno e de histórico entram com um INSERT em
+    massa por tabela, status_ecad é gravado com um UPDATE por status (WHERE id
+    IN) e cod_ecad dos aceitos com um UPDATE em massa por id. Cada lote é uma
+    transação: se o processamento parar no meio, os lotes anteriores ficam
+    gravados.
+    Linhas já aplicadas ao envio (fingerprints de retorno_incremental) são
+    puladas, o que torna o reenvio do mesmo arquivo inofensivo e retoma um
+    processamento interrompido de onde parou.
+    Linhas repetidas de um fonograma são tratadas em ordem, como antes: cada uma
+    gera retorno e histórico, e vale o status da última.
+    
     Args:
         retorno_data: Dados do retorno (resultado de importar_retorno_ecad)
         envio_id: ID do envio relacionado
+        arquivo_retorno: ArquivoRetornoECAD do arquivo lido (opcional), marcado
+            como CONCLUIDO ou ERRO no fim
         
     Returns:
         Dict com resultado do processamento
     """
+    from sqlalchemy import insert, select, update
+    from .envio_delta import registrar_retornos, sincronizar_atualizado_em
+    from .retorno_incremental import (
+        chave_linha, envio_tem_linhas_aplicadas, fingerprint_linha, linhas_aplicadas,
+        registrar_linhas_aplicadas
+    )
     
     if not retorno_data.get('sucesso'):
         return retorno_data
@@ -137,82 +180,165 @@ def processar_retorno(retorno_data: Dict, envio_id: int) -> Dict:
     
     aceitos = 0
     recusados = 0
+    ja_aplicadas = 0
     nao_encontrados = []
-    erros = []
+    arquivo_id = arquivo_retorno.id if arquivo_retorno is not None else None
     
     try:
-        for ret in retorno_data['retornos']:
-            isrc = ret['isrc']
-            
-            # Buscar fonograma pelo ISRC
-            fonograma = Fonograma.query.filter_by(isrc=isrc).first()
-            
-            if not fonograma:
-                nao_encontrados.append(isrc)
-                continue
+        agora = datetime.utcnow()
+        motivo = f'Retorno do envio {envio.protocolo or envio.id}'
+        # Lista ou, em arquivos posicionais, gerador lido do arquivo aos poucos
+        retornos = iter(retorno_data['retornos'])
+        total_processados = 0
+        
+        ids_por_isrc = {}  # isrc -> id do fonograma (None: não encontrado)
+        status_atual = {}  # id -> status_ecad (do banco, depois o da última linha do retorno)
+        updated_at = {}    # id -> updated_at antes do retorno (fingerprints do envio delta)
+        ocorrencias = {}   # chave da linha -> vezes que apareceu no arquivo
+        # No primeiro retorno do envio não há linhas aplicadas a procurar
+        procurar_aplicadas = envio_tem_linhas_aplicadas(envio_id)
+        
+        while True:
+            lote = list(islice(retornos, LOTE_RETORNO))
+            if not lote:
+                break
+            total_processados += len(lote)
             
-            # Interpretar status
-            status_ecad = interpretar_status_retorno(ret['status'])
+            # Fingerprint de cada linha; as já aplicadas ao envio são puladas
+            fingerprints = []
+            for ret in lote:
+                chave = chave_linha(ret)
+                ocorrencias[chave] = ocorrencias.get(chave, 0) + 1
+                fingerprints.append(fingerprint_linha(envio_id, chave, ocorrencias[chave]))
+            aplicadas = linhas_aplicadas(envio_id, fingerprints) if procurar_aplicadas else set()
+            ja_aplicadas += len(aplicadas)
             
-            # Criar registro de retorno
-            retorno_ecad = RetornoECAD(
-                envio_id=envio_id,
-                fonograma_id=fonograma.id,
-                data_retorno=datetime.utcnow(),
-                status_ecad=status_ecad,
-                codigo_erro=ret.get('codigo_erro'),
-                mensagem_erro=ret.get('mensagem'),
-                cod_ecad_gerado=ret.get('cod_ecad')
-            )
-            db.session.add(retorno_ecad)
+            # Buscar os fonogramas do lote pelo ISRC, numa consulta só
+            isrcs = {ret['isrc'] for ret in lote} - ids_por_isrc.keys()
+            ids_por_isrc.update(dict.fromkeys(isrcs))
+            if isrcs:
+                for fonograma_id, isrc, status_ecad, atualizado in db.session.execute(
+                    select(Fonograma.id, Fonograma.isrc, Fonograma.status_ecad, Fonograma.updated_at)
+                    .where(Fonograma.isrc.in_(isrcs))
+                ):
+                    ids_por_isrc[isrc] = fonograma_id
+                    status_atual[fonograma_id] = status_ecad
+                    updated_at[fonograma_id] = atualizado
             
-            # Atualizar status do fonograma
-            status_anterior = fonograma.status_ecad
-            fonograma.status_ecad = status_ecad
+            registros_retorno = []
+            registros_historico = []
+            novas_aplicadas = []
+            alterados = set()
+            cod_ecad = {}  # id -> cod_ecad do último aceite no lote
+            for ret, fingerprint in zip(lote, fingerprints):
+                if fingerprint in aplicadas:
+                    continue
+                fonograma_id = ids_por_isrc[ret['isrc']]
+                if fonograma_id is None:
+                    nao_encontrados.append(ret['isrc'])
+                    continue
+                
+                # Interpretar status
+                status_ecad = interpretar_status_retorno(ret['status'])
+                
+                registros_retorno.append({
+                    'envio_id': envio_id,
+                    'fonograma_id': fonograma_id,
+                    'data_retorno': agora,
+                    'status_ecad': status_ecad,
+                    'codigo_erro': ret.get('codigo_erro'),
+                    'mensagem_erro': ret.get('mensagem'),
+                    'cod_ecad_gerado': ret.get('cod_ecad'),
+                })
+                registros_historico.append({
+                    'fonograma_id': fonograma_id,
+                    'data_alteracao': agora,
+                    'tipo_alteracao': 'RETORNO',
+                    'campo_alterado': 'status_ecad',
+                    'valor_anterior': status_atual[fonograma_id],
+                    'valor_novo': status_ecad,
+                    'motivo': motivo,
+                    'detalhes': f'Código: {ret.get("codigo_erro")}, Mensagem: {ret.get("mensagem")}',
+                })
+                novas_aplicadas.append(fingerprint)
+                status_atual[fonograma_id] = status_ecad
+                alterados.add(fonograma_id)
+                
+                # Se aceito, atualizar cod_ecad
+                if status_ecad == 'ACEITO' and ret.get('cod_ecad'):
+                    cod_ecad[fonograma_id] = ret['cod_ecad']
+                
+                # Contabilizar
+                if status_ecad == 'ACEITO':
+                    aceitos += 1
+                elif status_ecad == 'RECUSADO':
+                    recusados += 1
             
-            # Se aceito, atualizar cod_ecad
-            if status_ecad == 'ACEITO' and ret.get('cod_ecad'):
-                fonograma.cod_ecad = ret['cod_ecad']
+            if not registros_retorno:
+                continue
+            db.session.execute(insert(RetornoECAD.__table__), registros_retorno)
+            db.session.execute(insert(HistoricoFonograma.__table__), registros_historico)
+            registrar_linhas_aplicadas(envio_id, novas_aplicadas, arquivo_id)
             
-            # Registrar no histórico
-            historico = HistoricoFonograma(
-                fonograma_id=fonograma.id,
-                data_alteracao=datetime.utcnow(),
-                tipo_alteracao='RETORNO',
-                campo_alterado='status_ecad',
-                valor_anterior=status_anterior,
-                valor_novo=status_ecad,
-                motivo=f'Retorno do envio {envio.protocolo or envio.id}',
-                detalhes=f'Código: {ret.get("codigo_erro")}, Mensagem: {ret.get("mensagem")}'
+            # Fingerprints do envio (base do envio delta) e fonogramas sem alteração desde o envio
+            sincronizar = registrar_retornos(
+                envio_id, {fonograma_id: status_atual[fonograma_id] for fonograma_id in alterados}, updated_at
             )
-            db.session.add(historico)
             
-            # Contabilizar
-            if status_ecad == 'ACEITO':
-                aceitos += 1
-            elif status_ecad == 'RECUSADO':
-                recusados += 1
+            # Atualizar status dos fonogramas do lote: um UPDATE por status
+            por_status = {}
+            for fonograma_id in sorted(alterados):
+                por_status.setdefault(status_atual[fonograma_id], []).append(fonograma_id)
+            for status_ecad, ids in por_status.items():
+                db.session.execute(
+                    update(Fonograma).where(Fonograma.id.in_(ids))
+                    .values(status_ecad=status_ecad, updated_at=agora)
+                    .execution_options(synchronize_session=False)
+                )
+            if cod_ecad:
+                db.session.execute(update(Fonograma), [
+                    {'id': fonograma_id, 'cod_ecad': codigo} for fonograma_id, codigo in cod_ecad.items()
+                ])
+            
+            db.session.commit()
+            # O retorno só alterou campos de controle: o fingerprint continua valendo
+            sincronizar_atualizado_em(sincronizar)
         
         # Atualizar status do envio
         envio.status = 'PROCESSADO'
-        envio.updated_at = datetime.utcnow()
+        envio.updated_at = agora
+        if arquivo_retorno is not None:
+            arquivo_retorno.status = 'CONCLUIDO'
+            arquivo_retorno.erro = None
+            arquivo_retorno.total_linhas = total_processados
+            arquivo_retorno.aceitos = aceitos
+            arquivo_retorno.recusados = recusados
+            arquivo_retorno.nao_encontrados = len(nao_encontrados)
+            arquivo_retorno.ja_aplicadas = ja_aplicadas
+            arquivo_retorno.processado_em = agora
         
         db.session.commit()
         
         return {
             'sucesso': True,
-            'total_processados': len(retorno_data['retornos']),
+            'total_processados': total_processados,
             'aceitos': aceitos,
             'recusados': recusados,
+            'ja_aplicadas': ja_aplicadas,
             'nao_encontrados': nao_encontrados,
             'envio_id': envio_id
         }
         
     except Exception as e:
         db.session.rollback()
+        if arquivo_retorno is not None:
+            arquivo_retorno.status = 'ERRO'
+            arquivo_retorno.erro = str(e)
+            db.session.commit()
         return {
             'sucesso': False,
-            'erro': f'Erro ao processar retorno: {str(e)}'
+            'erro': f'Erro ao processar retorno: {str(e)}. '
+                    f'As linhas já gravadas são puladas ao enviar o arquivo de novo.'
         }
 
 
@@ -279,20 +405,78 @@ def interpretar_codigo_erro(codigo: str) -> str:
     return mapeamento.get(codigo, f'Código de erro: {codigo}')
 
 
+def ultimos_retornos(envio_id: int):
+    """
+    Select dos ids do último retorno de cada fonograma no envio, para usar em
+    RetornoECAD.id.in_(...): ROW_NUMBER() OVER (PARTITION BY fonograma_id
+    ORDER BY data_retorno DESC) sobre os retornos do envio. Só usa colunas do
+    índice idx_retorno_envio_fonograma_data (com o id), que entrega as linhas
+    já na ordem sem ler a tabela. Retornos gravados no mesmo processamento têm
+    a mesma data: vale o de maior id (a última linha do arquivo).
+    """
+    from sqlalchemy import func, select
+    
+    ordem = func.row_number().over(
+        partition_by=RetornoECAD.fonograma_id,
+        order_by=(RetornoECAD.data_retorno.desc(), RetornoECAD.id.desc())
+    ).label('ordem')
+    numerados = select(RetornoECAD.id, ordem).where(RetornoECAD.envio_id == envio_id).subquery('retornos_numerados')
+    return select(numerados.c.id).where(numerados.c.ordem == 1)
+
+
+def resumo_retornos_envio(envio_id: int) -> Dict:
+    """
+    Fonogramas do envio com retorno, aceitos e recusados, pelo último retorno
+    de cada um (uma consulta agrupada sobre ultimos_retornos)
+    """
+    from sqlalchemy import func, select
+    
+    por_status = dict(db.session.execute(
+        select(RetornoECAD.status_ecad, func.count())
+        .where(RetornoECAD.id.in_(ultimos_retornos(envio_id)))
+        .group_by(RetornoECAD.status_ecad)
+    ).all())
+    return {
+        'total': sum(por_status.values()),
+        'aceitos': por_status.get('ACEITO', 0),
+        'recusados': por_status.get('RECUSADO', 0),
+    }
+
+
+def consulta_ultimos_retornos(envio_id: int):
+    """
+    Select de RetornoECAD (com o fonograma) restrito ao último retorno de cada
+    fonograma do envio, dos mais recentes para os mais antigos, para paginar
+    com db.paginate
+    """
+    from sqlalchemy import select
+    from sqlalchemy.orm import joinedload
+    
+    return (
+        select(RetornoECAD)
+        .where(RetornoECAD.id.in_(ultimos_retornos(envio_id)))
+        .options(joinedload(RetornoECAD.fonograma))
+        .order_by(RetornoECAD.data_retorno.desc(), RetornoECAD.fonograma_id)
+    )
+
+
 def obter_fonogramas_para_reenvio(envio_id: int) -> List[int]:
     """
     Retorna IDs dos fonogramas recusados em um envio
     
+    Vale o último retorno de cada fonograma (ultimos_retornos): um fonograma
+    recusado e aceito depois no mesmo envio não é reenviado.
+    
     Args:
         envio_id: ID do envio
         
     Returns:
         Lista de IDs de fonogramas recusados
     """
+    from sqlalchemy import select
     
-    retornos_recusados = RetornoECAD.query.filter_by(
-        envio_id=envio_id,
-        status_ecad='RECUSADO'
-    ).all()
-    
-    return [r.fonograma_id for r in retornos_recusados]
+    return list(db.session.execute(
+        select(RetornoECAD.fonograma_id)
+        .where(RetornoECAD.id.in_(ultimos_retornos(envio_id)), RetornoECAD.status_ecad == 'RECUSADO')
+        .order_by(RetornoECAD.fonograma_id)
+    ).scalars())
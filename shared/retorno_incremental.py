@@ -0,0 +1,100 @@
+"""
+Processamento incremental de retornos do ECAD
+
+Dois níveis de impressão digital (hash):
+  - arquivo (ArquivoRetornoECAD): SHA-256 do conteúdo, por envio. O mesmo
+    arquivo enviado de novo depois de processado não é lido outra vez;
+  - linha (FingerprintLinhaRetorno): SHA-1 de envio, ISRC, status, código de
+    erro, código ECAD e ocorrência da mesma linha no arquivo. Linhas já
+    aplicadas são puladas em lote, o que permite retomar um processamento
+    interrompido (processar_retorno grava um lote por transação) e ignora as
+    linhas repetidas de um arquivo corrigido.
+
+A ocorrência entra no hash para que uma linha repetida dentro do mesmo arquivo
+continue gerando um registro por repetição, como antes.
+"""
+
+import hashlib
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from models import db, ArquivoRetornoECAD, FingerprintLinhaRetorno
+
+# Fingerprints por consulta no banco
+LOTE_FINGERPRINTS_RETORNO = 500
+
+SEPARADOR_CAMPOS = '\x1f'
+
+
+def chave_linha(ret: Dict) -> Tuple:
+    """Conteúdo da linha que identifica o retorno (a mensagem fica de fora)"""
+    return (ret['isrc'], ret['status'], ret.get('codigo_erro') or '', ret.get('cod_ecad') or '')
+
+
+def fingerprint_linha(envio_id: int, chave: Tuple, ocorrencia: int) -> str:
+    """SHA-1 da linha no envio; ocorrencia conta as repetições da mesma chave no arquivo (a partir de 1)"""
+    partes = (str(envio_id),) + chave + (str(ocorrencia),)
+    return hashlib.sha1(SEPARADOR_CAMPOS.join(partes).encode('utf-8')).hexdigest()
+
+
+def envio_tem_linhas_aplicadas(envio_id: int) -> bool:
+    """Se algum retorno já foi aplicado ao envio (sem isso, não há linhas a procurar)"""
+    return db.session.execute(
+        select(FingerprintLinhaRetorno.fingerprint).where(FingerprintLinhaRetorno.envio_id == envio_id).limit(1)
+    ).first() is not None
+
+
+def linhas_aplicadas(envio_id: int, fingerprints: Iterable[str]) -> Set[str]:
+    """Quais dos fingerprints já foram aplicados ao envio"""
+    unicos = list(set(fingerprints))
+    aplicadas = set()
+    for inicio in range(0, len(unicos), LOTE_FINGERPRINTS_RETORNO):
+        lote = unicos[inicio:inicio + LOTE_FINGERPRINTS_RETORNO]
+        aplicadas.update(db.session.execute(
+            select(FingerprintLinhaRetorno.fingerprint)
+            .where(FingerprintLinhaRetorno.envio_id == envio_id, FingerprintLinhaRetorno.fingerprint.in_(lote))
+        ).scalars())
+    return aplicadas
+
+
+def registrar_linhas_aplicadas(envio_id: int, fingerprints: List[str], arquivo_id: Optional[int] = None):
+    """Grava os fingerprints das linhas aplicadas (INSERT em massa). Não faz commit"""
+    if not fingerprints:
+        return
+    agora = datetime.utcnow()
+    db.session.execute(insert(FingerprintLinhaRetorno.__table__), [
+        {'envio_id': envio_id, 'fingerprint': fingerprint, 'arquivo_id': arquivo_id, 'created_at': agora}
+        for fingerprint in fingerprints
+    ])
+
+
+def hash_arquivo_retorno(caminho: str) -> str:
+    from .processador import hash_conteudo_arquivo
+    return hash_conteudo_arquivo(caminho)
+
+
+def registrar_arquivo_retorno(envio_id: int, caminho: str, nome_arquivo: Optional[str] = None) -> Tuple[ArquivoRetornoECAD, bool]:
+    """
+    Registro do arquivo para o envio, criado se ainda não existe (com commit).
+    Retorna (registro, ja_processado): ja_processado quando o mesmo conteúdo já
+    foi processado por inteiro; com status ERRO ou PROCESSANDO, o processamento
+    é retomado (as linhas já aplicadas são puladas).
+    """
+    hash_arquivo = hash_arquivo_retorno(caminho)
+    registro = ArquivoRetornoECAD.query.filter_by(envio_id=envio_id, hash_arquivo=hash_arquivo).first()
+    if registro is not None:
+        return registro, registro.status == 'CONCLUIDO'
+
+    registro = ArquivoRetornoECAD(envio_id=envio_id, hash_arquivo=hash_arquivo, nome_arquivo=nome_arquivo, caminho=caminho)
+    db.session.add(registro)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # O mesmo arquivo registrado ao mesmo tempo por outra requisição
+        db.session.rollback()
+        registro = ArquivoRetornoECAD.query.filter_by(envio_id=envio_id, hash_arquivo=hash_arquivo).one()
+        return registro, registro.status == 'CONCLUIDO'
+    return registro, False
@@ -0,0 +1,145 @@
+"""
+Gravação de fonogramas por ISRC em uma única instrução (upsert)
+
+Em SQLite e PostgreSQL usa INSERT ... ON CONFLICT (isrc) DO UPDATE ... RETURNING,
+sem a consulta prévia "já existe?" e sem a janela de corrida entre dois uploads
+simultâneos do mesmo ISRC. Nos demais bancos cai para consulta IN + inserts e
+updates em massa.
+
+Os registros filhos (autores, editoras, intérpretes, músicos e documentos) dos
+fonogramas gravados são substituídos no mesmo lote, e os registros ECAD em
+cache dos fonogramas atualizados são descartados. Nada aqui faz commit.
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import String, func, insert, update
+
+from models import db, Fonograma
+from .cache_registros_ecad import invalidar_cache_registros
+from .fonograma_service import RELACIONAMENTOS_FILHOS
+
+DIALETOS_UPSERT = ('sqlite', 'postgresql')
+
+# Colunas que um upsert nunca sobrescreve num fonograma já cadastrado
+COLUNAS_PRESERVADAS = ('id', 'isrc', 'user_id', 'created_at', 'updated_at')
+
+
+def suporta_upsert() -> bool:
+    """True se o banco da sessão tem INSERT ... ON CONFLICT ... RETURNING"""
+    dialeto = db.session.get_bind().dialect
+    return dialeto.name in DIALETOS_UPSERT and dialeto.insert_returning
+
+
+def upsert_fonogramas(valores: List[Dict], filhos: Optional[Dict[str, Dict[str, List[Dict]]]] = None,
+                      colunas_atualizadas: Optional[Iterable[str]] = None,
+                      preservar_existentes: bool = False) -> Dict[str, Tuple[int, bool]]:
+    """
+    Cria ou atualiza fonogramas pelo ISRC.
+
+    valores: colunas de cada fonograma (todas as linhas com as mesmas chaves,
+    incluindo 'isrc'; ISRCs não podem se repetir na lista)
+    filhos: {isrc: {'autores_list': [...], ...}} - substitui os filhos desses ISRCs
+    colunas_atualizadas: colunas gravadas quando o ISRC já existe (padrão: todas
+    as informadas, exceto isrc e user_id)
+    preservar_existentes: num ISRC já cadastrado, valores None (e textos
+    vazios) não apagam o que está no banco (COALESCE/NULLIF)
+
+    Retorna {isrc: (id, criado)}.
+    """
+    if not valores:
+        return {}
+    isrcs = [v['isrc'] for v in valores]
+    if len(set(isrcs)) != len(isrcs):
+        raise ValueError('upsert_fonogramas: ISRC repetido no mesmo lote')
+
+    if colunas_atualizadas is None:
+        colunas_atualizadas = valores[0].keys()
+    colunas = [c for c in colunas_atualizadas if c not in COLUNAS_PRESERVADAS]
+
+    if suporta_upsert():
+        resultado = _upsert_nativo(valores, colunas, preservar_existentes)
+    else:
+        resultado = _upsert_consultando(valores, colunas, preservar_existentes)
+
+    # Gravação fora do ORM: o evento de invalidação do cache não vê estas linhas
+    invalidar_cache_registros(id_ for id_, criado in resultado.values() if not criado)
+    if filhos:
+        substituir_filhos(resultado, filhos)
+    return resultado
+
+
+def _upsert_nativo(valores: List[Dict], colunas: List[str], preservar_existentes: bool) -> Dict[str, Tuple[int, bool]]:
+    if db.session.get_bind().dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as insert_dialeto
+    else:
+        from sqlalchemy.dialects.sqlite import insert as insert_dialeto
+
+    tabela = Fonograma.__table__
+    # created_at só é gravado na inserção: voltar com este valor no RETURNING
+    # indica que a linha foi criada agora (vale para os dois bancos)
+    agora = datetime.utcnow()
+
+    instrucao = insert_dialeto(tabela)
+    novos_valores = {}
+    for coluna in colunas:
+        novo = instrucao.excluded[coluna]
+        if preservar_existentes:
+            if isinstance(tabela.c[coluna].type, String):
+                novo = func.nullif(novo, '')
+            novo = func.coalesce(novo, tabela.c[coluna])
+        novos_valores[coluna] = novo
+    novos_valores['updated_at'] = agora
+    instrucao = instrucao.on_conflict_do_update(
+        index_elements=[tabela.c.isrc], set_=novos_valores
+    ).returning(tabela.c.id, tabela.c.isrc, tabela.c.created_at)
+
+    linhas = [{**v, 'created_at': agora, 'updated_at': agora} for v in valores]
+    return {
+        isrc: (id_, criado_em == agora)
+        for id_, isrc, criado_em in db.session.execute(instrucao, linhas)
+    }
+
+
+def _upsert_consultando(valores: List[Dict], colunas: List[str],
+                        preservar_existentes: bool) -> Dict[str, Tuple[int, bool]]:
+    """Bancos sem ON CONFLICT: uma consulta IN, depois INSERT e UPDATE em massa"""
+    isrcs = [v['isrc'] for v in valores]
+    existentes = dict(db.session.query(Fonograma.isrc, Fonograma.id).filter(Fonograma.isrc.in_(isrcs)))
+
+    novos, alterados = [], []
+    for linha in valores:
+        if linha['isrc'] not in existentes:
+            novos.append(linha)
+            continue
+        alterado = {'id': existentes[linha['isrc']]}
+        for coluna in colunas:
+            if not (preservar_existentes and linha.get(coluna) in (None, '')):
+                alterado[coluna] = linha.get(coluna)
+        alterados.append(alterado)
+
+    resultado = {isrc: (id_, False) for isrc, id_ in existentes.items()}
+    if novos:
+        db.session.execute(insert(Fonograma), novos)
+        criados = [linha['isrc'] for linha in novos]
+        for isrc, id_ in db.session.query(Fonograma.isrc, Fonograma.id).filter(Fonograma.isrc.in_(criados)):
+            resultado[isrc] = (id_, True)
+    if alterados:
+        db.session.execute(update(Fonograma), alterados)
+    return resultado
+
+
+def substituir_filhos(gravados: Dict[str, Tuple[int, bool]], filhos: Dict[str, Dict[str, List[Dict]]]):
+    """Apaga os filhos dos fonogramas atualizados e insere os novos, um comando por tabela"""
+    ids_atualizados = [gravados[isrc][0] for isrc in filhos if not gravados[isrc][1]]
+    for relacionamento, modelo in RELACIONAMENTOS_FILHOS:
+        if ids_atualizados:
+            db.session.query(modelo).filter(modelo.fonograma_id.in_(ids_atualizados)).delete(synchronize_session=False)
+        registros = [
+            {**valores, 'fonograma_id': gravados[isrc][0]}
+            for isrc, filhos_linha in filhos.items()
+            for valores in filhos_linha[relacionamento]
+        ]
+        if registros:
+            db.session.execute(insert(modelo), registros)
@@ -6,6 +6,10 @@ import re
 from datetime import datetime
 
 
+# Versão das regras de validação. Incrementar sempre que uma regra mudar:
+# resultados guardados em cache (cache_validacao) com outra versão são ignorados
+VERSAO_VALIDADOR = '1'
+
 # Constantes de valores válidos
 VERSOES = ['original', 'remix', 'ao_vivo', 'instrumental', 'edit', 'acoustic', 'radio_edit', 'acapella', 'cover']
 IDIOMAS = ['PT', 'EN', 'ES', 'FR', 'IT', 'DE', 'JP', 'KR', 'RU', 'AR']
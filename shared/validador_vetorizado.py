@@ -0,0 +1,494 @@
+"""
+Motor de validação vetorizado (coluna a coluna) para planilhas de fonogramas
+
+Aplica as mesmas regras de validador.py sobre Series do pandas em vez de
+iterar linha a linha. Os erros produzidos são idênticos (mesmos dicts, mesma
+ordem) aos da validação linha a linha de processador.py.
+"""
+
+import os
+import multiprocessing
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Tuple, Optional, Callable
+from .validador import (
+    validar_cpf, validar_cnpj, validar_ano, validar_data,
+    VERSOES, IDIOMAS, GENEROS, FUNCOES_AUTOR, CATEGORIAS_INTERPRETE,
+    TIPOS_MUSICO, ASSOCIACOES, TIPOS_LANCAMENTO, FORMATOS, SITUACOES,
+    TERRITORIOS, TIPOS_EXECUCAO, PRIORIDADES, TIPOS_DOCUMENTO
+)
+
+
+PESOS_CPF_1 = np.arange(10, 1, -1)
+PESOS_CPF_2 = np.arange(11, 1, -1)
+PESOS_CNPJ_1 = np.array([5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+PESOS_CNPJ_2 = np.array([6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+
+# Validação paralela: número de processos (0 = núcleos disponíveis) e tamanho
+# mínimo do arquivo para compensar o custo de subir os processos
+VALIDACAO_WORKERS = int(os.environ.get('VALIDACAO_WORKERS', '0'))
+VALIDACAO_PARALELA_MIN_LINHAS = int(os.environ.get('VALIDACAO_PARALELA_MIN_LINHAS', '20000'))
+
+# ==================== VALIDADORES DE SERIES ====================
+
+def _digito_verificador(matriz: np.ndarray, pesos: np.ndarray) -> np.ndarray:
+    resto = (matriz[:, :len(pesos)] @ pesos) % 11
+    return np.where(resto < 2, 0, 11 - resto)
+
+
+def _validar_documentos_serie(valores: pd.Series, tamanho: int, pesos1: np.ndarray,
+                              pesos2: np.ndarray, validador_escalar: Callable) -> np.ndarray:
+    limpos = valores.astype(str).str.replace(r'\D', '', regex=True)
+    resultado = np.zeros(len(limpos), dtype=bool)
+
+    ascii_ok = limpos.str.fullmatch(rf'[0-9]{{{tamanho}}}').to_numpy(dtype=bool)
+    idx = np.flatnonzero(ascii_ok)
+    if idx.size:
+        bruto = ''.join(limpos.iloc[idx].tolist()).encode('ascii')
+        matriz = np.frombuffer(bruto, dtype=np.uint8).reshape(-1, tamanho).astype(np.int64) - 48
+        repetidos = (matriz == matriz[:, :1]).all(axis=1)
+        dv1 = _digito_verificador(matriz, pesos1)
+        dv2 = _digito_verificador(matriz, pesos2)
+        resultado[idx] = ~repetidos & (matriz[:, -2] == dv1) & (matriz[:, -1] == dv2)
+
+    # Dígitos não-ASCII (ex.: numerais unicode) seguem a regra escalar
+    residuo = np.flatnonzero(~ascii_ok & (limpos.str.len() == tamanho).to_numpy(dtype=bool))
+    for i in residuo:
+        resultado[i] = validador_escalar(limpos.iloc[i])
+
+    return resultado
+
+
+def validar_cpf_serie(valores: pd.Series) -> np.ndarray:
+    """Equivalente vetorizado de validar_cpf"""
+    return _validar_documentos_serie(valores, 11, PESOS_CPF_1, PESOS_CPF_2, validar_cpf)
+
+
+def validar_cnpj_serie(valores: pd.Series) -> np.ndarray:
+    """Equivalente vetorizado de validar_cnpj"""
+    return _validar_documentos_serie(valores, 14, PESOS_CNPJ_1, PESOS_CNPJ_2, validar_cnpj)
+
+
+def validar_ano_serie(valores: pd.Series) -> np.ndarray:
+    """Equivalente vetorizado de validar_ano (valores vazios são válidos)"""
+    texto = valores.astype(str)
+    numerico = texto.str.fullmatch(r'\s*[+-]?[0-9]+\s*').to_numpy(dtype=bool)
+    anos = pd.to_numeric(texto.str.strip().where(numerico), errors='coerce').to_numpy(dtype=float)
+    resultado = numerico & (anos >= 1900) & (anos <= 2100)
+    resultado |= (texto == '').to_numpy(dtype=bool)
+
+    # Formas aceitas por int() mas fora da regex (ex.: "2_024", numerais unicode)
+    residuo = np.flatnonzero(~numerico & texto.str.contains(r'\d', regex=True).to_numpy(dtype=bool))
+    for i in residuo:
+        resultado[i] = validar_ano(texto.iloc[i])
+    return resultado
+
+
+def validar_data_serie(valores: pd.Series) -> np.ndarray:
+    """Equivalente vetorizado de validar_data (valores vazios são válidos)"""
+    texto = valores.astype(str)
+    limpo = texto.str.strip()
+    formato_br = limpo.str.match(r'^\d{2}/\d{2}/\d{4}$').to_numpy(dtype=bool)
+    formato_iso = limpo.str.match(r'^\d{4}-\d{2}-\d{2}$').to_numpy(dtype=bool)
+
+    datas_br = pd.to_datetime(limpo.where(formato_br), format='%d/%m/%Y', errors='coerce')
+    datas_iso = pd.to_datetime(limpo.where(formato_iso), format='%Y-%m-%d', errors='coerce')
+    resultado = datas_br.notna().to_numpy() | datas_iso.notna().to_numpy()
+    resultado |= (texto == '').to_numpy(dtype=bool)
+
+    # Datas fora do intervalo do pandas (ex.: ano 1500) ou com dígitos unicode
+    residuo = np.flatnonzero((formato_br | formato_iso) & ~resultado)
+    for i in residuo:
+        resultado[i] = validar_data(texto.iloc[i])
+    return resultado
+
+
+def _fora_da_lista(valores: pd.Series, permitidos: List[str], maiusculo: bool = True) -> np.ndarray:
+    comparados = valores.str.upper() if maiusculo else valores
+    return ~comparados.isin(permitidos).to_numpy(dtype=bool)
+
+
+def _vazio(valores: pd.Series) -> np.ndarray:
+    return (valores.str.strip() == '').to_numpy(dtype=bool)
+
+
+# ==================== TABELAS DE PARTES ====================
+
+def somar_percentuais(tabela: pd.DataFrame, total_linhas: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Soma os percentuais por linha na mesma ordem de sum() do Python, para que
+    o valor exibido na mensagem de erro seja idêntico ao da validação linha a linha.
+    Retorna (somas, quantidade_de_titulares).
+    """
+    somas = np.zeros(total_linhas, dtype=float)
+    quantidade = np.bincount(tabela['pos'].to_numpy(dtype=np.int64), minlength=total_linhas)
+    if tabela.empty:
+        return somas, quantidade
+
+    pos = tabela['pos'].to_numpy(dtype=np.int64)
+    ordem = tabela['ordem'].to_numpy(dtype=np.int64)
+    matriz = np.zeros((total_linhas, int(ordem.max()) + 1), dtype=float)
+    matriz[pos, ordem] = tabela['percentual'].to_numpy(dtype=float)
+    for j in range(matriz.shape[1]):
+        somas = somas + matriz[:, j]
+    return somas, quantidade
+
+
+# ==================== COLETA DE ERROS ====================
+
+class _ColetorErros:
+    """Acumula erros em blocos e os ordena como a validação linha a linha"""
+
+    SUB_FINAL = 10 ** 9  # verificações de soma vêm depois dos titulares
+
+    def __init__(self):
+        self.blocos = []
+
+    def adicionar(self, pos, ordem: int, campo: str, valor, erro, sub=0):
+        pos = np.asarray(pos, dtype=np.int64)
+        if pos.size == 0:
+            return
+        n = pos.size
+        self.blocos.append((
+            pos,
+            np.full(n, ordem, dtype=np.int64),
+            np.broadcast_to(np.asarray(sub, dtype=np.int64), (n,)),
+            campo,
+            valor if not isinstance(valor, str) else [valor] * n,
+            erro if not isinstance(erro, str) else [erro] * n,
+        ))
+
+    def adicionar_linhas(self, mascara: np.ndarray, ordem: int, campo: str, valores, erro):
+        """Erro de nível de linha; valores pode ser str fixa ou Series alinhada ao DataFrame"""
+        pos = np.flatnonzero(mascara)
+        if isinstance(valores, str):
+            self.adicionar(pos, ordem, campo, valores, erro)
+        else:
+            self.adicionar(pos, ordem, campo, valores.to_numpy(dtype=object)[pos].tolist(), erro)
+
+    def resultado(self, linhas: np.ndarray) -> Tuple[List[Dict], np.ndarray]:
+        if not self.blocos:
+            return [], np.array([], dtype=np.int64)
+
+        pos = np.concatenate([b[0] for b in self.blocos])
+        ordem = np.concatenate([b[1] for b in self.blocos])
+        sub = np.concatenate([b[2] for b in self.blocos])
+        campos = [b[3] for b in self.blocos for _ in range(b[0].size)]
+        valores = [v for b in self.blocos for v in b[4]]
+        mensagens = [m for b in self.blocos for m in b[5]]
+
+        sequencia = np.lexsort((sub, ordem, pos))
+        linhas_erro = linhas[pos[sequencia]].tolist()
+        erros = [
+            {
+                "linha": linhas_erro[k],
+                "campo": campos[i],
+                "valor": valores[i],
+                "erro": mensagens[i]
+            }
+            for k, i in enumerate(sequencia.tolist())
+        ]
+        return erros, np.unique(pos)
+
+
+def _mensagens(prefixo: str, nomes: pd.Series) -> List[str]:
+    return [prefixo + n for n in nomes.astype(str).tolist()]
+
+
+def _formatar_soma(valor: float, quantidade: int) -> str:
+    # sum() de lista vazia retorna o int 0
+    return str(valor) if quantidade else '0'
+
+
+def _percentual_produtor(valor: str) -> Optional[float]:
+    if not valor.strip():
+        return None
+    try:
+        return float(str(valor).replace('%', '').replace(',', '.'))
+    except ValueError:
+        return None
+
+
+def _mapear_unicos(valores: pd.Series, funcao: Callable) -> list:
+    """Aplica uma função escalar apenas uma vez por valor distinto"""
+    codigos, unicos = pd.factorize(valores, use_na_sentinel=False)
+    resultados = [funcao(u) for u in unicos]
+    return [resultados[c] for c in codigos]
+
+
+# ==================== MOTOR PRINCIPAL ====================
+
+def validar_dataframe(df: pd.DataFrame, linhas: Optional[np.ndarray] = None,
+                      composicoes: Optional[Dict[str, pd.DataFrame]] = None) -> Tuple[List[Dict], int, int]:
+    """
+    Valida todas as linhas do DataFrame normalizado por processar_csv.
+
+    linhas: número da linha na planilha de cada registro (padrão: posição + 2,
+    pois a linha 1 é o cabeçalho).
+    composicoes: tabelas de titulares já geradas por parse_composicoes_em_lote
+    para este DataFrame (se omitido, as colunas compostas são lidas aqui).
+
+    Retorna (erros, linhas_validas, linhas_com_erro).
+    """
+    total = len(df)
+    if linhas is None:
+        linhas = np.arange(total, dtype=np.int64) + 2
+    linhas = np.asarray(linhas, dtype=np.int64)
+    if total == 0:
+        return [], 0, 0
+
+    df = df.reset_index(drop=True)
+    vazio_padrao = pd.Series([''] * total, dtype=object)
+
+    def coluna(nome: str) -> pd.Series:
+        if nome in df.columns:
+            return df[nome].astype(str)
+        return vazio_padrao
+
+    coletor = _ColetorErros()
+    ordem = iter(range(1, 1000))
+
+    def obrigatorio(nome: str, mensagem: str):
+        coletor.adicionar_linhas(_vazio(coluna(nome)), next(ordem), nome, "", mensagem)
+
+    def opcional(nome: str, invalidos: np.ndarray, mensagem: str):
+        valores = coluna(nome)
+        coletor.adicionar_linhas(~_vazio(valores) & invalidos, next(ordem), nome, valores, mensagem)
+
+    def opcional_lista(nome: str, permitidos: List[str], mensagem: str):
+        opcional(nome, _fora_da_lista(coluna(nome), permitidos), mensagem)
+
+    def opcional_data(nome: str, mensagem: str):
+        opcional(nome, ~validar_data_serie(coluna(nome)), mensagem)
+
+    def obrigatorio_com_regra(nome: str, invalidos: np.ndarray, msg_vazio: str, msg_invalido: str):
+        valores = coluna(nome)
+        vazio = _vazio(valores)
+        n = next(ordem)
+        coletor.adicionar_linhas(vazio, n, nome, "", msg_vazio)
+        coletor.adicionar_linhas(~vazio & invalidos, n, nome, valores, msg_invalido)
+
+    # SEÇÃO 1 - IDENTIFICAÇÃO
+    isrc = coluna('isrc').str.strip().str.upper()
+    isrc_valido = ((isrc.str.len() == 12) & isrc.str.isalnum()).to_numpy(dtype=bool)
+    obrigatorio_com_regra('isrc', ~isrc_valido, "ISRC é obrigatório",
+                          "ISRC inválido (deve ter 12 caracteres alfanuméricos)")
+    obrigatorio('titulo', "Título é obrigatório")
+
+    duracao_valida = coluna('duracao').str.strip().str.match(r'^(\d{1,2}):([0-5]\d)$').to_numpy(dtype=bool)
+    obrigatorio_com_regra('duracao', ~duracao_valida, "Duração é obrigatória",
+                          "Duração inválida (formato esperado: mm:ss)")
+    obrigatorio_com_regra('ano_lanc', ~validar_ano_serie(coluna('ano_lanc')),
+                          "Ano de lançamento é obrigatório", "Ano de lançamento inválido")
+    obrigatorio_com_regra('genero', _fora_da_lista(coluna('genero'), GENEROS, maiusculo=False),
+                          "Gênero é obrigatório",
+                          f"Gênero inválido (valores válidos: {', '.join(GENEROS[:5])}...)")
+
+    versoes = [v.lower() for v in VERSOES]
+    opcional('versao', ~coluna('versao').str.lower().isin(versoes).to_numpy(dtype=bool), "Versão inválida")
+    opcional_lista('idioma', IDIOMAS, "Idioma inválido")
+    opcional('ano_grav', ~validar_ano_serie(coluna('ano_grav')), "Ano de gravação inválido")
+
+    # SEÇÃO 2 - OBRA MUSICAL
+    obrigatorio('titulo_obra', "Título da obra é obrigatório")
+
+    from .processador import parse_coluna_em_lote
+
+    def partes(tipo: str) -> pd.DataFrame:
+        if composicoes is not None and tipo in composicoes:
+            return composicoes[tipo]
+        return parse_coluna_em_lote(coluna(tipo), tipo)
+
+    # Autores (obrigatório)
+    n = next(ordem)
+    autores = partes('autores')
+    somas_autores, qtd_autores = somar_percentuais(autores, total)
+    coletor.adicionar_linhas(qtd_autores == 0, n, 'autores', coluna('autores'),
+                             "Pelo menos um autor é obrigatório")
+    if not autores.empty:
+        sub = autores['ordem'].to_numpy() * 3
+        sem_nome = autores[autores['nome'] == '']
+        coletor.adicionar(sem_nome['pos'], n, 'autores', [
+            str({"nome": nome, "cpf": cpf, "funcao": funcao, "percentual": percentual})
+            for nome, cpf, funcao, percentual in zip(
+                sem_nome['nome'].tolist(), sem_nome['cpf'].tolist(),
+                sem_nome['funcao'].tolist(), sem_nome['percentual'].astype(float).tolist())
+        ], "Autor sem nome", sub[sem_nome.index])
+        invalidos = autores[~validar_cpf_serie(autores['cpf'])]
+        coletor.adicionar(invalidos['pos'], n, 'autores', invalidos['cpf'].tolist(),
+                          _mensagens("CPF inválido para autor ", invalidos['nome']), sub[invalidos.index] + 1)
+        invalidos = autores[_fora_da_lista(autores['funcao'], FUNCOES_AUTOR)]
+        coletor.adicionar(invalidos['pos'], n, 'autores', invalidos['funcao'].tolist(),
+                          _mensagens("Função inválida para autor ", invalidos['nome']), sub[invalidos.index] + 2)
+
+        soma_invalida = np.flatnonzero((qtd_autores > 0) & ~(np.abs(somas_autores - 100.0) < 0.01))
+        coletor.adicionar(soma_invalida, n, 'autores',
+                          [f"Soma: {s}%" for s in somas_autores[soma_invalida].tolist()],
+                          "Soma dos percentuais autorais deve ser 100%", _ColetorErros.SUB_FINAL)
+
+    # Editoras (opcional)
+    n = next(ordem)
+    editoras = partes('editoras')
+    if not editoras.empty:
+        invalidos = editoras[~validar_cnpj_serie(editoras['cnpj'])]
+        coletor.adicionar(invalidos['pos'], n, 'editoras', invalidos['cnpj'].tolist(),
+                          _mensagens("CNPJ inválido para editora ", invalidos['nome']),
+                          invalidos['ordem'].to_numpy())
+        somas, qtd = somar_percentuais(editoras, total)
+        soma_invalida = np.flatnonzero((qtd > 0) & ~(np.abs(somas - 100.0) < 0.01))
+        coletor.adicionar(soma_invalida, n, 'editoras',
+                          [f"Soma: {s}%" for s in somas[soma_invalida].tolist()],
+                          "Soma dos percentuais de editoras deve ser 100%", _ColetorErros.SUB_FINAL)
+
+    # SEÇÃO 3 - TITULARES CONEXOS
+    n = next(ordem)
+    interpretes = partes('interpretes')
+    somas_interpretes, qtd_interpretes = somar_percentuais(interpretes, total)
+    coletor.adicionar_linhas(qtd_interpretes == 0, n, 'interpretes', "",
+                             "Pelo menos um intérprete é obrigatório")
+    if not interpretes.empty:
+        sub = interpretes['ordem'].to_numpy() * 3
+        invalidos = interpretes[~validar_cpf_serie(interpretes['doc'])]
+        coletor.adicionar(invalidos['pos'], n, 'interpretes', invalidos['doc'].tolist(),
+                          _mensagens("CPF inválido para intérprete ", invalidos['nome']), sub[invalidos.index])
+        invalidos = interpretes[_fora_da_lista(interpretes['categoria'], CATEGORIAS_INTERPRETE)]
+        coletor.adicionar(invalidos['pos'], n, 'interpretes', invalidos['categoria'].tolist(),
+                          _mensagens("Categoria inválida para intérprete ", invalidos['nome']),
+                          sub[invalidos.index] + 1)
+        invalidos = interpretes[(interpretes['associacao'] != '').to_numpy()
+                                & _fora_da_lista(interpretes['associacao'], ASSOCIACOES)]
+        coletor.adicionar(invalidos['pos'], n, 'interpretes', invalidos['associacao'].tolist(),
+                          _mensagens("Associação inválida para intérprete ", invalidos['nome']),
+                          sub[invalidos.index] + 2)
+
+    # Músicos (opcional)
+    n = next(ordem)
+    musicos = partes('musicos')
+    somas_musicos, qtd_musicos = somar_percentuais(musicos, total)
+    if not musicos.empty:
+        sub = musicos['ordem'].to_numpy() * 2
+        invalidos = musicos[~validar_cpf_serie(musicos['cpf'])]
+        coletor.adicionar(invalidos['pos'], n, 'musicos', invalidos['cpf'].tolist(),
+                          _mensagens("CPF inválido para músico ", invalidos['nome']), sub[invalidos.index])
+        invalidos = musicos[_fora_da_lista(musicos['tipo'], TIPOS_MUSICO)]
+        coletor.adicionar(invalidos['pos'], n, 'musicos', invalidos['tipo'].tolist(),
+                          _mensagens("Tipo inválido para músico ", invalidos['nome']), sub[invalidos.index] + 1)
+
+    # Soma dos direitos conexos
+    n = next(ordem)
+    perc_produtor = _mapear_unicos(coluna('prod_perc'), _percentual_produtor)
+    produtor = np.array([p if p is not None else 0.0 for p in perc_produtor], dtype=float)
+    soma_conexos = somas_interpretes + somas_musicos + produtor
+    conexos_invalidos = np.flatnonzero(~(np.abs(soma_conexos - 100.0) < 0.01))
+    coletor.adicionar(conexos_invalidos, n, 'percentuais_conexos', [
+        f"Intérpretes: {_formatar_soma(float(somas_interpretes[i]), qtd_interpretes[i])}%, "
+        f"Músicos: {_formatar_soma(float(somas_musicos[i]), qtd_musicos[i])}%, "
+        f"Produtor: {perc_produtor[i] if perc_produtor[i] is not None else 0}%"
+        for i in conexos_invalidos.tolist()
+    ], "Soma dos direitos conexos (intérpretes + músicos + produtor) deve ser 100%")
+
+    # SEÇÃO 4 - PRODUTOR
+    obrigatorio('prod_nome', "Nome do produtor é obrigatório")
+
+    n = next(ordem)
+    prod_doc = coluna('prod_doc')
+    doc_vazio = _vazio(prod_doc)
+    doc_limpo = prod_doc.str.replace(r'\D', '', regex=True)
+    tamanho_doc = doc_limpo.str.len().to_numpy()
+    coletor.adicionar_linhas(doc_vazio, n, 'prod_doc', "", "Documento do produtor é obrigatório")
+    coletor.adicionar_linhas(~doc_vazio & (tamanho_doc == 11) & ~validar_cpf_serie(doc_limpo), n,
+                             'prod_doc', prod_doc, "CPF do produtor inválido")
+    coletor.adicionar_linhas(~doc_vazio & (tamanho_doc == 14) & ~validar_cnpj_serie(doc_limpo), n,
+                             'prod_doc', prod_doc, "CNPJ do produtor inválido")
+    coletor.adicionar_linhas(~doc_vazio & (tamanho_doc != 11) & (tamanho_doc != 14), n, 'prod_doc', prod_doc,
+                             "Documento do produtor deve ser CPF (11 dígitos) ou CNPJ (14 dígitos)")
+
+    obrigatorio('prod_perc', "Percentual do produtor é obrigatório")
+    opcional_lista('prod_assoc', ASSOCIACOES, "Associação do produtor inválida")
+    opcional_data('prod_data_ini', "Data de início do produtor inválida (formato: dd/mm/yyyy ou yyyy-mm-dd)")
+
+    # SEÇÃO 5 - LANÇAMENTO
+    opcional_lista('tipo_lanc', TIPOS_LANCAMENTO, "Tipo de lançamento inválido")
+    opcional_lista('formato', FORMATOS, "Formato inválido")
+    opcional_data('data_lanc', "Data de lançamento inválida (formato: dd/mm/yyyy ou yyyy-mm-dd)")
+
+    # SEÇÃO 6 - ADMINISTRATIVO
+    opcional_lista('situacao', SITUACOES, "Situação inválida")
+    opcional_data('data_cad', "Data de cadastro inválida (formato: dd/mm/yyyy ou yyyy-mm-dd)")
+
+    # SEÇÃO 7 - DOCUMENTOS
+    n = next(ordem)
+    documentos = partes('documentos')
+    if not documentos.empty:
+        sub = documentos['ordem'].to_numpy() * 2
+        invalidos = documentos[_fora_da_lista(documentos['tipo'], TIPOS_DOCUMENTO)]
+        coletor.adicionar(invalidos['pos'], n, 'documentos', invalidos['tipo'].tolist(),
+                          _mensagens("Tipo de documento inválido: ", invalidos['tipo']), sub[invalidos.index])
+        invalidos = documentos[(documentos['data'] != '').to_numpy() & ~validar_data_serie(documentos['data'])]
+        coletor.adicionar(invalidos['pos'], n, 'documentos', invalidos['data'].tolist(),
+                          _mensagens("Data inválida no documento ", invalidos['tipo']), sub[invalidos.index] + 1)
+
+    # SEÇÃO 8 - DISTRIBUIÇÃO
+    opcional_lista('territorio', TERRITORIOS, "Território inválido")
+    opcional_lista('tipos_exec', TIPOS_EXECUCAO, "Tipo de execução inválido")
+    opcional_lista('prioridade', PRIORIDADES, "Prioridade inválida")
+
+    erros, posicoes_com_erro = coletor.resultado(linhas)
+    linhas_com_erro = int(posicoes_com_erro.size)
+    return erros, total - linhas_com_erro, linhas_com_erro
+
+
+def _validar_fatia(fatia: Tuple) -> Tuple[List[Dict], int, int]:
+    df, linhas, composicoes = fatia
+    return validar_dataframe(df, linhas, composicoes)
+
+
+def validar_dataframe_paralelo(df: pd.DataFrame, linhas: Optional[np.ndarray] = None,
+                               workers: Optional[int] = None,
+                               composicoes: Optional[Dict[str, pd.DataFrame]] = None) -> Tuple[List[Dict], int, int]:
+    """
+    Divide o DataFrame em fatias contíguas de linhas e valida cada uma em um
+    processo separado. Como cada fatia já sai ordenada, basta concatenar os
+    erros na ordem das fatias para manter a ordem por linha.
+    
+    Arquivos com menos de VALIDACAO_PARALELA_MIN_LINHAS linhas (ou workers <= 1)
+    são validados no processo atual, assim como os validados dentro de um
+    processo daemon (que não pode criar processos filhos).
+    """
+    total = len(df)
+    if linhas is None:
+        linhas = np.arange(total, dtype=np.int64) + 2
+    linhas = np.asarray(linhas, dtype=np.int64)
+    
+    if workers is None:
+        workers = VALIDACAO_WORKERS or os.cpu_count() or 1
+    workers = min(workers, total // 1000 or 1)  # fatias de pelo menos 1000 linhas
+    
+    if workers <= 1 or total < VALIDACAO_PARALELA_MIN_LINHAS or multiprocessing.current_process().daemon:
+        return validar_dataframe(df, linhas, composicoes)
+    
+    from .processador import selecionar_composicoes
+    
+    limites = np.linspace(0, total, workers + 1, dtype=np.int64)
+    def composicoes_da_fatia(inicio: int, fim: int) -> Optional[Dict[str, pd.DataFrame]]:
+        if composicoes is None:
+            return None
+        mascara = np.zeros(total, dtype=bool)
+        mascara[inicio:fim] = True
+        return selecionar_composicoes(composicoes, mascara)
+    
+    fatias = [(df.iloc[a:b], linhas[a:b], composicoes_da_fatia(a, b)) for a, b in zip(limites[:-1], limites[1:])]
+    
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            resultados = list(executor.map(_validar_fatia, fatias))
+    except (BrokenProcessPool, OSError):
+        # Ambiente sem suporte a multiprocessamento: valida no processo atual
+        return validar_dataframe(df, linhas, composicoes)
+    
+    erros = [erro for resultado in resultados for erro in resultado[0]]
+    linhas_validas = sum(r[1] for r in resultados)
+    linhas_com_erro = sum(r[2] for r in resultados)
+    return erros, linhas_validas, linhas_com_erro
@@ -0,0 +1,47 @@
+"""
+Configuração dos testes
+
+O banco é um SQLite temporário (DATABASE_URL definido antes de importar o
+app) e o cache de validação fica desligado. A fixture `banco` recria as
+tabelas a cada teste.
+
+Uso: python -m pytest -q
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, RAIZ)
+# benchmark_validacao guarda o validador linha a linha usado como referência
+sys.path.insert(0, os.path.join(RAIZ, 'scripts'))
+
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='fonogramas-testes-'), 'testes.db')
+os.environ['CACHE_VALIDACAO_MAX_MB'] = '0'
+
+
+@pytest.fixture
+def app():
+    from app import app as aplicacao
+    return aplicacao
+
+
+@pytest.fixture
+def banco(app):
+    """Contexto de aplicação com as tabelas vazias"""
+    from models import db
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield db
+        db.session.remove()
+
+
+@pytest.fixture
+def pasta_trabalho(tmp_path, monkeypatch):
+    """Diretório atual temporário: uploads/ e arquivos de envio ficam fora do repositório"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,92 @@
+"""
+Importação do retorno do ECAD (retorno_incremental): o mesmo arquivo enviado
+de novo não grava nada, e um arquivo corrigido só aplica as linhas novas.
+"""
+
+from contextlib import nullcontext
+
+import pandas as pd
+from werkzeug.datastructures import FileStorage
+
+from benchmark_validacao import linha_base
+from models import FingerprintLinhaRetorno, Fonograma, HistoricoFonograma, RetornoECAD
+
+TOTAL_FONOGRAMAS = 40
+
+
+def preparar_envio(banco):
+    from admin.services.envio_service import criar_envio
+    from shared.fonograma_service import salvar_fonogramas_do_dataframe
+
+    df = pd.DataFrame([linha_base(i) for i in range(TOTAL_FONOGRAMAS)], dtype=str)
+    salvar_fonogramas_do_dataframe(df, nullcontext(), em_lote=True)
+    ids = [id_ for (id_,) in banco.session.query(Fonograma.id).order_by(Fonograma.id)]
+    resultado = criar_envio(ids, 'TXT', None)
+    assert resultado['sucesso'], resultado.get('erro')
+    return resultado['envio_id']
+
+
+def escrever_retorno(pasta, nome, recusados=()):
+    linhas = []
+    for i in range(TOTAL_FONOGRAMAS):
+        isrc = linha_base(i)['isrc']
+        if i in recusados:
+            linhas.append({'ISRC': isrc, 'STATUS': 'RECUSADO', 'CODIGO_ERRO': 'E003', 'COD_ECAD': ''})
+        else:
+            linhas.append({'ISRC': isrc, 'STATUS': 'ACEITO', 'CODIGO_ERRO': '', 'COD_ECAD': f'ECAD{i:06d}'})
+    caminho = pasta / nome
+    pd.DataFrame(linhas).to_csv(caminho, index=False)
+    return caminho
+
+
+def enviar(caminho, envio_id):
+    from admin.services.retorno_service import processar_upload_retorno
+
+    with open(caminho, 'rb') as arquivo:
+        return processar_upload_retorno(FileStorage(arquivo, filename=caminho.name), envio_id)
+
+
+def estado(banco):
+    return {
+        'retornos': banco.session.query(RetornoECAD).count(),
+        'historico': banco.session.query(HistoricoFonograma).count(),
+        'linhas_aplicadas': banco.session.query(FingerprintLinhaRetorno).count(),
+        'fonogramas': sorted(banco.session.query(Fonograma.isrc, Fonograma.status_ecad, Fonograma.cod_ecad)),
+    }
+
+
+def test_mesmo_arquivo_duas_vezes(banco, pasta_trabalho):
+    envio_id = preparar_envio(banco)
+    caminho = escrever_retorno(pasta_trabalho, 'retorno.csv', recusados={3, 7})
+
+    primeiro = enviar(caminho, envio_id)
+    depois_do_primeiro = estado(banco)
+    segundo = enviar(caminho, envio_id)
+
+    assert primeiro['sucesso'] and (primeiro['aceitos'], primeiro['recusados']) == (38, 2)
+    assert segundo['sucesso'] and segundo['ja_processado']
+    assert (segundo['aceitos'], segundo['recusados']) == (38, 2)
+    assert estado(banco) == depois_do_primeiro
+    assert depois_do_primeiro['retornos'] == TOTAL_FONOGRAMAS
+
+
+def test_arquivo_corrigido_aplica_so_as_linhas_novas(banco, pasta_trabalho):
+    envio_id = preparar_envio(banco)
+    enviar(escrever_retorno(pasta_trabalho, 'retorno.csv', recusados={3, 7}), envio_id)
+    antes = estado(banco)
+
+    # O ECAD reprocessou o fonograma 7: só essa linha mudou
+    corrigido = enviar(escrever_retorno(pasta_trabalho, 'retorno_corrigido.csv', recusados={3}), envio_id)
+
+    assert corrigido['sucesso'] and not corrigido.get('ja_processado')
+    assert corrigido['ja_aplicadas'] == TOTAL_FONOGRAMAS - 1
+    assert (corrigido['aceitos'], corrigido['recusados']) == (1, 0)
+    depois = estado(banco)
+    assert depois['retornos'] == antes['retornos'] + 1
+    assert depois['linhas_aplicadas'] == antes['linhas_aplicadas'] + 1
+    isrc = linha_base(7)['isrc']
+    assert (isrc, 'ACEITO', 'ECAD000007') in depois['fonogramas']
+
+    # E o corrigido de novo não grava nada
+    assert enviar(pasta_trabalho / 'retorno_corrigido.csv', envio_id)['ja_processado']
+    assert estado(banco) == depois
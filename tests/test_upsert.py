@@ -0,0 +1,90 @@
+"""
+Gravação por ISRC (upsert_service): gravar a mesma planilha de novo atualiza
+os fonogramas existentes, sem duplicar fonogramas nem titulares.
+"""
+
+from contextlib import nullcontext
+
+import pandas as pd
+
+from benchmark_validacao import linha_base
+from models import Autor, Documento, Editora, Fonograma, Interprete, Musico
+
+
+def contagens(db):
+    return {
+        modelo.__tablename__: db.session.query(modelo).count()
+        for modelo in (Fonograma, Autor, Interprete, Musico)
+    }
+
+
+def estado_fonogramas(db):
+    ignorar = {'id', 'created_at', 'updated_at'}
+    colunas = [c.name for c in Fonograma.__table__.columns if c.name not in ignorar]
+    return {
+        f.isrc: {coluna: getattr(f, coluna) for coluna in colunas}
+        for f in db.session.query(Fonograma)
+    }
+
+
+def test_upsert_repetido(banco):
+    from shared.fonograma_service import _valores_criacao, _valores_filhos
+    from shared.upsert_service import upsert_fonogramas
+
+    linhas = [linha_base(i) for i in range(40)]
+    valores = [_valores_criacao(linha) for linha in linhas]
+    filhos = {linha['isrc']: _valores_filhos(linha) for linha in linhas}
+
+    primeira = upsert_fonogramas(valores, filhos)
+    banco.session.commit()
+    antes = contagens(banco)
+    segunda = upsert_fonogramas(valores, filhos)
+    banco.session.commit()
+
+    assert all(criado for _, criado in primeira.values())
+    assert not any(criado for _, criado in segunda.values())
+    assert {isrc: id_ for isrc, (id_, _) in segunda.items()} == {isrc: id_ for isrc, (id_, _) in primeira.items()}
+    assert contagens(banco) == antes == {'fonogramas': 40, 'autores': 40, 'interpretes': 40, 'musicos': 40}
+
+
+def test_importacao_em_lote_repetida(banco):
+    from shared.fonograma_service import salvar_fonogramas_do_dataframe
+
+    df = pd.DataFrame([linha_base(i) for i in range(1200)], dtype=str)
+
+    primeira = salvar_fonogramas_do_dataframe(df, nullcontext(), em_lote=True)
+    antes, estado = contagens(banco), estado_fonogramas(banco)
+    banco.session.expunge_all()
+    segunda = salvar_fonogramas_do_dataframe(df, nullcontext(), em_lote=True)
+    banco.session.expunge_all()
+
+    assert (primeira['salvos'], primeira['atualizados'], primeira['erros']) == (1200, 0, [])
+    assert (segunda['salvos'], segunda['atualizados'], segunda['erros']) == (0, 1200, [])
+    assert contagens(banco) == antes
+    assert estado_fonogramas(banco) == estado
+
+
+def test_atualizacao_em_lote_igual_a_linha_a_linha(banco):
+    """Células vazias num ISRC existente: o upsert grava o mesmo que o ORM"""
+    from shared.fonograma_service import salvar_fonogramas_do_dataframe
+
+    df = pd.DataFrame([linha_base(i) for i in range(30)], dtype=str)
+    alterada = df.copy()
+    for coluna in ('ano_lanc', 'ano_grav', 'versao', 'prod_perc', 'situacao', 'idioma'):
+        alterada.loc[::2, coluna] = ''
+
+    estados = {}
+    for em_lote in (True, False):
+        for modelo in (Autor, Editora, Interprete, Musico, Documento, Fonograma):
+            banco.session.query(modelo).delete()
+        banco.session.commit()
+        banco.session.expunge_all()
+        salvar_fonogramas_do_dataframe(df, nullcontext(), em_lote=em_lote)
+        banco.session.expunge_all()
+        resultado = salvar_fonogramas_do_dataframe(alterada, nullcontext(), em_lote=em_lote)
+        banco.session.expunge_all()
+        assert (resultado['salvos'], resultado['atualizados']) == (0, 30)
+        estados[em_lote] = estado_fonogramas(banco)
+
+    assert estados[True] == estados[False]
+    assert estados[True][linha_base(0)['isrc']]['ano_lanc'] is None
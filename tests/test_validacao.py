@@ -0,0 +1,74 @@
+"""
+Motor de validação vetorizado x validador linha a linha de referência
+(scripts/benchmark_validacao.py): mesmos erros, na mesma ordem, e mesmas
+contagens de linhas válidas e com erro.
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from benchmark_validacao import PARSERS, gerar_dataframe, validar_dataframe_linha_a_linha
+from shared.processador import (
+    ler_csv_com_fallback, listas_por_linha, normalizar_colunas, parse_coluna_em_lote,
+    parse_composicoes_em_lote
+)
+from shared import validador_vetorizado
+from shared.validador_vetorizado import validar_dataframe, validar_dataframe_paralelo
+
+from conftest import RAIZ
+
+PLANILHAS_EXEMPLO = [
+    'exemplo.csv',
+    'fonograma_com_erros_demonstracao.csv',
+    'fonograma_realista_teste.csv',
+]
+
+
+def ler_planilha(nome: str) -> pd.DataFrame:
+    """Lê a planilha como processar_csv antes de validar"""
+    df, _, _ = ler_csv_com_fallback(os.path.join(RAIZ, nome))
+    return normalizar_colunas(df).fillna('')
+
+
+@pytest.fixture(scope='module')
+def planilha_gerada():
+    # ~30% das linhas com valores inválidos ou de borda (VARIACOES do benchmark)
+    return gerar_dataframe(3000)
+
+
+@pytest.mark.parametrize('nome', PLANILHAS_EXEMPLO)
+def test_planilhas_de_exemplo(nome):
+    df = ler_planilha(nome)
+    assert validar_dataframe(df) == validar_dataframe_linha_a_linha(df)
+
+
+def test_planilha_gerada(planilha_gerada):
+    referencia = validar_dataframe_linha_a_linha(planilha_gerada)
+    assert referencia[0], 'a planilha gerada deveria ter erros'
+    assert validar_dataframe(planilha_gerada) == referencia
+
+
+def test_planilha_gerada_com_tabelas_prontas(planilha_gerada):
+    composicoes = parse_composicoes_em_lote(planilha_gerada)
+    resultado = validar_dataframe(planilha_gerada, composicoes=composicoes)
+    assert resultado == validar_dataframe_linha_a_linha(planilha_gerada)
+
+
+def test_planilha_gerada_em_paralelo(planilha_gerada, monkeypatch):
+    monkeypatch.setattr(validador_vetorizado, 'VALIDACAO_PARALELA_MIN_LINHAS', 1000)
+    resultado = validar_dataframe_paralelo(planilha_gerada, workers=2)
+    assert resultado == validar_dataframe_linha_a_linha(planilha_gerada)
+
+
+def test_planilha_sem_colunas_compostas():
+    df = gerar_dataframe(50).drop(columns=list(PARSERS))
+    assert validar_dataframe(df) == validar_dataframe_linha_a_linha(df)
+
+
+@pytest.mark.parametrize('tipo', list(PARSERS))
+def test_parser_em_lote_igual_ao_parse(planilha_gerada, tipo):
+    valores = planilha_gerada[tipo].tolist() + [None, float('nan'), '', ' ; ', 'Nome só']
+    tabela = parse_coluna_em_lote(pd.Series(valores, dtype=object), tipo)
+    assert listas_por_linha(tabela, len(valores)) == [PARSERS[tipo](v) for v in valores]
@@ -357,6 +357,15 @@ def salvar_upload():
     # Filtrar apenas linhas válidas
     salvar_apenas_validos = request.form.get('salvar_apenas_validos') == 'on'
     
+    # Gravação em segundo plano (scripts/worker_importacao.py)
+    if request.form.get('assincrono') == '1':
+        from shared import jobs
+        job = jobs.enfileirar('salvar_upload', user_id=current_user.id, dados=resultado_validacao,
+                              parametros={'salvar_apenas_validos': salvar_apenas_validos})
+        session.pop('upload_resultado', None)
+        flash(f'Importação #{job.id} enviada para processamento. Acompanhe o andamento em /api/jobs/{job.id}.', 'info')
+        return redirect(url_for('usuario.listar_fonogramas'))
+    
     resultado = upload_service.salvar_fonogramas(
         resultado_validacao,
         current_user,
@@ -7,193 +7,138 @@ import os
 import tempfile
 from models import Fonograma
 
+# Fonogramas carregados por consulta (titulares em uma consulta por relacionamento)
+TAMANHO_LOTE_EXPORTACAO = 1000
+
 
 def exportar_fonogramas(usuario, fonograma_ids=None):
     """
     Exporta fonogramas para Excel com estilo idêntico ao template.
     Cria arquivo do zero para evitar erro de corrupção do Excel.
+    As linhas são escritas à medida que os fonogramas chegam do banco (escritor_xlsx).
     """
-    import openpyxl
-    from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
-    from openpyxl.utils import get_column_letter
+    from openpyxl.styles import Font
+    from sqlalchemy.orm import selectinload
+    from shared.escritor_xlsx import Coluna, borda_fina, escrever_planilha, estilo
     
     query = Fonograma.query.filter_by(user_id=usuario.id)
         
     if fonograma_ids:
         query = query.filter(Fonograma.id.in_(fonograma_ids))
         
-    fonogramas = query.order_by(Fonograma.created_at.desc()).all()
-    
-    # Criar workbook novo (evita problemas de corrupção ao copiar template)
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Fonogramas"
-    
-    # === DEFINIR HEADERS ===
-    headers = [
-        'ISRC *', 'Título *', 'Duração *', 'Ano Lanc. *', 'Gênero *', 'Título Obra *',
-        'Autores * (Nome|CPF|Função|%)', 'Intérpretes (Nome|Doc|Cat|%|Assoc)',
-        'Produtor Nome *', 'Produtor Doc *', 'Produtor % *',
-        'Versão', 'Idioma', 'Ano Grav.', 'Cód. Interno', 'Cód. Obra',
-        'Editoras (Nome|CNPJ|%)', 'Músicos (Nome|CPF|Instr|Tipo|%)',
-        'Prod. Fantasia', 'Prod. Assoc.', 'Tipo Lanç.', 'Álbum', 'Faixa',
-        'Formato', 'Situação', 'Território'
-    ]
-    
-    # === CORES (EXATAS do template) ===
-    # Identificação: 22164C (roxo escuro)
-    cor_identificacao = PatternFill(start_color="22164C", end_color="22164C", fill_type="solid")
-    # Obra: 3D2E6B (roxo médio)
-    cor_obra = PatternFill(start_color="3D2E6B", end_color="3D2E6B", fill_type="solid")
-    # Autores/Intérpretes: EF234D (vermelho SBACEM)
-    cor_autores = PatternFill(start_color="EF234D", end_color="EF234D", fill_type="solid")
-    # Produtor: E1C8B0 (bege)
-    cor_produtor = PatternFill(start_color="E1C8B0", end_color="E1C8B0", fill_type="solid")
-    # Opcionais: 4A4A4A (cinza)
-    cor_opcional = PatternFill(start_color="4A4A4A", end_color="4A4A4A", fill_type="solid")
-    # Dados: FFF3CD (amarelo claro)
-    cor_dados = PatternFill(start_color="FFF3CD", end_color="FFF3CD", fill_type="solid")
+    fonogramas = query.options(
+        selectinload(Fonograma.autores_list),
+        selectinload(Fonograma.interpretes_list),
+        selectinload(Fonograma.editoras_list),
+        selectinload(Fonograma.musicos_list),
+    ).order_by(Fonograma.created_at.desc()).yield_per(TAMANHO_LOTE_EXPORTACAO)
     
-    # Fontes
+    # === ESTILOS (CORES EXATAS do template) ===
+    borda = borda_fina('CCCCCC')
     fonte_branca = Font(color="FFFFFF", bold=True)
     fonte_escura = Font(color="22164C", bold=True)
-    fonte_dados = Font(color="000000")
-    
-    # Alinhamentos
-    alinhamento_header = Alignment(horizontal="center", vertical="center", wrap_text=True)
-    alinhamento_dados = Alignment(vertical="center", wrap_text=True)
-    
-    # Borda
-    borda = Border(
-        left=Side(style='thin', color='CCCCCC'),
-        right=Side(style='thin', color='CCCCCC'),
-        top=Side(style='thin', color='CCCCCC'),
-        bottom=Side(style='thin', color='CCCCCC')
-    )
-    
-    # Mapa de cores por coluna (index 0-based)
-    cores_colunas = [
-        (cor_identificacao, fonte_branca),  # 1 ISRC
-        (cor_identificacao, fonte_branca),  # 2 Título
-        (cor_identificacao, fonte_branca),  # 3 Duração
-        (cor_identificacao, fonte_branca),  # 4 Ano Lanc
-        (cor_identificacao, fonte_branca),  # 5 Gênero
-        (cor_obra, fonte_branca),           # 6 Título Obra
-        (cor_autores, fonte_branca),        # 7 Autores
-        (cor_autores, fonte_branca),        # 8 Intérpretes
-        (cor_produtor, fonte_escura),       # 9 Produtor Nome
-        (cor_produtor, fonte_escura),       # 10 Produtor Doc
-        (cor_produtor, fonte_escura),       # 11 Produtor %
-        (cor_opcional, fonte_branca),       # 12 Versão
-        (cor_opcional, fonte_branca),       # 13 Idioma
-        (cor_opcional, fonte_branca),       # 14 Ano Grav
-        (cor_opcional, fonte_branca),       # 15 Cód Interno
-        (cor_opcional, fonte_branca),       # 16 Cód Obra
-        (cor_opcional, fonte_branca),       # 17 Editoras
-        (cor_opcional, fonte_branca),       # 18 Músicos
-        (cor_opcional, fonte_branca),       # 19 Prod Fantasia
-        (cor_opcional, fonte_branca),       # 20 Prod Assoc
-        (cor_opcional, fonte_branca),       # 21 Tipo Lanç
-        (cor_opcional, fonte_branca),       # 22 Álbum
-        (cor_opcional, fonte_branca),       # 23 Faixa
-        (cor_opcional, fonte_branca),       # 24 Formato
-        (cor_opcional, fonte_branca),       # 25 Situação
-        (cor_opcional, fonte_branca),       # 26 Território
+    estilos = [
+        # Identificação: 22164C (roxo escuro)
+        estilo('identificacao', fundo='22164C', fonte=fonte_branca, horizontal='center', vertical='center', quebrar_texto=True, borda=borda),
+        # Obra: 3D2E6B (roxo médio)
+        estilo('obra', fundo='3D2E6B', fonte=fonte_branca, horizontal='center', vertical='center', quebrar_texto=True, borda=borda),
+        # Autores/Intérpretes: EF234D (vermelho SBACEM)
+        estilo('autores', fundo='EF234D', fonte=fonte_branca, horizontal='center', vertical='center', quebrar_texto=True, borda=borda),
+        # Produtor: E1C8B0 (bege)
+        estilo('produtor', fundo='E1C8B0', fonte=fonte_escura, horizontal='center', vertical='center', quebrar_texto=True, borda=borda),
+        # Opcionais: 4A4A4A (cinza)
+        estilo('opcional', fundo='4A4A4A', fonte=fonte_branca, horizontal='center', vertical='center', quebrar_texto=True, borda=borda),
+        # Dados: FFF3CD (amarelo claro)
+        estilo('dados', fundo='FFF3CD', fonte=Font(color="000000"), vertical='center', quebrar_texto=True, borda=borda),
     ]
     
-    # === ESCREVER HEADERS ===
-    for col_idx, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_idx, value=header)
-        cor, fonte = cores_colunas[col_idx - 1]
-        cell.fill = cor
-        cell.font = fonte
-        cell.alignment = alinhamento_header
-        cell.border = borda
+    # === HEADERS (estilo e largura idênticos ao template) ===
+    colunas = [
+        Coluna('ISRC *', 'identificacao', 14),
+        Coluna('Título *', 'identificacao', 25),
+        Coluna('Duração *', 'identificacao', 10),
+        Coluna('Ano Lanc. *', 'identificacao', 10),
+        Coluna('Gênero *', 'identificacao', 12),
+        Coluna('Título Obra *', 'obra', 25),
+        Coluna('Autores * (Nome|CPF|Função|%)', 'autores', 50),
+        Coluna('Intérpretes (Nome|Doc|Cat|%|Assoc)', 'autores', 45),
+        Coluna('Produtor Nome *', 'produtor', 25),
+        Coluna('Produtor Doc *', 'produtor', 16),
+        Coluna('Produtor % *', 'produtor', 10),
+        Coluna('Versão', 'opcional', 12),
+        Coluna('Idioma', 'opcional', 8),
+        Coluna('Ano Grav.', 'opcional', 10),
+        Coluna('Cód. Interno', 'opcional', 12),
+        Coluna('Cód. Obra', 'opcional', 12),
+        Coluna('Editoras (Nome|CNPJ|%)', 'opcional', 30),
+        Coluna('Músicos (Nome|CPF|Instr|Tipo|%)', 'opcional', 35),
+        Coluna('Prod. Fantasia', 'opcional', 15),
+        Coluna('Prod. Assoc.', 'opcional', 12),
+        Coluna('Tipo Lanç.', 'opcional', 12),
+        Coluna('Álbum', 'opcional', 20),
+        Coluna('Faixa', 'opcional', 8),
+        Coluna('Formato', 'opcional', 10),
+        Coluna('Situação', 'opcional', 10),
+        Coluna('Território', 'opcional', 12),
+    ]
     
-    # === LARGURAS DAS COLUNAS (idêntico ao template) ===
-    larguras = {
-        'A': 14, 'B': 25, 'C': 10, 'D': 10, 'E': 12, 'F': 25,
-        'G': 50, 'H': 45, 'I': 25, 'J': 16, 'K': 10,
-        'L': 12, 'M': 8, 'N': 10, 'O': 12, 'P': 12,
-        'Q': 30, 'R': 35, 'S': 15, 'T': 12, 'U': 12,
-        'V': 20, 'W': 8, 'X': 10, 'Y': 10, 'Z': 12
-    }
-    for col, width in larguras.items():
-        ws.column_dimensions[col].width = width
+    # === SALVAR ARQUIVO (header congelado) ===
+    arquivo = tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False)
+    arquivo.close()  # Fechar o handle antes de salvar
+    escrever_planilha(arquivo.name, 'Fonogramas', colunas, (_linha_exportacao(f) for f in fonogramas),
+                      estilos, ['dados'], altura_cabecalho=40, altura_dados=25, congelar='A2')
     
-    # === ALTURA DO HEADER ===
-    ws.row_dimensions[1].height = 40
+    return arquivo.name
+
+
+def _linha_exportacao(f):
+    """Valores de um fonograma na ordem do template"""
+    # Formatar relações no formato pipe-delimited
+    autores_str = '; '.join([
+        f"{a.nome}|{a.cpf}|{a.funcao}|{a.percentual}" 
+        for a in f.autores_list
+    ]) if f.autores_list else ''
     
-    # === INSERIR DADOS ===
-    for row_idx, f in enumerate(fonogramas, 2):
-        # Formatar relações no formato pipe-delimited
-        autores_str = '; '.join([
-            f"{a.nome}|{a.cpf}|{a.funcao}|{a.percentual}" 
-            for a in f.autores_list
-        ]) if f.autores_list else ''
-        
-        interpretes_str = '; '.join([
-            f"{i.nome}|{i.doc}|{i.categoria}|{i.percentual}|{i.associacao or ''}"
-            for i in f.interpretes_list
-        ]) if f.interpretes_list else ''
-        
-        editoras_str = '; '.join([
-            f"{e.nome}|{e.cnpj}|{e.percentual}"
-            for e in f.editoras_list
-        ]) if f.editoras_list else ''
-        
-        musicos_str = '; '.join([
-            f"{m.nome}|{m.cpf}|{m.instrumento}|{m.tipo}|{m.percentual}"
-            for m in f.musicos_list
-        ]) if f.musicos_list else ''
-        
-        # Dados na ordem do template
-        row_data = [
-            f.isrc,
-            f.titulo,
-            f.duracao,
-            f.ano_lanc,
-            f.genero,
-            f.titulo_obra,
-            autores_str,
-            interpretes_str,
-            f.prod_nome,
-            f.prod_doc,
-            f.prod_perc,
-            f.versao,
-            f.idioma,
-            f.ano_grav,
-            f.cod_interno,
-            f.cod_obra,
-            editoras_str,
-            musicos_str,
-            f.prod_fantasia,
-            f.prod_assoc,
-            f.tipo_lanc,
-            f.album,
-            f.faixa,
-            f.formato,
-            f.situacao,
-            f.territorio,
-        ]
-        
-        for col_idx, value in enumerate(row_data, 1):
-            cell = ws.cell(row=row_idx, column=col_idx, value=value)
-            cell.fill = cor_dados
-            cell.font = fonte_dados
-            cell.alignment = alinhamento_dados
-            cell.border = borda
-        
-        # Altura da linha de dados
-        ws.row_dimensions[row_idx].height = 25
+    interpretes_str = '; '.join([
+        f"{i.nome}|{i.doc}|{i.categoria}|{i.percentual}|{i.associacao or ''}"
+        for i in f.interpretes_list
+    ]) if f.interpretes_list else ''
     
-    # === CONGELAR HEADER ===
-    ws.freeze_panes = 'A2'
+    editoras_str = '; '.join([
+        f"{e.nome}|{e.cnpj}|{e.percentual}"
+        for e in f.editoras_list
+    ]) if f.editoras_list else ''
     
-    # === SALVAR ARQUIVO ===
-    arquivo = tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False)
-    arquivo.close()  # Fechar o handle antes de salvar
-    wb.save(arquivo.name)
-    wb.close()  # Fechar o workbook também
+    musicos_str = '; '.join([
+        f"{m.nome}|{m.cpf}|{m.instrumento}|{m.tipo}|{m.percentual}"
+        for m in f.musicos_list
+    ]) if f.musicos_list else ''
     
-    return arquivo.name
+    return [
+        f.isrc,
+        f.titulo,
+        f.duracao,
+        f.ano_lanc,
+        f.genero,
+        f.titulo_obra,
+        autores_str,
+        interpretes_str,
+        f.prod_nome,
+        f.prod_doc,
+        f.prod_perc,
+        f.versao,
+        f.idioma,
+        f.ano_grav,
+        f.cod_interno,
+        f.cod_obra,
+        editoras_str,
+        musicos_str,
+        f.prod_fantasia,
+        f.prod_assoc,
+        f.tipo_lanc,
+        f.album,
+        f.faixa,
+        f.formato,
+        f.situacao,
+        f.territorio,
+    ]
@@ -1,21 +1,36 @@
 # usuario/services/upload_service.py
-from shared.processador import processar_arquivo_fonogramas
+from shared.processador import processar_arquivo_fonogramas, ler_excel, xlsx_pequeno
 from shared.fonograma_service import salvar_fonogramas_do_dataframe
 from shared.validador import validar_isrc, validar_cpf, validar_cnpj, validar_duracao
+from shared import cache_validacao
 from models import db, Fonograma
 from datetime import datetime
 import pandas as pd
 import tempfile
 import os
 
+# Quantidade de ISRCs por consulta na checagem de duplicidade
+LOTE_CONSULTA_ISRC = 500
+
 def validar_arquivo(arquivo):
     """Valida arquivo e retorna preview para usuário"""
     # Salvar temporariamente
-    temp = tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(arquivo.filename)[1])
-    arquivo.save(temp.name)
+    extensao = os.path.splitext(arquivo.filename)[1]
+    conteudo = arquivo.read()
+    temp = tempfile.NamedTemporaryFile(delete=False, suffix=extensao)
+    temp.write(conteudo)
+    temp.close()
     
-    # Processar
-    resultado = processar_arquivo_fonogramas(temp.name)
+    # Processar (reenvio do mesmo arquivo reaproveita o resultado em cache)
+    chave = cache_validacao.chave_cache(conteudo, 'validacao', extensao)
+    resultado = cache_validacao.obter(chave)
+    if resultado is None:
+        resultado = processar_arquivo_fonogramas(temp.name, incremental=True)
+        # Fingerprints gravados pela validação incremental
+        db.session.commit()
+        # Erros gerais (leitura/estrutura) não vão para o cache
+        if not any(e.get('linha', 0) < 2 for e in resultado.get('erros', [])):
+            cache_validacao.guardar(chave, resultado)
     
     # Criar mapa de erros por linha para associação eficiente
     # linha no erro é 1-based (contando header como 1, dados começam 2)
@@ -34,6 +49,7 @@ def validar_arquivo(arquivo):
     # Enriquecer com validações extras e pré-check de duplicidade
     validos = []
     com_erro = []
+    existentes = _isrcs_existentes([item.get('isrc') for item in resultado['dados']])
     
     for idx, item in enumerate(resultado['dados']):
         # Pegar erros do processador + erros já presentes no item se houver
@@ -45,7 +61,7 @@ def validar_arquivo(arquivo):
         avisos = []
         
         # Verificar duplicidade
-        if Fonograma.query.filter_by(isrc=item.get('isrc')).first():
+        if item.get('isrc') in existentes:
             avisos.append('ISRC já existe (será atualizado)')
             
         if erros:
@@ -61,12 +77,25 @@ def validar_arquivo(arquivo):
         'validos': validos,
         'com_erro': com_erro,
         'arquivo_temp': temp.name,
+        'chave_cache': chave,
         # Passar erros gerais (linha 0) caso não haja dados
         'erros_gerais': [e.get('erro') for e in resultado.get('erros', []) if e.get('linha', 0) < 2]
     }
 
-def salvar_fonogramas(resultado_validacao, usuario, salvar_apenas_validos=False):
-    """Salva fonogramas da validação usando dados diretamente da sessão"""
+def _isrcs_existentes(isrcs):
+    """ISRCs já cadastrados, consultados em lotes (uma query por lote em vez de uma por linha)"""
+    unicos = list({isrc for isrc in isrcs if isrc})
+    existentes = set()
+    for inicio in range(0, len(unicos), LOTE_CONSULTA_ISRC):
+        lote = unicos[inicio:inicio + LOTE_CONSULTA_ISRC]
+        existentes.update(isrc for (isrc,) in db.session.query(Fonograma.isrc).filter(Fonograma.isrc.in_(lote)))
+    return existentes
+
+def salvar_fonogramas(resultado_validacao, usuario, salvar_apenas_validos=False, callback_progresso=None):
+    """
+    Salva fonogramas da validação usando dados diretamente da sessão
+    (também executado em segundo plano pelo job salvar_upload, ver shared/jobs.py)
+    """
     try:
         # Tentar usar dados validados diretamente (mais confiável)
         dados_validados = resultado_validacao.get('dados_validados', [])
@@ -83,13 +112,18 @@ def salvar_fonogramas(resultado_validacao, usuario, salvar_apenas_validos=False)
             if not arquivo_temp or not os.path.exists(arquivo_temp):
                 return {'sucesso': False, 'erro': 'Nenhum dado disponível para salvar'}
             
-            df = pd.read_excel(arquivo_temp)
+            # XLSX grande em streaming, como texto (convertido pelos safe_* na gravação)
+            if arquivo_temp.lower().endswith('.xlsx') and not xlsx_pequeno(arquivo_temp):
+                df = ler_excel(arquivo_temp, limpar=False)
+            else:
+                df = pd.read_excel(arquivo_temp)
         
         # Importar app para obter contexto
         from app import app
         
         # Chamar com parâmetros corretos - incluindo user_id para ownership
-        resultado = salvar_fonogramas_do_dataframe(df, app.app_context(), salvar_apenas_validos, user_id=usuario.id)
+        resultado = salvar_fonogramas_do_dataframe(df, app.app_context(), salvar_apenas_validos, user_id=usuario.id,
+                                                   incremental=True, callback_progresso=callback_progresso)
         
         # Adicionar flag de sucesso
         resultado['sucesso'] = True
@@ -205,7 +239,14 @@ def processar_para_frontend(arquivo):
     # 2. Gerar Excel de saída (apenas válidos para converter)
     arquivo_excel = None
     arquivo_save = None
-    if resultado['validos']:
+    output_dir = os.path.join(os.getcwd(), 'outputs')
+    
+    # Mesmo arquivo já convertido: reaproveita os Excel gerados, se ainda existirem
+    chave_saida = resultado['chave_cache'] + '-conversor'
+    gerados = cache_validacao.obter(chave_saida) if resultado['validos'] else None
+    if gerados and all(os.path.exists(os.path.join(output_dir, nome)) for nome in gerados):
+        arquivo_excel, arquivo_save = gerados
+    elif resultado['validos']:
         # DataFrame original com colunas lowercase (para save)
         df_original = pd.DataFrame(resultado['validos'])
         # Remover colunas internas de controle se existirem
@@ -224,7 +265,6 @@ def processar_para_frontend(arquivo):
         
         # Gerar arquivo - usar delete=False e fechar antes de mover
         import shutil
-        output_dir = os.path.join(os.getcwd(), 'outputs')
         os.makedirs(output_dir, exist_ok=True)
         
         # 1. Gerar Excel no formato TEMPLATE para download (com colunas ISRC *, Título *, etc.)
@@ -258,6 +298,8 @@ def processar_para_frontend(arquivo):
             os.remove(temp_save_path)
         except:
             pass
+        
+        cache_validacao.guardar(chave_saida, (arquivo_excel, arquivo_save))
     
     # 3. Formatar Erros (Flatten)
     erros_flat = []
@@ -309,104 +351,61 @@ def _gerar_excel_estilizado(df, filepath):
     """
     Gera Excel com estilos SBACEM idênticos ao export_service.
     """
-    import openpyxl
-    from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
-    
-    # Criar workbook
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Fonogramas"
-    
-    # Headers do DataFrame
-    headers = list(df.columns)
-    
-    # === CORES (EXATAS do template) ===
-    cor_identificacao = PatternFill(start_color="22164C", end_color="22164C", fill_type="solid")
-    cor_obra = PatternFill(start_color="3D2E6B", end_color="3D2E6B", fill_type="solid")
-    cor_autores = PatternFill(start_color="EF234D", end_color="EF234D", fill_type="solid")
-    cor_produtor = PatternFill(start_color="E1C8B0", end_color="E1C8B0", fill_type="solid")
-    cor_opcional = PatternFill(start_color="4A4A4A", end_color="4A4A4A", fill_type="solid")
-    cor_dados = PatternFill(start_color="FFF3CD", end_color="FFF3CD", fill_type="solid")
+    from openpyxl.styles import Font
+    from shared.escritor_xlsx import Coluna, borda_fina, escrever_planilha, estilo
     
+    # === ESTILOS (CORES EXATAS do template) ===
+    borda = borda_fina('CCCCCC')
     fonte_branca = Font(color="FFFFFF", bold=True)
     fonte_escura = Font(color="22164C", bold=True)
-    fonte_dados = Font(color="000000")
-    
-    alinhamento_header = Alignment(horizontal="center", vertical="center", wrap_text=True)
-    alinhamento_dados = Alignment(vertical="center", wrap_text=True)
-    
-    borda = Border(
-        left=Side(style='thin', color='CCCCCC'),
-        right=Side(style='thin', color='CCCCCC'),
-        top=Side(style='thin', color='CCCCCC'),
-        bottom=Side(style='thin', color='CCCCCC')
-    )
+    estilos = [
+        estilo('identificacao', fundo='22164C', fonte=fonte_branca, horizontal='center', vertical='center', quebrar_texto=True, borda=borda),
+        estilo('obra', fundo='3D2E6B', fonte=fonte_branca, horizontal='center', vertical='center', quebrar_texto=True, borda=borda),
+        estilo('autores', fundo='EF234D', fonte=fonte_branca, horizontal='center', vertical='center', quebrar_texto=True, borda=borda),
+        estilo('produtor', fundo='E1C8B0', fonte=fonte_escura, horizontal='center', vertical='center', quebrar_texto=True, borda=borda),
+        estilo('opcional', fundo='4A4A4A', fonte=fonte_branca, horizontal='center', vertical='center', quebrar_texto=True, borda=borda),
+        # Dados com wrap_text
+        estilo('dados', fundo='FFF3CD', fonte=Font(color="000000"), vertical='center', quebrar_texto=True, borda=borda),
+    ]
     
     # Mapa de cores por header
     def get_header_style(header):
         header_lower = header.lower()
         if 'isrc' in header_lower or 'título *' == header_lower or 'duração' in header_lower or 'ano lanc' in header_lower or 'gênero' in header_lower:
-            return cor_identificacao, fonte_branca
+            return 'identificacao'
         elif 'título obra' in header_lower:
-            return cor_obra, fonte_branca
+            return 'obra'
         elif 'autores' in header_lower or 'intérpretes' in header_lower:
-            return cor_autores, fonte_branca
+            return 'autores'
         elif 'produtor' in header_lower:
-            return cor_produtor, fonte_escura
+            return 'produtor'
         else:
-            return cor_opcional, fonte_branca
-    
-    # Escrever headers
-    for col_idx, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_idx, value=header)
-        cor, fonte = get_header_style(header)
-        cell.fill = cor
-        cell.font = fonte
-        cell.alignment = alinhamento_header
-        cell.border = borda
+            return 'opcional'
     
     # Larguras de colunas (Ajustadas para melhor leitura)
-    larguras = {
-        'A': 18,  # ISRC
-        'B': 45,  # Título
-        'C': 12,  # Duração
-        'D': 12,  # Ano Lanc
-        'E': 15,  # Gênero
-        'F': 40,  # Título Obra
-        'G': 60,  # Autores (Longo)
-        'H': 60,  # Intérpretes (Longo)
-        'I': 30,  # Produtor Nome
-        'J': 20,  # Produtor Doc
-        'K': 12,  # Produtor %
+    larguras = [
+        18,  # ISRC
+        45,  # Título
+        12,  # Duração
+        12,  # Ano Lanc
+        15,  # Gênero
+        40,  # Título Obra
+        60,  # Autores (Longo)
+        60,  # Intérpretes (Longo)
+        30,  # Produtor Nome
+        20,  # Produtor Doc
+        12,  # Produtor %
         # Extras se existirem
-        'L': 15, 'M': 15, 'N': 15, 'O': 15, 'P': 40
-    }
-    
-    # Aplicar larguras
-    for col_letter, width in larguras.items():
-        ws.column_dimensions[col_letter].width = width
+        15, 15, 15, 15, 40
+    ]
     
-    # Altura do header
-    ws.row_dimensions[1].height = 45
-    
-    # Escrever dados
-    for row_idx, row in enumerate(df.values, 2):
-        for col_idx, value in enumerate(row, 1):
-            cell = ws.cell(row=row_idx, column=col_idx, value=value)
-            cell.fill = cor_dados
-            cell.font = fonte_dados
-            cell.alignment = alinhamento_dados # Já inclui wrap_text
-            cell.border = borda
-        
-        # Altura da linha automática ou fixa?
-        # Como temos wrap_text, deixar automático é melhor, mas Excel via openpyxl
-        # nem sempre ajusta sozinho. Vamos dar uma altura mínima.
-        ws.row_dimensions[row_idx].height = 60 # Altura generosa para acomodar wraps
-    
-    # Congelar header e primeira coluna (ISRC) para facilitar navegação
-    ws.freeze_panes = 'B2'
+    headers = list(df.columns)
+    colunas = [
+        Coluna(header, get_header_style(header), larguras[idx] if idx < len(larguras) else None)
+        for idx, header in enumerate(headers)
+    ]
     
-    # Salvar
-    wb.save(filepath)
-    wb.close()
-
+    # Como temos wrap_text, a altura automática seria melhor, mas o openpyxl não ajusta
+    # sozinho: altura generosa para acomodar wraps. Header e primeira coluna (ISRC) congelados.
+    escrever_planilha(filepath, 'Fonogramas', colunas, df.itertuples(index=False, name=None), estilos, ['dados'],
+                      altura_cabecalho=45, altura_dados=60, congelar='B2')